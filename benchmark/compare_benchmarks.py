@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Script to compare two sleigh-benchmark result files and flag regressions"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# Results format written by sleigh-benchmark that this script understands
+SUPPORTED_FORMAT_VERSION = 1
+
+# Compared metrics, with whether a higher value is better
+METRICS = [
+    ("instructions_per_second", "insns/s", True),
+    ("pcode_ops_per_second", "ops/s", True),
+    ("disassembly_instructions_per_second", "disasm/s", True),
+    ("init_seconds", "init", False),
+]
+
+
+@dataclass
+class MetricChange:
+    """Holds the change of one metric for one corpus between two runs."""
+
+    corpus: str
+    metric: str
+    baseline: float
+    current: float
+    higher_is_better: bool
+
+    @property
+    def slowdown(self) -> float:
+        """Percentage by which the current run is worse, negative if better."""
+        if self.higher_is_better:
+            if self.current <= 0:
+                return float("inf")
+            return (self.baseline / self.current - 1.0) * 100.0
+        if self.baseline <= 0:
+            return 0.0
+        return (self.current / self.baseline - 1.0) * 100.0
+
+
+def load_results(path: Path) -> Dict[str, Dict[str, object]]:
+    """Load a results file, keyed by corpus name."""
+    with open(path, "r", encoding="utf-8") as f:
+        results = json.load(f)
+    version = results.get("format_version")
+    if version != SUPPORTED_FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported results format version {version}")
+    return {corpus["name"]: corpus for corpus in results["corpora"]}
+
+
+def describe(path: Path) -> str:
+    """Short description of the Ghidra version a results file was made with."""
+    with open(path, "r", encoding="utf-8") as f:
+        results = json.load(f)
+    return f"{results.get('ghidra_version')} ({results.get('ghidra_commit')})"
+
+
+def compare(
+    baseline: Dict[str, Dict[str, object]],
+    current: Dict[str, Dict[str, object]],
+    include_init: bool,
+) -> List[MetricChange]:
+    """Compare the metrics of every corpus present in both runs."""
+    changes = []
+    for name in sorted(baseline.keys() & current.keys()):
+        for metric, _, higher_is_better in METRICS:
+            if metric == "init_seconds" and not include_init:
+                continue
+            changes.append(
+                MetricChange(
+                    corpus=name,
+                    metric=metric,
+                    baseline=float(baseline[name][metric]),
+                    current=float(current[name][metric]),
+                    higher_is_better=higher_is_better,
+                )
+            )
+    return changes
+
+
+def format_value(metric: str, value: float) -> str:
+    if metric == "init_seconds":
+        return f"{value * 1000:.1f}ms"
+    return f"{value:,.0f}"
+
+
+def print_table(changes: List[MetricChange], threshold: float) -> None:
+    labels = {metric: label for metric, label, _ in METRICS}
+    print(
+        f"{'corpus':<10} {'metric':<10} {'baseline':>14} {'current':>14} "
+        f"{'change':>9}"
+    )
+    for change in changes:
+        flag = "  REGRESSION" if change.slowdown > threshold else ""
+        print(
+            f"{change.corpus:<10} {labels[change.metric]:<10} "
+            f"{format_value(change.metric, change.baseline):>14} "
+            f"{format_value(change.metric, change.current):>14} "
+            f"{-change.slowdown:>+8.1f}%{flag}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare the results of two sleigh-benchmark runs. Exits with a "
+            "non-zero status if any corpus got slower than the threshold."
+        )
+    )
+    parser.add_argument("baseline", type=Path, help="Baseline results file")
+    parser.add_argument("current", type=Path, help="Results file to check")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Slowdown in percent that counts as a regression (default: 10)",
+    )
+    parser.add_argument(
+        "--include-init",
+        action="store_true",
+        help="Also flag regressions in engine initialization time",
+    )
+    parser.add_argument(
+        "--json-output",
+        type=Path,
+        help="Also write the comparison as JSON to this file",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        baseline = load_results(args.baseline)
+        current = load_results(args.current)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error reading benchmark results: {e}", file=sys.stderr)
+        return 2
+
+    print(f"Baseline: {args.baseline} {describe(args.baseline)}")
+    print(f"Current:  {args.current} {describe(args.current)}")
+    for name in sorted(baseline.keys() - current.keys()):
+        print(f"Warning: corpus {name} is missing from the current results")
+    for name in sorted(current.keys() - baseline.keys()):
+        print(f"Note: corpus {name} has no baseline")
+    print()
+
+    changes = compare(baseline, current, args.include_init)
+    print_table(changes, args.threshold)
+    regressions = [c for c in changes if c.slowdown > args.threshold]
+
+    if args.json_output:
+        report = {
+            "baseline": str(args.baseline),
+            "current": str(args.current),
+            "threshold": args.threshold,
+            "changes": [
+                {
+                    "corpus": c.corpus,
+                    "metric": c.metric,
+                    "baseline": c.baseline,
+                    "current": c.current,
+                    "slowdown_percent": c.slowdown,
+                    "regression": c.slowdown > args.threshold,
+                }
+                for c in changes
+            ],
+        }
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    print()
+    if regressions:
+        print(
+            f"{len(regressions)} metric(s) regressed by more than "
+            f"{args.threshold:g}%"
+        )
+        return 1
+    print(f"No regressions beyond {args.threshold:g}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+"""Script to generate the instruction corpora used by the lifting benchmark
+
+Each corpus is a set of synthetic functions for one language, built from the
+instructions that make up most of compiled code: prologues and epilogues,
+integer arithmetic, loads and stores, compares, branches and calls. Register
+numbers, immediates and branch targets are chosen from a seeded random number
+generator, so the output is always the same and the checked-in corpora only
+change when this script does.
+"""
+
+import argparse
+import random
+import struct
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+# Constants
+CORPORA_DIR = Path(__file__).parent / "corpora"
+SEED = 0x5E16
+NUM_FUNCTIONS = 100
+BODY_LENGTH = (20, 60)
+# Functions are placed at increasing addresses from here
+BASE_ADDRESS = 0x100000
+FUNCTION_ALIGNMENT = 0x10
+
+Encoder = Callable[[random.Random], bytes]
+
+
+def u32(word: int, big_endian: bool = False) -> bytes:
+    """Pack a 32-bit instruction word."""
+    return struct.pack(">I" if big_endian else "<I", word & 0xFFFFFFFF)
+
+
+def s8(value: int) -> int:
+    return value & 0xFF
+
+
+#
+# x86-64
+#
+
+X86_REGS = [0, 1, 2, 3, 6, 7, 8, 9, 10, 11, 12, 14, 15]
+
+
+def x86_rex(reg: int, rm: int) -> int:
+    return 0x48 | ((reg >> 3) << 2) | (rm >> 3)
+
+
+def x86_alu_reg(rng: random.Random) -> bytes:
+    # add, sub, xor, and, or, cmp, mov, test
+    op = rng.choice([0x01, 0x29, 0x31, 0x21, 0x09, 0x39, 0x89, 0x85])
+    reg, rm = rng.choice(X86_REGS), rng.choice(X86_REGS)
+    return bytes([x86_rex(reg, rm), op, 0xC0 | (reg & 7) << 3 | (rm & 7)])
+
+
+def x86_alu_imm(rng: random.Random) -> bytes:
+    # add, sub, cmp with an 8-bit immediate
+    ext = rng.choice([0, 5, 7])
+    rm = rng.choice(X86_REGS)
+    imm = rng.randrange(1, 0x80)
+    return bytes([x86_rex(0, rm), 0x83, 0xC0 | ext << 3 | (rm & 7), imm])
+
+
+def x86_load_local(rng: random.Random) -> bytes:
+    reg = rng.choice(X86_REGS)
+    disp = -8 * rng.randrange(1, 16)
+    op = rng.choice([0x8B, 0x89])
+    return bytes([x86_rex(reg, 0), op, 0x45 | (reg & 7) << 3, s8(disp)])
+
+
+def x86_load_field(rng: random.Random) -> bytes:
+    # Base registers that don't need a SIB byte or forced displacement
+    reg = rng.choice(X86_REGS)
+    base = rng.choice([0, 1, 2, 3, 6, 7, 8, 9, 10, 11, 14, 15])
+    disp = 8 * rng.randrange(0, 16)
+    op = rng.choice([0x8B, 0x89])
+    return bytes([x86_rex(reg, base), op, 0x40 | (reg & 7) << 3 | (base & 7), disp])
+
+
+def x86_movzx(rng: random.Random) -> bytes:
+    reg = rng.choice([0, 1, 2, 3, 6, 7])
+    base = rng.choice([0, 1, 2, 3, 6, 7])
+    return bytes([0x0F, 0xB6, 0x40 | reg << 3 | base, rng.randrange(0, 0x40)])
+
+
+def x86_lea_rip(rng: random.Random) -> bytes:
+    reg = rng.choice(X86_REGS)
+    disp = rng.randrange(-0x100000, 0x100000)
+    return bytes([x86_rex(reg, 0), 0x8D, 0x05 | (reg & 7) << 3]) + struct.pack(
+        "<i", disp
+    )
+
+
+def x86_mov_imm(rng: random.Random) -> bytes:
+    reg = rng.choice([0, 1, 2, 3, 6, 7])
+    return bytes([0xB8 + reg]) + struct.pack("<I", rng.randrange(0, 0x10000))
+
+
+def x86_shift(rng: random.Random) -> bytes:
+    rm = rng.choice(X86_REGS)
+    ext = rng.choice([4, 5, 7])
+    return bytes([x86_rex(0, rm), 0xC1, 0xC0 | ext << 3 | (rm & 7), rng.randrange(1, 32)])
+
+
+def x86_imul(rng: random.Random) -> bytes:
+    reg, rm = rng.choice(X86_REGS), rng.choice(X86_REGS)
+    return bytes([x86_rex(reg, rm), 0x0F, 0xAF, 0xC0 | (reg & 7) << 3 | (rm & 7)])
+
+
+def x86_sse(rng: random.Random) -> bytes:
+    # movsd xmm, [rbp-disp] or addsd/mulsd xmm, xmm
+    reg = rng.randrange(0, 8)
+    if rng.random() < 0.5:
+        return bytes([0xF2, 0x0F, 0x10, 0x45 | reg << 3, s8(-8 * rng.randrange(1, 16))])
+    op = rng.choice([0x58, 0x59])
+    return bytes([0xF2, 0x0F, op, 0xC0 | reg << 3 | rng.randrange(0, 8)])
+
+
+def x86_jcc(rng: random.Random) -> bytes:
+    return bytes([0x70 + rng.randrange(0, 16), s8(rng.randrange(-0x40, 0x40))])
+
+
+def x86_jmp(rng: random.Random) -> bytes:
+    return bytes([0xEB, s8(rng.randrange(-0x40, 0x40))])
+
+
+def x86_call(rng: random.Random) -> bytes:
+    return bytes([0xE8]) + struct.pack("<i", rng.randrange(-0x100000, 0x100000))
+
+
+def x86_prologue(rng: random.Random) -> bytes:
+    frame = 8 * rng.randrange(2, 16)
+    return bytes([0x55, 0x48, 0x89, 0xE5, 0x53, 0x48, 0x83, 0xEC, frame])
+
+
+def x86_epilogue(rng: random.Random) -> bytes:
+    frame = 8 * rng.randrange(2, 16)
+    return bytes([0x48, 0x83, 0xC4, frame, 0x5B, 0x5D, 0xC3])
+
+
+X86_64_BODY: List[Tuple[int, Encoder]] = [
+    (20, x86_alu_reg),
+    (8, x86_alu_imm),
+    (14, x86_load_local),
+    (10, x86_load_field),
+    (3, x86_movzx),
+    (5, x86_lea_rip),
+    (5, x86_mov_imm),
+    (3, x86_shift),
+    (2, x86_imul),
+    (3, x86_sse),
+    (10, x86_jcc),
+    (3, x86_jmp),
+    (6, x86_call),
+]
+
+
+#
+# AArch64
+#
+
+
+def a64_reg(rng: random.Random) -> int:
+    return rng.randrange(0, 29)
+
+
+def a64_add_imm(rng: random.Random) -> bytes:
+    op = rng.choice([0x91000000, 0xD1000000])
+    return u32(op | rng.randrange(0, 0x100) << 10 | a64_reg(rng) << 5 | a64_reg(rng))
+
+
+def a64_alu_reg(rng: random.Random) -> bytes:
+    # add, sub, and, orr, eor
+    op = rng.choice([0x8B000000, 0xCB000000, 0x8A000000, 0xAA000000, 0xCA000000])
+    return u32(op | a64_reg(rng) << 16 | a64_reg(rng) << 5 | a64_reg(rng))
+
+
+def a64_cmp(rng: random.Random) -> bytes:
+    return u32(0xEB00001F | a64_reg(rng) << 16 | a64_reg(rng) << 5)
+
+
+def a64_movz(rng: random.Random) -> bytes:
+    return u32(0xD2800000 | rng.randrange(0, 0x10000) << 5 | a64_reg(rng))
+
+
+def a64_load_store(rng: random.Random) -> bytes:
+    # ldr/str x, ldr/str w and ldrb with an unsigned offset
+    op = rng.choice([0xF9400000, 0xF9000000, 0xB9400000, 0xB9000000, 0x39400000])
+    base = rng.choice([31, 29, a64_reg(rng)])
+    return u32(op | rng.randrange(0, 0x40) << 10 | base << 5 | a64_reg(rng))
+
+
+def a64_adrp(rng: random.Random) -> bytes:
+    imm = rng.randrange(0, 0x1000)
+    return u32(0x90000000 | (imm & 3) << 29 | (imm >> 2) << 5 | a64_reg(rng))
+
+
+def a64_csel(rng: random.Random) -> bytes:
+    return u32(
+        0x9A800000
+        | a64_reg(rng) << 16
+        | rng.randrange(0, 14) << 12
+        | a64_reg(rng) << 5
+        | a64_reg(rng)
+    )
+
+
+def a64_mul(rng: random.Random) -> bytes:
+    return u32(0x9B007C00 | a64_reg(rng) << 16 | a64_reg(rng) << 5 | a64_reg(rng))
+
+
+def a64_lsl(rng: random.Random) -> bytes:
+    shift = rng.randrange(1, 32)
+    return u32(
+        0xD3400000
+        | (-shift % 64) << 16
+        | (63 - shift) << 10
+        | a64_reg(rng) << 5
+        | a64_reg(rng)
+    )
+
+
+def a64_fadd(rng: random.Random) -> bytes:
+    reg = lambda: rng.randrange(0, 32)
+    return u32(0x1E602800 | reg() << 16 | reg() << 5 | reg())
+
+
+def a64_bcond(rng: random.Random) -> bytes:
+    imm19 = rng.randrange(-0x20, 0x20) & 0x7FFFF
+    return u32(0x54000000 | imm19 << 5 | rng.randrange(0, 14))
+
+
+def a64_cbz(rng: random.Random) -> bytes:
+    imm19 = rng.randrange(-0x20, 0x20) & 0x7FFFF
+    return u32(rng.choice([0xB4000000, 0xB5000000]) | imm19 << 5 | a64_reg(rng))
+
+
+def a64_b(rng: random.Random) -> bytes:
+    return u32(0x14000000 | rng.randrange(-0x20, 0x20) & 0x3FFFFFF)
+
+
+def a64_bl(rng: random.Random) -> bytes:
+    return u32(0x94000000 | rng.randrange(-0x40000, 0x40000) & 0x3FFFFFF)
+
+
+def a64_prologue(rng: random.Random) -> bytes:
+    frame = rng.randrange(2, 8)
+    # stp x29, x30, [sp, #-frame*16]!; mov x29, sp
+    return u32(0xA9807BFD | (-2 * frame & 0x7F) << 15) + u32(0x910003FD)
+
+
+def a64_epilogue(rng: random.Random) -> bytes:
+    frame = rng.randrange(2, 8)
+    # ldp x29, x30, [sp], #frame*16; ret
+    return u32(0xA8C07BFD | (2 * frame) << 15) + u32(0xD65F03C0)
+
+
+AARCH64_BODY: List[Tuple[int, Encoder]] = [
+    (12, a64_add_imm),
+    (14, a64_alu_reg),
+    (6, a64_cmp),
+    (5, a64_movz),
+    (20, a64_load_store),
+    (4, a64_adrp),
+    (3, a64_csel),
+    (2, a64_mul),
+    (3, a64_lsl),
+    (2, a64_fadd),
+    (8, a64_bcond),
+    (4, a64_cbz),
+    (2, a64_b),
+    (6, a64_bl),
+]
+
+
+#
+# ARM (A32)
+#
+
+ARM_AL = 0xE
+
+
+def arm_reg(rng: random.Random) -> int:
+    return rng.randrange(0, 13)
+
+
+def arm_dp_imm(rng: random.Random) -> bytes:
+    # and, eor, sub, rsb, add, orr, bic, then cmp and mov
+    opcode = rng.choice([0, 1, 2, 3, 4, 12, 14, 10, 13])
+    s = 1 if opcode == 10 else 0
+    rn = 0 if opcode == 13 else arm_reg(rng)
+    rd = 0 if opcode == 10 else arm_reg(rng)
+    imm = rng.randrange(0, 0x100)
+    return u32(
+        ARM_AL << 28 | 1 << 25 | opcode << 21 | s << 20 | rn << 16 | rd << 12 | imm
+    )
+
+
+def arm_dp_reg(rng: random.Random) -> bytes:
+    opcode = rng.choice([0, 1, 2, 4, 12, 10, 13])
+    s = 1 if opcode == 10 else 0
+    rn = 0 if opcode == 13 else arm_reg(rng)
+    rd = 0 if opcode == 10 else arm_reg(rng)
+    shift_imm = rng.choice([0, 0, rng.randrange(1, 32)])
+    shift = rng.randrange(0, 3)
+    return u32(
+        ARM_AL << 28
+        | opcode << 21
+        | s << 20
+        | rn << 16
+        | rd << 12
+        | shift_imm << 7
+        | shift << 5
+        | arm_reg(rng)
+    )
+
+
+def arm_load_store(rng: random.Random) -> bytes:
+    # ldr, str, ldrb, with sp, fp or pc-relative literal loads
+    op = rng.choice([0x05900000, 0x05800000, 0x05D00000])
+    base = rng.choice([13, 11, 15 if op == 0x05900000 else 13, arm_reg(rng)])
+    imm = 4 * rng.randrange(0, 0x40)
+    return u32(ARM_AL << 28 | op | base << 16 | arm_reg(rng) << 12 | imm)
+
+
+def arm_movw(rng: random.Random) -> bytes:
+    imm = rng.randrange(0, 0x10000)
+    return u32(0xE3000000 | (imm >> 12) << 16 | arm_reg(rng) << 12 | imm & 0xFFF)
+
+
+def arm_mul(rng: random.Random) -> bytes:
+    return u32(
+        ARM_AL << 28 | 0x90 | arm_reg(rng) << 16 | arm_reg(rng) << 8 | arm_reg(rng)
+    )
+
+
+def arm_bcond(rng: random.Random) -> bytes:
+    cond = rng.randrange(0, 14)
+    return u32(cond << 28 | 0x0A000000 | rng.randrange(-0x20, 0x20) & 0xFFFFFF)
+
+
+def arm_bl(rng: random.Random) -> bytes:
+    return u32(ARM_AL << 28 | 0x0B000000 | rng.randrange(-0x40000, 0x40000) & 0xFFFFFF)
+
+
+def arm_prologue(rng: random.Random) -> bytes:
+    # push {r4-r7, r11, lr}; add r11, sp, #16; sub sp, sp, #frame
+    frame = 8 * rng.randrange(1, 16)
+    return u32(0xE92D48F0) + u32(0xE28DB010) + u32(0xE24DD000 | frame)
+
+
+def arm_epilogue(rng: random.Random) -> bytes:
+    # sub sp, r11, #16; pop {r4-r7, r11, pc}
+    return u32(0xE24BD010) + u32(0xE8BD88F0)
+
+
+ARM_BODY: List[Tuple[int, Encoder]] = [
+    (18, arm_dp_imm),
+    (16, arm_dp_reg),
+    (22, arm_load_store),
+    (4, arm_movw),
+    (3, arm_mul),
+    (10, arm_bcond),
+    (6, arm_bl),
+]
+
+
+#
+# MIPS32 (big-endian)
+#
+
+MIPS_REGS = [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 24, 25]
+MIPS_NOP = u32(0, True)
+
+
+def mips_reg(rng: random.Random) -> int:
+    return rng.choice(MIPS_REGS)
+
+
+def mips_r_type(rng: random.Random) -> bytes:
+    # addu, subu, and, or, xor, slt, sltu
+    funct = rng.choice([0x21, 0x23, 0x24, 0x25, 0x26, 0x2A, 0x2B])
+    return u32(
+        mips_reg(rng) << 21 | mips_reg(rng) << 16 | mips_reg(rng) << 11 | funct, True
+    )
+
+
+def mips_shift(rng: random.Random) -> bytes:
+    # sll, srl, sra
+    funct = rng.choice([0x00, 0x02, 0x03])
+    return u32(
+        mips_reg(rng) << 16 | mips_reg(rng) << 11 | rng.randrange(1, 32) << 6 | funct,
+        True,
+    )
+
+
+def mips_i_type(rng: random.Random) -> bytes:
+    # addiu, andi, ori, slti, lui
+    op = rng.choice([0x09, 0x0C, 0x0D, 0x0A, 0x0F])
+    rs = 0 if op == 0x0F else mips_reg(rng)
+    return u32(op << 26 | rs << 21 | mips_reg(rng) << 16 | rng.randrange(0, 0x10000), True)
+
+
+def mips_load_store(rng: random.Random) -> bytes:
+    # lw, sw, lbu, sb relative to sp, gp or another register
+    op = rng.choice([0x23, 0x2B, 0x24, 0x28])
+    base = rng.choice([29, 28, mips_reg(rng)])
+    return u32(op << 26 | base << 21 | mips_reg(rng) << 16 | 4 * rng.randrange(0, 0x40), True)
+
+
+def mips_mult(rng: random.Random) -> bytes:
+    # mult followed by mflo
+    return u32(mips_reg(rng) << 21 | mips_reg(rng) << 16 | 0x18, True) + u32(
+        mips_reg(rng) << 11 | 0x12, True
+    )
+
+
+def mips_branch(rng: random.Random) -> bytes:
+    # beq or bne, with an instruction in the delay slot
+    op = rng.choice([0x04, 0x05])
+    offset = rng.randrange(-0x20, 0x20) & 0xFFFF
+    branch = u32(op << 26 | mips_reg(rng) << 21 | mips_reg(rng) << 16 | offset, True)
+    return branch + rng.choice([MIPS_NOP, mips_r_type(rng)])
+
+
+def mips_call(rng: random.Random) -> bytes:
+    # jal, with an argument set up in the delay slot
+    target = rng.randrange(0x40000, 0x80000)
+    return u32(0x03 << 26 | target, True) + u32(
+        0x09 << 26 | 4 << 16 | rng.randrange(0, 0x100), True
+    )
+
+
+def mips_prologue(rng: random.Random) -> bytes:
+    frame = 8 * rng.randrange(4, 16)
+    # addiu sp, sp, -frame; sw ra, frame-4(sp); sw s0, frame-8(sp)
+    return (
+        u32(0x27BD0000 | -frame & 0xFFFF, True)
+        + u32(0xAFBF0000 | frame - 4, True)
+        + u32(0xAFB00000 | frame - 8, True)
+    )
+
+
+def mips_epilogue(rng: random.Random) -> bytes:
+    frame = 8 * rng.randrange(4, 16)
+    # lw ra, frame-4(sp); lw s0, frame-8(sp); jr ra; addiu sp, sp, frame
+    return (
+        u32(0x8FBF0000 | frame - 4, True)
+        + u32(0x8FB00000 | frame - 8, True)
+        + u32(0x03E00008, True)
+        + u32(0x27BD0000 | frame, True)
+    )
+
+
+MIPS_BODY: List[Tuple[int, Encoder]] = [
+    (18, mips_r_type),
+    (4, mips_shift),
+    (16, mips_i_type),
+    (22, mips_load_store),
+    (2, mips_mult),
+    (10, mips_branch),
+    (6, mips_call),
+]
+
+
+#
+# PowerPC (32-bit big-endian)
+#
+
+PPC_REGS = [3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 28, 29, 30, 31]
+
+
+def ppc_reg(rng: random.Random) -> int:
+    return rng.choice(PPC_REGS)
+
+
+def ppc_addi(rng: random.Random) -> bytes:
+    # addi, addis and li
+    op = rng.choice([14, 15])
+    ra = rng.choice([0, ppc_reg(rng)])
+    return u32(op << 26 | ppc_reg(rng) << 21 | ra << 16 | rng.randrange(0, 0x10000), True)
+
+
+def ppc_x_form(rng: random.Random) -> bytes:
+    # add, subf and mullw take rD, rA, rB. and, or and xor take rS, rA, rB
+    xo = rng.choice([266, 40, 235, 28, 444, 316])
+    return u32(
+        31 << 26
+        | ppc_reg(rng) << 21
+        | ppc_reg(rng) << 16
+        | ppc_reg(rng) << 11
+        | xo << 1,
+        True,
+    )
+
+
+def ppc_load_store(rng: random.Random) -> bytes:
+    # lwz, stw, lbz, stb relative to the stack pointer or another register
+    op = rng.choice([32, 36, 34, 38])
+    base = rng.choice([1, 31, ppc_reg(rng)])
+    return u32(op << 26 | ppc_reg(rng) << 21 | base << 16 | 4 * rng.randrange(0, 0x40), True)
+
+
+def ppc_compare(rng: random.Random) -> bytes:
+    # cmpwi or cmpw into cr0
+    if rng.random() < 0.5:
+        return u32(11 << 26 | ppc_reg(rng) << 16 | rng.randrange(0, 0x100), True)
+    return u32(31 << 26 | ppc_reg(rng) << 16 | ppc_reg(rng) << 11, True)
+
+
+def ppc_rlwinm(rng: random.Random) -> bytes:
+    return u32(
+        21 << 26
+        | ppc_reg(rng) << 21
+        | ppc_reg(rng) << 16
+        | rng.randrange(0, 32) << 11
+        | rng.randrange(0, 16) << 6
+        | rng.randrange(16, 32) << 1,
+        True,
+    )
+
+
+def ppc_bc(rng: random.Random) -> bytes:
+    # beq or bne on cr0
+    bo = rng.choice([12, 4])
+    return u32(16 << 26 | bo << 21 | 2 << 16 | (rng.randrange(-0x20, 0x20) & 0x3FFF) << 2, True)
+
+
+def ppc_bl(rng: random.Random) -> bytes:
+    return u32(18 << 26 | (rng.randrange(-0x40000, 0x40000) & 0xFFFFFF) << 2 | 1, True)
+
+
+def ppc_prologue(rng: random.Random) -> bytes:
+    frame = 16 * rng.randrange(2, 8)
+    # stwu r1, -frame(r1); mflr r0; stw r0, frame+4(r1); stw r31, frame-4(r1)
+    return (
+        u32(0x94210000 | -frame & 0xFFFF, True)
+        + u32(0x7C0802A6, True)
+        + u32(0x90010000 | frame + 4, True)
+        + u32(0x93E10000 | frame - 4, True)
+    )
+
+
+def ppc_epilogue(rng: random.Random) -> bytes:
+    frame = 16 * rng.randrange(2, 8)
+    # lwz r0, frame+4(r1); lwz r31, frame-4(r1); mtlr r0; addi r1, r1, frame; blr
+    return (
+        u32(0x80010000 | frame + 4, True)
+        + u32(0x83E10000 | frame - 4, True)
+        + u32(0x7C0803A6, True)
+        + u32(0x38210000 | frame, True)
+        + u32(0x4E800020, True)
+    )
+
+
+PPC_BODY: List[Tuple[int, Encoder]] = [
+    (16, ppc_addi),
+    (18, ppc_x_form),
+    (24, ppc_load_store),
+    (8, ppc_compare),
+    (4, ppc_rlwinm),
+    (10, ppc_bc),
+    (6, ppc_bl),
+]
+
+
+# Name, .sla file, processor spec, prologue, body encoders and epilogue
+CORPORA = [
+    ("x86-64", "x86-64.sla", "x86-64.pspec", x86_prologue, X86_64_BODY, x86_epilogue),
+    ("AARCH64", "AARCH64.sla", "AARCH64.pspec", a64_prologue, AARCH64_BODY, a64_epilogue),
+    ("ARM", "ARM8_le.sla", "ARMt.pspec", arm_prologue, ARM_BODY, arm_epilogue),
+    ("MIPS", "mips32be.sla", "mips32.pspec", mips_prologue, MIPS_BODY, mips_epilogue),
+    ("PPC", "ppc_32_be.sla", "ppc_32.pspec", ppc_prologue, PPC_BODY, ppc_epilogue),
+]
+
+
+def generate_function(
+    rng: random.Random,
+    prologue: Encoder,
+    body: List[Tuple[int, Encoder]],
+    epilogue: Encoder,
+) -> bytes:
+    """Generate the bytes of one function."""
+    weights = [weight for weight, _ in body]
+    encoders = [encoder for _, encoder in body]
+    code = prologue(rng)
+    for encoder in rng.choices(encoders, weights, k=rng.randint(*BODY_LENGTH)):
+        code += encoder(rng)
+    return code + epilogue(rng)
+
+
+def generate_corpus(name: str, sla: str, pspec: str, prologue, body, epilogue) -> str:
+    """Generate the text of one corpus file."""
+    rng = random.Random(f"{SEED}:{name}")
+    lines = [
+        f"# Lifting benchmark corpus for {name}, generated by generate_corpora.py",
+        f"# sla: {sla}",
+        f"# pspec: {pspec}",
+    ]
+    address = BASE_ADDRESS
+    for _ in range(NUM_FUNCTIONS):
+        code = generate_function(rng, prologue, body, epilogue)
+        lines.append(f"{address:#x} {code.hex()}")
+        address += -(-len(code) // FUNCTION_ALIGNMENT) * FUNCTION_ALIGNMENT
+    return "\n".join(lines) + "\n"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=CORPORA_DIR,
+        help=f"Directory to write the corpora to (default: {CORPORA_DIR})",
+    )
+    args = parser.parse_args()
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    for name, sla, pspec, prologue, body, epilogue in CORPORA:
+        corpus_file = args.output_dir / f"{name}.txt"
+        corpus_file.write_text(
+            generate_corpus(name, sla, pspec, prologue, body, epilogue)
+        )
+        print(f"Wrote {corpus_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,428 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include <sleigh/LanguageCache.h>
+#include <sleigh/libsleigh.hh>
+
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdint>
+#include <cstring>
+#include <filesystem>
+#include <fstream>
+#include <iomanip>
+#include <iostream>
+#include <map>
+#include <memory>
+#include <optional>
+#include <sstream>
+#include <string>
+#include <string_view>
+#include <vector>
+
+static void PrintUsage(std::ostream &os) {
+  os << "Usage: sleigh-benchmark [-p root_sla_dir] [-r repetitions] "
+        "[-o output_file] corpus_file [corpus_file ...]\n"
+        "\n"
+        "Lifts every function of each corpus file, and reports the time to "
+        "load its language and the instructions and p-code ops decoded per "
+        "second. Each timed pass runs over a corpus enough times to take at "
+        "least 50ms, and is repeated (default: 5 times) to keep the fastest. With -o, the results are also written as JSON "
+        "for comparison with compare_benchmarks.py.\n"
+        "\n"
+        "Corpus files have one 'address bytes' line per function, with the "
+        "address in decimal or 0x-prefixed hex, and name the language to use "
+        "in '# sla: file' and '# pspec: file' comment lines."
+     << std::endl;
+}
+
+using Clock = std::chrono::steady_clock;
+
+// Minimum duration of a timed pass over a corpus
+static constexpr double kMinPassSeconds = 0.05;
+
+static double SecondsSince(Clock::time_point start) {
+  return std::chrono::duration<double>(Clock::now() - start).count();
+}
+
+struct Corpus {
+  std::string name;
+  std::string sla_file_name;
+  std::optional<std::string> pspec_file_name;
+  // Function bytes by address
+  std::map<uint64_t, std::string> functions;
+};
+
+// Returns nullopt, after printing an error, if the corpus can't be read
+static std::optional<Corpus> ReadCorpus(const std::filesystem::path &path) {
+  std::ifstream input(path);
+  if (!input) {
+    std::cerr << "Could not open corpus file: " << path.string() << std::endl;
+    return {};
+  }
+  Corpus corpus;
+  corpus.name = path.stem().string();
+  std::string line;
+  size_t line_num = 0;
+  while (std::getline(input, line)) {
+    ++line_num;
+    std::istringstream fields(line);
+    std::string first, second;
+    if (!(fields >> first)) {
+      continue;
+    }
+    if (first[0] == '#') {
+      if (fields >> first >> second) {
+        if (first == "sla:") {
+          corpus.sla_file_name = second;
+        } else if (first == "pspec:") {
+          corpus.pspec_file_name = second;
+        }
+      }
+      continue;
+    }
+    std::string bytes;
+    bool valid = static_cast<bool>(fields >> second) && second.size() % 2 == 0;
+    uint64_t addr = 0;
+    try {
+      size_t parsed_len = 0;
+      addr = std::stoull(first, &parsed_len, 0);
+      valid = valid && parsed_len == first.size();
+    } catch (const std::logic_error &) {
+      valid = false;
+    }
+    for (size_t i = 0; valid && i < second.size(); i += 2) {
+      const char nibbles[] = {second[i], second[i + 1], '\0'};
+      char *parsed_to = nullptr;
+      bytes.push_back(static_cast<char>(strtol(nibbles, &parsed_to, 16)));
+      valid = parsed_to == &nibbles[2];
+    }
+    if (!valid) {
+      std::cerr << path.string() << ':' << line_num
+                << ": Expected 'address bytes'" << std::endl;
+      return {};
+    }
+    corpus.functions[addr] = std::move(bytes);
+  }
+  if (corpus.sla_file_name.empty()) {
+    std::cerr << path.string() << ": Missing '# sla:' line" << std::endl;
+    return {};
+  }
+  return corpus;
+}
+
+// Serves the functions of a corpus at their addresses, and zeros elsewhere
+class CorpusLoadImage : public ghidra::LoadImage {
+public:
+  explicit CorpusLoadImage(const Corpus &corpus)
+      : LoadImage("nofile"), corpus(corpus) {}
+
+  void loadFill(unsigned char *ptr, int size,
+                const ghidra::Address &addr) override {
+    std::memset(ptr, 0, static_cast<size_t>(size));
+    const uint64_t start = addr.getOffset();
+    const uint64_t end = start + static_cast<uint64_t>(size);
+    auto it = corpus.functions.upper_bound(start);
+    if (it != corpus.functions.begin()) {
+      --it;
+    }
+    for (; it != corpus.functions.end() && it->first < end; ++it) {
+      const uint64_t func_end = it->first + it->second.size();
+      const uint64_t copy_start = std::max(start, it->first);
+      const uint64_t copy_end = std::min(end, func_end);
+      if (copy_start < copy_end) {
+        std::memcpy(ptr + (copy_start - start),
+                    it->second.data() + (copy_start - it->first),
+                    static_cast<size_t>(copy_end - copy_start));
+      }
+    }
+  }
+
+  std::string getArchType(void) const override { return "memory"; }
+  void adjustVma(long) override {}
+
+private:
+  const Corpus &corpus;
+};
+
+// Only counts the ops, so that the engine's own speed is what gets measured
+class CountingPcodeEmit : public ghidra::PcodeEmit {
+public:
+  void dump(const ghidra::Address &, ghidra::OpCode, ghidra::VarnodeData *,
+            ghidra::VarnodeData *, int32_t) override {
+    ++num_ops;
+  }
+
+  uint64_t num_ops = 0;
+};
+
+class NullAssemblyEmit : public ghidra::AssemblyEmit {
+public:
+  void dump(const ghidra::Address &, const std::string &,
+            const std::string &) override {}
+};
+
+struct BenchmarkResult {
+  std::string name, sla_file_name, pspec_file_name;
+  uint64_t functions = 0;
+  uint64_t bytes = 0;
+  uint64_t instructions = 0;
+  uint64_t pcode_ops = 0;
+  // Time to load the language and create the first engine
+  double init_seconds = 0;
+  // Runs over the corpus in each timed pass
+  int loops = 1;
+  // Time per run over the corpus in the fastest pass
+  double pcode_seconds = 0;
+  double disassembly_seconds = 0;
+};
+
+// Decode every function of the corpus once, returning the number of
+// instructions. Throws ghidra::LowlevelError if any instruction fails.
+template <typename DecodeFunc>
+static uint64_t DecodeCorpus(ghidra::Sleigh &engine, const Corpus &corpus,
+                             DecodeFunc decode) {
+  uint64_t instructions = 0;
+  for (const auto &[addr, bytes] : corpus.functions) {
+    ghidra::Address cur_addr(engine.getDefaultCodeSpace(), addr);
+    const ghidra::Address last_addr(engine.getDefaultCodeSpace(),
+                                    addr + bytes.size());
+    while (cur_addr < last_addr) {
+      cur_addr = cur_addr + decode(cur_addr);
+      ++instructions;
+    }
+  }
+  return instructions;
+}
+
+static std::optional<BenchmarkResult>
+RunBenchmark(const Corpus &corpus,
+             const std::optional<std::string> &root_sla_dir,
+             int repetitions) {
+  auto find_spec_file = [&](const std::string &file_name) {
+    return root_sla_dir ? sleigh::FindSpecFile(file_name, {*root_sla_dir})
+                        : sleigh::FindSpecFile(file_name);
+  };
+  const auto sla_file_path = find_spec_file(corpus.sla_file_name);
+  if (!sla_file_path) {
+    std::cerr << "Could not find SLA file: " << corpus.sla_file_name
+              << std::endl;
+    return {};
+  }
+  std::optional<std::filesystem::path> pspec_file_path;
+  if (corpus.pspec_file_name) {
+    pspec_file_path = find_spec_file(*corpus.pspec_file_name);
+    if (!pspec_file_path) {
+      std::cerr << "Could not find PSPEC file: " << *corpus.pspec_file_name
+                << std::endl;
+      return {};
+    }
+  }
+
+  BenchmarkResult result;
+  result.name = corpus.name;
+  result.sla_file_name = corpus.sla_file_name;
+  result.pspec_file_name = corpus.pspec_file_name.value_or("");
+  result.functions = corpus.functions.size();
+  for (const auto &function : corpus.functions) {
+    result.bytes += function.second.size();
+  }
+
+  CorpusLoadImage load_image(corpus);
+  try {
+    // Not from the language cache, so that every run pays the full cost
+    const auto init_start = Clock::now();
+    auto language = sleigh::Language::Load(*sla_file_path, pspec_file_path);
+    auto engine = language->CreateEngine(&load_image);
+    result.init_seconds = SecondsSince(init_start);
+    auto &translator = engine->Engine();
+
+    CountingPcodeEmit pcode_emit;
+    NullAssemblyEmit asm_emit;
+    auto lift_pcode = [&](const ghidra::Address &addr) {
+      return translator.oneInstruction(pcode_emit, addr);
+    };
+    auto disassemble = [&](const ghidra::Address &addr) {
+      return translator.printAssembly(asm_emit, addr);
+    };
+    // Seconds per run over the corpus, averaged over a pass of `loops` runs
+    // that starts with empty instruction caches
+    auto time_pass = [&](const auto &decode, int loops) {
+      engine->Reset(&load_image);
+      translator.allowContextSet(false);
+      const auto start = Clock::now();
+      for (int loop = 0; loop < loops; ++loop) {
+        result.instructions = DecodeCorpus(translator, corpus, decode);
+      }
+      return SecondsSince(start) / loops;
+    };
+
+    // The untimed first run counts the p-code ops, and sizes the passes so
+    // that small corpora still take long enough to time reliably
+    const double first_seconds = time_pass(lift_pcode, 1);
+    result.pcode_ops = pcode_emit.num_ops;
+    result.loops = static_cast<int>(
+        std::ceil(kMinPassSeconds / std::max(first_seconds, 1e-6)));
+    for (int i = 0; i < repetitions; ++i) {
+      const double pcode_seconds = time_pass(lift_pcode, result.loops);
+      const double disassembly_seconds = time_pass(disassemble, result.loops);
+      if (i == 0 || pcode_seconds < result.pcode_seconds) {
+        result.pcode_seconds = pcode_seconds;
+      }
+      if (i == 0 || disassembly_seconds < result.disassembly_seconds) {
+        result.disassembly_seconds = disassembly_seconds;
+      }
+    }
+  } catch (ghidra::LowlevelError &err) {
+    std::cerr << "Error benchmarking " << corpus.name << ": " << err.explain
+              << std::endl;
+    return {};
+  }
+  return result;
+}
+
+static double PerSecond(uint64_t count, double seconds) {
+  return seconds > 0 ? static_cast<double>(count) / seconds : 0.0;
+}
+
+static void WriteJsonString(std::ostream &os, std::string_view str) {
+  os << '"';
+  for (const char c : str) {
+    if (c == '"' || c == '\\') {
+      os << '\\';
+    }
+    os << c;
+  }
+  os << '"';
+}
+
+static void WriteJson(std::ostream &os,
+                      const std::vector<BenchmarkResult> &results,
+                      int repetitions) {
+  os << std::setprecision(17);
+  os << "{\n  \"format_version\": 1,\n  \"ghidra_version\": ";
+  WriteJsonString(os, sleigh::GetGhidraVersion());
+  os << ",\n  \"ghidra_commit\": ";
+  WriteJsonString(os, sleigh::GetGhidraCommitHash());
+  os << ",\n  \"repetitions\": " << repetitions << ",\n  \"corpora\": [";
+  for (size_t i = 0; i < results.size(); ++i) {
+    const auto &result = results[i];
+    os << (i ? ",\n" : "\n") << "    {\"name\": ";
+    WriteJsonString(os, result.name);
+    os << ", \"sla\": ";
+    WriteJsonString(os, result.sla_file_name);
+    os << ", \"pspec\": ";
+    WriteJsonString(os, result.pspec_file_name);
+    os << ",\n     \"functions\": " << result.functions
+       << ", \"bytes\": " << result.bytes
+       << ", \"instructions\": " << result.instructions
+       << ", \"pcode_ops\": " << result.pcode_ops
+       << ", \"loops\": " << result.loops
+       << ",\n     \"init_seconds\": " << result.init_seconds
+       << ", \"pcode_seconds\": " << result.pcode_seconds
+       << ", \"disassembly_seconds\": " << result.disassembly_seconds
+       << ",\n     \"instructions_per_second\": "
+       << PerSecond(result.instructions, result.pcode_seconds)
+       << ",\n     \"pcode_ops_per_second\": "
+       << PerSecond(result.pcode_ops, result.pcode_seconds)
+       << ",\n     \"disassembly_instructions_per_second\": "
+       << PerSecond(result.instructions, result.disassembly_seconds) << "}";
+  }
+  os << "\n  ]\n}\n";
+}
+
+static void PrintTable(std::ostream &os,
+                       const std::vector<BenchmarkResult> &results) {
+  os << std::left << std::setw(10) << "corpus" << std::right
+     << std::setw(8) << "insns" << std::setw(12) << "init ms"
+     << std::setw(14) << "insns/s" << std::setw(14) << "ops/s"
+     << std::setw(14) << "disasm/s" << '\n';
+  os << std::fixed;
+  for (const auto &result : results) {
+    os << std::left << std::setw(10) << result.name << std::right
+       << std::setw(8) << result.instructions << std::setw(12)
+       << std::setprecision(1) << result.init_seconds * 1000.0
+       << std::setprecision(0) << std::setw(14)
+       << PerSecond(result.instructions, result.pcode_seconds)
+       << std::setw(14) << PerSecond(result.pcode_ops, result.pcode_seconds)
+       << std::setw(14)
+       << PerSecond(result.instructions, result.disassembly_seconds) << '\n';
+  }
+  os << std::defaultfloat << std::flush;
+}
+
+int main(int argc, char *argv[]) {
+  std::optional<std::string> root_sla_dir, output_file_name;
+  int repetitions = 5;
+  std::vector<std::filesystem::path> corpus_paths;
+  for (int i = 1; i < argc; ++i) {
+    const std::string arg = argv[i];
+    if (arg == "--help") {
+      PrintUsage(std::cout);
+      return EXIT_SUCCESS;
+    }
+    if (arg == "-p" || arg == "-o" || arg == "-r") {
+      if (++i == argc) {
+        std::cerr << "Flag " << arg << " has no value" << std::endl;
+        PrintUsage(std::cerr);
+        return EXIT_FAILURE;
+      }
+      if (arg == "-p") {
+        root_sla_dir = argv[i];
+      } else if (arg == "-o") {
+        output_file_name = argv[i];
+      } else {
+        try {
+          repetitions = std::stoi(argv[i]);
+        } catch (const std::logic_error &) {
+          repetitions = 0;
+        }
+        if (repetitions <= 0) {
+          std::cerr << "Invalid repetitions: " << argv[i] << std::endl;
+          return EXIT_FAILURE;
+        }
+      }
+    } else if (arg[0] == '-') {
+      std::cerr << "Unrecognised optional flag: " << arg << std::endl;
+      PrintUsage(std::cerr);
+      return EXIT_FAILURE;
+    } else {
+      corpus_paths.emplace_back(arg);
+    }
+  }
+  if (corpus_paths.empty()) {
+    PrintUsage(std::cerr);
+    return EXIT_FAILURE;
+  }
+
+  std::vector<BenchmarkResult> results;
+  for (const auto &corpus_path : corpus_paths) {
+    const auto corpus = ReadCorpus(corpus_path);
+    if (!corpus) {
+      return EXIT_FAILURE;
+    }
+    auto result = RunBenchmark(*corpus, root_sla_dir, repetitions);
+    if (!result) {
+      return EXIT_FAILURE;
+    }
+    results.push_back(std::move(*result));
+  }
+
+  PrintTable(std::cout, results);
+  if (output_file_name) {
+    std::ofstream output(*output_file_name);
+    WriteJson(output, results, repetitions);
+    if (!output) {
+      std::cerr << "Could not write output file: " << *output_file_name
+                << std::endl;
+      return EXIT_FAILURE;
+    }
+  }
+  return EXIT_SUCCESS;
+}
@@ -0,0 +1,781 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+// Python bindings for lifting with the support library.
+//
+// Input bytes are read in place through the buffer protocol, and decoded
+// p-code is returned as columns that export the buffer protocol themselves,
+// so they can be wrapped by `memoryview` or `numpy.asarray` without copying.
+// Decoding runs without the GIL, with one engine per call.
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include <sleigh/LanguageCache.h>
+#include <sleigh/LiftedInstruction.h>
+#include <sleigh/Support.h>
+#include <sleigh/Version.h>
+#include <sleigh/libsleigh.hh>
+
+#include <cstdint>
+#include <cstring>
+#include <exception>
+#include <filesystem>
+#include <iterator>
+#include <memory>
+#include <optional>
+#include <string>
+#include <utility>
+#include <vector>
+
+namespace {
+
+PyObject *gSleighError = nullptr;
+
+// Like Py_NewRef, which needs Python 3.10
+PyObject *NewRef(PyObject *obj) {
+  Py_INCREF(obj);
+  return obj;
+}
+
+// Serves loads from a single read-only span of caller-owned bytes. Bytes
+// outside of the span read as zero. Safe to use from several engines at once.
+class BufferLoadImage : public ghidra::LoadImage {
+public:
+  BufferLoadImage(uint64_t base, const unsigned char *data, size_t size)
+      : LoadImage("nofile"), base(base), data(data), size(size) {}
+
+  void loadFill(unsigned char *ptr, int fill_size,
+                const ghidra::Address &addr) override {
+    if (fill_size <= 0) {
+      return;
+    }
+    std::memset(ptr, 0, static_cast<size_t>(fill_size));
+    const uint64_t start = addr.getOffset();
+    const uint64_t end = start + static_cast<uint64_t>(fill_size);
+    const uint64_t copy_first = std::max(start, base);
+    const uint64_t copy_end =
+        std::min<uint64_t>(end < start ? ~0ULL : end, base + size);
+    if (copy_first < copy_end) {
+      std::memcpy(ptr + (copy_first - start), data + (copy_first - base),
+                  static_cast<size_t>(copy_end - copy_first));
+    }
+  }
+
+  std::string getArchType(void) const override { return "memory"; }
+  void adjustVma(long) override {}
+
+private:
+  const uint64_t base;
+  const unsigned char *const data;
+  const size_t size;
+};
+
+//
+// Column: a read-only, typed, one-dimensional array
+//
+
+class ColumnStorage {
+public:
+  virtual ~ColumnStorage(void) = default;
+  virtual void *Data(void) = 0;
+  virtual size_t Size(void) const = 0;
+  virtual size_t ItemSize(void) const = 0;
+  virtual const char *Format(void) const = 0;
+};
+
+template <typename T> struct ColumnFormat;
+template <> struct ColumnFormat<uint64_t> {
+  static constexpr const char *kFormat = "Q";
+};
+template <> struct ColumnFormat<int64_t> {
+  static constexpr const char *kFormat = "q";
+};
+template <> struct ColumnFormat<uint32_t> {
+  static constexpr const char *kFormat = "I";
+};
+template <> struct ColumnFormat<int32_t> {
+  static constexpr const char *kFormat = "i";
+};
+
+template <typename T> class TypedColumnStorage final : public ColumnStorage {
+public:
+  explicit TypedColumnStorage(std::vector<T> &&values)
+      : values(std::move(values)) {}
+
+  void *Data(void) override { return values.data(); }
+  size_t Size(void) const override { return values.size(); }
+  size_t ItemSize(void) const override { return sizeof(T); }
+  const char *Format(void) const override { return ColumnFormat<T>::kFormat; }
+
+private:
+  std::vector<T> values;
+};
+
+struct ColumnObject {
+  PyObject_HEAD
+  ColumnStorage *storage;
+  // Referenced by exported buffers
+  Py_ssize_t shape;
+  Py_ssize_t stride;
+};
+
+void ColumnDealloc(ColumnObject *self) {
+  PyTypeObject *type = Py_TYPE(self);
+  delete self->storage;
+  type->tp_free(reinterpret_cast<PyObject *>(self));
+  Py_DECREF(type);
+}
+
+Py_ssize_t ColumnLength(ColumnObject *self) { return self->shape; }
+
+int ColumnGetBuffer(ColumnObject *self, Py_buffer *view, int flags) {
+  if (flags & PyBUF_WRITABLE) {
+    PyErr_SetString(PyExc_BufferError, "Column is read-only");
+    view->obj = nullptr;
+    return -1;
+  }
+  view->obj = reinterpret_cast<PyObject *>(self);
+  Py_INCREF(view->obj);
+  view->buf = self->storage->Data();
+  view->len = self->shape * self->stride;
+  view->readonly = 1;
+  view->itemsize = self->stride;
+  view->format = (flags & PyBUF_FORMAT)
+                     ? const_cast<char *>(self->storage->Format())
+                     : nullptr;
+  view->ndim = 1;
+  view->shape = (flags & PyBUF_ND) ? &self->shape : nullptr;
+  view->strides = (flags & PyBUF_STRIDES) ? &self->stride : nullptr;
+  view->suboffsets = nullptr;
+  view->internal = nullptr;
+  return 0;
+}
+
+PyObject *ColumnToList(ColumnObject *self, PyObject *) {
+  PyObject *view = PyMemoryView_FromObject(reinterpret_cast<PyObject *>(self));
+  if (!view) {
+    return nullptr;
+  }
+  PyObject *list = PyObject_CallMethod(view, "tolist", nullptr);
+  Py_DECREF(view);
+  return list;
+}
+
+PyObject *ColumnRepr(ColumnObject *self) {
+  return PyUnicode_FromFormat("Column(format='%s', len=%zd)",
+                              self->storage->Format(), self->shape);
+}
+
+PyMethodDef gColumnMethods[] = {
+    {"tolist", reinterpret_cast<PyCFunction>(ColumnToList), METH_NOARGS,
+     "Return the values as a list of ints."},
+    {nullptr, nullptr, 0, nullptr},
+};
+
+PyType_Slot gColumnSlots[] = {
+    {Py_tp_doc,
+     const_cast<char *>(
+         "A read-only column of integers that supports the buffer protocol, "
+         "for use with memoryview or numpy.asarray.")},
+    {Py_tp_dealloc, reinterpret_cast<void *>(ColumnDealloc)},
+    {Py_tp_repr, reinterpret_cast<void *>(ColumnRepr)},
+    {Py_tp_methods, gColumnMethods},
+    {Py_sq_length, reinterpret_cast<void *>(ColumnLength)},
+    {Py_bf_getbuffer, reinterpret_cast<void *>(ColumnGetBuffer)},
+    {0, nullptr},
+};
+
+PyType_Spec gColumnSpec = {
+    "sleigh.Column",
+    sizeof(ColumnObject),
+    0,
+    Py_TPFLAGS_DEFAULT,
+    gColumnSlots,
+};
+
+PyTypeObject *gColumnType = nullptr;
+
+template <typename T> PyObject *NewColumn(std::vector<T> &&values) {
+  auto storage = std::make_unique<TypedColumnStorage<T>>(std::move(values));
+  auto *column = PyObject_New(ColumnObject, gColumnType);
+  if (!column) {
+    return nullptr;
+  }
+  column->shape = static_cast<Py_ssize_t>(storage->Size());
+  column->stride = static_cast<Py_ssize_t>(storage->ItemSize());
+  column->storage = storage.release();
+  return reinterpret_cast<PyObject *>(column);
+}
+
+//
+// LiftResult: the columns for one lifted range
+//
+
+PyStructSequence_Field gLiftResultFields[] = {
+    {"insn_address", "Address of each instruction (uint64)"},
+    {"insn_length", "Length in bytes of each instruction (uint32)"},
+    {"insn_op_count", "Number of p-code ops of each instruction (uint32)"},
+    {"mnemonic", "Mnemonic of each instruction, or None if not disassembled"},
+    {"body", "Operands of each instruction, or None if not disassembled"},
+    {"op_address", "Address of the instruction of each p-code op (uint64)"},
+    {"opcode", "Opcode of each p-code op (uint32)"},
+    {"op_output", "Varnode index of each op's output, or -1 (int64)"},
+    {"op_input_start", "Varnode index of each op's first input (uint64)"},
+    {"op_input_count", "Number of inputs of each op (uint32)"},
+    {"varnode_space", "Address space index of each varnode (int32)"},
+    {"varnode_offset", "Offset of each varnode (uint64)"},
+    {"varnode_size", "Size in bytes of each varnode (uint32)"},
+    {"error", "Why decoding stopped before the end, or None"},
+    {"error_address", "Address that could not be decoded, or None"},
+    {nullptr, nullptr},
+};
+
+PyStructSequence_Desc gLiftResultDesc = {
+    "sleigh.LiftResult",
+    "Instructions and p-code ops decoded from a range of bytes, as columns.\n"
+    "\n"
+    "Each p-code op refers to its varnodes by index into the varnode "
+    "columns.",
+    gLiftResultFields,
+    15,
+};
+
+PyTypeObject *gLiftResultType = nullptr;
+
+// Lifted instructions, laid out as columns while decoding
+struct LiftColumns {
+  std::vector<uint64_t> insn_address;
+  std::vector<uint32_t> insn_length;
+  std::vector<uint32_t> insn_op_count;
+  std::vector<std::string> mnemonic, body;
+  std::vector<uint64_t> op_address;
+  std::vector<uint32_t> opcode;
+  std::vector<int64_t> op_output;
+  std::vector<uint64_t> op_input_start;
+  std::vector<uint32_t> op_input_count;
+  std::vector<int32_t> varnode_space;
+  std::vector<uint64_t> varnode_offset;
+  std::vector<uint32_t> varnode_size;
+  std::optional<std::string> error;
+  uint64_t error_address = 0;
+
+  void AddVarnode(const sleigh::LiftedVarnode &vn) {
+    varnode_space.push_back(vn.space);
+    varnode_offset.push_back(vn.offset);
+    varnode_size.push_back(vn.size);
+  }
+
+  void Add(const sleigh::LiftedInstruction &insn, bool disassemble) {
+    insn_address.push_back(insn.address);
+    insn_length.push_back(insn.length);
+    insn_op_count.push_back(static_cast<uint32_t>(insn.pcode.size()));
+    if (disassemble) {
+      mnemonic.push_back(insn.mnemonic);
+      body.push_back(insn.body);
+    }
+    for (const auto &op : insn.pcode) {
+      op_address.push_back(insn.address);
+      opcode.push_back(op.opcode);
+      if (op.output) {
+        op_output.push_back(static_cast<int64_t>(varnode_space.size()));
+        AddVarnode(*op.output);
+      } else {
+        op_output.push_back(-1);
+      }
+      op_input_start.push_back(varnode_space.size());
+      op_input_count.push_back(static_cast<uint32_t>(op.inputs.size()));
+      for (const auto &input : op.inputs) {
+        AddVarnode(input);
+      }
+    }
+  }
+};
+
+PyObject *StringList(const std::vector<std::string> &strings) {
+  PyObject *list = PyList_New(static_cast<Py_ssize_t>(strings.size()));
+  if (!list) {
+    return nullptr;
+  }
+  for (size_t i = 0; i < strings.size(); ++i) {
+    PyObject *str = PyUnicode_DecodeUTF8(
+        strings[i].data(), static_cast<Py_ssize_t>(strings[i].size()),
+        "replace");
+    if (!str) {
+      Py_DECREF(list);
+      return nullptr;
+    }
+    PyList_SET_ITEM(list, static_cast<Py_ssize_t>(i), str);
+  }
+  return list;
+}
+
+PyObject *NewLiftResult(LiftColumns &&columns, bool disassemble) {
+  PyObject *result = PyStructSequence_New(gLiftResultType);
+  if (!result) {
+    return nullptr;
+  }
+  PyObject *items[] = {
+      NewColumn(std::move(columns.insn_address)),
+      NewColumn(std::move(columns.insn_length)),
+      NewColumn(std::move(columns.insn_op_count)),
+      disassemble ? StringList(columns.mnemonic) : NewRef(Py_None),
+      disassemble ? StringList(columns.body) : NewRef(Py_None),
+      NewColumn(std::move(columns.op_address)),
+      NewColumn(std::move(columns.opcode)),
+      NewColumn(std::move(columns.op_output)),
+      NewColumn(std::move(columns.op_input_start)),
+      NewColumn(std::move(columns.op_input_count)),
+      NewColumn(std::move(columns.varnode_space)),
+      NewColumn(std::move(columns.varnode_offset)),
+      NewColumn(std::move(columns.varnode_size)),
+      columns.error ? PyUnicode_DecodeUTF8(
+                          columns.error->data(),
+                          static_cast<Py_ssize_t>(columns.error->size()),
+                          "replace")
+                    : NewRef(Py_None),
+      columns.error ? PyLong_FromUnsignedLongLong(columns.error_address)
+                    : NewRef(Py_None),
+  };
+  bool failed = false;
+  for (size_t i = 0; i < std::size(items); ++i) {
+    if (!items[i]) {
+      failed = true;
+      items[i] = NewRef(Py_None);
+    }
+    PyStructSequence_SET_ITEM(result, static_cast<Py_ssize_t>(i), items[i]);
+  }
+  if (failed) {
+    Py_DECREF(result);
+    return nullptr;
+  }
+  return result;
+}
+
+//
+// Language
+//
+
+struct LanguageObject {
+  PyObject_HEAD
+  std::shared_ptr<const sleigh::Language> language;
+  // Tuple of address space names, by space index
+  PyObject *space_names;
+  // Address size of the default code space, in bytes
+  uint32_t addr_size;
+};
+
+// Convert a sequence of path-like objects to search paths
+bool ParseSearchPaths(PyObject *obj, std::vector<std::filesystem::path> &out) {
+  if (obj == Py_None) {
+    out = sleigh::gDefaultSearchPaths;
+    return true;
+  }
+  PyObject *seq = PySequence_Fast(obj, "search_paths must be a sequence");
+  if (!seq) {
+    return false;
+  }
+  const Py_ssize_t size = PySequence_Fast_GET_SIZE(seq);
+  for (Py_ssize_t i = 0; i < size; ++i) {
+    PyObject *path = nullptr;
+    if (!PyUnicode_FSConverter(PySequence_Fast_GET_ITEM(seq, i), &path)) {
+      Py_DECREF(seq);
+      return false;
+    }
+    out.emplace_back(PyBytes_AS_STRING(path));
+    Py_DECREF(path);
+  }
+  Py_DECREF(seq);
+  return true;
+}
+
+PyObject *PathToStr(const std::filesystem::path &path) {
+  const auto str = path.string();
+  return PyUnicode_DecodeFSDefaultAndSize(str.data(),
+                                          static_cast<Py_ssize_t>(str.size()));
+}
+
+int LanguageInit(LanguageObject *self, PyObject *args, PyObject *kwargs) {
+  static const char *kKeywords[] = {"sla", "pspec", "search_paths", nullptr};
+  const char *sla_name = nullptr;
+  const char *pspec_name = nullptr;
+  PyObject *search_paths_obj = Py_None;
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s|zO:Language",
+                                   const_cast<char **>(kKeywords), &sla_name,
+                                   &pspec_name, &search_paths_obj)) {
+    return -1;
+  }
+  std::vector<std::filesystem::path> search_paths;
+  if (!ParseSearchPaths(search_paths_obj, search_paths)) {
+    return -1;
+  }
+
+  // Find the spec files like sleigh-lift, defaulting to a processor spec
+  // named like the .sla file if there is one
+  std::optional<std::filesystem::path> sla_path, pspec_path;
+  std::shared_ptr<const sleigh::Language> language;
+  std::string error;
+  bool not_found = false;
+  Py_BEGIN_ALLOW_THREADS
+  sla_path = sleigh::FindSpecFile(sla_name, search_paths);
+  if (!sla_path) {
+    not_found = true;
+    error = std::string("Could not find SLA file: ") + sla_name;
+  } else if (pspec_name) {
+    pspec_path = sleigh::FindSpecFile(pspec_name, search_paths);
+    if (!pspec_path) {
+      not_found = true;
+      error = std::string("Could not find PSPEC file: ") + pspec_name;
+    }
+  } else {
+    pspec_path = *sla_path;
+    pspec_path->replace_extension(".pspec");
+    if (!std::filesystem::exists(*pspec_path)) {
+      pspec_path.reset();
+    }
+  }
+  if (error.empty()) {
+    try {
+      language = sleigh::LanguageCache::Global().Get(*sla_path, pspec_path);
+    } catch (ghidra::LowlevelError &err) {
+      error = "Could not load language: " + err.explain;
+    }
+  }
+  Py_END_ALLOW_THREADS
+  if (!language) {
+    PyErr_SetString(not_found ? PyExc_FileNotFoundError : gSleighError,
+                    error.c_str());
+    return -1;
+  }
+
+  BufferLoadImage empty_image(0, nullptr, 0);
+  std::vector<std::string> space_names;
+  try {
+    auto engine = language->CreateEngine(&empty_image);
+    space_names = sleigh::GetSpaceNames(engine->Engine());
+    self->addr_size =
+        static_cast<uint32_t>(engine->Engine().getDefaultSize());
+  } catch (ghidra::LowlevelError &err) {
+    PyErr_SetString(gSleighError, err.explain.c_str());
+    return -1;
+  }
+  PyObject *names = PyTuple_New(static_cast<Py_ssize_t>(space_names.size()));
+  if (!names) {
+    return -1;
+  }
+  for (size_t i = 0; i < space_names.size(); ++i) {
+    PyObject *name = PyUnicode_FromStringAndSize(
+        space_names[i].data(), static_cast<Py_ssize_t>(space_names[i].size()));
+    if (!name) {
+      Py_DECREF(names);
+      return -1;
+    }
+    PyTuple_SET_ITEM(names, static_cast<Py_ssize_t>(i), name);
+  }
+  Py_XDECREF(self->space_names);
+  self->space_names = names;
+  self->language = std::move(language);
+  return 0;
+}
+
+PyObject *LanguageNew(PyTypeObject *type, PyObject *, PyObject *) {
+  auto *self = reinterpret_cast<LanguageObject *>(type->tp_alloc(type, 0));
+  if (self) {
+    new (&self->language) std::shared_ptr<const sleigh::Language>();
+    self->space_names = nullptr;
+    self->addr_size = 0;
+  }
+  return reinterpret_cast<PyObject *>(self);
+}
+
+void LanguageDealloc(LanguageObject *self) {
+  PyTypeObject *type = Py_TYPE(self);
+  self->language.~shared_ptr();
+  Py_XDECREF(self->space_names);
+  type->tp_free(reinterpret_cast<PyObject *>(self));
+  Py_DECREF(type);
+}
+
+bool CheckInitialized(LanguageObject *self) {
+  if (!self->language) {
+    PyErr_SetString(PyExc_RuntimeError, "Language is not initialized");
+    return false;
+  }
+  return true;
+}
+
+PyObject *LanguageLift(LanguageObject *self, PyObject *args,
+                       PyObject *kwargs) {
+  static const char *kKeywords[] = {"data",        "address", "disassemble",
+                                    "pcode",       "max_instructions",
+                                    nullptr};
+  Py_buffer view;
+  PyObject *address_obj = nullptr;
+  int disassemble = 0;
+  int pcode = 1;
+  Py_ssize_t max_instructions = -1;
+  if (!CheckInitialized(self) ||
+      !PyArg_ParseTupleAndKeywords(args, kwargs, "y*|O!$ppn:lift",
+                                   const_cast<char **>(kKeywords), &view,
+                                   &PyLong_Type, &address_obj, &disassemble, &pcode,
+                                   &max_instructions)) {
+    return nullptr;
+  }
+  // The buffer is held until the end of the call, so it can't be resized or
+  // released while the engine reads from it
+  std::unique_ptr<Py_buffer, decltype(&PyBuffer_Release)> view_guard(
+      &view, PyBuffer_Release);
+
+  uint64_t address = 0;
+  if (address_obj) {
+    address = PyLong_AsUnsignedLongLong(address_obj);
+    if (PyErr_Occurred()) {
+      return nullptr;
+    }
+  }
+  const uint64_t size = static_cast<uint64_t>(view.len);
+  const uint64_t addr_mask = ~0ULL >> (64 - self->addr_size * 8);
+  if (address > addr_mask || (size > 0 && size - 1 > addr_mask - address)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "Data does not fit in the address space at this address");
+    return nullptr;
+  }
+
+  LiftColumns columns;
+  std::string error;
+  bool failed = false;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    BufferLoadImage image(address, static_cast<const unsigned char *>(view.buf),
+                          static_cast<size_t>(size));
+    auto engine = self->language->CreateEngine(&image);
+    engine->Engine().allowContextSet(false);
+    sleigh::LiftedInstruction insn;
+    uint64_t offset = 0;
+    for (Py_ssize_t count = 0;
+         offset < size && (max_instructions < 0 || count < max_instructions);
+         ++count) {
+      try {
+        sleigh::DecodeInstruction(engine->Engine(), address + offset,
+                                  disassemble, pcode, insn);
+      } catch (ghidra::LowlevelError &err) {
+        // Includes UnimplError and BadDataError, which end the range
+        columns.error = err.explain;
+        columns.error_address = address + offset;
+        break;
+      }
+      columns.Add(insn, disassemble);
+      offset += insn.length;
+    }
+  } catch (ghidra::LowlevelError &err) {
+    failed = true;
+    error = err.explain;
+  } catch (std::exception &err) {
+    failed = true;
+    error = err.what();
+  }
+  Py_END_ALLOW_THREADS
+  if (failed) {
+    PyErr_SetString(gSleighError, error.c_str());
+    return nullptr;
+  }
+  return NewLiftResult(std::move(columns), disassemble);
+}
+
+PyObject *LanguageGetSlaPath(LanguageObject *self, void *) {
+  if (!CheckInitialized(self)) {
+    return nullptr;
+  }
+  return PathToStr(self->language->SlaPath());
+}
+
+PyObject *LanguageGetPspecPath(LanguageObject *self, void *) {
+  if (!CheckInitialized(self)) {
+    return nullptr;
+  }
+  const auto &pspec_path = self->language->PspecPath();
+  return pspec_path ? PathToStr(*pspec_path) : NewRef(Py_None);
+}
+
+PyObject *LanguageGetSpaceNames(LanguageObject *self, void *) {
+  if (!CheckInitialized(self)) {
+    return nullptr;
+  }
+  return NewRef(self->space_names);
+}
+
+PyMethodDef gLanguageMethods[] = {
+    {"lift",
+     reinterpret_cast<PyCFunction>(
+         reinterpret_cast<void (*)(void)>(LanguageLift)),
+     METH_VARARGS | METH_KEYWORDS,
+     "lift(data, address=0, *, disassemble=False, pcode=True, "
+     "max_instructions=-1)\n"
+     "--\n"
+     "\n"
+     "Decode the instructions in `data`, any bytes-like object, mapped at "
+     "`address`. Decoding stops at the end of the data, after "
+     "`max_instructions` if it is not negative, or at the first instruction "
+     "that can't be decoded, which is reported in the result's `error`.\n"
+     "\n"
+     "The data is read in place and the GIL is released while decoding, so "
+     "several threads can lift at once. Returns a LiftResult."},
+    {nullptr, nullptr, 0, nullptr},
+};
+
+PyGetSetDef gLanguageGetSet[] = {
+    {"sla_path", reinterpret_cast<getter>(LanguageGetSlaPath), nullptr,
+     "Path of the compiled .sla file", nullptr},
+    {"pspec_path", reinterpret_cast<getter>(LanguageGetPspecPath), nullptr,
+     "Path of the processor spec file, or None", nullptr},
+    {"space_names", reinterpret_cast<getter>(LanguageGetSpaceNames), nullptr,
+     "Names of the address spaces, indexed by varnode_space", nullptr},
+    {nullptr, nullptr, nullptr, nullptr, nullptr},
+};
+
+PyType_Slot gLanguageSlots[] = {
+    {Py_tp_doc,
+     const_cast<char *>(
+         "Language(sla, pspec=None, search_paths=None)\n"
+         "--\n"
+         "\n"
+         "A compiled sleigh language, found by the names of its .sla and "
+         "processor spec files like sleigh-lift does. Loaded languages are "
+         "shared through the support library's language cache.")},
+    {Py_tp_new, reinterpret_cast<void *>(LanguageNew)},
+    {Py_tp_init, reinterpret_cast<void *>(LanguageInit)},
+    {Py_tp_dealloc, reinterpret_cast<void *>(LanguageDealloc)},
+    {Py_tp_methods, gLanguageMethods},
+    {Py_tp_getset, gLanguageGetSet},
+    {0, nullptr},
+};
+
+PyType_Spec gLanguageSpec = {
+    "sleigh.Language",
+    sizeof(LanguageObject),
+    0,
+    Py_TPFLAGS_DEFAULT,
+    gLanguageSlots,
+};
+
+PyTypeObject *gLanguageType = nullptr;
+
+//
+// Module functions
+//
+
+PyObject *FindSpecFileFunc(PyObject *, PyObject *args, PyObject *kwargs) {
+  static const char *kKeywords[] = {"name", "search_paths", nullptr};
+  const char *name = nullptr;
+  PyObject *search_paths_obj = Py_None;
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s|O:find_spec_file",
+                                   const_cast<char **>(kKeywords), &name,
+                                   &search_paths_obj)) {
+    return nullptr;
+  }
+  std::vector<std::filesystem::path> search_paths;
+  if (!ParseSearchPaths(search_paths_obj, search_paths)) {
+    return nullptr;
+  }
+  std::optional<std::filesystem::path> path;
+  Py_BEGIN_ALLOW_THREADS
+  path = sleigh::FindSpecFile(name, search_paths);
+  Py_END_ALLOW_THREADS
+  return path ? PathToStr(*path) : NewRef(Py_None);
+}
+
+PyMethodDef gModuleMethods[] = {
+    {"find_spec_file",
+     reinterpret_cast<PyCFunction>(
+         reinterpret_cast<void (*)(void)>(FindSpecFileFunc)),
+     METH_VARARGS | METH_KEYWORDS,
+     "find_spec_file(name, search_paths=None)\n"
+     "--\n"
+     "\n"
+     "Find a spec file by name, in the default search paths if none are "
+     "given. Returns its path, or None if it can't be found."},
+    {nullptr, nullptr, 0, nullptr},
+};
+
+PyModuleDef gModule = {
+    PyModuleDef_HEAD_INIT,
+    "sleigh",
+    "Lift machine code to p-code with Ghidra's sleigh.",
+    -1,
+    gModuleMethods,
+    nullptr,
+    nullptr,
+    nullptr,
+    nullptr,
+};
+
+bool InitTypes(void) {
+  gColumnType =
+      reinterpret_cast<PyTypeObject *>(PyType_FromSpec(&gColumnSpec));
+  gLanguageType =
+      reinterpret_cast<PyTypeObject *>(PyType_FromSpec(&gLanguageSpec));
+  gLiftResultType = PyStructSequence_NewType(&gLiftResultDesc);
+  return gColumnType && gLanguageType && gLiftResultType;
+}
+
+} // namespace
+
+PyMODINIT_FUNC PyInit_sleigh(void) {
+  if (!InitTypes()) {
+    return nullptr;
+  }
+  PyObject *module = PyModule_Create(&gModule);
+  if (!module) {
+    return nullptr;
+  }
+
+  gSleighError = PyErr_NewExceptionWithDoc(
+      "sleigh.SleighError", "Raised when a language can't be loaded or used.",
+      PyExc_RuntimeError, nullptr);
+
+  PyObject *opcode_names = PyTuple_New(ghidra::CPUI_MAX);
+  if (opcode_names) {
+    for (int i = 0; i < ghidra::CPUI_MAX; ++i) {
+      const char *name = ghidra::get_opname(static_cast<ghidra::OpCode>(i));
+      PyTuple_SET_ITEM(opcode_names, i,
+                       name ? PyUnicode_FromString(name) : NewRef(Py_None));
+    }
+  }
+  const auto ghidra_version = sleigh::GetGhidraVersion();
+  PyObject *ghidra_version_str = PyUnicode_FromStringAndSize(
+      ghidra_version.data(), static_cast<Py_ssize_t>(ghidra_version.size()));
+
+  const std::pair<const char *, PyObject *> members[] = {
+      {"SleighError", gSleighError},
+      {"Language", reinterpret_cast<PyObject *>(gLanguageType)},
+      {"Column", reinterpret_cast<PyObject *>(gColumnType)},
+      {"LiftResult", reinterpret_cast<PyObject *>(gLiftResultType)},
+      {"OPCODE_NAMES", opcode_names},
+      {"GHIDRA_VERSION", ghidra_version_str},
+  };
+  bool failed = false;
+  for (const auto &[name, member] : members) {
+    if (failed || !member) {
+      failed = true;
+      continue;
+    }
+    // PyModule_AddObject only steals the reference if it succeeds
+    Py_INCREF(member);
+    if (PyModule_AddObject(module, name, member) < 0) {
+      Py_DECREF(member);
+      failed = true;
+    }
+  }
+  Py_XDECREF(opcode_names);
+  Py_XDECREF(ghidra_version_str);
+  if (failed) {
+    Py_DECREF(module);
+    return nullptr;
+  }
+  return module;
+}
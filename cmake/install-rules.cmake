@@ -83,7 +83,10 @@ install(
 )
 
 install(
-  FILES cmake/modules/sleighCompile.cmake
+  FILES
+    cmake/modules/sleighCompile.cmake
+    cmake/modules/sleighCompileCache.cmake
+    cmake/modules/sleighSpecDeps.cmake
   DESTINATION "${sleigh_INSTALL_CMAKEDIR}/modules"
   COMPONENT sleigh_Development
 )
@@ -8,6 +8,10 @@
 
 cmake_minimum_required(VERSION 3.18)
 
+include("${CMAKE_CURRENT_LIST_DIR}/sleighSpecDeps.cmake")
+set(_sleigh_spec_deps_script "${CMAKE_CURRENT_LIST_DIR}/sleighSpecDeps.cmake")
+set(_sleigh_compile_cache_script "${CMAKE_CURRENT_LIST_DIR}/sleighCompileCache.cmake")
+
 # Takes the following required arguments:
 #
 #   TARGET: Named CMake target for performing sleigh compilation
@@ -16,13 +20,29 @@ cmake_minimum_required(VERSION 3.18)
 #   LOG_FILE: File to write logs
 #   OUT_FILE: Compiled sleigh output file (should be in build directory somewhere)
 #
-# NOTE: This doesn't track _all_ dependencies for the slaspec compilation due
-# to the ability for slaspec files to include other files. If you want to
-# rebuild the sleigh file then you must delete the OUT_FILE
+# And the following optional arguments:
+#
+#   TRACK_INCLUDES: Rebuild OUT_FILE when any file transitively included by
+#     the slaspec file through '@include' changes. With generators that
+#     support DEPFILE, the include graph is rescanned on every compilation.
+#     Otherwise, it is scanned once during configuration.
+#   DEPENDS: Additional files that should trigger a rebuild of OUT_FILE
+#   CACHE_DIR: Directory of a compiled sleigh file cache to restore OUT_FILE
+#     from instead of invoking the compiler. See sleighCompileCache.cmake
+#   CACHE_MAX_SIZE: Size limit of CACHE_DIR, like '512M' (default: 1G)
+#   COMPILER_ID: Version of COMPILER used in the cache key. Required with
+#     CACHE_DIR. Usually the Ghidra commit hash the compiler was built from
+#
+# NOTE: Without TRACK_INCLUDES, this doesn't track _all_ dependencies for the
+# slaspec compilation due to the ability for slaspec files to include other
+# files. If you want to rebuild the sleigh file then you must delete the
+# OUT_FILE
 function(sleigh_compile)
-  set(options)
-  set(oneValueArgs TARGET COMPILER SLASPEC LOG_FILE OUT_FILE)
-  set(multiValueArgs)
+  set(options TRACK_INCLUDES)
+  set(oneValueArgs
+    TARGET COMPILER SLASPEC LOG_FILE OUT_FILE CACHE_DIR CACHE_MAX_SIZE COMPILER_ID
+  )
+  set(multiValueArgs DEPENDS)
   cmake_parse_arguments(parsed
     "${options}"
     "${oneValueArgs}"
@@ -40,6 +60,7 @@ function(sleigh_compile)
 
   # Setup variables for paths/filenames
   set(spec_file "${parsed_SLASPEC}")
+  get_filename_component(spec_file_abs "${spec_file}" ABSOLUTE)
   get_filename_component(spec_name "${spec_file}" NAME_WE)
   get_filename_component(spec_dir "${spec_file}" DIRECTORY)
 
@@ -49,19 +70,80 @@ function(sleigh_compile)
   set(spec_out "${parsed_OUT_FILE}")
   get_filename_component(spec_out_dir "${spec_out}" DIRECTORY)
 
+  # Setup the compile command, optionally going through the cache
+  if(parsed_CACHE_DIR)
+    if(NOT parsed_COMPILER_ID)
+      message(FATAL_ERROR "COMPILER_ID is required when using CACHE_DIR")
+    endif()
+    if(NOT parsed_CACHE_MAX_SIZE)
+      set(parsed_CACHE_MAX_SIZE 1G)
+    endif()
+    set(compile_command
+      COMMAND ${CMAKE_COMMAND}
+        "-DCOMPILER=${parsed_COMPILER}"
+        "-DCOMPILER_ID=${parsed_COMPILER_ID}"
+        "-DSLASPEC=${spec_file_abs}"
+        "-DOUT_FILE=${spec_out}"
+        "-DLOG_FILE=${spec_build_log}"
+        "-DCACHE_DIR=${parsed_CACHE_DIR}"
+        "-DCACHE_MAX_SIZE=${parsed_CACHE_MAX_SIZE}"
+        -P "${_sleigh_compile_cache_script}"
+    )
+  else()
+    set(compile_command
+      COMMAND "${parsed_COMPILER}" ${spec_file} "${spec_out}" > "${spec_build_log}" 2>&1
+    )
+  endif()
+
+  # Setup include tracking
+  set(spec_depends ${parsed_DEPENDS})
+  set(depfile_args)
+  set(depfile_command)
+  if(parsed_TRACK_INCLUDES)
+    if(CMAKE_GENERATOR MATCHES "Ninja"
+        OR (CMAKE_GENERATOR MATCHES "Makefiles" AND CMAKE_VERSION VERSION_GREATER_EQUAL 3.20)
+        OR CMAKE_VERSION VERSION_GREATER_EQUAL 3.21)
+      set(spec_depfile "${spec_out}.d")
+      set(depfile_args DEPFILE "${spec_depfile}")
+      set(depfile_command
+        COMMAND ${CMAKE_COMMAND}
+          "-DSLASPEC=${spec_file_abs}"
+          "-DOUT_FILE=${spec_out}"
+          "-DDEPFILE=${spec_depfile}"
+          -P "${_sleigh_spec_deps_script}"
+      )
+    else()
+      sleigh_spec_dependencies(spec_includes "${spec_file}")
+      list(APPEND spec_depends ${spec_includes})
+    endif()
+  endif()
+
+  # Depfile paths are absolute, so use the non-legacy interpretation
+  if(POLICY CMP0116)
+    cmake_policy(PUSH)
+    cmake_policy(SET CMP0116 NEW)
+  endif()
+
   # Custom command to compile the sla file
   add_custom_command(
     OUTPUT "${spec_out}"
     MAIN_DEPENDENCY "${spec_file}"
+    DEPENDS ${spec_depends}
+    ${depfile_args}
     COMMAND ${CMAKE_COMMAND} -E make_directory "${spec_out_dir}"
     COMMAND ${CMAKE_COMMAND} -E make_directory "${spec_build_log_dir}"
-    COMMAND "${parsed_COMPILER}" ${spec_file} "${spec_out}" > "${spec_build_log}" 2>&1
+    ${compile_command}
+    ${depfile_command}
     WORKING_DIRECTORY "${spec_dir}"
     COMMENT "sleigh: Compiling the '${spec_name}' spec file (logs written in '${spec_build_log}')"
     BYPRODUCTS "${spec_build_log}"
     VERBATIM
   )
 
+  if(POLICY CMP0116)
+    cmake_policy(POP)
+  endif()
+
   # Custom target for others to depend on
   add_custom_target(${parsed_TARGET} DEPENDS "${spec_out}")
 endfunction()
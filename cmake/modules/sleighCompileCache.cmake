@@ -0,0 +1,229 @@
+#
+# Copyright (c) 2026-present, Trail of Bits, Inc.
+# All rights reserved.
+#
+# This source code is licensed in accordance with the terms specified in
+# the LICENSE file found in the root directory of this source tree.
+#
+
+cmake_minimum_required(VERSION 3.18)
+
+# Script mode wrapper around the sleigh compiler that stores compiled sleigh
+# files in a content-addressed cache, which can be shared between build
+# directories and Ghidra checkouts.
+#
+# The cache key is the hash of the compiler identity (e.g. the Ghidra commit
+# hash that the compiler was built from) along with the contents and relative
+# paths of the slaspec file and all of the files it transitively includes. On
+# a hit, the cached file is copied to OUT_FILE without invoking the compiler.
+#
+# Compile through the cache:
+#
+#   cmake -DCOMPILER=<sleigh> -DCOMPILER_ID=<id> -DSLASPEC=<slaspec>
+#     -DOUT_FILE=<sla> -DLOG_FILE=<log> -DCACHE_DIR=<dir>
+#     [-DCACHE_MAX_SIZE=<size>] -P sleighCompileCache.cmake
+#
+# CACHE_MAX_SIZE is in bytes, optionally suffixed with K, M or G, and defaults
+# to 1G. When the cache grows beyond it, least recently used entries are
+# evicted.
+#
+# Print or reset the hit/miss statistics:
+#
+#   cmake -DCACHE_DIR=<dir> -DSHOW_STATS=ON -P sleighCompileCache.cmake
+#   cmake -DCACHE_DIR=<dir> -DZERO_STATS=ON -P sleighCompileCache.cmake
+
+include("${CMAKE_CURRENT_LIST_DIR}/sleighSpecDeps.cmake")
+
+set(_sleigh_cache_stat_names hits misses evictions)
+
+# Sets OUT_VAR to the cache key for compiling SPEC_FILE with COMPILER_ID
+function(_sleigh_cache_key out_var spec_file compiler_id)
+  get_filename_component(spec_file "${spec_file}" ABSOLUTE)
+  get_filename_component(spec_dir "${spec_file}" DIRECTORY)
+  sleigh_spec_dependencies(spec_includes "${spec_file}")
+
+  set(key_data "compiler:${compiler_id}\n")
+  foreach(dep_file "${spec_file}" ${spec_includes})
+    file(RELATIVE_PATH dep_name "${spec_dir}" "${dep_file}")
+    file(SHA256 "${dep_file}" dep_hash)
+    string(APPEND key_data "${dep_name}:${dep_hash}\n")
+  endforeach()
+  string(SHA256 key "${key_data}")
+  set(${out_var} "${key}" PARENT_SCOPE)
+endfunction()
+
+# Converts a size like '512M' into a number of bytes
+function(_sleigh_cache_parse_size out_var size)
+  if(NOT size MATCHES "^([0-9]+)([KMG]?)$")
+    message(FATAL_ERROR "Invalid cache size: ${size}")
+  endif()
+  set(bytes "${CMAKE_MATCH_1}")
+  if(CMAKE_MATCH_2 STREQUAL "K")
+    math(EXPR bytes "${bytes} * 1024")
+  elseif(CMAKE_MATCH_2 STREQUAL "M")
+    math(EXPR bytes "${bytes} * 1024 * 1024")
+  elseif(CMAKE_MATCH_2 STREQUAL "G")
+    math(EXPR bytes "${bytes} * 1024 * 1024 * 1024")
+  endif()
+  set(${out_var} "${bytes}" PARENT_SCOPE)
+endfunction()
+
+# Sets <prefix>_<stat> in the caller for each statistic. Caller holds the lock
+macro(_sleigh_cache_read_stats prefix)
+  foreach(_stat ${_sleigh_cache_stat_names})
+    set(${prefix}_${_stat} 0)
+  endforeach()
+  if(EXISTS "${CACHE_DIR}/stats.txt")
+    file(STRINGS "${CACHE_DIR}/stats.txt" _stat_lines)
+    foreach(_stat_line IN LISTS _stat_lines)
+      if(_stat_line MATCHES "^([a-z]+)=([0-9]+)$")
+        set(${prefix}_${CMAKE_MATCH_1} "${CMAKE_MATCH_2}")
+      endif()
+    endforeach()
+  endif()
+endmacro()
+
+# Writes the statistics from <prefix>_<stat>. Caller holds the lock
+function(_sleigh_cache_write_stats prefix)
+  set(content)
+  foreach(stat ${_sleigh_cache_stat_names})
+    string(APPEND content "${stat}=${${prefix}_${stat}}\n")
+  endforeach()
+  file(WRITE "${CACHE_DIR}/stats.txt.tmp" "${content}")
+  file(RENAME "${CACHE_DIR}/stats.txt.tmp" "${CACHE_DIR}/stats.txt")
+endfunction()
+
+# Lists cache entries and sets OUT_ENTRIES to 'mtime|size|path' items sorted
+# from least to most recently used, and OUT_TOTAL to their combined size
+function(_sleigh_cache_entries out_entries out_total)
+  file(GLOB entry_files "${CACHE_DIR}/*/*.sla")
+  set(entries)
+  set(total 0)
+  foreach(entry_file IN LISTS entry_files)
+    file(TIMESTAMP "${entry_file}" entry_mtime "%s" UTC)
+    file(SIZE "${entry_file}" entry_size)
+    math(EXPR total "${total} + ${entry_size}")
+    list(APPEND entries "${entry_mtime}|${entry_size}|${entry_file}")
+  endforeach()
+  list(SORT entries COMPARE NATURAL)
+  set(${out_entries} "${entries}" PARENT_SCOPE)
+  set(${out_total} "${total}" PARENT_SCOPE)
+endfunction()
+
+# Records a hit or miss and evicts entries over the size limit
+function(_sleigh_cache_update stat max_size)
+  file(LOCK "${CACHE_DIR}/cache.lock" TIMEOUT 600)
+
+  _sleigh_cache_read_stats(stats)
+  math(EXPR stats_${stat} "${stats_${stat}} + 1")
+
+  _sleigh_cache_entries(entries total)
+  foreach(entry IN LISTS entries)
+    if(total LESS_EQUAL max_size)
+      break()
+    endif()
+    string(REPLACE "|" ";" entry_parts "${entry}")
+    list(GET entry_parts 1 entry_size)
+    list(GET entry_parts 2 entry_file)
+    file(REMOVE "${entry_file}")
+    math(EXPR total "${total} - ${entry_size}")
+    math(EXPR stats_evictions "${stats_evictions} + 1")
+  endforeach()
+
+  _sleigh_cache_write_stats(stats)
+  file(LOCK "${CACHE_DIR}/cache.lock" RELEASE)
+endfunction()
+
+if(NOT DEFINED CACHE_DIR)
+  message(FATAL_ERROR "Missing required variable: CACHE_DIR")
+endif()
+file(MAKE_DIRECTORY "${CACHE_DIR}")
+
+if(SHOW_STATS OR ZERO_STATS)
+  file(LOCK "${CACHE_DIR}/cache.lock" TIMEOUT 600)
+  _sleigh_cache_read_stats(stats)
+  if(ZERO_STATS)
+    foreach(stat ${_sleigh_cache_stat_names})
+      set(stats_${stat} 0)
+    endforeach()
+    _sleigh_cache_write_stats(stats)
+    message(STATUS "sleigh cache: statistics zeroed")
+  else()
+    _sleigh_cache_entries(entries total)
+    list(LENGTH entries num_entries)
+    math(EXPR num_requests "${stats_hits} + ${stats_misses}")
+    if(num_requests GREATER 0)
+      math(EXPR hit_rate "100 * ${stats_hits} / ${num_requests}")
+    else()
+      set(hit_rate 0)
+    endif()
+    message(STATUS "sleigh cache directory: ${CACHE_DIR}")
+    message(STATUS "sleigh cache hits:      ${stats_hits} (${hit_rate}%)")
+    message(STATUS "sleigh cache misses:    ${stats_misses}")
+    message(STATUS "sleigh cache evictions: ${stats_evictions}")
+    message(STATUS "sleigh cache entries:   ${num_entries} (${total} bytes)")
+  endif()
+  file(LOCK "${CACHE_DIR}/cache.lock" RELEASE)
+  return()
+endif()
+
+foreach(required_var COMPILER COMPILER_ID SLASPEC OUT_FILE LOG_FILE)
+  if(NOT DEFINED ${required_var})
+    message(FATAL_ERROR "Missing required variable: ${required_var}")
+  endif()
+endforeach()
+if(NOT DEFINED CACHE_MAX_SIZE)
+  set(CACHE_MAX_SIZE 1G)
+endif()
+_sleigh_cache_parse_size(max_size "${CACHE_MAX_SIZE}")
+
+_sleigh_cache_key(cache_key "${SLASPEC}" "${COMPILER_ID}")
+string(SUBSTRING "${cache_key}" 0 2 cache_subdir)
+set(cache_entry "${CACHE_DIR}/${cache_subdir}/${cache_key}.sla")
+
+get_filename_component(spec_dir "${SLASPEC}" DIRECTORY)
+get_filename_component(out_dir "${OUT_FILE}" DIRECTORY)
+get_filename_component(log_dir "${LOG_FILE}" DIRECTORY)
+file(MAKE_DIRECTORY "${out_dir}" "${log_dir}")
+
+if(EXISTS "${cache_entry}")
+  execute_process(
+    COMMAND "${CMAKE_COMMAND}" -E copy "${cache_entry}" "${OUT_FILE}"
+    RESULT_VARIABLE copy_result
+  )
+  if(copy_result EQUAL 0)
+    # Mark the entry as recently used and the output as newer than its inputs
+    file(TOUCH_NOCREATE "${cache_entry}")
+    file(TOUCH "${OUT_FILE}")
+    file(WRITE "${LOG_FILE}" "sleigh cache: hit ${cache_key}\n")
+    _sleigh_cache_update(hits "${max_size}")
+    return()
+  endif()
+endif()
+
+execute_process(
+  COMMAND "${COMPILER}" "${SLASPEC}" "${OUT_FILE}"
+  WORKING_DIRECTORY "${spec_dir}"
+  OUTPUT_FILE "${LOG_FILE}"
+  ERROR_FILE "${LOG_FILE}"
+  RESULT_VARIABLE compile_result
+)
+if(NOT compile_result EQUAL 0)
+  message(FATAL_ERROR
+    "sleigh compilation of '${SLASPEC}' failed (${compile_result}), see '${LOG_FILE}'"
+  )
+endif()
+
+# Copy under a unique name and rename so that concurrent readers never see a
+# partially written entry
+file(MAKE_DIRECTORY "${CACHE_DIR}/${cache_subdir}")
+string(RANDOM LENGTH 8 tmp_suffix)
+set(tmp_entry "${cache_entry}.${tmp_suffix}.tmp")
+execute_process(
+  COMMAND "${CMAKE_COMMAND}" -E copy "${OUT_FILE}" "${tmp_entry}"
+  RESULT_VARIABLE copy_result
+)
+if(copy_result EQUAL 0)
+  file(RENAME "${tmp_entry}" "${cache_entry}")
+endif()
+_sleigh_cache_update(misses "${max_size}")
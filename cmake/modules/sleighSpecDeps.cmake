@@ -0,0 +1,81 @@
+#
+# Copyright (c) 2026-present, Trail of Bits, Inc.
+# All rights reserved.
+#
+# This source code is licensed in accordance with the terms specified in
+# the LICENSE file found in the root directory of this source tree.
+#
+
+cmake_minimum_required(VERSION 3.18)
+
+# Scans the sleigh `@include` directives of a slaspec file to find every
+# `.sinc` (or other) file that its compilation depends on.
+#
+# Include this file to use `sleigh_spec_dependencies` at configure time, or
+# run it in script mode to write a Makefile-style depfile for a compiled
+# sleigh file at build time:
+#
+#   cmake -DSLASPEC=<slaspec> -DOUT_FILE=<sla> -DDEPFILE=<depfile>
+#     -P sleighSpecDeps.cmake
+include_guard(GLOBAL)
+
+# Sets OUT_VAR to the absolute paths of all files transitively included by
+# SPEC_FILE. Relative include paths are resolved against the directory of the
+# including file, like the sleigh compiler does.
+#
+# NOTE: Includes that are only reachable through preprocessor macro expansion
+# (e.g. '@include "$(VAR).sinc"') cannot be resolved and are skipped. Includes
+# inside '@if' blocks are always counted as dependencies.
+function(sleigh_spec_dependencies out_var spec_file)
+  get_filename_component(spec_file "${spec_file}" ABSOLUTE)
+
+  set(include_regex "^[ \t]*@include[ \t]+\"([^\"]+)\"")
+  set(visited)
+  set(worklist "${spec_file}")
+  while(worklist)
+    list(POP_FRONT worklist current_file)
+    get_filename_component(current_dir "${current_file}" DIRECTORY)
+
+    file(STRINGS "${current_file}" include_lines REGEX "${include_regex}")
+    foreach(include_line IN LISTS include_lines)
+      if(NOT include_line MATCHES "${include_regex}")
+        continue()
+      endif()
+      set(included_file "${CMAKE_MATCH_1}")
+      if(included_file MATCHES "\\$\\(")
+        continue()
+      endif()
+
+      get_filename_component(included_file "${included_file}"
+        ABSOLUTE BASE_DIR "${current_dir}"
+      )
+      if(included_file IN_LIST visited OR NOT EXISTS "${included_file}")
+        continue()
+      endif()
+      list(APPEND visited "${included_file}")
+      list(APPEND worklist "${included_file}")
+    endforeach()
+  endwhile()
+
+  list(SORT visited)
+  set(${out_var} "${visited}" PARENT_SCOPE)
+endfunction()
+
+# Script mode entrypoint for writing a depfile
+if(CMAKE_SCRIPT_MODE_FILE STREQUAL CMAKE_CURRENT_LIST_FILE)
+  foreach(required_var SLASPEC OUT_FILE DEPFILE)
+    if(NOT DEFINED ${required_var})
+      message(FATAL_ERROR "Missing required variable: ${required_var}")
+    endif()
+  endforeach()
+
+  sleigh_spec_dependencies(spec_includes "${SLASPEC}")
+
+  # Spaces are the only special characters we expect in paths
+  string(REPLACE " " "\\ " depfile_content "${OUT_FILE}:")
+  foreach(dep_file "${SLASPEC}" ${spec_includes})
+    string(REPLACE " " "\\ " dep_file "${dep_file}")
+    string(APPEND depfile_content " \\\n  ${dep_file}")
+  endforeach()
+  file(WRITE "${DEPFILE}" "${depfile_content}\n")
+endif()
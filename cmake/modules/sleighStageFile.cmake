@@ -0,0 +1,45 @@
+#
+# Copyright (c) 2026-present, Trail of Bits, Inc.
+# All rights reserved.
+#
+# This source code is licensed in accordance with the terms specified in
+# the LICENSE file found in the root directory of this source tree.
+#
+
+cmake_minimum_required(VERSION 3.18)
+
+# Stages a single spec runtime file into the build tree by linking it to its
+# source instead of copying it. Run in script mode:
+#
+#   cmake -DSOURCE=<file> -DDESTINATION=<file> -DMODE=<hardlink|symlink>
+#     -P sleighStageFile.cmake
+#
+# Falls back to copying when the link cannot be created, like hard links
+# across filesystems or symbolic links without the needed privileges on
+# Windows.
+
+foreach(var SOURCE DESTINATION MODE)
+  if(NOT DEFINED ${var})
+    message(FATAL_ERROR "${var} is required")
+  endif()
+endforeach()
+
+if(MODE STREQUAL "symlink")
+  set(link_args SYMBOLIC)
+elseif(MODE STREQUAL "hardlink")
+  set(link_args)
+else()
+  message(FATAL_ERROR "Unknown staging mode '${MODE}'")
+endif()
+
+get_filename_component(destination_dir "${DESTINATION}" DIRECTORY)
+file(MAKE_DIRECTORY "${destination_dir}")
+
+# CREATE_LINK does not replace existing files, like a copy from an earlier
+# build or a link to a source file that an editor has since replaced.
+# Links share the timestamp of their source, so they stay up to date for the
+# build system without touching anything
+if(EXISTS "${DESTINATION}" OR IS_SYMLINK "${DESTINATION}")
+  file(REMOVE "${DESTINATION}")
+endif()
+file(CREATE_LINK "${SOURCE}" "${DESTINATION}" ${link_args} COPY_ON_ERROR)
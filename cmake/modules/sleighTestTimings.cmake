@@ -0,0 +1,85 @@
+#
+# Copyright (c) 2026-present, Trail of Bits, Inc.
+# All rights reserved.
+#
+# This source code is licensed in accordance with the terms specified in
+# the LICENSE file found in the root directory of this source tree.
+#
+
+cmake_minimum_required(VERSION 3.18)
+
+# Prints the time each test took, slowest first, from the cost data that ctest
+# keeps about its runs. Run in script mode:
+#
+#   cmake -DCOST_DATA=<build>/Testing/Temporary/CTestCostData.txt
+#     [-DTEST_PREFIX=<prefix>] -P sleighTestTimings.cmake
+#
+# ctest averages the time of each test over its recent runs, so the times are
+# those of the last run after running the tests once in a fresh build
+# directory.
+
+if(NOT DEFINED COST_DATA)
+  message(FATAL_ERROR "COST_DATA is required")
+endif()
+if(NOT EXISTS "${COST_DATA}")
+  message(FATAL_ERROR "No test timings in ${COST_DATA}, run ctest first")
+endif()
+
+file(STRINGS "${COST_DATA}" lines)
+set(timings)
+set(total_micros 0)
+foreach(line IN LISTS lines)
+  # The failed tests follow this separator
+  if(line STREQUAL "---")
+    break()
+  endif()
+  # Lines hold the test name, its number of runs and its average time
+  if(NOT line MATCHES "^([^ ]+) [0-9]+ ([0-9]+)(\\.([0-9]*))?$")
+    continue()
+  endif()
+  set(name "${CMAKE_MATCH_1}")
+  set(seconds "${CMAKE_MATCH_2}")
+  set(fraction "${CMAKE_MATCH_4}000000")
+  if(DEFINED TEST_PREFIX)
+    string(FIND "${name}" "${TEST_PREFIX}" prefix_pos)
+    if(NOT prefix_pos EQUAL 0)
+      continue()
+    endif()
+  endif()
+  string(SUBSTRING "${fraction}" 0 6 fraction)
+  # Drop leading zeros, which math() would otherwise reject or misread
+  string(REGEX MATCH "[1-9][0-9]*" fraction "${fraction}")
+  if(fraction STREQUAL "")
+    set(fraction 0)
+  endif()
+  math(EXPR micros "${seconds} * 1000000 + ${fraction}")
+  math(EXPR total_micros "${total_micros} + ${micros}")
+  # Pad the times so that sorting the strings sorts them by time
+  string(LENGTH "${micros}" micros_len)
+  math(EXPR pad_len "15 - ${micros_len}")
+  string(REPEAT "0" "${pad_len}" pad)
+  list(APPEND timings "${pad}${micros} ${name}")
+endforeach()
+
+list(LENGTH timings timing_count)
+if(timing_count EQUAL 0)
+  message(FATAL_ERROR "No matching test timings in ${COST_DATA}")
+endif()
+list(SORT timings ORDER DESCENDING)
+
+function(format_seconds micros out_var)
+  math(EXPR whole "${micros} / 1000000")
+  math(EXPR millis "(${micros} % 1000000) / 1000")
+  string(LENGTH "${millis}" millis_len)
+  math(EXPR pad_len "3 - ${millis_len}")
+  string(REPEAT "0" "${pad_len}" pad)
+  set("${out_var}" "${whole}.${pad}${millis}" PARENT_SCOPE)
+endfunction()
+
+foreach(timing IN LISTS timings)
+  string(REGEX MATCH "^0*([0-9]+) (.*)$" timing "${timing}")
+  format_seconds("${CMAKE_MATCH_1}" seconds)
+  message("${seconds} s  ${CMAKE_MATCH_2}")
+endforeach()
+format_seconds("${total_micros}" total_seconds)
+message("${total_seconds} s total in ${timing_count} tests")
@@ -34,6 +34,8 @@ option(sleigh_BUILD_SLEIGHSPECS "Build and install sleigh spec files" "${PROJECT
 # Add-ons by ToB
 option(sleigh_BUILD_SUPPORT "Build ToB support libraries" "${PROJECT_IS_TOP_LEVEL}")
 cmake_dependent_option(sleigh_BUILD_EXTRATOOLS "Build extra ToB sleigh tools" "${PROJECT_IS_TOP_LEVEL}" "sleigh_BUILD_SUPPORT" OFF)
+cmake_dependent_option(sleigh_BUILD_PYTHON "Build the Python bindings" OFF "sleigh_BUILD_SUPPORT" OFF)
+cmake_dependent_option(sleigh_BUILD_BENCHMARKS "Build the lifting benchmark" OFF "sleigh_BUILD_SUPPORT;sleigh_BUILD_SLEIGHSPECS" OFF)
 
 # ---- Warning guard ----
 
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Client for the `sleigh-lift --serve` lift server"""
+
+import argparse
+import json
+import socket
+import struct
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Request kinds and output formats, see extra-tools/sleigh-lift/src/Server.h
+KIND_STATS = 0
+KIND_PCODE = 1
+KIND_DISASSEMBLE = 2
+OUTPUT_FORMATS = {"text": 0, "jsonl": 1, "binary": 2}
+
+# Response statuses
+STATUS_OK = 0
+STATUS_DECODE_ERROR = 1
+STATUS_FAILED = 2
+
+REQUEST_HEADER = struct.Struct("<IIBBQ")
+RESPONSE_HEADER = struct.Struct("<IIBI")
+
+
+@dataclass
+class LiftRequest:
+    """A range of bytes to lift."""
+
+    address: int
+    data: bytes
+
+
+@dataclass
+class LiftResponse:
+    """The server's answer to one request."""
+
+    request_id: int
+    status: int
+    message: str
+    output: bytes
+
+
+class LiftClient:
+    """A connection to a lift server, which can have many requests in flight."""
+
+    def __init__(self, socket_path: Path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(socket_path))
+        self.reader = self.sock.makefile("rb")
+        self.next_id = 0
+
+    def close(self) -> None:
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self) -> "LiftClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def encode_request(
+        self,
+        kind: int,
+        sla: str = "",
+        pspec: Optional[str] = None,
+        output_format: str = "text",
+        address: int = 0,
+        data: bytes = b"",
+    ) -> Tuple[int, bytes]:
+        """Build a request frame. Returns its id and the frame."""
+        request_id = self.next_id
+        self.next_id = (self.next_id + 1) & 0xFFFFFFFF
+        sla_name = sla.encode()
+        pspec_name = (pspec or "").encode()
+        body = (
+            struct.pack("<H", len(sla_name))
+            + sla_name
+            + struct.pack("<H", len(pspec_name))
+            + pspec_name
+            + data
+        )
+        size = REQUEST_HEADER.size - 4 + len(body)
+        header = REQUEST_HEADER.pack(
+            size, request_id, kind, OUTPUT_FORMATS[output_format], address
+        )
+        return request_id, header + body
+
+    def send(self, frame: bytes) -> None:
+        self.sock.sendall(frame)
+
+    def receive(self) -> LiftResponse:
+        """Wait for the next response, in whatever order the server sends them."""
+        header = self._read_exactly(RESPONSE_HEADER.size)
+        size, request_id, status, message_len = RESPONSE_HEADER.unpack(header)
+        rest = self._read_exactly(size - (RESPONSE_HEADER.size - 4))
+        return LiftResponse(
+            request_id=request_id,
+            status=status,
+            message=rest[:message_len].decode(errors="replace"),
+            output=rest[message_len:],
+        )
+
+    def lift_many(
+        self,
+        kind: int,
+        sla: str,
+        requests: Iterable[LiftRequest],
+        pspec: Optional[str] = None,
+        output_format: str = "text",
+    ) -> List[LiftResponse]:
+        """Send all requests without waiting, and return the responses in
+        request order."""
+        frames = [
+            self.encode_request(
+                kind, sla, pspec, output_format, request.address, request.data
+            )
+            for request in requests
+        ]
+
+        # The server stops reading while its queue is full, so send from
+        # another thread to keep reading responses in the meantime
+        send_error: List[BaseException] = []
+
+        def send_all() -> None:
+            try:
+                for _, frame in frames:
+                    self.send(frame)
+            except OSError as e:
+                send_error.append(e)
+
+        sender = threading.Thread(target=send_all)
+        sender.start()
+        responses: Dict[int, LiftResponse] = {}
+        try:
+            while len(responses) < len(frames):
+                response = self.receive()
+                responses[response.request_id] = response
+        finally:
+            sender.join()
+        if send_error:
+            raise send_error[0]
+        return [responses[request_id] for request_id, _ in frames]
+
+    def stats(self) -> Dict[str, object]:
+        """Fetch the server's statistics."""
+        request_id, frame = self.encode_request(KIND_STATS)
+        self.send(frame)
+        response = self.receive()
+        if response.request_id != request_id or response.status != STATUS_OK:
+            raise RuntimeError(f"Unexpected stats response: {response}")
+        return json.loads(response.output)
+
+    def _read_exactly(self, size: int) -> bytes:
+        data = self.reader.read(size)
+        if len(data) != size:
+            raise ConnectionError("Server closed the connection")
+        return data
+
+
+def read_records(path: str, default_address: int) -> List[LiftRequest]:
+    """Read 'address bytes' records, like `sleigh-lift -i` in text format."""
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    records = []
+    with stream:
+        for line in stream:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if len(fields) == 1:
+                records.append(LiftRequest(default_address, bytes.fromhex(fields[0])))
+            else:
+                records.append(
+                    LiftRequest(int(fields[0], 0), bytes.fromhex(fields[1]))
+                )
+    return records
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Send lift requests to a sleigh-lift server, or print its "
+            "statistics. All requests are sent without waiting for responses, "
+            "and the output is printed in request order."
+        )
+    )
+    parser.add_argument("socket", type=Path, help="Server socket path")
+    parser.add_argument(
+        "action",
+        choices=["pcode", "disassemble", "stats"],
+        help="What to do",
+    )
+    parser.add_argument("sla", nargs="?", help="SLA file name")
+    parser.add_argument("bytes", nargs="?", help="Hex bytes to lift")
+    parser.add_argument("-s", "--pspec", help="PSPEC file name")
+    parser.add_argument(
+        "-a", "--address", type=lambda x: int(x, 0), default=0, help="Address"
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        help="File of 'address bytes' lines to lift, or '-' for stdin",
+    )
+    parser.add_argument(
+        "-O",
+        "--output-format",
+        choices=sorted(OUTPUT_FORMATS),
+        default="text",
+        help="Output format (default: text)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Send the requests this many times, to load the server",
+    )
+
+    args = parser.parse_args()
+
+    with LiftClient(args.socket) as client:
+        if args.action == "stats":
+            json.dump(client.stats(), sys.stdout, indent=2)
+            print()
+            return 0
+
+        if not args.sla or (args.bytes is None) == (args.input is None):
+            parser.error("lifting needs an SLA file and either bytes or -i")
+        if args.input:
+            requests = read_records(args.input, args.address)
+        else:
+            requests = [LiftRequest(args.address, bytes.fromhex(args.bytes))]
+        kind = KIND_PCODE if args.action == "pcode" else KIND_DISASSEMBLE
+        responses = client.lift_many(
+            kind, args.sla, requests * args.repeat, args.pspec, args.output_format
+        )
+
+    exit_code = 0
+    out = sys.stdout.buffer
+    for response in responses[: len(requests)]:
+        if response.status == STATUS_FAILED:
+            print(f"Request failed: {response.message}", file=sys.stderr)
+            exit_code = 1
+            continue
+        if response.status == STATUS_DECODE_ERROR:
+            print(response.message, file=sys.stderr)
+        out.write(response.output)
+    out.flush()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
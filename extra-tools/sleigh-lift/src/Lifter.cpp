@@ -0,0 +1,276 @@
+/*
+  Copyright (c) 2021-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include "Lifter.h"
+
+#include <set>
+
+std::optional<OutputFormat> ParseOutputFormat(std::string_view name) {
+  if (name == "text") {
+    return OutputFormat::kText;
+  } else if (name == "jsonl") {
+    return OutputFormat::kJsonLines;
+  } else if (name == "binary") {
+    return OutputFormat::kBinary;
+  }
+  return {};
+}
+
+void WriteJsonString(std::ostream &os, std::string_view str) {
+  static const char kHexDigits[] = "0123456789abcdef";
+  os << '"';
+  for (const char c : str) {
+    if (c == '"' || c == '\\') {
+      os << '\\' << c;
+    } else if (static_cast<unsigned char>(c) < 0x20) {
+      os << "\\u00" << kHexDigits[(c >> 4) & 0xf] << kHexDigits[c & 0xf];
+    } else {
+      os << c;
+    }
+  }
+  os << '"';
+}
+
+void LiftRange(LiftEngine &lifter, InstructionWriter &writer, bool disassemble,
+               uint64_t addr, size_t len, std::ostream &errors) {
+  auto &engine = lifter.Engine();
+  sleigh::LiftedInstruction insn;
+  ghidra::Address cur_addr(engine.getDefaultCodeSpace(), addr),
+      last_addr(engine.getDefaultCodeSpace(), addr + len);
+  while (cur_addr < last_addr) {
+    try {
+      lifter.Decode(cur_addr.getOffset(), disassemble, insn);
+      if (disassemble) {
+        writer.WriteAssembly(insn);
+      } else {
+        writer.WritePcode(insn);
+      }
+      cur_addr = cur_addr + static_cast<int32_t>(insn.length);
+    }
+    catch(ghidra::UnimplError &err) {
+      errors << "UnimplError @ " << cur_addr << " (addr 0x" << addr << ", len 0x" << len << "): " << err.explain << "\n";
+      break;
+    }
+    catch (ghidra::BadDataError &err) {
+      errors << "BadDataError @ " << cur_addr << " (addr 0x" << addr << ", len 0x" << len << "): " << err.explain << "\n";
+      break;
+    }
+  }
+}
+
+namespace {
+
+// An instruction decoded while following control flow
+struct ReachedInstruction {
+  sleigh::LiftedInstruction insn;
+  // Constant BRANCH and CBRANCH targets in the code space
+  std::vector<uint64_t> targets;
+  bool falls_through = true;
+  // Whether the instruction branches, so that it is the last of its block
+  bool ends_block = false;
+};
+
+// Find where an instruction can continue from its p-code
+void AnalyzeFlow(ReachedInstruction &reached, int32_t code_space,
+                 std::vector<uint64_t> &calls) {
+  reached.targets.clear();
+  reached.falls_through = true;
+  reached.ends_block = false;
+  for (const auto &op : reached.insn.pcode) {
+    switch (op.opcode) {
+    case ghidra::CPUI_BRANCH:
+    case ghidra::CPUI_CBRANCH:
+    case ghidra::CPUI_CALL:
+      // Targets in the constant space are relative to the instruction's own
+      // p-code, so they don't leave it
+      if (op.inputs.empty() || op.inputs[0].space != code_space) {
+        break;
+      }
+      if (op.opcode == ghidra::CPUI_CALL) {
+        calls.push_back(op.inputs[0].offset);
+      } else {
+        reached.targets.push_back(op.inputs[0].offset);
+        reached.ends_block = true;
+      }
+      break;
+    case ghidra::CPUI_BRANCHIND:
+    case ghidra::CPUI_RETURN:
+      reached.ends_block = true;
+      break;
+    default:
+      break;
+    }
+  }
+  if (!reached.insn.pcode.empty()) {
+    switch (reached.insn.pcode.back().opcode) {
+    case ghidra::CPUI_BRANCH:
+    case ghidra::CPUI_BRANCHIND:
+    case ghidra::CPUI_RETURN:
+      reached.falls_through = false;
+      break;
+    default:
+      break;
+    }
+  }
+}
+
+// The address after an instruction, wrapping around the address space
+uint64_t FallthroughAddress(ghidra::AddrSpace *space, uint64_t addr,
+                            const sleigh::LiftedInstruction &insn) {
+  return (ghidra::Address(space, addr) + static_cast<int32_t>(insn.length))
+      .getOffset();
+}
+
+} // namespace
+
+size_t LiftReachable(LiftEngine &lifter, InstructionWriter &writer,
+                     bool disassemble, const std::vector<uint64_t> &entries,
+                     std::ostream &errors) {
+  auto &engine = lifter.Engine();
+  auto *const space = engine.getDefaultCodeSpace();
+  const int32_t code_space = space->getIndex();
+
+  // Decode everything reachable, from one block start at a time until its
+  // instructions stop falling through or reach code that was already decoded
+  std::map<uint64_t, ReachedInstruction> reached;
+  std::set<uint64_t> leaders;
+  std::vector<uint64_t> worklist(entries.rbegin(), entries.rend());
+  std::vector<uint64_t> calls;
+  while (!worklist.empty()) {
+    uint64_t addr = worklist.back();
+    worklist.pop_back();
+    if (!leaders.insert(addr).second) {
+      continue;
+    }
+    for (;;) {
+      if (reached.count(addr)) {
+        // Joined code that was reached from elsewhere, which must now start a
+        // block of its own
+        leaders.insert(addr);
+        break;
+      }
+      if (!lifter.IsMapped(addr)) {
+        break;
+      }
+      ReachedInstruction insn;
+      try {
+        // Control flow is found from the p-code, so it's always lifted
+        lifter.Decode(addr, disassemble, true, insn.insn);
+      } catch (ghidra::UnimplError &err) {
+        errors << "UnimplError @ " << ghidra::Address(space, addr) << ": "
+               << err.explain << "\n";
+        break;
+      } catch (ghidra::BadDataError &err) {
+        errors << "BadDataError @ " << ghidra::Address(space, addr) << ": "
+               << err.explain << "\n";
+        break;
+      }
+      AnalyzeFlow(insn, code_space, calls);
+      const uint64_t next = FallthroughAddress(space, addr, insn.insn);
+      for (auto target : insn.targets) {
+        worklist.push_back(target);
+      }
+      for (auto target : calls) {
+        worklist.push_back(target);
+      }
+      calls.clear();
+      const bool falls_through = insn.falls_through;
+      const bool ends_block = insn.ends_block;
+      reached.emplace(addr, std::move(insn));
+      if (!falls_through) {
+        break;
+      }
+      if (ends_block) {
+        worklist.push_back(next);
+        break;
+      }
+      addr = next;
+    }
+  }
+
+  // Write the blocks that start at each decoded leader, splitting runs of
+  // instructions where a branch lands in the middle of them
+  size_t num_blocks = 0;
+  std::vector<const ReachedInstruction *> block;
+  std::vector<uint64_t> successors;
+  for (auto leader : leaders) {
+    auto it = reached.find(leader);
+    if (it == reached.end()) {
+      continue;
+    }
+    block.clear();
+    successors.clear();
+    for (;;) {
+      const auto &insn = it->second;
+      block.push_back(&insn);
+      const uint64_t next = FallthroughAddress(space, it->first, insn.insn);
+      if (insn.ends_block || !insn.falls_through) {
+        successors = insn.targets;
+        if (insn.falls_through) {
+          successors.push_back(next);
+        }
+        break;
+      }
+      it = reached.find(next);
+      if (it == reached.end() || leaders.count(next)) {
+        // Falls into another block, or off the end of the reachable code
+        successors.push_back(next);
+        break;
+      }
+    }
+    std::sort(successors.begin(), successors.end());
+    successors.erase(std::unique(successors.begin(), successors.end()),
+                     successors.end());
+    writer.BeginBlock(leader, successors);
+    for (const auto *insn : block) {
+      if (disassemble) {
+        writer.WriteAssembly(insn->insn);
+      } else {
+        writer.WritePcode(insn->insn);
+      }
+    }
+    writer.EndBlock();
+    ++num_blocks;
+  }
+  return num_blocks;
+}
+
+std::optional<LanguageFiles>
+FindLanguageFiles(const std::string &sla_file_name,
+                  const std::optional<std::string> &pspec_file_name,
+                  const std::optional<std::string> &root_sla_dir,
+                  std::string &error) {
+  // Find SLA file path
+  const auto sla_file_path =
+      root_sla_dir ? sleigh::FindSpecFile(sla_file_name, {*root_sla_dir})
+                   : sleigh::FindSpecFile(sla_file_name);
+  if (!sla_file_path) {
+    error = "Could not find SLA file: " + sla_file_name;
+    return {};
+  }
+  std::optional<std::filesystem::path> pspec_file_path;
+  if (pspec_file_name) {
+    // A PSPEC file was explicitly supplied
+    pspec_file_path =
+        root_sla_dir ? sleigh::FindSpecFile(*pspec_file_name, {*root_sla_dir})
+                     : sleigh::FindSpecFile(*pspec_file_name);
+    if (!pspec_file_path) {
+      error = "Could not find PSPEC file: " + *pspec_file_name;
+      return {};
+    }
+  } else {
+    // Otherwise, see if there's a PSPEC file named identically to the SLA file
+    pspec_file_path = *sla_file_path;
+    pspec_file_path->replace_extension(".pspec");
+    if (!std::filesystem::exists(*pspec_file_path)) {
+      // If a file with that extension doesn't exist, don't attempt to load it
+      pspec_file_path = {};
+    }
+  }
+  return LanguageFiles{*sla_file_path, std::move(pspec_file_path)};
+}
@@ -0,0 +1,499 @@
+/*
+  Copyright (c) 2021-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#pragma once
+
+#include <sleigh/InstructionCache.h>
+#include <sleigh/LanguageCache.h>
+#include <sleigh/LiftProfile.h>
+#include <sleigh/LiftedInstruction.h>
+#include <sleigh/libsleigh.hh>
+
+#include <algorithm>
+#include <cstdint>
+#include <cstring>
+#include <filesystem>
+#include <iostream>
+#include <map>
+#include <memory>
+#include <optional>
+#include <string>
+#include <string_view>
+#include <utility>
+#include <vector>
+
+// Serves loads from a set of non-overlapping segments, each mapped at its own
+// base address. Bytes outside of every segment read as zero.
+class InMemoryLoadImage : public ghidra::LoadImage {
+public:
+  InMemoryLoadImage(void) : LoadImage("nofile") {}
+
+  // Replace the image with a single buffer mapped at a new base address
+  void SetImage(uint64_t addr, std::string &&buf) {
+    segments.clear();
+    auto &segment = segments[addr];
+    segment.buffer = std::move(buf);
+    segment.bytes = segment.buffer;
+  }
+
+  // Replace the image with bytes owned by the caller, such as a mapped file.
+  // The bytes must outlive any use of this load image.
+  void SetImageView(uint64_t addr, std::string_view bytes) {
+    segments.clear();
+    AddSegmentView(addr, bytes);
+  }
+
+  // Map another segment of caller-owned bytes. Returns false if it would
+  // overlap an existing segment.
+  bool AddSegmentView(uint64_t addr, std::string_view bytes) {
+    if (bytes.empty()) {
+      return true;
+    }
+    const uint64_t last = addr + (bytes.size() - 1);
+    auto next = segments.lower_bound(addr);
+    if (next != segments.end() && next->first <= last) {
+      return false;
+    }
+    if (next != segments.begin() && LastAddress(*std::prev(next)) >= addr) {
+      return false;
+    }
+    segments.emplace_hint(next, addr, Segment{{}, bytes});
+    return true;
+  }
+
+  // Whether any segment maps `addr`
+  bool Contains(uint64_t addr) const {
+    auto it = segments.upper_bound(addr);
+    if (it == segments.begin()) {
+      return false;
+    }
+    --it;
+    return !it->second.bytes.empty() && LastAddress(*it) >= addr;
+  }
+
+  void loadFill(unsigned char *ptr, int size,
+                const ghidra::Address &addr) override {
+    if (size <= 0) {
+      return;
+    }
+    const uint64_t start = addr.getOffset();
+    uint64_t last = start + static_cast<uint64_t>(size - 1);
+    if (last < start) {
+      // Reads past the top of the address space are left as zeros
+      last = ~0ULL;
+    }
+    std::memset(ptr, 0, static_cast<size_t>(size));
+
+    // Start from the last segment beginning at or before the load, which is
+    // the only one that can cover its first byte
+    auto it = segments.upper_bound(start);
+    if (it != segments.begin()) {
+      --it;
+    }
+    for (; it != segments.end() && it->first <= last; ++it) {
+      if (it->second.bytes.empty() || LastAddress(*it) < start) {
+        continue;
+      }
+      const uint64_t copy_first = std::max(start, it->first);
+      const uint64_t copy_last = std::min(last, LastAddress(*it));
+      std::memcpy(ptr + (copy_first - start),
+                  it->second.bytes.data() + (copy_first - it->first),
+                  static_cast<size_t>(copy_last - copy_first + 1));
+    }
+  }
+
+  std::string getArchType(void) const override { return "memory"; }
+  void adjustVma(long) override {}
+
+private:
+  struct Segment {
+    // Set for segments whose bytes are owned by this image
+    std::string buffer;
+    std::string_view bytes;
+  };
+
+  static uint64_t LastAddress(const std::pair<const uint64_t, Segment> &entry) {
+    return entry.first + (entry.second.bytes.size() - 1);
+  }
+
+  // Keyed by base address. Map nodes are stable, so views into an owned
+  // buffer stay valid as other segments are added.
+  std::map<uint64_t, Segment> segments;
+};
+
+enum class OutputFormat { kText, kJsonLines, kBinary };
+
+std::optional<OutputFormat> ParseOutputFormat(std::string_view name);
+
+void WriteJsonString(std::ostream &os, std::string_view str);
+
+// Writes decoded instructions in the selected output format.
+//
+// The binary format is little-endian. It starts with the magic "SLPB", a u32
+// version and a table of address spaces, each a u32 space index, a u32 name
+// length and the name. It is followed by records that each start with a u8
+// kind:
+//   kind 0: end of a basic block when following control flow
+//   kind 1: u64 address, u32 length, u32 op count, then per p-code op a u32
+//           opcode, u8 output flag, u32 input count and the output (if
+//           flagged) and input varnodes as u32 space index, u64 offset and
+//           u32 size
+//   kind 2: u64 address, u32 length, then the mnemonic and the operands, each
+//           as a u32 length and the text
+//   kind 3: start of a basic block (only when following control flow), as a
+//           u64 address, u32 successor count and the u64 successor addresses
+//   kind 4: end of an input record in batch mode, as a u64 record number, a
+//           u8 flag for whether the address is known, the u64 address (0 if
+//           not) and the error that ended or skipped the record as a u32
+//           length and the text, which is empty if there was none
+class InstructionWriter {
+public:
+  static constexpr uint32_t kBinaryVersion = 2;
+
+  InstructionWriter(std::ostream &os, OutputFormat format,
+                    const ghidra::Translate &trans)
+      : os(os), format(format), trans(trans) {
+    if (format == OutputFormat::kBinary) {
+      os.write("SLPB", 4);
+      WriteInt(kBinaryVersion, 4);
+      std::vector<ghidra::AddrSpace *> spaces;
+      for (int32_t i = 0; i < trans.numSpaces(); ++i) {
+        if (auto *space = trans.getSpace(i)) {
+          spaces.push_back(space);
+        }
+      }
+      WriteInt(spaces.size(), 4);
+      for (auto *space : spaces) {
+        WriteInt(static_cast<uint64_t>(space->getIndex()), 4);
+        WriteString(space->getName());
+      }
+    }
+  }
+
+  void WriteAssembly(const sleigh::LiftedInstruction &insn) {
+    switch (format) {
+    case OutputFormat::kText:
+      ghidra::Address(trans.getDefaultCodeSpace(), insn.address).printRaw(os);
+      os << ": " << insn.mnemonic << ' ' << insn.body << '\n';
+      break;
+    case OutputFormat::kJsonLines:
+      os << "{\"addr\":" << insn.address << ",\"len\":" << insn.length
+         << ",\"mnemonic\":";
+      WriteJsonString(os, insn.mnemonic);
+      os << ",\"body\":";
+      WriteJsonString(os, insn.body);
+      os << "}\n";
+      break;
+    case OutputFormat::kBinary:
+      os.put(2);
+      WriteInt(insn.address, 8);
+      WriteInt(insn.length, 4);
+      WriteString(insn.mnemonic);
+      WriteString(insn.body);
+      break;
+    }
+  }
+
+  void WritePcode(const sleigh::LiftedInstruction &insn) {
+    switch (format) {
+    case OutputFormat::kText:
+      for (const auto &op : insn.pcode) {
+        if (op.output) {
+          WriteTextVarnode(*op.output);
+          os << " = ";
+        }
+        os << ghidra::get_opname(static_cast<ghidra::OpCode>(op.opcode));
+        for (const auto &input : op.inputs) {
+          os << ' ';
+          WriteTextVarnode(input);
+        }
+        os << '\n';
+      }
+      break;
+    case OutputFormat::kJsonLines:
+      os << "{\"addr\":" << insn.address << ",\"len\":" << insn.length
+         << ",\"ops\":[";
+      for (size_t i = 0; i < insn.pcode.size(); ++i) {
+        const auto &op = insn.pcode[i];
+        os << (i ? ",{" : "{") << "\"opcode\":\""
+           << ghidra::get_opname(static_cast<ghidra::OpCode>(op.opcode))
+           << '"';
+        if (op.output) {
+          os << ",\"output\":";
+          WriteJsonVarnode(*op.output);
+        }
+        os << ",\"inputs\":[";
+        for (size_t j = 0; j < op.inputs.size(); ++j) {
+          os << (j ? "," : "");
+          WriteJsonVarnode(op.inputs[j]);
+        }
+        os << "]}";
+      }
+      os << "]}\n";
+      break;
+    case OutputFormat::kBinary:
+      os.put(1);
+      WriteInt(insn.address, 8);
+      WriteInt(insn.length, 4);
+      WriteInt(insn.pcode.size(), 4);
+      for (const auto &op : insn.pcode) {
+        WriteInt(op.opcode, 4);
+        os.put(op.output ? 1 : 0);
+        WriteInt(op.inputs.size(), 4);
+        if (op.output) {
+          WriteBinaryVarnode(*op.output);
+        }
+        for (const auto &input : op.inputs) {
+          WriteBinaryVarnode(input);
+        }
+      }
+      break;
+    }
+  }
+
+  // Starts a basic block, which is ended by `EndBlock`
+  void BeginBlock(uint64_t addr, const std::vector<uint64_t> &successors) {
+    switch (format) {
+    case OutputFormat::kText:
+      os << "block ";
+      ghidra::Address(trans.getDefaultCodeSpace(), addr).printRaw(os);
+      if (!successors.empty()) {
+        os << " ->";
+        for (auto succ : successors) {
+          os << ' ';
+          ghidra::Address(trans.getDefaultCodeSpace(), succ).printRaw(os);
+        }
+      }
+      os << '\n';
+      break;
+    case OutputFormat::kJsonLines:
+      os << "{\"block\":" << addr << ",\"succs\":[";
+      for (size_t i = 0; i < successors.size(); ++i) {
+        os << (i ? "," : "") << successors[i];
+      }
+      os << "]}\n";
+      break;
+    case OutputFormat::kBinary:
+      os.put(3);
+      WriteInt(addr, 8);
+      WriteInt(successors.size(), 4);
+      for (auto succ : successors) {
+        WriteInt(succ, 8);
+      }
+      break;
+    }
+  }
+
+  void EndBlock(void) {
+    switch (format) {
+    case OutputFormat::kText:
+      os << '\n';
+      break;
+    case OutputFormat::kJsonLines:
+      os << "{\"end\":true}\n";
+      break;
+    case OutputFormat::kBinary:
+      os.put(0);
+      break;
+    }
+  }
+
+  // Marks the end of the output for one input record in batch mode. Every
+  // record gets one, including those that were skipped because they were
+  // malformed, which have an error and no output. Text output only has an
+  // empty line.
+  void EndInputRecord(size_t number, std::optional<uint64_t> addr,
+                      std::string_view error) {
+    switch (format) {
+    case OutputFormat::kText:
+      os << '\n';
+      break;
+    case OutputFormat::kJsonLines:
+      os << "{\"end\":true,\"record\":" << number << ",\"addr\":";
+      if (addr) {
+        os << *addr;
+      } else {
+        os << "null";
+      }
+      if (!error.empty()) {
+        os << ",\"error\":";
+        WriteJsonString(os, error);
+      }
+      os << "}\n";
+      break;
+    case OutputFormat::kBinary:
+      os.put(4);
+      WriteInt(number, 8);
+      os.put(addr ? 1 : 0);
+      WriteInt(addr.value_or(0), 8);
+      WriteString(error);
+      break;
+    }
+  }
+
+private:
+  void WriteInt(uint64_t val, size_t size) {
+    char bytes[8];
+    for (size_t i = 0; i < size; ++i) {
+      bytes[i] = static_cast<char>(val >> (8 * i));
+    }
+    os.write(bytes, static_cast<std::streamsize>(size));
+  }
+
+  void WriteString(std::string_view str) {
+    WriteInt(str.size(), 4);
+    os.write(str.data(), static_cast<std::streamsize>(str.size()));
+  }
+
+  void WriteTextVarnode(const sleigh::LiftedVarnode &vn) {
+    const auto *space = trans.getSpace(vn.space);
+    os << '(' << space->getName() << ',';
+    space->printOffset(os, vn.offset);
+    os << ',' << std::dec << vn.size << ')';
+  }
+
+  void WriteJsonVarnode(const sleigh::LiftedVarnode &vn) {
+    os << "{\"space\":\"" << trans.getSpace(vn.space)->getName()
+       << "\",\"offset\":" << vn.offset << ",\"size\":" << vn.size << '}';
+  }
+
+  void WriteBinaryVarnode(const sleigh::LiftedVarnode &vn) {
+    WriteInt(static_cast<uint64_t>(vn.space), 4);
+    WriteInt(vn.offset, 8);
+    WriteInt(vn.size, 4);
+  }
+
+  std::ostream &os;
+  const OutputFormat format;
+  const ghidra::Translate &trans;
+};
+
+// Owns an engine for a cached language that can lift many images in turn
+class LiftEngine {
+public:
+  explicit LiftEngine(const sleigh::Language &language)
+      : engine(language.CreateEngine(&load_image)) {
+    engine->Engine().allowContextSet(false);
+  }
+
+  ghidra::Sleigh &Engine(void) { return engine->Engine(); }
+
+  // Memoize decoded instructions in a cache of up to `max_entries`
+  void EnableCache(const sleigh::Language &language, size_t max_entries) {
+    cache = std::make_unique<sleigh::InstructionCache>(language, max_entries);
+  }
+
+  const sleigh::InstructionCache *Cache(void) const { return cache.get(); }
+
+  // Record the decoding costs of each mnemonic
+  void EnableProfile(void) {
+    profile = std::make_unique<sleigh::LiftProfile>();
+  }
+
+  const sleigh::LiftProfile *Profile(void) const { return profile.get(); }
+
+  // Disassemble or lift the instruction at `addr` from the current image
+  void Decode(uint64_t addr, bool disassemble,
+              sleigh::LiftedInstruction &insn) {
+    Decode(addr, disassemble, !disassemble, insn);
+  }
+
+  // Like above, but p-code can be lifted along with the disassembly
+  void Decode(uint64_t addr, bool disassemble, bool pcode,
+              sleigh::LiftedInstruction &insn) {
+    if (cache) {
+      cache->Lift(*engine, load_image, addr, disassemble, pcode, insn,
+                  profile.get());
+    } else {
+      sleigh::DecodeInstruction(engine->Engine(), addr, disassemble, pcode,
+                                insn, profile.get());
+    }
+  }
+
+  // Whether `addr` is in the current image
+  bool IsMapped(uint64_t addr) const { return load_image.Contains(addr); }
+
+  // Map a new image for lifting. The engine caches decoded instructions by
+  // address, so if the image overlaps anything lifted since the last reset,
+  // those caches are rebuilt. The compiled .sla stays loaded either way.
+  void SetImage(uint64_t addr, std::string &&buf) {
+    PrepareImage(addr, buf.size());
+    load_image.SetImage(addr, std::move(buf));
+  }
+
+  // Like SetImage, but the bytes are not copied and must outlive their use
+  void SetImageView(uint64_t addr, std::string_view bytes) {
+    PrepareImage(addr, bytes.size());
+    load_image.SetImageView(addr, bytes);
+  }
+
+  // Map one more segment alongside the current image. The bytes are not
+  // copied and must outlive their use. Returns false if segments overlap.
+  bool AddSegmentView(uint64_t addr, std::string_view bytes) {
+    PrepareImage(addr, bytes.size());
+    return load_image.AddSegmentView(addr, bytes);
+  }
+
+private:
+  static constexpr uint64_t kMaxInstructionOverrun = 64;
+
+  void PrepareImage(uint64_t addr, uint64_t size) {
+    // Leave room for instructions and delay slots running past the end
+    const uint64_t end = addr + size + kMaxInstructionOverrun;
+    if (used_begin < used_end && addr < used_end && used_begin < end) {
+      engine->Reset(&load_image);
+      engine->Engine().allowContextSet(false);
+      used_begin = used_end = 0;
+    }
+    if (used_begin >= used_end) {
+      used_begin = addr;
+      used_end = end;
+    } else {
+      used_begin = std::min(used_begin, addr);
+      used_end = std::max(used_end, end);
+    }
+  }
+
+  InMemoryLoadImage load_image;
+  std::unique_ptr<sleigh::LanguageEngine> engine;
+  std::unique_ptr<sleigh::InstructionCache> cache;
+  std::unique_ptr<sleigh::LiftProfile> profile;
+  uint64_t used_begin = 0, used_end = 0;
+};
+
+// Disassemble or lift the instructions in [addr, addr + len). Decoding errors
+// end the range and are reported to `errors`
+void LiftRange(LiftEngine &lifter, InstructionWriter &writer, bool disassemble,
+               uint64_t addr, size_t len, std::ostream &errors = std::cerr);
+
+// Disassemble or lift the code reachable from `entries`, following the
+// constant targets of BRANCH, CBRANCH and CALL p-code ops and fallthroughs
+// within the current image. Each instruction is decoded once, and the
+// instructions are written in basic blocks in address order. A block's
+// successors are its branch targets and its fallthrough; call targets are
+// followed but are not successors. Decoding errors end a block and are
+// reported to `errors`. Returns the number of blocks.
+size_t LiftReachable(LiftEngine &lifter, InstructionWriter &writer,
+                     bool disassemble, const std::vector<uint64_t> &entries,
+                     std::ostream &errors = std::cerr);
+
+// Paths of the files a language is loaded from
+struct LanguageFiles {
+  std::filesystem::path sla;
+  std::optional<std::filesystem::path> pspec;
+};
+
+// Find a language's .sla file and processor spec by name, in `root_sla_dir`
+// if given or the default search paths otherwise. Without a processor spec
+// name, the processor spec named like the .sla file is used if there is one.
+// Returns nothing and sets `error` if a file can't be found.
+std::optional<LanguageFiles>
+FindLanguageFiles(const std::string &sla_file_name,
+                  const std::optional<std::string> &pspec_file_name,
+                  const std::optional<std::string> &root_sla_dir,
+                  std::string &error);
@@ -0,0 +1,886 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include "Server.h"
+
+#include "Lifter.h"
+
+#include <cstdlib>
+#include <iostream>
+
+#ifdef _WIN32
+
+int RunLiftServer(const LiftServerOptions &) {
+  std::cerr << "The lift server is not supported on Windows" << std::endl;
+  return EXIT_FAILURE;
+}
+
+#else
+
+#include <algorithm>
+#include <atomic>
+#include <cerrno>
+#include <chrono>
+#include <condition_variable>
+#include <csignal>
+#include <cstring>
+#include <deque>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <sstream>
+#include <thread>
+
+#include <poll.h>
+#include <sys/socket.h>
+#include <sys/stat.h>
+#include <sys/un.h>
+#include <unistd.h>
+
+namespace {
+
+// Requests larger than this close the connection
+constexpr uint32_t kMaxFrameSize = 64u << 20;
+
+// Clients that leave more responses than this unread are disconnected
+constexpr size_t kMaxUnsentBytes = 64u << 20;
+
+// How long to keep sending responses to clients after stopping
+constexpr auto kShutdownFlushTimeout = std::chrono::seconds(5);
+
+// Fixed size part of a request, after the frame length
+constexpr size_t kRequestHeaderSize = 4 + 1 + 1 + 8;
+
+enum RequestKind : uint8_t { kStats = 0, kPcode = 1, kDisassemble = 2 };
+enum ResponseStatus : uint8_t { kOk = 0, kDecodeError = 1, kFailed = 2 };
+
+using Clock = std::chrono::steady_clock;
+
+volatile std::sig_atomic_t gStopRequested = 0;
+
+void HandleStopSignal(int) { gStopRequested = 1; }
+
+struct Request {
+  uint32_t id = 0;
+  uint8_t kind = 0;
+  uint8_t format = 0;
+  uint64_t addr = 0;
+  std::string sla_file_name;
+  std::optional<std::string> pspec_file_name;
+  std::string bytes;
+};
+
+uint64_t ReadLittleEndian(const char *data, size_t size) {
+  uint64_t val = 0;
+  for (size_t i = 0; i < size; ++i) {
+    val |= static_cast<uint64_t>(static_cast<unsigned char>(data[i]))
+           << (8 * i);
+  }
+  return val;
+}
+
+void AppendLittleEndian(std::string &out, uint64_t val, size_t size) {
+  for (size_t i = 0; i < size; ++i) {
+    out.push_back(static_cast<char>(val >> (8 * i)));
+  }
+}
+
+// Parses the request in a frame, without its length. Returns false if the
+// frame is malformed.
+bool ParseRequest(std::string &&frame, Request &request) {
+  if (frame.size() < kRequestHeaderSize) {
+    return false;
+  }
+  const char *data = frame.data();
+  request.id = static_cast<uint32_t>(ReadLittleEndian(data, 4));
+  request.kind = static_cast<uint8_t>(data[4]);
+  request.format = static_cast<uint8_t>(data[5]);
+  request.addr = ReadLittleEndian(data + 6, 8);
+  size_t pos = kRequestHeaderSize;
+  std::string names[2];
+  for (auto &name : names) {
+    if (frame.size() - pos < 2) {
+      return false;
+    }
+    const size_t len = ReadLittleEndian(data + pos, 2);
+    pos += 2;
+    if (frame.size() - pos < len) {
+      return false;
+    }
+    name.assign(data + pos, len);
+    pos += len;
+  }
+  request.sla_file_name = std::move(names[0]);
+  if (!names[1].empty()) {
+    request.pspec_file_name = std::move(names[1]);
+  } else {
+    request.pspec_file_name.reset();
+  }
+  frame.erase(0, pos);
+  request.bytes = std::move(frame);
+  return true;
+}
+
+// Reads exactly `size` bytes. Returns false at the end of the stream or on
+// an error.
+bool ReadFully(int fd, char *data, size_t size) {
+  while (size > 0) {
+    const ssize_t num_read = read(fd, data, size);
+    if (num_read < 0 && errno == EINTR) {
+      continue;
+    }
+    if (num_read <= 0) {
+      return false;
+    }
+    data += num_read;
+    size -= static_cast<size_t>(num_read);
+  }
+  return true;
+}
+
+// A client connection. Responses are queued by any thread and written by
+// the connection's own writer thread, so that a client that doesn't read its
+// responses can't block the workers.
+class Connection {
+public:
+  explicit Connection(int fd) : fd(fd) {}
+
+  ~Connection(void) { close(fd); }
+
+  Connection(const Connection &) = delete;
+  Connection &operator=(const Connection &) = delete;
+
+  int Descriptor(void) const { return fd; }
+
+  // Reads the next request frame. Returns false at the end of the stream, or
+  // if the frame is too large to accept.
+  bool ReadFrame(std::string &frame) {
+    char header[4];
+    if (!ReadFully(fd, header, sizeof(header))) {
+      return false;
+    }
+    const uint64_t size = ReadLittleEndian(header, sizeof(header));
+    if (size > kMaxFrameSize) {
+      std::cerr << "Closing connection with a request of " << size
+                << " bytes" << std::endl;
+      return false;
+    }
+    frame.resize(size);
+    return ReadFully(fd, frame.data(), frame.size());
+  }
+
+  // Called for each request read, which must be answered with one `Send`
+  void ExpectResponse(void) {
+    const std::lock_guard<std::mutex> lock(mutex);
+    ++num_unanswered;
+  }
+
+  // Called once no more requests will be read
+  void FinishReading(void) {
+    const std::lock_guard<std::mutex> lock(mutex);
+    reading = false;
+    can_write.notify_one();
+  }
+
+  // Queues a response for the writer thread. Returns false if the client
+  // went away, or was disconnected for leaving too many responses unread.
+  bool Send(uint32_t id, ResponseStatus status, std::string_view message,
+            std::string_view output) {
+    std::string response;
+    const size_t size = 4 + 1 + 4 + message.size() + output.size();
+    response.reserve(4 + size);
+    AppendLittleEndian(response, size, 4);
+    AppendLittleEndian(response, id, 4);
+    response.push_back(static_cast<char>(status));
+    AppendLittleEndian(response, message.size(), 4);
+    response.append(message);
+    response.append(output);
+
+    const std::lock_guard<std::mutex> lock(mutex);
+    --num_unanswered;
+    can_write.notify_one();
+    if (closed) {
+      return false;
+    }
+    if (!unsent.empty() &&
+        num_unsent_bytes + response.size() > kMaxUnsentBytes) {
+      std::cerr << "Closing connection with more than " << kMaxUnsentBytes
+                << " bytes of unread responses" << std::endl;
+      CloseLocked();
+      return false;
+    }
+    num_unsent_bytes += response.size();
+    unsent.push_back(std::move(response));
+    return true;
+  }
+
+  // Writes the queued responses until every request has been answered, or
+  // the connection is closed
+  void WriteLoop(void) {
+    std::unique_lock<std::mutex> lock(mutex);
+    while (true) {
+      can_write.wait(lock, [&] {
+        return closed || !unsent.empty() || (!reading && num_unanswered == 0);
+      });
+      if (closed || unsent.empty()) {
+        break;
+      }
+      const std::string response = std::move(unsent.front());
+      unsent.pop_front();
+      num_unsent_bytes -= response.size();
+      lock.unlock();
+      const bool written = WriteFully(response);
+      lock.lock();
+      if (!written) {
+        break;
+      }
+    }
+    CloseLocked();
+  }
+
+  // Stops reading and writing, and drops the unsent responses
+  void Close(void) {
+    const std::lock_guard<std::mutex> lock(mutex);
+    CloseLocked();
+  }
+
+private:
+  void CloseLocked(void) {
+    if (!closed) {
+      closed = true;
+      unsent.clear();
+      num_unsent_bytes = 0;
+      shutdown(fd, SHUT_RDWR);
+      can_write.notify_one();
+    }
+  }
+
+  // Waits for the socket to be writable between writes, so that shutting it
+  // down stops a write to a client that isn't reading
+  bool WriteFully(std::string_view data) {
+    while (!data.empty()) {
+      const ssize_t num_written =
+          send(fd, data.data(), data.size(), MSG_DONTWAIT);
+      if (num_written < 0 && (errno == EAGAIN || errno == EWOULDBLOCK)) {
+        pollfd pfd = {fd, POLLOUT, 0};
+        poll(&pfd, 1, 250);
+        continue;
+      }
+      if (num_written < 0 && errno == EINTR) {
+        continue;
+      }
+      if (num_written <= 0) {
+        return false;
+      }
+      data.remove_prefix(static_cast<size_t>(num_written));
+    }
+    return true;
+  }
+
+  const int fd;
+  std::mutex mutex;
+  std::condition_variable can_write;
+  std::deque<std::string> unsent;
+  size_t num_unsent_bytes = 0;
+  size_t num_unanswered = 0;
+  bool reading = true;
+  bool closed = false;
+};
+
+struct Job {
+  std::shared_ptr<Connection> connection;
+  Request request;
+  Clock::time_point received;
+};
+
+// Jobs waiting for a worker. Pushing blocks while the queue is full, so a
+// client that sends requests faster than they are served is slowed down
+// instead of growing the queue without bound.
+class JobQueue {
+public:
+  explicit JobQueue(size_t max_size) : max_size(max_size) {}
+
+  // Returns false if the queue was closed
+  bool Push(Job &&job) {
+    std::unique_lock<std::mutex> lock(mutex);
+    not_full.wait(lock, [&] { return closed || jobs.size() < max_size; });
+    if (closed) {
+      return false;
+    }
+    jobs.push_back(std::move(job));
+    max_depth = std::max(max_depth, jobs.size());
+    not_empty.notify_one();
+    return true;
+  }
+
+  // Returns false once the queue is closed and empty
+  bool Pop(Job &job) {
+    std::unique_lock<std::mutex> lock(mutex);
+    not_empty.wait(lock, [&] { return closed || !jobs.empty(); });
+    if (jobs.empty()) {
+      return false;
+    }
+    job = std::move(jobs.front());
+    jobs.pop_front();
+    not_full.notify_one();
+    return true;
+  }
+
+  void Close(void) {
+    const std::lock_guard<std::mutex> lock(mutex);
+    closed = true;
+    not_empty.notify_all();
+    not_full.notify_all();
+  }
+
+  size_t Depth(void) const {
+    const std::lock_guard<std::mutex> lock(mutex);
+    return jobs.size();
+  }
+
+  size_t MaxDepth(void) const {
+    const std::lock_guard<std::mutex> lock(mutex);
+    return max_depth;
+  }
+
+private:
+  mutable std::mutex mutex;
+  std::condition_variable not_empty, not_full;
+  std::deque<Job> jobs;
+  const size_t max_size;
+  size_t max_depth = 0;
+  bool closed = false;
+};
+
+// Keeps the latencies of the most recent requests to report percentiles
+class LatencyTracker {
+public:
+  static constexpr size_t kMaxSamples = 4096;
+
+  void Add(uint64_t micros) {
+    if (samples.size() < kMaxSamples) {
+      samples.push_back(micros);
+    } else {
+      samples[next_sample] = micros;
+    }
+    next_sample = (next_sample + 1) % kMaxSamples;
+  }
+
+  // Writes the percentiles of the recent latencies as a JSON object
+  void WriteJson(std::ostream &os) const {
+    std::vector<uint64_t> sorted(samples);
+    std::sort(sorted.begin(), sorted.end());
+    auto percentile = [&](double p) -> uint64_t {
+      if (sorted.empty()) {
+        return 0;
+      }
+      const auto last = static_cast<double>(sorted.size() - 1);
+      return sorted[static_cast<size_t>(p * last + 0.5)];
+    };
+    os << "{\"samples\":" << sorted.size() << ",\"p50\":" << percentile(0.5)
+       << ",\"p90\":" << percentile(0.9) << ",\"p99\":" << percentile(0.99)
+       << ",\"max\":" << (sorted.empty() ? 0 : sorted.back()) << '}';
+  }
+
+private:
+  std::vector<uint64_t> samples;
+  size_t next_sample = 0;
+};
+
+// Initialized engines for one language that are not in use
+struct LanguagePool {
+  LanguageFiles files;
+  std::shared_ptr<const sleigh::Language> language;
+  std::vector<std::unique_ptr<LiftEngine>> idle;
+  uint64_t requests = 0;
+  uint64_t hits = 0;
+  uint64_t misses = 0;
+  LatencyTracker latency;
+};
+
+// An engine taken from a pool, to give back when done
+struct EngineLease {
+  LanguagePool *pool = nullptr;
+  std::shared_ptr<const sleigh::Language> language;
+  std::unique_ptr<LiftEngine> engine;
+};
+
+// Engine pools by language, keyed by the .sla and processor spec paths that
+// the requested file names resolve to, so that different names for the same
+// files share a pool
+class EnginePools {
+public:
+  EnginePools(std::optional<std::string> root_sla_dir, size_t max_idle)
+      : root_sla_dir(std::move(root_sla_dir)), max_idle(max_idle) {}
+
+  // Take an idle engine for the language, or create one if there are none.
+  // Returns false and sets `error` if the language can't be loaded.
+  bool Acquire(const std::string &sla_file_name,
+               const std::optional<std::string> &pspec_file_name,
+               EngineLease &lease, std::string &error) {
+    std::shared_ptr<const sleigh::Language> language;
+    auto *pool = LoadPool(sla_file_name, pspec_file_name, language, error);
+    if (!pool) {
+      return false;
+    }
+    lease.pool = pool;
+    lease.language = language;
+    {
+      const std::lock_guard<std::mutex> lock(mutex);
+      ++pool->requests;
+      if (pool->language == language && !pool->idle.empty()) {
+        ++pool->hits;
+        lease.engine = std::move(pool->idle.back());
+        pool->idle.pop_back();
+        return true;
+      }
+      ++pool->misses;
+    }
+    lease.engine = std::make_unique<LiftEngine>(*language);
+    return true;
+  }
+
+  // Give an engine back to its pool and record the request's latency. The
+  // engine is dropped if the language was reloaded in the meantime.
+  void Release(EngineLease &&lease, uint64_t latency_micros) {
+    const std::lock_guard<std::mutex> lock(mutex);
+    auto *pool = lease.pool;
+    pool->latency.Add(latency_micros);
+    if (lease.engine && pool->language == lease.language &&
+        pool->idle.size() < max_idle) {
+      pool->idle.push_back(std::move(lease.engine));
+    }
+  }
+
+  // Load a language and create `count` idle engines for it ahead of time
+  bool Prewarm(const std::string &sla_file_name,
+               const std::optional<std::string> &pspec_file_name,
+               size_t count, std::string &error) {
+    std::shared_ptr<const sleigh::Language> language;
+    auto *pool = LoadPool(sla_file_name, pspec_file_name, language, error);
+    if (!pool) {
+      return false;
+    }
+    std::vector<std::unique_ptr<LiftEngine>> engines;
+    for (size_t i = 0; i < count; ++i) {
+      engines.push_back(std::make_unique<LiftEngine>(*language));
+    }
+    const std::lock_guard<std::mutex> lock(mutex);
+    for (auto &engine : engines) {
+      if (pool->idle.size() < max_idle) {
+        pool->idle.push_back(std::move(engine));
+      }
+    }
+    return true;
+  }
+
+  void WriteJson(std::ostream &os) const {
+    const std::lock_guard<std::mutex> lock(mutex);
+    os << '[';
+    bool first = true;
+    for (const auto &[key, pool] : pools) {
+      os << (first ? "{" : ",{") << "\"sla\":";
+      first = false;
+      WriteJsonString(os, pool->files.sla.string());
+      os << ",\"pspec\":";
+      if (pool->files.pspec) {
+        WriteJsonString(os, pool->files.pspec->string());
+      } else {
+        os << "null";
+      }
+      os << ",\"requests\":" << pool->requests
+         << ",\"pool_hits\":" << pool->hits
+         << ",\"pool_misses\":" << pool->misses
+         << ",\"idle_engines\":" << pool->idle.size() << ",\"latency_us\":";
+      pool->latency.WriteJson(os);
+      os << '}';
+    }
+    os << ']';
+  }
+
+private:
+  // Find the pool for the named language, and get its language. The pool
+  // keeps its language while the files are unchanged, even after the
+  // language cache evicts it, so that serving more languages than the cache
+  // holds doesn't throw away warm engines. Otherwise the language is loaded
+  // with the language cache, and idle engines for an outdated language are
+  // dropped.
+  LanguagePool *LoadPool(const std::string &sla_file_name,
+                         const std::optional<std::string> &pspec_file_name,
+                         std::shared_ptr<const sleigh::Language> &language,
+                         std::string &error) {
+    std::unique_lock<std::mutex> lock(mutex);
+    auto *pool = FindPool(sla_file_name, pspec_file_name, error);
+    if (!pool) {
+      return nullptr;
+    }
+    const LanguageFiles files = pool->files;
+    language = pool->language;
+
+    // Checking and loading don't hold up requests for other languages
+    lock.unlock();
+    if (language && language->IsUpToDate()) {
+      return pool;
+    }
+    try {
+      language = sleigh::LanguageCache::Global().Get(files.sla, files.pspec);
+    } catch (ghidra::LowlevelError &err) {
+      error = "Could not load language: " + err.explain;
+      return nullptr;
+    }
+    lock.lock();
+    if (pool->language != language) {
+      pool->idle.clear();
+      pool->language = language;
+    }
+    return pool;
+  }
+
+  // Caller must hold the mutex
+  LanguagePool *FindPool(const std::string &sla_file_name,
+                         const std::optional<std::string> &pspec_file_name,
+                         std::string &error) {
+    // Requests without a pspec name can't collide with ones that have one,
+    // since names never contain a newline
+    const std::string name_key = sla_file_name + '\n' +
+                                 (pspec_file_name ? *pspec_file_name : "\n");
+    if (auto it = pools_by_name.find(name_key); it != pools_by_name.end()) {
+      return it->second;
+    }
+    auto files = FindLanguageFiles(sla_file_name, pspec_file_name,
+                                   root_sla_dir, error);
+    if (!files) {
+      return nullptr;
+    }
+    const std::string key =
+        files->sla.string() + '\n' +
+        (files->pspec ? files->pspec->string() : std::string());
+    auto &pool = pools[key];
+    if (!pool) {
+      pool = std::make_unique<LanguagePool>();
+      pool->files = std::move(*files);
+    }
+    pools_by_name.emplace(name_key, pool.get());
+    return pool.get();
+  }
+
+  const std::optional<std::string> root_sla_dir;
+  const size_t max_idle;
+  mutable std::mutex mutex;
+  std::map<std::string, std::unique_ptr<LanguagePool>> pools;
+  std::map<std::string, LanguagePool *> pools_by_name;
+};
+
+class LiftServer {
+public:
+  LiftServer(const LiftServerOptions &options, size_t num_workers)
+      : num_workers(num_workers), queue(num_workers * 64),
+        pools(options.root_sla_dir, num_workers), started(Clock::now()) {}
+
+  // Accept connections until a stop is requested
+  void Serve(int listen_fd) {
+    std::vector<std::thread> workers;
+    for (size_t i = 0; i < num_workers; ++i) {
+      workers.emplace_back([this] { WorkerLoop(); });
+    }
+
+    while (!gStopRequested) {
+      pollfd pfd = {listen_fd, POLLIN, 0};
+      if (poll(&pfd, 1, 250) <= 0) {
+        continue;
+      }
+      const int fd = accept(listen_fd, nullptr, nullptr);
+      if (fd < 0) {
+        continue;
+      }
+      auto connection = std::make_shared<Connection>(fd);
+      {
+        const std::lock_guard<std::mutex> lock(connections_mutex);
+        connections.push_back(connection);
+        ++active_readers;
+        ++active_writers;
+        ++total_connections;
+      }
+      std::thread([this, connection] { ReadLoop(connection); }).detach();
+      std::thread([this, connection] { WriteLoop(connection); }).detach();
+    }
+
+    // Stop reading new requests, then finish the queued ones
+    {
+      std::unique_lock<std::mutex> lock(connections_mutex);
+      for (const auto &weak : connections) {
+        if (auto connection = weak.lock()) {
+          shutdown(connection->Descriptor(), SHUT_RD);
+        }
+      }
+      readers_done.wait(lock, [&] { return active_readers == 0; });
+    }
+    queue.Close();
+    for (auto &worker : workers) {
+      worker.join();
+    }
+
+    // Give clients some time to read their last responses
+    std::unique_lock<std::mutex> lock(connections_mutex);
+    if (!writers_done.wait_for(lock, kShutdownFlushTimeout,
+                               [&] { return active_writers == 0; })) {
+      std::cerr << "Closing " << active_writers
+                << " connections with unread responses" << std::endl;
+      for (const auto &weak : connections) {
+        if (auto connection = weak.lock()) {
+          connection->Close();
+        }
+      }
+      writers_done.wait(lock, [&] { return active_writers == 0; });
+    }
+  }
+
+  bool Prewarm(const std::string &sla_file_name,
+               const std::optional<std::string> &pspec_file_name,
+               std::string &error) {
+    return pools.Prewarm(sla_file_name, pspec_file_name, num_workers, error);
+  }
+
+  void WriteStats(std::ostream &os) {
+    size_t num_connections = 0;
+    uint64_t num_total_connections = 0;
+    {
+      const std::lock_guard<std::mutex> lock(connections_mutex);
+      num_connections = active_readers;
+      num_total_connections = total_connections;
+    }
+    const auto uptime =
+        std::chrono::duration<double>(Clock::now() - started).count();
+    os << "{\"uptime_seconds\":" << uptime << ",\"workers\":" << num_workers
+       << ",\"connections\":" << num_connections
+       << ",\"total_connections\":" << num_total_connections
+       << ",\"queue_depth\":" << queue.Depth()
+       << ",\"max_queue_depth\":" << queue.MaxDepth()
+       << ",\"requests\":" << num_requests.load()
+       << ",\"failed_requests\":" << num_failed.load() << ",\"languages\":";
+    pools.WriteJson(os);
+    os << "}\n";
+  }
+
+private:
+  void ReadLoop(std::shared_ptr<Connection> connection) {
+    std::string frame;
+    while (connection->ReadFrame(frame)) {
+      Job job{connection, {}, Clock::now()};
+      if (!ParseRequest(std::move(frame), job.request)) {
+        std::cerr << "Closing connection with a malformed request"
+                  << std::endl;
+        break;
+      }
+      const uint32_t id = job.request.id;
+      connection->ExpectResponse();
+      if (!queue.Push(std::move(job))) {
+        ++num_failed;
+        connection->Send(id, kFailed, "The server is stopping", {});
+        break;
+      }
+    }
+    connection->FinishReading();
+    const std::lock_guard<std::mutex> lock(connections_mutex);
+    --active_readers;
+    readers_done.notify_all();
+  }
+
+  void WriteLoop(std::shared_ptr<Connection> connection) {
+    connection->WriteLoop();
+    const std::lock_guard<std::mutex> lock(connections_mutex);
+    connections.erase(
+        std::remove_if(connections.begin(), connections.end(),
+                       [](const auto &weak) { return weak.expired(); }),
+        connections.end());
+    --active_writers;
+    writers_done.notify_all();
+  }
+
+  void WorkerLoop(void) {
+    Job job;
+    while (queue.Pop(job)) {
+      ++num_requests;
+      Handle(job);
+      job = Job();
+    }
+  }
+
+  void Handle(Job &job) {
+    auto &request = job.request;
+    if (request.kind == kStats) {
+      std::ostringstream stats;
+      WriteStats(stats);
+      job.connection->Send(request.id, kOk, {}, stats.str());
+      return;
+    }
+
+    const auto format = request.format == 0   ? OutputFormat::kText
+                        : request.format == 1 ? OutputFormat::kJsonLines
+                                              : OutputFormat::kBinary;
+    if ((request.kind != kPcode && request.kind != kDisassemble) ||
+        request.format > 2) {
+      Fail(job, "Invalid request kind or output format");
+      return;
+    }
+
+    EngineLease lease;
+    std::string error;
+    if (!pools.Acquire(request.sla_file_name, request.pspec_file_name, lease,
+                       error)) {
+      Fail(job, error);
+      return;
+    }
+
+    auto &lifter = *lease.engine;
+    const uint64_t len = request.bytes.size();
+    const uint64_t addr_mask =
+        ~0ULL >> (64UL - lifter.Engine().getDefaultSize() * 8);
+    if ((request.addr & addr_mask) != request.addr ||
+        (len > 0 && len - 1 > addr_mask - request.addr)) {
+      Fail(job, "Bytes would overflow the address space at this address");
+      pools.Release(std::move(lease), ElapsedMicros(job));
+      return;
+    }
+
+    std::ostringstream output, errors;
+    try {
+      InstructionWriter writer(output, format, lifter.Engine());
+      lifter.SetImage(request.addr, std::move(request.bytes));
+      LiftRange(lifter, writer, request.kind == kDisassemble, request.addr,
+                len, errors);
+    } catch (ghidra::LowlevelError &err) {
+      // The engine may be left in a bad state, so don't reuse it
+      lease.engine.reset();
+      Fail(job, err.explain);
+      pools.Release(std::move(lease), ElapsedMicros(job));
+      return;
+    }
+    auto status = kOk;
+    std::string message = errors.str();
+    if (!message.empty()) {
+      status = kDecodeError;
+      if (message.back() == '\n') {
+        message.pop_back();
+      }
+    }
+    job.connection->Send(request.id, status, message, output.str());
+    pools.Release(std::move(lease), ElapsedMicros(job));
+  }
+
+  void Fail(Job &job, std::string_view message) {
+    ++num_failed;
+    job.connection->Send(job.request.id, kFailed, message, {});
+  }
+
+  static uint64_t ElapsedMicros(const Job &job) {
+    return static_cast<uint64_t>(
+        std::chrono::duration_cast<std::chrono::microseconds>(Clock::now() -
+                                                              job.received)
+            .count());
+  }
+
+  const size_t num_workers;
+  JobQueue queue;
+  EnginePools pools;
+  const Clock::time_point started;
+
+  std::mutex connections_mutex;
+  std::condition_variable readers_done, writers_done;
+  std::vector<std::weak_ptr<Connection>> connections;
+  size_t active_readers = 0;
+  size_t active_writers = 0;
+  uint64_t total_connections = 0;
+
+  std::atomic<uint64_t> num_requests{0};
+  std::atomic<uint64_t> num_failed{0};
+};
+
+// Bind a listening socket at `path`, replacing a stale socket file left by a
+// server that is no longer running. Returns -1 after printing an error.
+int Listen(const std::string &path) {
+  sockaddr_un addr = {};
+  addr.sun_family = AF_UNIX;
+  if (path.size() >= sizeof(addr.sun_path)) {
+    std::cerr << "Socket path is too long: " << path << std::endl;
+    return -1;
+  }
+  std::memcpy(addr.sun_path, path.c_str(), path.size() + 1);
+  const auto *sock_addr = reinterpret_cast<const sockaddr *>(&addr);
+
+  const int fd = socket(AF_UNIX, SOCK_STREAM, 0);
+  if (fd < 0) {
+    std::cerr << "Could not create socket: " << std::strerror(errno)
+              << std::endl;
+    return -1;
+  }
+  struct stat path_stat;
+  if (lstat(path.c_str(), &path_stat) == 0 && S_ISSOCK(path_stat.st_mode)) {
+    const int probe_fd = socket(AF_UNIX, SOCK_STREAM, 0);
+    const bool in_use =
+        probe_fd >= 0 && connect(probe_fd, sock_addr, sizeof(addr)) == 0;
+    if (probe_fd >= 0) {
+      close(probe_fd);
+    }
+    if (in_use) {
+      std::cerr << "Another server is already listening on " << path
+                << std::endl;
+      close(fd);
+      return -1;
+    }
+    unlink(path.c_str());
+  }
+  if (bind(fd, sock_addr, sizeof(addr)) != 0 || listen(fd, SOMAXCONN) != 0) {
+    std::cerr << "Could not listen on " << path << ": "
+              << std::strerror(errno) << std::endl;
+    close(fd);
+    return -1;
+  }
+  return fd;
+}
+
+} // namespace
+
+int RunLiftServer(const LiftServerOptions &options) {
+  size_t num_workers = options.num_workers;
+  if (num_workers == 0) {
+    num_workers = std::max(1u, std::thread::hardware_concurrency());
+  }
+  LiftServer server(options, num_workers);
+  for (const auto &[sla_file_name, pspec_file_name] : options.preload) {
+    std::string error;
+    if (!server.Prewarm(sla_file_name, pspec_file_name, error)) {
+      std::cerr << error << std::endl;
+      return EXIT_FAILURE;
+    }
+  }
+
+  const int listen_fd = Listen(options.socket_path);
+  if (listen_fd < 0) {
+    return EXIT_FAILURE;
+  }
+
+  // Clients that disconnect early are noticed by failing writes instead
+  std::signal(SIGPIPE, SIG_IGN);
+  struct sigaction stop_action = {};
+  stop_action.sa_handler = HandleStopSignal;
+  sigaction(SIGINT, &stop_action, nullptr);
+  sigaction(SIGTERM, &stop_action, nullptr);
+
+  std::cerr << "Listening on " << options.socket_path << " with "
+            << num_workers << " workers" << std::endl;
+  server.Serve(listen_fd);
+  close(listen_fd);
+  unlink(options.socket_path.c_str());
+
+  std::cerr << "Final statistics: ";
+  server.WriteStats(std::cerr);
+  return EXIT_SUCCESS;
+}
+
+#endif
@@ -0,0 +1,57 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#pragma once
+
+#include <cstddef>
+#include <optional>
+#include <string>
+#include <utility>
+#include <vector>
+
+// Lift server protocol
+//
+// Clients connect to a Unix domain socket and send any number of requests
+// without waiting for the responses. Requests are handled concurrently, so
+// responses may arrive in a different order and are matched to requests by
+// id. All integers are little-endian, and every message is framed by a u32
+// length of the rest of the message. The server stops reading requests while
+// too many are queued, so clients should read responses while sending, and
+// closes connections that leave more than 64 MiB of responses unread.
+//
+// Request: u32 frame length, u32 id, u8 kind, u8 output format, u64 address,
+//          u16 sla file name length and the name, u16 pspec file name length
+//          and the name (empty for the default), then the bytes to lift up
+//          to the end of the frame
+//   kind 0: server statistics as JSON (the other fields are ignored)
+//   kind 1: p-code
+//   kind 2: disassembly
+//   output format 0: text, 1: jsonl, 2: binary, as written by sleigh-lift
+//
+// Response: u32 frame length, u32 id, u8 status, u32 message length and the
+//           message, then the output up to the end of the frame
+//   status 0: success
+//   status 1: decoding stopped early at an instruction that couldn't be
+//             decoded, which the message describes. The output has the
+//             instructions before it
+//   status 2: the request failed, like for an unknown language, and the
+//             message says why
+
+struct LiftServerOptions {
+  std::string socket_path;
+  std::optional<std::string> root_sla_dir;
+  // Number of worker threads. Zero uses the hardware concurrency
+  size_t num_workers = 0;
+  // Languages to load and fill with an engine per worker before serving, as
+  // sla file and optional pspec file names
+  std::vector<std::pair<std::string, std::optional<std::string>>> preload;
+};
+
+// Serve lift requests on a Unix domain socket until interrupted. Returns the
+// exit status.
+int RunLiftServer(const LiftServerOptions &options);
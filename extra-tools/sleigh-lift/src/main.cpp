@@ -6,15 +6,86 @@
   the LICENSE file found in the root directory of this source tree.
 */
 
+#include <sleigh/InstructionCache.h>
+#include <sleigh/LanguageCache.h>
+#include <sleigh/LiftedInstruction.h>
 #include <sleigh/libsleigh.hh>
 
+#include "Lifter.h"
+#include "Server.h"
+
+#include <algorithm>
 #include <cassert>
+#include <cstdint>
+#include <cstring>
+#include <fstream>
 #include <iostream>
+#include <map>
+#include <memory>
+#include <sstream>
 #include <string>
+#include <vector>
+
+#ifdef _WIN32
+#include <fcntl.h>
+#include <io.h>
+#ifndef NOMINMAX
+#define NOMINMAX
+#endif
+#include <windows.h>
+#else
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
 
 static void PrintUsage(std::ostream &os) {
   os << "Usage: sleigh-lift [action] [sla_file] [bytes] [-a address] "
-        "[-p root_sla_dir] [-s pspec_file]"
+        "[-p root_sla_dir] [-s pspec_file]\n"
+        "       sleigh-lift [action] [sla_file] -i input_file "
+        "[-f text|binary] [-p root_sla_dir] [-s pspec_file]\n"
+        "       sleigh-lift [action] [sla_file] -b binary_file [-o offset] "
+        "[-n length] [-a address] [-p root_sla_dir] [-s pspec_file]\n"
+        "       sleigh-lift [action] [sla_file] -m binary_file@address "
+        "[-m binary_file@address ...] [-p root_sla_dir] [-s pspec_file]\n"
+        "\n"
+        "Every form also accepts -O text|jsonl|binary to select the output "
+        "format (default: text), and -c cache_entries to memoize decoded "
+        "instructions in a cache of that many entries, printing its hit "
+        "rate to stderr, and -P text|json to print the decoding time and "
+        "p-code ops of each mnemonic to stderr.\n"
+        "\n"
+        "Addresses, offsets and lengths are in decimal or 0x-prefixed hex.\n"
+        "\n"
+        "With -i, many records are lifted with one engine. Use '-' to read "
+        "from stdin.\n"
+        "  text:   one 'address bytes' record per line, address in decimal "
+        "or 0x-prefixed hex\n"
+        "  binary: records of a little-endian u64 address, a little-endian "
+        "u32 length and that many bytes\n"
+        "The output of each record ends with an empty line, or with an end "
+        "record that has the record's line or position, its address and any "
+        "error, including for records that are skipped.\n"
+        "\n"
+        "With -b, the file is memory-mapped and the bytes from offset (default "
+        "0) up to length (default: to the end of the file) are lifted at "
+        "address.\n"
+        "With -m, each file is memory-mapped as a segment at its address, and "
+        "all segments are lifted in address order.\n"
+        "\n"
+        "Except with -i, -e address follows control flow from an entry point "
+        "instead of lifting every byte, and can be given more than once. "
+        "Only the code reachable through branches, calls and fallthroughs is "
+        "lifted, and it is written as basic blocks in address order.\n"
+        "\n"
+        "       sleigh-lift --serve socket_path [-p root_sla_dir] [-t workers] "
+        "[-w sla_file[:pspec_file] ...]\n"
+        "\n"
+        "With --serve, lift requests are served on a Unix domain socket until "
+        "interrupted, keeping initialized engines for each language. -t sets "
+        "the number of worker threads (default: one per core) and -w loads a "
+        "language with an engine per worker before serving."
      << std::endl;
 }
 
@@ -45,168 +116,253 @@ static void PrintVersion(void) {
   }
 }
 
-class InMemoryLoadImage : public ghidra::LoadImage {
+// A read-only memory mapping of an entire file
+class MappedFile {
 public:
-  explicit InMemoryLoadImage(uint64_t base_addr)
-      : LoadImage("nofile"), base_addr(base_addr) {}
-
-  void SetImageBuffer(std::string &&buf) {
-    assert(image_buffer.empty());
-    image_buffer = std::move(buf);
-  }
-
-  void loadFill(unsigned char *ptr, int size,
-                const ghidra::Address &addr) override {
-    uint64_t start = addr.getOffset();
-    for (int i = 0; i < size; ++i) {
-      uint64_t offset = start + i;
-      if (offset >= base_addr) {
-        offset -= base_addr;
-        ptr[i] = offset < image_buffer.size() ? image_buffer[offset] : 0;
-      } else {
-        ptr[i] = 0;
+  // Returns nullptr, after printing an error, if the file can't be mapped
+  static std::unique_ptr<MappedFile> Open(const std::string &path) {
+    std::unique_ptr<MappedFile> mapped(new MappedFile);
+#ifdef _WIN32
+    mapped->file = CreateFileA(path.c_str(), GENERIC_READ, FILE_SHARE_READ,
+                               nullptr, OPEN_EXISTING,
+                               FILE_FLAG_SEQUENTIAL_SCAN, nullptr);
+    LARGE_INTEGER file_size;
+    if (mapped->file == INVALID_HANDLE_VALUE ||
+        !GetFileSizeEx(mapped->file, &file_size)) {
+      std::cerr << "Could not open binary file: " << path << std::endl;
+      return nullptr;
+    }
+    mapped->size = static_cast<size_t>(file_size.QuadPart);
+    if (mapped->size == 0) {
+      return mapped;
+    }
+    mapped->mapping = CreateFileMappingA(mapped->file, nullptr, PAGE_READONLY,
+                                         0, 0, nullptr);
+    if (mapped->mapping) {
+      mapped->data = static_cast<const char *>(
+          MapViewOfFile(mapped->mapping, FILE_MAP_READ, 0, 0, 0));
+    }
+#else
+    const int fd = open(path.c_str(), O_RDONLY);
+    struct stat file_stat;
+    if (fd < 0 || fstat(fd, &file_stat) != 0) {
+      std::cerr << "Could not open binary file: " << path << std::endl;
+      if (fd >= 0) {
+        close(fd);
       }
+      return nullptr;
+    }
+    mapped->size = static_cast<size_t>(file_stat.st_size);
+    if (mapped->size == 0) {
+      close(fd);
+      return mapped;
+    }
+    void *data = mmap(nullptr, mapped->size, PROT_READ, MAP_PRIVATE, fd, 0);
+    // The mapping keeps its own reference to the file
+    close(fd);
+    if (data != MAP_FAILED) {
+      mapped->data = static_cast<const char *>(data);
+    }
+#endif
+    if (!mapped->data) {
+      std::cerr << "Could not memory-map binary file: " << path << std::endl;
+      return nullptr;
+    }
+    return mapped;
+  }
+
+  ~MappedFile(void) {
+#ifdef _WIN32
+    if (data) {
+      UnmapViewOfFile(data);
+    }
+    if (mapping) {
+      CloseHandle(mapping);
+    }
+    if (file != INVALID_HANDLE_VALUE) {
+      CloseHandle(file);
+    }
+#else
+    if (data) {
+      munmap(const_cast<char *>(data), size);
     }
+#endif
   }
 
-  std::string getArchType(void) const override { return "memory"; }
-  void adjustVma(long) override {}
+  MappedFile(const MappedFile &) = delete;
+  MappedFile &operator=(const MappedFile &) = delete;
+
+  std::string_view Contents(void) const { return {data, size}; }
 
 private:
-  const uint64_t base_addr;
-  std::string image_buffer;
+  MappedFile(void) = default;
+
+  const char *data = nullptr;
+  size_t size = 0;
+#ifdef _WIN32
+  HANDLE file = INVALID_HANDLE_VALUE;
+  HANDLE mapping = nullptr;
+#endif
 };
 
-static std::string ParseHexBytes(std::string_view bytes, uint64_t addr,
-                                 uint64_t addr_size) {
-  std::string buffer;
+// Make sure that if a really big number is specified for `address`, that we
+// don't accidentally wrap around and start filling out low byte addresses.
+// Returns why the bytes don't fit, if they don't.
+static std::optional<std::string>
+AddressRangeError(uint64_t addr, uint64_t len, uint64_t addr_size) {
+  if (len == 0) {
+    return {};
+  }
+  const uint64_t addr_mask = ~0ULL >> (64UL - addr_size * 8);
+  auto last_addr = addr + (len - 1);
+  auto masked_addr = last_addr & addr_mask;
+  if ((addr & addr_mask) < addr || masked_addr < last_addr) {
+    return "would result in a 32-bit overflow";
+  } else if (masked_addr < addr) {
+    return "would result in a 64-bit overflow";
+  }
+  return {};
+}
+
+// `source` names where the bytes came from in the error message
+static bool CheckAddressRange(uint64_t addr, uint64_t len, uint64_t addr_size,
+                              std::string_view source) {
+  if (const auto error = AddressRangeError(addr, len, addr_size)) {
+    std::cerr << "Too many bytes specified in " << source << ", " << *error
+              << "." << std::endl;
+    return false;
+  }
+  return true;
+}
+
+// Decodes pairs of hex digits into `buffer`. Returns why they can't be
+// decoded, if they can't.
+static std::optional<std::string> ParseHexBytes(std::string_view bytes,
+                                                std::string &buffer) {
+  if (bytes.size() % 2 != 0) {
+    return "Must provide an even number of bytes";
+  }
+  buffer.clear();
+  buffer.reserve(bytes.size() / 2);
   for (size_t i = 0; i < bytes.size(); i += 2) {
     const char nibbles[] = {bytes[i], bytes[i + 1], '\0'};
     char *parsed_to = nullptr;
     auto byte_val = strtol(nibbles, &parsed_to, 16);
     if (parsed_to != &(nibbles[2])) {
-      std::cerr << "Invalid hex byte value '" << nibbles
-                << "' specified in bytes arg." << std::endl;
-      exit(EXIT_FAILURE);
-    }
-    const uint64_t addr_mask = ~0ULL >> (64UL - addr_size * 8);
-    auto byte_addr = addr + (i / 2);
-    auto masked_addr = byte_addr & addr_mask;
-    // Make sure that if a really big number is specified for `address`,
-    // that we don't accidentally wrap around and start filling out low
-    // byte addresses.
-    if (masked_addr < byte_addr) {
-      std::cerr << "Too many bytes specified to bytes arg, would result "
-                << "in a 32-bit overflow.";
-      exit(EXIT_FAILURE);
-    } else if (masked_addr < addr) {
-      std::cerr << "Too many bytes specified to bytes arg, would result "
-                << "in a 64-bit overflow.";
-      exit(EXIT_FAILURE);
+      return "Invalid hex byte value '" + std::string(nibbles) + "'";
     }
     buffer.push_back(static_cast<char>(byte_val));
   }
-  return buffer;
+  return {};
 }
 
-class AssemblyPrinter : public ghidra::AssemblyEmit {
+// Buffers output in large chunks that are only written out when the buffer
+// fills up or is flushed, instead of on every line
+class LargeOutputBuffer : public std::streambuf {
 public:
-  void dump(const ghidra::Address &addr, const std::string &mnemonic,
-            const std::string &body) override {
-    addr.printRaw(std::cout);
-    std::cout << ": " << mnemonic << ' ' << body << std::endl;
+  explicit LargeOutputBuffer(FILE *file, size_t size = 1 << 20)
+      : file(file), buffer(size) {
+    setp(buffer.data(), buffer.data() + buffer.size());
   }
-};
 
-static void PrintAssembly(ghidra::Sleigh &engine, uint64_t addr, size_t len) {
-  AssemblyPrinter asm_emit;
-  ghidra::Address cur_addr(engine.getDefaultCodeSpace(), addr),
-      last_addr(engine.getDefaultCodeSpace(), addr + len);
-  while (cur_addr < last_addr) {
-    try {
-      int32_t instr_len = engine.printAssembly(asm_emit, cur_addr);
-      cur_addr = cur_addr + instr_len;
-    }
-    catch(ghidra::UnimplError &err) {
-      std::cerr << "UnimplError @ " << cur_addr << " (addr 0x" << addr << ", len 0x" << len << "): " << err.explain << "\n";
-      break;
+  ~LargeOutputBuffer(void) override { sync(); }
+
+protected:
+  int_type overflow(int_type ch) override {
+    if (!WriteBuffer()) {
+      return traits_type::eof();
     }
-    catch (ghidra::BadDataError &err) {
-      std::cerr << "BadDataError @ " << cur_addr << " (addr 0x" << addr << ", len 0x" << len << "): " << err.explain << "\n";
-      break;
+    if (!traits_type::eq_int_type(ch, traits_type::eof())) {
+      *pptr() = traits_type::to_char_type(ch);
+      pbump(1);
     }
+    return traits_type::not_eof(ch);
   }
-}
 
-static void PrintVarData(std::ostream &s, ghidra::VarnodeData &data) {
-  s << '(' << data.space->getName() << ',';
-  data.space->printOffset(s, data.offset);
-  s << ',' << std::dec << data.size << ')';
-}
-
-class PcodePrinter : public ghidra::PcodeEmit {
-public:
-  void dump(const ghidra::Address &, ghidra::OpCode op,
-            ghidra::VarnodeData *outvar, ghidra::VarnodeData *vars,
-            int32_t isize) override {
-    if (outvar) {
-      PrintVarData(std::cout, *outvar);
-      std::cout << " = ";
-    }
-    std::cout << get_opname(op);
-    for (int32_t i = 0; i < isize; ++i) {
-      std::cout << ' ';
-      PrintVarData(std::cout, vars[i]);
-    }
-    std::cout << std::endl;
+  int sync(void) override {
+    return WriteBuffer() && std::fflush(file) == 0 ? 0 : -1;
   }
-};
 
-static void PrintPcode(ghidra::Sleigh &engine, uint64_t addr, size_t len) {
-  PcodePrinter pcode_emit;
-  ghidra::Address cur_addr(engine.getDefaultCodeSpace(), addr),
-      last_addr(engine.getDefaultCodeSpace(), addr + len);
-  while (cur_addr < last_addr) {
-    try {
-      int32_t instr_len = engine.oneInstruction(pcode_emit, cur_addr);
-      cur_addr = cur_addr + instr_len;
-    }
-    catch(ghidra::UnimplError &err) {
-      std::cerr << "UnimplError @ " << cur_addr << " (addr 0x" << addr << ", len 0x" << len << "): " << err.explain << "\n";
-      break;
-    }
-    catch(ghidra::BadDataError &err) {
-      std::cerr << "BadDataError @ " << cur_addr << " (addr 0x" << addr << ", len 0x" << len << "): " << err.explain << "\n";
-      break;
-    }
+private:
+  bool WriteBuffer(void) {
+    const size_t size = static_cast<size_t>(pptr() - pbase());
+    const bool ok = std::fwrite(pbase(), 1, size, file) == size;
+    setp(buffer.data(), buffer.data() + buffer.size());
+    return ok;
   }
-}
+
+  FILE *file;
+  std::vector<char> buffer;
+};
 
 struct LiftArgs {
-  const std::string action, sla_file_name, bytes;
+  const std::string action, sla_file_name;
+  const std::optional<std::string> bytes;
   const std::optional<uint64_t> addr;
   const std::optional<std::string> root_sla_dir, pspec_file_name;
+  const std::optional<std::string> input_file_name, input_format;
+  const std::optional<std::string> binary_file_name;
+  const std::optional<uint64_t> binary_offset, binary_length;
+  const std::vector<std::pair<std::string, uint64_t>> segment_files;
+  const OutputFormat output_format;
+  const std::optional<uint64_t> cache_entries;
+  const std::vector<uint64_t> entries;
+  const std::optional<std::string> profile_format;
 };
 
+// Parses an unsigned integer flag value in decimal or 0x-prefixed hex
+static bool ParseUnsignedFlag(const std::string &flag, const char *value,
+                              std::optional<uint64_t> &out) {
+  if (out) {
+    std::cerr << flag << " flag provided multiple times" << std::endl;
+    return false;
+  }
+  try {
+    size_t parsed_len = 0;
+    out = std::stoull(value, &parsed_len, 0);
+    if (value[parsed_len] == '\0' && value[0] != '-') {
+      return true;
+    }
+  } catch (const std::out_of_range &) {
+    std::cerr << flag << " argument out of range: " << value << std::endl;
+    return false;
+  } catch (const std::invalid_argument &) {
+  }
+  std::cerr << "Invalid " << flag << " argument: " << value << std::endl;
+  return false;
+}
+
 std::optional<LiftArgs> ParseArgs(int argc, char *argv[]) {
   // Too few args
-  if (argc < 4) {
+  if (argc < 3) {
     return {};
   }
 
-  // Get positional args
+  // Get positional args. The bytes are omitted when reading records with -i
   int arg_index = 1;
   std::string action = argv[arg_index++];
   std::string sla_file_name = argv[arg_index++];
-  std::string bytes = argv[arg_index++];
-  if (bytes.size() % 2 != 0) {
-    std::cerr << "Must provide an even number of bytes: " << bytes << std::endl;
-    return {};
+  std::optional<std::string> bytes;
+  if (arg_index < argc && argv[arg_index][0] != '-') {
+    bytes = argv[arg_index++];
+    if (bytes->size() % 2 != 0) {
+      std::cerr << "Must provide an even number of bytes: " << *bytes
+                << std::endl;
+      return {};
+    }
   }
 
   // Get optional args
   std::optional<uint64_t> addr;
   std::optional<std::string> root_sla_dir, pspec_file_name;
+  std::optional<std::string> input_file_name, input_format;
+  std::optional<std::string> binary_file_name;
+  std::optional<uint64_t> binary_offset, binary_length;
+  std::vector<std::pair<std::string, uint64_t>> segment_files;
+  std::optional<OutputFormat> output_format;
+  std::optional<uint64_t> cache_entries;
+  std::vector<uint64_t> entries;
+  std::optional<std::string> profile_format;
   while (arg_index < argc) {
     const std::string flag = argv[arg_index++];
     if (arg_index == argc) {
@@ -214,18 +370,7 @@ std::optional<LiftArgs> ParseArgs(int argc, char *argv[]) {
       return {};
     }
     if (flag == "-a") {
-      if (addr) {
-        std::cerr << "-a flag provided multiple times" << std::endl;
-        return {};
-      }
-      const char *addr_str = argv[arg_index++];
-      try {
-        addr = std::stoul(addr_str);
-      } catch (const std::invalid_argument &) {
-        std::cerr << "Invalid address argument: " << addr_str << std::endl;
-        return {};
-      } catch (const std::out_of_range &) {
-        std::cerr << "Address argument out of range: " << addr_str << std::endl;
+      if (!ParseUnsignedFlag(flag, argv[arg_index++], addr)) {
         return {};
       }
     } else if (flag == "-p") {
@@ -240,14 +385,428 @@ std::optional<LiftArgs> ParseArgs(int argc, char *argv[]) {
         return {};
       }
       pspec_file_name = argv[arg_index++];
+    } else if (flag == "-i") {
+      if (input_file_name) {
+        std::cerr << "-i flag provided multiple times" << std::endl;
+        return {};
+      }
+      input_file_name = argv[arg_index++];
+    } else if (flag == "-f") {
+      if (input_format) {
+        std::cerr << "-f flag provided multiple times" << std::endl;
+        return {};
+      }
+      input_format = argv[arg_index++];
+      if (*input_format != "text" && *input_format != "binary") {
+        std::cerr << "Invalid input format: " << *input_format << std::endl;
+        return {};
+      }
+    } else if (flag == "-b") {
+      if (binary_file_name) {
+        std::cerr << "-b flag provided multiple times" << std::endl;
+        return {};
+      }
+      binary_file_name = argv[arg_index++];
+    } else if (flag == "-O") {
+      if (output_format) {
+        std::cerr << "-O flag provided multiple times" << std::endl;
+        return {};
+      }
+      const char *format_name = argv[arg_index++];
+      output_format = ParseOutputFormat(format_name);
+      if (!output_format) {
+        std::cerr << "Invalid output format: " << format_name << std::endl;
+        return {};
+      }
+    } else if (flag == "-m") {
+      const std::string segment = argv[arg_index++];
+      const auto at_pos = segment.rfind('@');
+      std::optional<uint64_t> segment_addr;
+      if (at_pos == std::string::npos || at_pos == 0) {
+        std::cerr << "Invalid segment, expected binary_file@address: "
+                  << segment << std::endl;
+        return {};
+      }
+      if (!ParseUnsignedFlag(flag, segment.c_str() + at_pos + 1,
+                             segment_addr)) {
+        return {};
+      }
+      segment_files.emplace_back(segment.substr(0, at_pos), *segment_addr);
+    } else if (flag == "-o") {
+      if (!ParseUnsignedFlag(flag, argv[arg_index++], binary_offset)) {
+        return {};
+      }
+    } else if (flag == "-n") {
+      if (!ParseUnsignedFlag(flag, argv[arg_index++], binary_length)) {
+        return {};
+      }
+    } else if (flag == "-c") {
+      if (!ParseUnsignedFlag(flag, argv[arg_index++], cache_entries)) {
+        return {};
+      }
+    } else if (flag == "-e") {
+      std::optional<uint64_t> entry;
+      if (!ParseUnsignedFlag(flag, argv[arg_index++], entry)) {
+        return {};
+      }
+      entries.push_back(*entry);
+    } else if (flag == "-P") {
+      if (profile_format) {
+        std::cerr << "-P flag provided multiple times" << std::endl;
+        return {};
+      }
+      profile_format = argv[arg_index++];
+      if (*profile_format != "text" && *profile_format != "json") {
+        std::cerr << "Invalid profile format: " << *profile_format
+                  << std::endl;
+        return {};
+      }
     } else {
       std::cerr << "Unrecognised optional flag: " << flag << std::endl;
       return {};
     }
   }
-  return LiftArgs{std::move(action),       std::move(sla_file_name),
-                  std::move(bytes),        addr,
-                  std::move(root_sla_dir), std::move(pspec_file_name)};
+
+  const int num_inputs = bytes.has_value() + input_file_name.has_value() +
+                         binary_file_name.has_value() + !segment_files.empty();
+  if (num_inputs != 1) {
+    std::cerr << "Must provide exactly one of bytes, -i input_file, "
+              << "-b binary_file or -m segments" << std::endl;
+    return {};
+  }
+  if (addr && !segment_files.empty()) {
+    std::cerr << "-a flag can't be used with -m" << std::endl;
+    return {};
+  }
+  if (input_format && !input_file_name) {
+    std::cerr << "-f flag requires -i" << std::endl;
+    return {};
+  }
+  if ((binary_offset || binary_length) && !binary_file_name) {
+    std::cerr << "-o and -n flags require -b" << std::endl;
+    return {};
+  }
+  if (!entries.empty() && input_file_name) {
+    std::cerr << "-e flag can't be used with -i" << std::endl;
+    return {};
+  }
+  return LiftArgs{std::move(action),           std::move(sla_file_name),
+                  std::move(bytes),            addr,
+                  std::move(root_sla_dir),     std::move(pspec_file_name),
+                  std::move(input_file_name),  std::move(input_format),
+                  std::move(binary_file_name), binary_offset,
+                  binary_length,               std::move(segment_files),
+                  output_format.value_or(OutputFormat::kText),
+                  cache_entries,               std::move(entries),
+                  std::move(profile_format)};
+}
+
+// A single image to lift from a batch input, or why it can't be lifted
+struct LiftRecord {
+  // The line of text input, or the position in binary input, counting from 1
+  size_t number = 0;
+  // Unknown if the record is too malformed to have one
+  std::optional<uint64_t> addr;
+  std::string bytes;
+  // Set when the record is skipped
+  std::string error;
+};
+
+// Reads an 'address bytes' line. Returns false at the end of the input.
+// Malformed lines are returned with an error.
+static bool ReadTextRecord(std::istream &is, LiftRecord &record,
+                           uint64_t default_addr, uint64_t addr_size) {
+  std::string line;
+  while (std::getline(is, line)) {
+    ++record.number;
+    record.addr.reset();
+    record.error.clear();
+    std::istringstream fields(line);
+    std::string first, second, extra;
+    if (!(fields >> first) || first[0] == '#') {
+      continue;
+    }
+    std::string hex_bytes = first;
+    if (fields >> second) {
+      try {
+        size_t parsed_len = 0;
+        record.addr = std::stoull(first, &parsed_len, 0);
+        if (parsed_len != first.size()) {
+          throw std::invalid_argument(first);
+        }
+      } catch (const std::logic_error &) {
+        record.addr.reset();
+        record.error = "Invalid address: " + first;
+        return true;
+      }
+      hex_bytes = second;
+    } else {
+      record.addr = default_addr;
+    }
+    if (fields >> extra) {
+      record.error = "Unexpected field: " + extra;
+    } else if (auto error = ParseHexBytes(hex_bytes, record.bytes)) {
+      record.error = std::move(*error);
+    } else if (auto error = AddressRangeError(
+                   *record.addr, record.bytes.size(), addr_size)) {
+      record.error = "Too many bytes, " + *error;
+    }
+    return true;
+  }
+  return false;
+}
+
+static uint64_t ReadLittleEndian(const unsigned char *data, size_t size) {
+  uint64_t val = 0;
+  for (size_t i = 0; i < size; ++i) {
+    val |= static_cast<uint64_t>(data[i]) << (8 * i);
+  }
+  return val;
+}
+
+// Reads a length-prefixed binary record. Returns false at the end of the
+// input. Records with bad addresses are returned with an error, as are
+// truncated records, after which the stream is marked bad.
+static bool ReadBinaryRecord(std::istream &is, LiftRecord &record,
+                             uint64_t addr_size) {
+  unsigned char header[12];
+  is.read(reinterpret_cast<char *>(header), sizeof(header));
+  if (is.gcount() == 0) {
+    return false;
+  }
+  ++record.number;
+  record.addr.reset();
+  record.error.clear();
+  if (is.gcount() != sizeof(header)) {
+    record.error = "Truncated header";
+    is.setstate(std::ios::badbit);
+    return true;
+  }
+  record.addr = ReadLittleEndian(header, 8);
+  const uint64_t len = ReadLittleEndian(header + 8, 4);
+  record.bytes.resize(len);
+  is.read(record.bytes.data(), static_cast<std::streamsize>(len));
+  if (static_cast<uint64_t>(is.gcount()) != len) {
+    record.error = "Truncated bytes";
+    is.setstate(std::ios::badbit);
+  } else if (auto error = AddressRangeError(*record.addr, len, addr_size)) {
+    record.error = "Too many bytes, " + *error;
+  }
+  return true;
+}
+
+// Lift every record of the input with one engine. Each record's output is
+// terminated by an end of record marker, which is also written for skipped
+// records and has the error that skipped or ended the record. Errors are
+// also reported to stderr, and decoding errors only end the current record.
+static bool LiftBatch(LiftEngine &lifter, InstructionWriter &writer,
+                      bool disassemble, std::istream &is, bool binary,
+                      uint64_t default_addr) {
+  const uint64_t addr_size = lifter.Engine().getDefaultSize();
+  LiftRecord record;
+  for (;;) {
+    const bool has_record =
+        binary ? ReadBinaryRecord(is, record, addr_size)
+               : ReadTextRecord(is, record, default_addr, addr_size);
+    if (!has_record) {
+      break;
+    }
+    if (record.error.empty()) {
+      const uint64_t addr = *record.addr;
+      const size_t len = record.bytes.size();
+      lifter.SetImage(addr, std::move(record.bytes));
+      std::ostringstream errors;
+      try {
+        LiftRange(lifter, writer, disassemble, addr, len, errors);
+        record.error = errors.str();
+        if (!record.error.empty() && record.error.back() == '\n') {
+          record.error.pop_back();
+        }
+      } catch (ghidra::LowlevelError &err) {
+        record.error = err.explain;
+      }
+    }
+    if (!record.error.empty()) {
+      std::cerr << (binary ? "Record " : "Line ") << record.number << ": "
+                << record.error << std::endl;
+    }
+    writer.EndInputRecord(record.number, record.addr, record.error);
+  }
+  return !is.bad();
+}
+
+// Lift the code reachable from the entry points in the current image
+static int LiftEntries(const LiftArgs &args, LiftEngine &lifter,
+                       InstructionWriter &writer, bool disassemble) {
+  for (auto entry : args.entries) {
+    if (!lifter.IsMapped(entry)) {
+      std::cerr << "Entry point 0x" << std::hex << entry << std::dec
+                << " is not in the image" << std::endl;
+      return EXIT_FAILURE;
+    }
+  }
+  LiftReachable(lifter, writer, disassemble, args.entries);
+  return EXIT_SUCCESS;
+}
+
+// Lift the input selected by the arguments, writing the decoded instructions
+static int LiftInputs(const LiftArgs &args, LiftEngine &lifter,
+                      InstructionWriter &writer) {
+  auto &engine = lifter.Engine();
+  const bool disassemble = args.action == "disassemble";
+  const uint64_t addr = args.addr ? *args.addr : 0;
+
+  if (args.input_file_name) {
+    const bool binary = args.input_format && *args.input_format == "binary";
+    bool ok = false;
+    if (*args.input_file_name == "-") {
+#ifdef _WIN32
+      if (binary) {
+        _setmode(_fileno(stdin), _O_BINARY);
+      }
+#endif
+      ok = LiftBatch(lifter, writer, disassemble, std::cin, binary, addr);
+    } else {
+      std::ifstream input(*args.input_file_name,
+                          binary ? std::ios::binary : std::ios::in);
+      if (!input) {
+        std::cerr << "Could not open input file: " << *args.input_file_name
+                  << std::endl;
+        return EXIT_FAILURE;
+      }
+      ok = LiftBatch(lifter, writer, disassemble, input, binary, addr);
+    }
+    return ok ? EXIT_SUCCESS : EXIT_FAILURE;
+  }
+
+  if (args.binary_file_name) {
+    const auto mapped = MappedFile::Open(*args.binary_file_name);
+    if (!mapped) {
+      return EXIT_FAILURE;
+    }
+    std::string_view contents = mapped->Contents();
+    const uint64_t offset = args.binary_offset ? *args.binary_offset : 0;
+    if (offset > contents.size()) {
+      std::cerr << "Offset 0x" << std::hex << offset << std::dec
+                << " is past the end of the binary file" << std::endl;
+      return EXIT_FAILURE;
+    }
+    contents.remove_prefix(offset);
+    if (args.binary_length) {
+      if (*args.binary_length > contents.size()) {
+        std::cerr << "Length 0x" << std::hex << *args.binary_length
+                  << std::dec << " is past the end of the binary file"
+                  << std::endl;
+        return EXIT_FAILURE;
+      }
+      contents = contents.substr(0, *args.binary_length);
+    }
+    if (!CheckAddressRange(addr, contents.size(), engine.getDefaultSize(),
+                           "binary file")) {
+      return EXIT_FAILURE;
+    }
+    lifter.SetImageView(addr, contents);
+    if (!args.entries.empty()) {
+      return LiftEntries(args, lifter, writer, disassemble);
+    }
+    LiftRange(lifter, writer, disassemble, addr, contents.size());
+    return EXIT_SUCCESS;
+  }
+
+  if (!args.segment_files.empty()) {
+    // Map every segment before lifting, so that loads can cross into any of
+    // them, then lift them in address order
+    std::vector<std::unique_ptr<MappedFile>> mapped_files;
+    std::map<uint64_t, std::string_view> segments;
+    for (const auto &[file_name, segment_addr] : args.segment_files) {
+      auto mapped = MappedFile::Open(file_name);
+      if (!mapped) {
+        return EXIT_FAILURE;
+      }
+      const std::string_view contents = mapped->Contents();
+      if (!CheckAddressRange(segment_addr, contents.size(),
+                             engine.getDefaultSize(), "segment " + file_name)) {
+        return EXIT_FAILURE;
+      }
+      if (!lifter.AddSegmentView(segment_addr, contents)) {
+        std::cerr << "Segment " << file_name << " at 0x" << std::hex
+                  << segment_addr << std::dec << " overlaps another segment"
+                  << std::endl;
+        return EXIT_FAILURE;
+      }
+      segments.emplace(segment_addr, contents);
+      mapped_files.push_back(std::move(mapped));
+    }
+    if (!args.entries.empty()) {
+      return LiftEntries(args, lifter, writer, disassemble);
+    }
+    for (const auto &[segment_addr, contents] : segments) {
+      LiftRange(lifter, writer, disassemble, segment_addr, contents.size());
+    }
+    return EXIT_SUCCESS;
+  }
+
+  // In order to parse and validate the byte string properly, we need to get the
+  // address size from Sleigh. Therefore this needs to happen after
+  // initialization.
+  //
+  // Ensure that we don't start disassembling until we've set the image buffer.
+  std::string image_buffer;
+  if (const auto error = ParseHexBytes(*args.bytes, image_buffer)) {
+    std::cerr << *error << " in bytes arg: " << *args.bytes << std::endl;
+    return EXIT_FAILURE;
+  }
+  const size_t len = image_buffer.size();
+  if (!CheckAddressRange(addr, len, engine.getDefaultSize(), "bytes arg")) {
+    return EXIT_FAILURE;
+  }
+  lifter.SetImage(addr, std::move(image_buffer));
+  if (!args.entries.empty()) {
+    return LiftEntries(args, lifter, writer, disassemble);
+  }
+  LiftRange(lifter, writer, disassemble, addr, len);
+  return EXIT_SUCCESS;
+}
+
+std::optional<LiftServerOptions> ParseServeArgs(int argc, char *argv[]) {
+  if (argc < 3) {
+    return {};
+  }
+  LiftServerOptions options;
+  options.socket_path = argv[2];
+  std::optional<uint64_t> num_workers;
+  for (int arg_index = 3; arg_index < argc;) {
+    const std::string flag = argv[arg_index++];
+    if (arg_index == argc) {
+      std::cerr << "Flag " << flag << " has no value" << std::endl;
+      return {};
+    }
+    if (flag == "-p") {
+      if (options.root_sla_dir) {
+        std::cerr << "-p flag provided multiple times" << std::endl;
+        return {};
+      }
+      options.root_sla_dir = argv[arg_index++];
+    } else if (flag == "-t") {
+      if (!ParseUnsignedFlag(flag, argv[arg_index++], num_workers)) {
+        return {};
+      }
+      options.num_workers = static_cast<size_t>(*num_workers);
+    } else if (flag == "-w") {
+      const std::string language = argv[arg_index++];
+      const auto colon_pos = language.find(':');
+      if (colon_pos == std::string::npos) {
+        options.preload.emplace_back(language, std::nullopt);
+      } else {
+        options.preload.emplace_back(language.substr(0, colon_pos),
+                                     language.substr(colon_pos + 1));
+      }
+    } else {
+      std::cerr << "Unrecognised optional flag: " << flag << std::endl;
+      return {};
+    }
+  }
+  return options;
 }
 
 int main(int argc, char *argv[]) {
@@ -262,100 +821,76 @@ int main(int argc, char *argv[]) {
       return EXIT_SUCCESS;
     }
   }
+  if (argc > 1 && std::string(argv[1]) == "--serve") {
+    const auto options = ParseServeArgs(argc, argv);
+    if (!options) {
+      PrintUsage(std::cerr);
+      return EXIT_FAILURE;
+    }
+    return RunLiftServer(*options);
+  }
   const auto args = ParseArgs(argc, argv);
   if (!args) {
     PrintUsage(std::cerr);
     return EXIT_FAILURE;
   }
-  const uint64_t addr = args->addr ? *args->addr : 0;
-  // Find SLA file path
-  const auto sla_file_path =
-      args->root_sla_dir
-          ? sleigh::FindSpecFile(args->sla_file_name, {*args->root_sla_dir})
-          : sleigh::FindSpecFile(args->sla_file_name);
-  if (!sla_file_path) {
-    std::cerr << "Could not find SLA file: " << args->sla_file_name
-              << std::endl;
+  if (args->action != "disassemble" && args->action != "pcode") {
+    std::cerr << "Invalid action: " << args->action << std::endl;
+    return EXIT_FAILURE;
+  }
+  std::string error;
+  const auto files = FindLanguageFiles(args->sla_file_name,
+                                       args->pspec_file_name,
+                                       args->root_sla_dir, error);
+  if (!files) {
+    std::cerr << error << std::endl;
     return EXIT_FAILURE;
   }
   // Put together Sleigh components
-  ghidra::AttributeId::initialize();
-  ghidra::ElementId::initialize();
-  InMemoryLoadImage load_image(addr);
-  ghidra::ContextInternal ctx;
-  ghidra::Sleigh engine(&load_image, &ctx);
-  ghidra::DocumentStorage storage;
-  std::istringstream sla("<sleigh>" + sla_file_path->string() + "</sleigh>");
-  ghidra::Element *root =
-      storage.parseDocument(sla)->getRoot();
-  storage.registerTag(root);
-  std::optional<std::filesystem::path> pspec_file_path;
-  if (args->pspec_file_name) {
-    // A PSPEC file was explicitly supplied
-    pspec_file_path = args->root_sla_dir
-                          ? sleigh::FindSpecFile(*args->pspec_file_name,
-                                                 {*args->root_sla_dir})
-                          : sleigh::FindSpecFile(*args->pspec_file_name);
-    if (!pspec_file_path) {
-      std::cerr << "Could not find PSPEC file: " << *args->pspec_file_name
-                << std::endl;
-      return EXIT_FAILURE;
-    }
-  } else {
-    // Otherwise, see if there's a PSPEC file named identically to the SLA file
-    pspec_file_path = *sla_file_path;
-    pspec_file_path->replace_extension(".pspec");
-    if (!std::filesystem::exists(*pspec_file_path)) {
-      // If a file with that extension doesn't exist, don't attempt to load it
-      pspec_file_path = {};
-    }
-  }
-  if (pspec_file_path) {
-    ghidra::Element *pspec_root =
-        storage.openDocument(pspec_file_path->string())->getRoot();
-    storage.registerTag(pspec_root);
-  }
-  engine.initialize(storage);
-  engine.allowContextSet(false);
-  // Now that context symbol names are loaded by the translator
-  // we can set the default context
-  // This imitates what is done in
-  //   void Architecture::parseProcessorConfig(DocumentStorage &store)
-  const ghidra::Element *el = storage.getTag("processor_spec");
-  if (el) {
-    ghidra::XmlDecode decoder(&engine, el);
-    ghidra::uint4 elemId = decoder.openElement(ghidra::ELEM_PROCESSOR_SPEC);
-    for (;;) {
-      ghidra::uint4 subId = decoder.peekElement();
-      if (subId == 0)
-        break;
-      else if (subId == ghidra::ELEM_CONTEXT_DATA) {
-        ctx.decodeFromSpec(decoder);
-        break;
-      } else {
-        decoder.openElement();
-        decoder.closeElementSkipping(subId);
-      }
-    }
-    decoder.closeElement(elemId);
+  std::shared_ptr<const sleigh::Language> language;
+  try {
+    language = sleigh::LanguageCache::Global().Get(files->sla, files->pspec);
+  } catch (ghidra::LowlevelError &err) {
+    std::cerr << "Could not load language: " << err.explain << std::endl;
+    return EXIT_FAILURE;
+  }
+  LiftEngine lifter(*language);
+  auto &engine = lifter.Engine();
+  if (args->cache_entries) {
+    lifter.EnableCache(*language, static_cast<size_t>(*args->cache_entries));
+  }
+  if (args->profile_format) {
+    lifter.EnableProfile();
   }
 
-  // In order to parse and validate the byte string properly, we need to get the
-  // address size from Sleigh. Therefore this needs to happen after
-  // initialization.
-  //
-  // Ensure that we don't start disassembling until we've set the image buffer.
-  std::string image_buffer =
-      ParseHexBytes(args->bytes, addr, engine.getDefaultSize());
-  const size_t len = image_buffer.size();
-  load_image.SetImageBuffer(std::move(image_buffer));
-  if (args->action == "disassemble") {
-    PrintAssembly(engine, addr, len);
-  } else if (args->action == "pcode") {
-    PrintPcode(engine, addr, len);
-  } else {
-    std::cerr << "Invalid action: " << args->action << std::endl;
+#ifdef _WIN32
+  if (args->output_format == OutputFormat::kBinary) {
+    _setmode(_fileno(stdout), _O_BINARY);
+  }
+#endif
+  LargeOutputBuffer out_buf(stdout);
+  std::ostream out(&out_buf);
+  InstructionWriter writer(out, args->output_format, engine);
+  const int result = LiftInputs(*args, lifter, writer);
+  out.flush();
+  if (!out) {
+    std::cerr << "Could not write output" << std::endl;
     return EXIT_FAILURE;
   }
-  return EXIT_SUCCESS;
+  if (const auto *cache = lifter.Cache()) {
+    const auto stats = cache->Stats();
+    std::cerr << std::dec << "Instruction cache: " << stats.hits << " hits, "
+              << stats.misses << " misses (" << stats.HitRate() * 100.0
+              << "% hit rate), " << stats.uncacheable << " uncacheable, "
+              << stats.evictions << " evictions, " << stats.entries
+              << " entries" << std::endl;
+  }
+  if (const auto *profile = lifter.Profile()) {
+    if (*args->profile_format == "json") {
+      profile->WriteJson(std::cerr);
+    } else {
+      profile->WriteReport(std::cerr);
+    }
+  }
+  return result;
 }
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Script to compile sleigh spec files in parallel and report their costs"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# Constants
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+HEAD_SPEC_FILE = PROJECT_ROOT / "src" / "spec_files_HEAD.cmake"
+
+# Prefix of spec file paths in the Ghidra repo, mirrored in the output directory
+SPEC_DIR_PREFIX = Path("Ghidra") / "Processors"
+
+# Regex patterns
+SPEC_LIST_ENTRY_PATTERN = r"\"\$\{ghidrasource_SOURCE_DIR\}/([^\"]+)\""
+
+
+@dataclass
+class SpecResult:
+    """Holds the outcome and resource usage of compiling one spec file."""
+
+    spec: str
+    output: str
+    log_file: str
+    returncode: int
+    wall_time: float
+    user_time: Optional[float] = None
+    system_time: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    output_size: Optional[int] = None
+
+    @property
+    def cpu_time(self) -> Optional[float]:
+        """Combined user and system CPU time, if measured."""
+        if self.user_time is None or self.system_time is None:
+            return None
+        return self.user_time + self.system_time
+
+    def to_dict(self) -> Dict[str, object]:
+        """Convert to a JSON-serializable dictionary."""
+        result = asdict(self)
+        result["cpu_time"] = self.cpu_time
+        result["status"] = "ok" if self.returncode == 0 else "failed"
+        return result
+
+
+def read_spec_list(spec_list_file: Path, ghidra_source: Path) -> List[Path]:
+    """Read the spec files from a CMake `spec_file_list` file."""
+    content = spec_list_file.read_text()
+    return [ghidra_source / m for m in re.findall(SPEC_LIST_ENTRY_PATTERN, content)]
+
+
+def read_previous_costs(report_file: Path) -> Dict[str, float]:
+    """Read per-spec wall times from a previous report, keyed by spec name."""
+    with report_file.open("r") as f:
+        report = json.load(f)
+    return {Path(s["spec"]).name: s["wall_time"] for s in report["specs"]}
+
+
+def spec_output_path(spec: Path, out_dir: Path) -> Path:
+    """Get the .sla path for a spec, mirroring its Ghidra/Processors layout."""
+    parts = spec.parts
+    prefix = SPEC_DIR_PREFIX.parts
+    for i in range(len(parts) - len(prefix)):
+        if parts[i : i + len(prefix)] == prefix:
+            relative = Path(*parts[i:]).with_suffix(".sla")
+            return out_dir / relative
+    return out_dir / spec.with_suffix(".sla").name
+
+
+def _rss_to_bytes(maxrss: int) -> int:
+    """Convert ru_maxrss to bytes. macOS reports bytes, others kilobytes."""
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _run_measured(
+    cmd: List[str], cwd: Path, log_file: Path
+) -> Tuple[int, Optional[float], Optional[float], Optional[int]]:
+    """Run a command, returning its exit code and resource usage.
+
+    Returns:
+        Tuple of (returncode, user_time, system_time, peak_rss_bytes). Resource
+        usage is None on platforms without os.wait4.
+    """
+    with log_file.open("w") as log:
+        proc = subprocess.Popen(cmd, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        if not hasattr(os, "wait4"):
+            return proc.wait(), None, None, None
+
+        _, status, rusage = os.wait4(proc.pid, 0)
+        # Let Popen know the process is gone so it doesn't try to reap it again
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        return (
+            proc.returncode,
+            rusage.ru_utime,
+            rusage.ru_stime,
+            _rss_to_bytes(rusage.ru_maxrss),
+        )
+
+
+def compile_spec(
+    compiler: Path, spec: Path, out_dir: Path, log_dir: Path
+) -> SpecResult:
+    """Compile a single spec file and measure its cost."""
+    output = spec_output_path(spec, out_dir)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    log_file = log_dir / f"{spec.stem}_build.log"
+
+    start = time.perf_counter()
+    returncode, user_time, system_time, peak_rss = _run_measured(
+        [str(compiler), str(spec), str(output)], spec.parent, log_file
+    )
+    wall_time = time.perf_counter() - start
+
+    return SpecResult(
+        spec=str(spec),
+        output=str(output),
+        log_file=str(log_file),
+        returncode=returncode,
+        wall_time=wall_time,
+        user_time=user_time,
+        system_time=system_time,
+        peak_rss_bytes=peak_rss,
+        output_size=output.stat().st_size if output.exists() else None,
+    )
+
+
+def compile_specs(
+    compiler: Path,
+    specs: List[Path],
+    out_dir: Path,
+    workers: int,
+    previous_costs: Optional[Dict[str, float]] = None,
+) -> List[SpecResult]:
+    """Compile spec files on a pool of workers.
+
+    Specs with a known cost from a previous report are started first, most
+    expensive first, so that the heaviest specs don't end up as the long pole.
+    """
+    if previous_costs:
+        specs = sorted(specs, key=lambda s: -previous_costs.get(s.name, 0.0))
+
+    log_dir = out_dir / "spec_build_logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(compile_spec, compiler, spec, out_dir, log_dir)
+            for spec in specs
+        ]
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            status = "ok" if result.returncode == 0 else "FAILED"
+            print(
+                f"[{i}/{len(specs)}] {Path(result.spec).name}: {status} "
+                f"({result.wall_time:.2f}s)"
+            )
+            results.append(result)
+
+    results.sort(key=lambda r: r.wall_time, reverse=True)
+    return results
+
+
+def format_size(num_bytes: Optional[int]) -> str:
+    """Format a byte count in MiB."""
+    if num_bytes is None:
+        return "-"
+    return f"{num_bytes / (1024 * 1024):.1f}M"
+
+
+def print_summary(results: List[SpecResult], total_time: float, top: int) -> None:
+    """Print the most expensive specs and overall totals."""
+    print(f"\nMost expensive specs (top {min(top, len(results))}):")
+    print(f"  {'spec':<32} {'wall':>8} {'cpu':>8} {'peak rss':>10}")
+    for result in results[:top]:
+        cpu = f"{result.cpu_time:.2f}s" if result.cpu_time is not None else "-"
+        print(
+            f"  {Path(result.spec).name:<32} {result.wall_time:>7.2f}s {cpu:>8} "
+            f"{format_size(result.peak_rss_bytes):>10}"
+        )
+
+    failed = [r for r in results if r.returncode != 0]
+    peak_rss = max((r.peak_rss_bytes or 0 for r in results), default=0)
+    print(
+        f"\nCompiled {len(results) - len(failed)}/{len(results)} specs in "
+        f"{total_time:.2f}s (max peak rss {format_size(peak_rss)})"
+    )
+    for result in failed:
+        print(f"  FAILED: {result.spec} (see {result.log_file})")
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Compile sleigh spec files in parallel, recording wall time, CPU time and peak memory of each compilation."
+    )
+
+    parser.add_argument(
+        "--compiler",
+        type=str,
+        required=True,
+        help="Path to the sleigh spec compiler executable",
+    )
+
+    parser.add_argument(
+        "--ghidra-source",
+        type=str,
+        help="Ghidra source directory, used to resolve paths in --spec-list",
+    )
+
+    parser.add_argument(
+        "--spec-list",
+        type=str,
+        help=f"CMake file with a spec_file_list to compile, like {HEAD_SPEC_FILE.relative_to(PROJECT_ROOT)}. Requires --ghidra-source",
+    )
+
+    parser.add_argument(
+        "--out-dir",
+        type=str,
+        default="specfiles",
+        help="Directory for compiled sleigh files and build logs (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of specs to compile concurrently (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "--report",
+        type=str,
+        help="Write a JSON report of per-spec costs, sorted by wall time, to this file",
+    )
+
+    parser.add_argument(
+        "--schedule-from",
+        type=str,
+        help="Previous JSON report used to start the most expensive specs first",
+    )
+
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Number of most expensive specs to summarize (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "specs",
+        nargs="*",
+        type=str,
+        help="Additional .slaspec files to compile",
+    )
+
+    args = parser.parse_args()
+
+    if args.spec_list and not args.ghidra_source:
+        parser.error("--ghidra-source is required when specifying --spec-list")
+
+    if not args.spec_list and not args.specs:
+        parser.error("No spec files given. Use --spec-list or pass .slaspec files")
+
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    return args
+
+
+def main() -> None:
+    """Main entry point"""
+    args = parse_args()
+
+    try:
+        compiler = Path(args.compiler).expanduser().resolve()
+        if not compiler.is_file():
+            raise FileNotFoundError(f"Sleigh compiler not found: {compiler}")
+
+        specs = [Path(s).expanduser().resolve() for s in args.specs]
+        if args.spec_list:
+            ghidra_source = Path(args.ghidra_source).expanduser().resolve()
+            specs.extend(read_spec_list(Path(args.spec_list), ghidra_source))
+
+        missing = [s for s in specs if not s.is_file()]
+        if missing:
+            raise FileNotFoundError(f"Spec file not found: {missing[0]}")
+
+        previous_costs = None
+        if args.schedule_from:
+            previous_costs = read_previous_costs(Path(args.schedule_from))
+
+        out_dir = Path(args.out_dir).expanduser().resolve()
+        print(f"Compiling {len(specs)} specs with {args.jobs} workers...")
+        start = time.perf_counter()
+        results = compile_specs(compiler, specs, out_dir, args.jobs, previous_costs)
+        total_time = time.perf_counter() - start
+
+        print_summary(results, total_time, args.top)
+
+        if args.report:
+            report = {
+                "compiler": str(compiler),
+                "workers": args.jobs,
+                "total_wall_time": total_time,
+                "specs": [r.to_dict() for r in results],
+            }
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+            print(f"Report written to {args.report}")
+
+        if any(r.returncode != 0 for r in results):
+            sys.exit(1)
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,30 @@
 """Script to update CMake files for latest Ghidra Sleigh changes"""
 
 import argparse
+import contextlib
+import hashlib
+import json
 import os
+import posixpath
 import re
 import shutil
 import subprocess
 import sys
 import tempfile
-from dataclasses import dataclass, field
-from pathlib import Path
-from typing import List, Dict, Optional, Any, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import IO, List, Dict, Iterator, Optional, Any, Set, Tuple
+
+from compile_specs import SpecResult, compile_specs, read_previous_costs
 
 
 # Constants
 PROJECT_ROOT = Path(__file__).parent.parent.resolve()
 HEAD_SPEC_FILE = PROJECT_ROOT / "src" / "spec_files_HEAD.cmake"
 SETUP_GHIDRA_FILE = PROJECT_ROOT / "src" / "setup-ghidra-source.cmake"
+GHIDRA_REPO_URL = "https://github.com/NationalSecurityAgency/ghidra"
 
 # Paths in Ghidra repo that affect this repo
 SLEIGH_PATHS = [
@@ -24,6 +33,19 @@ SLEIGH_PATHS = [
     "Ghidra/Processors",  # Sleigh files
 ]
 
+# Name of the lock file guarding a cached Ghidra mirror against concurrent use
+MIRROR_LOCK_FILE = "mirror.lock"
+
+# Name of the file in the cache directory with the time the last successful
+# clone or fetch of the mirror began
+MIRROR_FETCH_FILE = "mirror.fetched"
+
+# Name of the file in the cache directory with earlier patch check results
+PATCH_CHECK_CACHE_FILE = "patch_checks.json"
+
+# Options of the `git am` that applies the patches in setup-ghidra-source.cmake
+PATCH_APPLY_OPTIONS = ["--ignore-space-change", "--ignore-whitespace"]
+
 # File extensions requiring manual CMake intervention
 CPP_EXTENSIONS = {".cc", ".hh"}
 SPEC_EXTENSIONS = {".slaspec", ".cspec", ".pspec", ".ldefs", ".opinion", ".sinc"}
@@ -47,10 +69,33 @@ IGNORED_EXTENSIONS = {
 CPP_PATH = "Ghidra/Features/Decompiler/src/decompile/cpp/"
 SPEC_PATH_PREFIX = "Ghidra/Processors/"
 
+# Spec sources whose changes can change compiled .sla files
+SPEC_SOURCE_EXTENSIONS = {".slaspec", ".sinc"}
+
+# Target in the decompiler's Makefile (in CPP_PATH) that builds the optimized
+# spec compiler executable of the same name
+SPEC_COMPILER_TARGET = "sleigh_opt"
+
+# Spec compile time changes below this many seconds are never flagged as
+# regressions, since they are within the noise of small specs
+PERF_MIN_TIME_DELTA = 0.5
+
 # Regex patterns
 HEAD_COMMIT_PATTERN = r"set\(ghidra_head_git_tag \"([0-9A-Fa-f]+)\"\)"
 VERSION_PATTERN = r"set\(ghidra_head_version \"([0-9]+(\.[0-9]+)*)\"\)"
 APP_VERSION_PATTERN = r"application.version=([0-9]+(\.[0-9]+)*)"
+HEAD_PATCH_PATTERN = r"\"\$\{CMAKE_CURRENT_LIST_DIR\}/(patches/HEAD/[^\"]+\.patch)\""
+PATCH_FILE_PATTERN = r"^diff --git a/(\S+) b/(\S+)"
+PATCH_ERROR_PATTERN = r"^error: (?:patch failed: )?([^:]+):"
+# Same as sleigh_spec_dependencies in cmake/modules/sleighSpecDeps.cmake. This
+# isn't a raw string so that it holds a literal tab, since `git grep -E` reads
+# `\t` in a bracket expression as a backslash or a "t"
+SPEC_INCLUDE_PATTERN = '^[ \t]*@include[ \t]+"([^"]+)"'
+
+# Record delimiters for single-pass `git log` parsing. Control characters
+# are used because they never appear in commit hashes, dates or messages.
+COMMIT_START = "\x1e"
+HEADER_END = "\x1f"
 
 
 @dataclass
@@ -110,6 +155,690 @@ class CategorizedChanges:
         return "\n".join(sections).rstrip()
 
 
+def _lock_file(lock_file: IO[str], shared: bool = False, blocking: bool = True) -> bool:
+    """Lock the open file, either exclusively or shared with other shared locks.
+
+    When the lock is held elsewhere, this says so before waiting for it, or
+    returns False if not blocking. Windows has no shared locks, so they are
+    exclusive there.
+    """
+    if _try_lock_file(lock_file, shared):
+        return True
+    if not blocking:
+        return False
+
+    print(f"Waiting for lock on {lock_file.name}...")
+    if sys.platform == "win32":
+        import msvcrt
+
+        lock_file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                return True
+            except OSError:
+                # LK_LOCK gives up after ~10 seconds, so keep waiting
+                continue
+    else:
+        import fcntl
+
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        return True
+
+
+def _try_lock_file(lock_file: IO[str], shared: bool) -> bool:
+    """Take a lock for _lock_file if that is possible without waiting"""
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            fcntl.flock(lock_file.fileno(), mode | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _share_lock(lock_file: IO[str]) -> None:
+    """Turn an exclusive lock from _lock_file into a shared one.
+
+    Other processes may take the lock in between. On Windows the lock stays
+    exclusive.
+    """
+    if sys.platform != "win32":
+        import fcntl
+
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+
+
+def _unlock_file(lock_file: IO[str]) -> None:
+    """Release a lock taken with _lock_file"""
+    if sys.platform == "win32":
+        import msvcrt
+
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@dataclass
+class SpecListDiff:
+    """Holds the .slaspec files added and removed between two commits."""
+
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    def has_changes(self) -> bool:
+        """Check if the set of spec files changed."""
+        return bool(self.added or self.removed)
+
+    def format_details(self) -> str:
+        """Format the spec list changes as markdown."""
+        sections = []
+
+        if self.added:
+            sections.append("### Added `.slaspec` Files")
+            for f in self.added:
+                sections.append(f"- `{f}`")
+            sections.append("")
+
+        if self.removed:
+            sections.append("### Removed `.slaspec` Files")
+            for f in self.removed:
+                sections.append(f"- `{f}`")
+            sections.append("")
+
+        return "\n".join(sections).rstrip()
+
+
+@dataclass
+class SpecPerfDelta:
+    """Holds the compilation cost of one spec file at two commits."""
+
+    spec: str
+    old: Optional[SpecResult] = None
+    new: Optional[SpecResult] = None
+
+    def time_change(self) -> Optional[float]:
+        """Relative change in compile wall time, if both compilations succeeded."""
+        if not self._both_ok() or self.old.wall_time <= 0:
+            return None
+        return self.new.wall_time / self.old.wall_time - 1.0
+
+    def size_change(self) -> Optional[float]:
+        """Relative change in .sla size, if both compilations succeeded."""
+        if not self._both_ok() or not self.old.output_size:
+            return None
+        return (self.new.output_size or 0) / self.old.output_size - 1.0
+
+    def is_regression(self, threshold: float) -> bool:
+        """Check if the spec got more expensive than the threshold allows."""
+        if self.new is None:
+            return False
+        if self.new.returncode != 0:
+            return self.old is None or self.old.returncode == 0
+        if not self._both_ok():
+            return False
+        time_change = self.time_change()
+        size_change = self.size_change()
+        slower = (
+            time_change is not None
+            and time_change > threshold
+            and self.new.wall_time - self.old.wall_time > PERF_MIN_TIME_DELTA
+        )
+        larger = size_change is not None and size_change > threshold
+        return slower or larger
+
+    def _both_ok(self) -> bool:
+        return (
+            self.old is not None
+            and self.new is not None
+            and self.old.returncode == 0
+            and self.new.returncode == 0
+        )
+
+
+@dataclass
+class PerfGateResult:
+    """Holds the spec compilation costs of the specs affected by an update."""
+
+    threshold: float
+    deltas: List[SpecPerfDelta] = field(default_factory=list)
+
+    def regressions(self) -> List[SpecPerfDelta]:
+        """Get the specs that regressed beyond the threshold."""
+        return [d for d in self.deltas if d.is_regression(self.threshold)]
+
+    def to_dict(self) -> Dict[str, object]:
+        """Convert to a JSON-serializable dictionary."""
+        return {
+            "threshold": self.threshold,
+            "specs": [
+                {
+                    "spec": d.spec,
+                    "old": d.old.to_dict() if d.old else None,
+                    "new": d.new.to_dict() if d.new else None,
+                    "time_change": d.time_change(),
+                    "size_change": d.size_change(),
+                    "regression": d.is_regression(self.threshold),
+                }
+                for d in self.deltas
+            ],
+        }
+
+    def format_details(self) -> str:
+        """Format the performance deltas as a markdown table."""
+
+        def cost(result: Optional[SpecResult]) -> Tuple[str, str]:
+            if result is None:
+                return "-", "-"
+            if result.returncode != 0:
+                return "FAILED", "-"
+            size = "-" if result.output_size is None else f"{result.output_size:,}"
+            return f"{result.wall_time:.2f}s", size
+
+        def change(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value * 100:+.1f}%"
+
+        lines = [
+            "### Spec Compilation Performance",
+            f"Regressions are compile time or `.sla` size increases over "
+            f"{self.threshold * 100:g}%.",
+            "",
+            "| Spec | Old time | New time | Change | Old size | New size | Change | |",
+            "|---|---:|---:|---:|---:|---:|---:|---|",
+        ]
+        for delta in self.deltas:
+            old_time, old_size = cost(delta.old)
+            new_time, new_size = cost(delta.new)
+            flag = ":warning:" if delta.is_regression(self.threshold) else ""
+            lines.append(
+                f"| `{PurePosixPath(delta.spec).name}` | {old_time} | {new_time} "
+                f"| {change(delta.time_change())} | {old_size} | {new_size} "
+                f"| {change(delta.size_change())} | {flag} |"
+            )
+        return "\n".join(lines)
+
+
+def find_affected_specs(
+    includes: Dict[str, List[str]], changed_files: Set[str], spec_files: Set[str]
+) -> List[str]:
+    """Find the spec files that transitively include any of the changed files.
+
+    Args:
+        includes: Files included by each spec source file
+        changed_files: Changed spec source files
+        spec_files: All .slaspec files
+    """
+    included_by: Dict[str, List[str]] = {}
+    for source, included in includes.items():
+        for included_file in included:
+            included_by.setdefault(included_file, []).append(source)
+
+    affected = set()
+    worklist = list(changed_files)
+    visited = set(worklist)
+    while worklist:
+        current = worklist.pop()
+        if current in spec_files:
+            affected.add(current)
+        for source in included_by.get(current, []):
+            if source not in visited:
+                visited.add(source)
+                worklist.append(source)
+    return sorted(affected, key=lambda path: path.split("/"))
+
+
+def changed_spec_sources(changed_files: List[str]) -> Set[str]:
+    """Get the spec sources in --name-status lines whose changes affect .sla files"""
+    sources = set()
+    for line in changed_files:
+        _, file_path, _ = GitHelper._parse_git_status_line(line)
+        suffix = PurePosixPath(file_path).suffix.lower()
+        if file_path.startswith(SPEC_PATH_PREFIX) and suffix in SPEC_SOURCE_EXTENSIONS:
+            sources.add(file_path)
+    return sources
+
+
+def name_status_entry(line: str) -> Dict[str, str]:
+    """Split a --name-status line into its status and path for the JSON report"""
+    status, file_path, _ = GitHelper._parse_git_status_line(line)
+    return {"status": status, "path": file_path}
+
+
+def processor_family(file_path: str) -> Optional[str]:
+    """Get the processor directory name of a file in Ghidra/Processors"""
+    if not file_path.startswith(SPEC_PATH_PREFIX):
+        return None
+    return file_path[len(SPEC_PATH_PREFIX) :].split("/", 1)[0]
+
+
+@dataclass
+class SpecIncludeGraph:
+    """Holds the .slaspec files of a commit and what each spec source includes."""
+
+    spec_files: Set[str]
+    includes: Dict[str, List[str]]
+
+    def affected_specs(self, changed_files: Set[str]) -> List[str]:
+        """Find the spec files that transitively include any changed file."""
+        return find_affected_specs(self.includes, changed_files, self.spec_files)
+
+
+@dataclass
+class ProcessorImpact:
+    """Holds the changes to one processor family and the specs they affect."""
+
+    processor: str
+    changed_files: List[str] = field(default_factory=list)
+    affected_specs: List[str] = field(default_factory=list)
+    # Sum of the stored compile times of the affected specs that have one
+    rebuild_seconds: Optional[float] = None
+    unknown_cost_specs: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ImpactMap:
+    """Holds the changed files grouped by processor family, with rebuild costs."""
+
+    processors: List[ProcessorImpact] = field(default_factory=list)
+    affected_specs: List[str] = field(default_factory=list)
+    rebuild_seconds: Optional[float] = None
+    unknown_cost_specs: List[str] = field(default_factory=list)
+
+    def format_details(self) -> str:
+        """Format the impact map as a markdown table."""
+
+        def cost(seconds: Optional[float], unknown: List[str]) -> str:
+            if seconds is None:
+                return "-" if unknown else "0s"
+            text = f"{seconds:.1f}s"
+            if unknown:
+                text += f" (+{len(unknown)} unknown)"
+            return text
+
+        lines = [
+            "### Processor Impact",
+            "",
+            "| Processor | Changed files | Affected `.sla` files | Estimated rebuild |",
+            "|---|---:|---|---:|",
+        ]
+        for impact in self.processors:
+            slas = ", ".join(
+                f"`{PurePosixPath(spec).with_suffix('.sla').name}`"
+                for spec in impact.affected_specs
+            )
+            lines.append(
+                f"| `{impact.processor}` | {len(impact.changed_files)} "
+                f"| {slas or '-'} "
+                f"| {cost(impact.rebuild_seconds, impact.unknown_cost_specs)} |"
+            )
+        lines.append(
+            f"| **Total** | "
+            f"{sum(len(impact.changed_files) for impact in self.processors)} "
+            f"| {len(self.affected_specs)} specs "
+            f"| {cost(self.rebuild_seconds, self.unknown_cost_specs)} |"
+        )
+        return "\n".join(lines)
+
+
+def build_impact_map(
+    changed_files: List[str],
+    graphs: Dict[str, SpecIncludeGraph],
+    spec_costs: Optional[Dict[str, float]] = None,
+) -> ImpactMap:
+    """Group changed files by processor family and find the specs they affect.
+
+    Args:
+        changed_files: --name-status lines of the changes
+        graphs: Include graphs of the old and new commits, keyed "old" and "new".
+            Specs affected through an include that only exists at the old commit
+            are counted if they still exist at the new one.
+        spec_costs: Compile times of specs, keyed by spec file name
+    """
+    by_processor: Dict[str, ProcessorImpact] = {}
+    for line in changed_files:
+        _, file_path, _ = GitHelper._parse_git_status_line(line)
+        processor = processor_family(file_path)
+        if processor is not None:
+            impact = by_processor.setdefault(processor, ProcessorImpact(processor))
+            impact.changed_files.append(line)
+
+    costs = spec_costs or {}
+
+    def estimate(specs: List[str]) -> Tuple[Optional[float], List[str]]:
+        """Sum the known costs of specs, and list the specs without one"""
+        names = [PurePosixPath(spec).name for spec in specs]
+        known = [costs[name] for name in names if name in costs]
+        unknown = [spec for spec, name in zip(specs, names) if name not in costs]
+        return (sum(known) if known else None), unknown
+
+    result = ImpactMap()
+    all_affected: Set[str] = set()
+    for processor in sorted(by_processor):
+        impact = by_processor[processor]
+        sources = changed_spec_sources(impact.changed_files)
+        affected: Set[str] = set()
+        if sources and graphs:
+            new_graph = graphs["new"]
+            affected.update(new_graph.affected_specs(sources))
+            affected.update(
+                spec
+                for spec in graphs["old"].affected_specs(sources)
+                if spec in new_graph.spec_files
+            )
+        impact.affected_specs = sorted(affected, key=lambda path: path.split("/"))
+        impact.rebuild_seconds, impact.unknown_cost_specs = estimate(
+            impact.affected_specs
+        )
+        all_affected.update(affected)
+        result.processors.append(impact)
+
+    result.affected_specs = sorted(all_affected, key=lambda path: path.split("/"))
+    result.rebuild_seconds, result.unknown_cost_specs = estimate(result.affected_specs)
+    return result
+
+
+@dataclass
+class PatchCheck:
+    """Holds whether one patch applies to a commit."""
+
+    patch: str
+    applies: bool
+    conflicting_files: List[str] = field(default_factory=list)
+    cached: bool = False
+
+
+@dataclass
+class PatchCheckResult:
+    """Holds the results of checking the HEAD patches against a commit."""
+
+    commit: str
+    checks: List[PatchCheck] = field(default_factory=list)
+
+    def failures(self) -> List[PatchCheck]:
+        """Get the patches that don't apply."""
+        return [c for c in self.checks if not c.applies]
+
+    def format_details(self) -> str:
+        """Format the failing patches as markdown."""
+        sections = [
+            "### Patches That No Longer Apply",
+            f"These patches in `src/patches/HEAD` don't apply to `{self.commit}` "
+            "and need to be updated or removed from "
+            "`src/setup-ghidra-source.cmake`:",
+        ]
+        for check in self.failures():
+            sections.append(f"- `{check.patch}`")
+            for f in check.conflicting_files:
+                sections.append(f"  - `{f}`")
+        return "\n".join(sections)
+
+
+def read_patch_list(setup_file: Path) -> List[Path]:
+    """Read the HEAD patches from the setup file, in the order they're applied"""
+    content = setup_file.read_text()
+    return [setup_file.parent / m for m in re.findall(HEAD_PATCH_PATTERN, content)]
+
+
+def read_patch_files(patch: Path) -> Set[str]:
+    """Get the paths of the files a patch changes"""
+    files = set()
+    for line in patch.read_text(errors="replace").splitlines():
+        match = re.match(PATCH_FILE_PATTERN, line)
+        if match:
+            files.update(match.groups())
+    return files
+
+
+def group_patches(patches: List[Path]) -> List[List[Path]]:
+    """Group patches that change the same files, keeping their order.
+
+    Patches in different groups can be checked independently, while a patch
+    must be checked on top of the earlier patches of its group.
+    """
+    groups: List[Tuple[Set[str], List[Path]]] = []
+    for patch in patches:
+        files = read_patch_files(patch)
+        merged: Tuple[Set[str], List[Path]] = (set(files), [])
+        remaining = []
+        for group in groups:
+            if group[0] & files:
+                merged[0].update(group[0])
+                merged[1].extend(group[1])
+            else:
+                remaining.append(group)
+        merged[1].sort(key=patches.index)
+        merged[1].append(patch)
+        groups = remaining + [merged]
+    return [group[1] for group in groups]
+
+
+@dataclass
+class VersionBump:
+    """Holds the Ghidra version before and after an update."""
+
+    old: str
+    new: str
+
+
+@dataclass
+class UpdateReport:
+    """Holds everything found while comparing or updating Ghidra commits.
+
+    The text printed to stdout, the GitHub Actions outputs and the JSON report
+    are all derived from this.
+    """
+
+    old_commit: str
+    new_commit: str
+    changed_files: List[str] = field(default_factory=list)
+    commits: List[Dict[str, Any]] = field(default_factory=list)
+    categorized: CategorizedChanges = field(default_factory=CategorizedChanges)
+    spec_diff: Optional[SpecListDiff] = None
+    version: Optional[VersionBump] = None
+    impact: Optional[ImpactMap] = None
+    perf: Optional[PerfGateResult] = None
+    patches: Optional[PatchCheckResult] = None
+
+    def has_changes(self) -> bool:
+        """Check if any sleigh files changed between the commits."""
+        return bool(self.changed_files)
+
+    def perf_regressions(self) -> List[SpecPerfDelta]:
+        """Get the specs that got more expensive to compile."""
+        return self.perf.regressions() if self.perf else []
+
+    def patch_failures(self) -> List[PatchCheck]:
+        """Get the HEAD patches that no longer apply."""
+        return self.patches.failures() if self.patches else []
+
+    def needs_manual_intervention(self) -> bool:
+        """Check if anything needs manual intervention."""
+        return bool(
+            self.categorized.needs_manual_intervention()
+            or self.perf_regressions()
+            or self.patch_failures()
+        )
+
+    def format_commits(self) -> str:
+        """Format the commits affecting sleigh files, separated by blank lines."""
+        blocks = []
+        for i, commit in enumerate(self.commits, 1):
+            lines = [
+                f"[Commit {i}/{len(self.commits)}]",
+                f"Hash: {commit['hash']}",
+                f"Date: {commit['date']}",
+                f"Message: {commit['message']}",
+            ]
+            if commit["body"]:
+                lines.append(f"Details:\n{commit['body']}")
+            lines.append("\nFiles changed:")
+            lines.extend(f"  {file}" for file in commit["files"])
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+    def format_intervention_details(self) -> str:
+        """Format everything that needs manual intervention as markdown."""
+        sections = [self.categorized.format_intervention_details()]
+        if self.perf_regressions():
+            assert self.perf is not None
+            sections.append(self.perf.format_details())
+        if self.patch_failures():
+            assert self.patches is not None
+            sections.append(self.patches.format_details())
+        return "\n\n".join(s for s in sections if s)
+
+    def format_text(self) -> str:
+        """Format the report for humans."""
+        if not self.has_changes():
+            return "No sleigh files were modified between these commits"
+
+        lines = [f"Found {len(self.changed_files)} changed sleigh files:"]
+        lines.extend(f"  {file}" for file in self.changed_files)
+
+        categorized = self.categorized
+        if categorized.needs_manual_intervention():
+            lines.append("\n** Manual intervention may be required **")
+            if categorized.added_cpp:
+                lines.append(f"  New C++ files: {len(categorized.added_cpp)}")
+            if categorized.deleted_cpp:
+                lines.append(f"  Deleted C++ files: {len(categorized.deleted_cpp)}")
+            if categorized.added_spec:
+                lines.append(f"  New spec files: {len(categorized.added_spec)}")
+            if categorized.deleted_spec:
+                lines.append(f"  Deleted spec files: {len(categorized.deleted_spec)}")
+
+        if self.commits:
+            lines.append(f"\nCommits affecting sleigh files ({len(self.commits)}):\n")
+            lines.append(self.format_commits())
+
+        if self.version:
+            lines.append(f"\nFound new version: {self.version.new}")
+
+        if self.spec_diff:
+            for spec in self.spec_diff.added:
+                lines.append(f"  Added spec: {spec}")
+            for spec in self.spec_diff.removed:
+                lines.append(f"  Removed spec: {spec}")
+
+        if self.impact and self.impact.processors:
+            lines.append(f"\n{self.impact.format_details()}")
+
+        if self.perf and self.perf.deltas:
+            lines.append(f"\n{self.perf.format_details()}")
+            regressions = self.perf_regressions()
+            if regressions:
+                lines.append(
+                    f"\n** {len(regressions)} specs regressed by more than "
+                    f"{self.perf.threshold * 100:g}% **"
+                )
+
+        if self.patches:
+            lines.append(f"\nHEAD patches checked against {self.patches.commit}:")
+            for check in self.patches.checks:
+                status = "ok" if check.applies else "FAILED"
+                cached_note = " (cached)" if check.cached else ""
+                lines.append(f"  {check.patch}: {status}{cached_note}")
+                lines.extend(f"    {f}" for f in check.conflicting_files)
+            failures = self.patch_failures()
+            if failures:
+                lines.append(f"\n** {len(failures)} HEAD patches no longer apply **")
+
+        return "\n".join(lines)
+
+    def github_outputs(self) -> List[Tuple[str, str]]:
+        """Get the GitHub Actions outputs as (key, value) pairs."""
+        if not self.has_changes():
+            return []
+
+        outputs = [
+            ("short_sha", self.new_commit[:9]),
+            ("did_update", "true"),
+            ("changed_files", "```\n" + "\n".join(self.changed_files) + "\n```"),
+        ]
+
+        # Commit details, followed by the performance deltas
+        details = []
+        if self.commits:
+            details.append(f"```\n{self.format_commits()}\n```")
+        if self.perf and self.perf.deltas:
+            details.append(self.perf.format_details())
+        if details:
+            outputs.append(("commit_details", "\n\n".join(details)))
+
+        if self.impact and self.impact.processors:
+            outputs.append(("impact_details", self.impact.format_details()))
+
+        if self.perf is not None:
+            regression = "true" if self.perf_regressions() else "false"
+            outputs.append(("perf_regression", regression))
+
+        if self.patches is not None:
+            failures = self.patch_failures()
+            outputs.append(("patches_apply", "false" if failures else "true"))
+            if failures:
+                outputs.append(("patch_details", self.patches.format_details()))
+
+        if self.needs_manual_intervention():
+            outputs.append(("needs_manual_intervention", "true"))
+            outputs.append(("intervention_details", self.format_intervention_details()))
+        else:
+            outputs.append(("needs_manual_intervention", "false"))
+
+        if self.spec_diff is not None:
+            changed = self.spec_diff.has_changes()
+            outputs.append(("spec_list_changed", "true" if changed else "false"))
+            if changed:
+                outputs.append(("spec_list_details", self.spec_diff.format_details()))
+
+        return outputs
+
+    def write_json(self, out: IO[str]) -> None:
+        """Write the report as a single JSON document.
+
+        The commits come last, one per line, so consumers can read the summary
+        and then process a large range of commits incrementally. Changed files
+        are given as objects with their git status letter and path.
+        """
+        impact = asdict(self.impact) if self.impact else None
+        for processor in impact["processors"] if impact else []:
+            processor["changed_files"] = [
+                name_status_entry(line) for line in processor["changed_files"]
+            ]
+        summary: Dict[str, Any] = {
+            "format_version": 2,
+            "old_commit": self.old_commit,
+            "new_commit": self.new_commit,
+            "has_changes": self.has_changes(),
+            "needs_manual_intervention": self.needs_manual_intervention(),
+            "version": asdict(self.version) if self.version else None,
+            "changed_files": [name_status_entry(line) for line in self.changed_files],
+            "categorized": asdict(self.categorized),
+            "spec_list": asdict(self.spec_diff) if self.spec_diff else None,
+            "impact": impact,
+            "perf": self.perf.to_dict() if self.perf else None,
+            "patches": asdict(self.patches) if self.patches else None,
+        }
+        out.write("{\n")
+        for key, value in summary.items():
+            out.write(f"  {json.dumps(key)}: {json.dumps(value)},\n")
+        out.write('  "commits": [')
+        for i, commit in enumerate(self.commits):
+            out.write(",\n    " if i else "\n    ")
+            files = [name_status_entry(line) for line in commit["files"]]
+            json.dump({**commit, "files": files}, out)
+        out.write("\n  ]\n}\n" if self.commits else "]\n}\n")
+
+
 class GitHelper:
     """Helper class for Git operations"""
 
@@ -138,6 +867,32 @@ class GitHelper:
         print(f"Cloning {repo_url} to {target_dir}...")
         self.run(["clone", repo_url, str(target_dir)], cwd=PROJECT_ROOT)
 
+    def clone_partial(self, repo_url: str, target_dir: Path, paths: List[str]) -> None:
+        """Clone a git repository without blobs, sparsely checked out on paths"""
+        print(f"Cloning {repo_url} to {target_dir} (partial, sparse)...")
+        self.run(
+            [
+                "clone",
+                "--filter=blob:none",
+                "--no-checkout",
+                repo_url,
+                str(target_dir),
+            ],
+            cwd=PROJECT_ROOT,
+        )
+        self.run(["sparse-checkout", "set", "--cone", *paths], cwd=target_dir)
+
+    def fetch(self, repo_dir: Path, repo_url: str) -> None:
+        """Fetch new objects from repo_url and move HEAD to its default branch"""
+        print(f"Fetching {repo_url} into {repo_dir}...")
+        self.run(["remote", "set-url", "origin", repo_url], cwd=repo_dir)
+        self.run(["fetch", "--prune", "origin"], cwd=repo_dir)
+        self.run(["remote", "set-head", "origin", "--auto"], cwd=repo_dir)
+        self.run(
+            ["checkout", "--force", "--detach", "refs/remotes/origin/HEAD"],
+            cwd=repo_dir,
+        )
+
     def get_head_commit(self, repo_dir: Path) -> str:
         """Get the HEAD commit SHA of the repository"""
         result = self.run(["rev-parse", "HEAD"], cwd=repo_dir, capture_output=True)
@@ -151,6 +906,170 @@ class GitHelper:
         except subprocess.CalledProcessError:
             return False
 
+    def list_spec_files(self, repo_dir: Path, commit: str) -> List[str]:
+        """List the .slaspec files in the commit's tree, without a checkout.
+
+        Paths are relative to the repository root and sorted by path component.
+        """
+        result = self.run(
+            [
+                "ls-tree",
+                "-r",
+                "--name-only",
+                "--full-tree",
+                commit,
+                "--",
+                SPEC_PATH_PREFIX,
+            ],
+            cwd=repo_dir,
+            capture_output=True,
+        )
+        spec_files = [
+            line for line in result.stdout.splitlines() if line.endswith(".slaspec")
+        ]
+        spec_files.sort(key=lambda path: path.split("/"))
+        return spec_files
+
+    def diff_spec_files(
+        self, repo_dir: Path, old_commit: str, new_commit: str
+    ) -> SpecListDiff:
+        """Compare the .slaspec files present at two commits"""
+        old_specs = set(self.list_spec_files(repo_dir, old_commit))
+        new_specs = set(self.list_spec_files(repo_dir, new_commit))
+        return SpecListDiff(
+            added=sorted(new_specs - old_specs, key=lambda path: path.split("/")),
+            removed=sorted(old_specs - new_specs, key=lambda path: path.split("/")),
+        )
+
+    def list_spec_includes(self, repo_dir: Path, commit: str) -> Dict[str, List[str]]:
+        """Map each spec source file in the commit's tree to the files it includes.
+
+        Uses a single `git grep` over the commit, without a checkout. Paths are
+        relative to the repository root, and relative include paths are
+        resolved against the including file's directory. Includes that use
+        preprocessor macros can't be resolved and are skipped.
+        """
+        includes: Dict[str, List[str]] = {}
+        try:
+            lines = list(
+                self.stream_lines(
+                    [
+                        "grep",
+                        "--full-name",
+                        "-E",
+                        "-e",
+                        SPEC_INCLUDE_PATTERN,
+                        commit,
+                        "--",
+                        SPEC_PATH_PREFIX,
+                    ],
+                    cwd=repo_dir,
+                )
+            )
+        except subprocess.CalledProcessError as e:
+            # Exits with 1 when nothing matches
+            if e.returncode == 1:
+                return includes
+            raise
+
+        for line in lines:
+            # Lines look like '<commit>:<path>:<matching line>'
+            _, source, content = line.split(":", 2)
+            match = re.search(SPEC_INCLUDE_PATTERN, content)
+            if not match or "$(" in match.group(1):
+                continue
+            included = posixpath.normpath(
+                posixpath.join(posixpath.dirname(source), match.group(1))
+            )
+            includes.setdefault(source, []).append(included)
+        return includes
+
+    def load_spec_graph(self, repo_dir: Path, commit: str) -> SpecIncludeGraph:
+        """Load the spec files and include graph of a commit, without a checkout"""
+        return SpecIncludeGraph(
+            spec_files=set(self.list_spec_files(repo_dir, commit)),
+            includes=self.list_spec_includes(repo_dir, commit),
+        )
+
+    def resolve_commit(self, repo_dir: Path, commit: str) -> str:
+        """Get the full SHA of a commit"""
+        result = self.run(
+            ["rev-parse", "--verify", f"{commit}^{{commit}}"],
+            cwd=repo_dir,
+            capture_output=True,
+        )
+        return result.stdout.strip()
+
+    def check_patches(
+        self, repo_dir: Path, commit: str, patches: List[Path], files: Set[str]
+    ) -> List[Tuple[bool, List[str]]]:
+        """Check whether patches apply one after another on top of a commit.
+
+        The patches are applied to a temporary index holding only the given
+        files of the commit's tree, so nothing is checked out. A patch that
+        doesn't apply is skipped for the patches after it.
+
+        Returns:
+            Whether each patch applies, and the files it failed on
+        """
+        assert self.git_exe is not None
+        results = []
+        with tempfile.TemporaryDirectory() as temp_dir:
+            env = dict(os.environ, GIT_INDEX_FILE=str(Path(temp_dir) / "index"))
+            tree = self.run(
+                ["ls-tree", "-r", "--full-tree", commit, "--", *sorted(files)],
+                cwd=repo_dir,
+                capture_output=True,
+            )
+            subprocess.run(
+                [self.git_exe, "update-index", "--add", "--index-info"],
+                cwd=repo_dir,
+                env=env,
+                input=tree.stdout,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            for patch in patches:
+                apply = [self.git_exe, "apply", "--cached", *PATCH_APPLY_OPTIONS]
+                check = subprocess.run(
+                    apply + ["--check", str(patch)],
+                    cwd=repo_dir,
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                )
+                if check.returncode != 0:
+                    conflicting = re.findall(
+                        PATCH_ERROR_PATTERN, check.stderr, flags=re.MULTILINE
+                    )
+                    results.append((False, sorted(set(conflicting))))
+                    continue
+                # Later patches of the group build on this one
+                if patch is not patches[-1]:
+                    subprocess.run(
+                        apply + [str(patch)],
+                        cwd=repo_dir,
+                        env=env,
+                        capture_output=True,
+                        check=True,
+                    )
+                results.append((True, []))
+        return results
+
+    @contextlib.contextmanager
+    def worktree(self, repo_dir: Path, commit: str, target_dir: Path) -> Iterator[Path]:
+        """Check out a commit in a detached worktree for the duration of the context"""
+        print(f"Checking out {commit} to {target_dir}...")
+        self.run(
+            ["worktree", "add", "--force", "--detach", str(target_dir), commit],
+            cwd=repo_dir,
+        )
+        try:
+            yield target_dir
+        finally:
+            self.run(["worktree", "remove", "--force", str(target_dir)], cwd=repo_dir)
+
     @staticmethod
     def _should_ignore_file(file_path: str) -> bool:
         """Check if a file should be ignored based on its extension."""
@@ -205,83 +1124,118 @@ class GitHelper:
 
         return (status, parts[1], None)
 
-    def get_commit_info(
+    def stream_lines(self, args: List[str], cwd: Path) -> Iterator[str]:
+        """Run a git command and yield its stdout line by line as it is produced.
+
+        Raises:
+            subprocess.CalledProcessError: If the command exits with an error
+        """
+        assert self.git_exe is not None
+        cmd = [self.git_exe] + args
+        # Spool stderr to a file so a chatty command can't block on a full pipe
+        # while we are still consuming stdout
+        with tempfile.TemporaryFile(mode="w+") as stderr_file, subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            text=True,
+        ) as proc:
+            assert proc.stdout is not None
+            for line in proc.stdout:
+                yield line.rstrip("\n")
+            if proc.wait() != 0:
+                stderr_file.seek(0)
+                raise subprocess.CalledProcessError(
+                    proc.returncode, cmd, stderr=stderr_file.read()
+                )
+
+    def _filter_status_lines(self, lines: List[str]) -> List[str]:
+        """Drop ignored files from --name-status lines, splitting renames."""
+        filtered_files = []
+        for line in lines:
+            if not line.strip():
+                continue
+            status, file_path, new_path = self._parse_git_status_line(line)
+            if status == "R":
+                # For renames, check both old and new paths
+                if not self._should_ignore_file(file_path):
+                    filtered_files.append(f"D\t{file_path}")
+                if new_path and not self._should_ignore_file(new_path):
+                    filtered_files.append(f"A\t{new_path}")
+            elif not self._should_ignore_file(file_path):
+                filtered_files.append(line)
+        return filtered_files
+
+    def iter_commit_info(
         self, repo_dir: Path, old_commit: str, new_commit: str, paths: List[str]
-    ) -> List[Dict[str, Any]]:
-        """Get detailed information about commits affecting specified paths"""
-        result = self.run(
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield commit records affecting the specified paths in a single pass.
+
+        Hashes, dates, messages, bodies and name-status file lists all come
+        from one ``git log`` invocation, whose output is parsed while it is
+        still streaming in. Commits whose files are all ignored are skipped.
+        """
+        # Each record starts with COMMIT_START and its header ends with
+        # HEADER_END; the --name-status lines for the commit follow.
+        log_lines = self.stream_lines(
             [
                 "log",
-                "--pretty=format:%H%n%ad%n%s%n%b%n====",
+                "--no-renames",
+                f"--pretty=format:{COMMIT_START}%H%n%ad%n%s%n%b{HEADER_END}",
                 "--date=iso",
+                "--name-status",
                 f"{old_commit}..{new_commit}",
                 "--",
                 *paths,
             ],
             cwd=repo_dir,
-            capture_output=True,
         )
 
-        log_output = result.stdout.strip()
-        commits = []
-
-        if log_output:
-            commit_sections = log_output.split("\n====")
-
-            for section in commit_sections:
-                if not section.strip():
-                    continue
-
-                lines = section.strip().split("\n")
-                commit_hash = lines[0]
-                commit_date = lines[1]
-                commit_msg = lines[2]
-                body = "\n".join(lines[3:]) if len(lines) > 3 else ""
-
-                # Get files modified in this commit
-                files_result = self.run(
-                    [
-                        "diff-tree",
-                        "--no-commit-id",
-                        "--name-status",
-                        "-r",
-                        commit_hash,
-                        "--",
-                        *paths,
-                    ],
-                    cwd=repo_dir,
-                    capture_output=True,
-                )
-
-                commit_files = files_result.stdout.strip().splitlines()
-                # Filter out ignored files
-                filtered_files = []
-                for line in commit_files:
-                    if not line.strip():
-                        continue
-                    status, file_path, new_path = self._parse_git_status_line(line)
-                    if status == "R":
-                        # For renames, check both old and new paths
-                        if not self._should_ignore_file(file_path):
-                            filtered_files.append(f"D\t{file_path}")
-                        if new_path and not self._should_ignore_file(new_path):
-                            filtered_files.append(f"A\t{new_path}")
-                    elif not self._should_ignore_file(file_path):
-                        filtered_files.append(line)
-                commit_files = filtered_files
-
-                if commit_files:
-                    commits.append(
-                        {
-                            "hash": commit_hash,
-                            "date": commit_date,
-                            "message": commit_msg,
-                            "body": body,
-                            "files": commit_files,
-                        }
-                    )
+        header: List[str] = []
+        status_lines: List[str] = []
+        in_header = False
+
+        def make_record() -> Optional[Dict[str, Any]]:
+            commit_files = self._filter_status_lines(status_lines)
+            if not header or not commit_files:
+                return None
+            return {
+                "hash": header[0],
+                "date": header[1] if len(header) > 1 else "",
+                "message": header[2] if len(header) > 2 else "",
+                "body": "\n".join(header[3:]).rstrip(),
+                "files": commit_files,
+            }
+
+        for line in log_lines:
+            if line.startswith(COMMIT_START):
+                record = make_record()
+                if record:
+                    yield record
+                header, status_lines = [], []
+                line = line[len(COMMIT_START) :]
+                in_header = True
+            if in_header:
+                if HEADER_END in line:
+                    line = line[: line.index(HEADER_END)]
+                    in_header = False
+                    if line:
+                        header.append(line)
+                else:
+                    header.append(line)
+            elif line:
+                status_lines.append(line)
+
+        record = make_record()
+        if record:
+            yield record
 
-        return commits
+    def get_commit_info(
+        self, repo_dir: Path, old_commit: str, new_commit: str, paths: List[str]
+    ) -> List[Dict[str, Any]]:
+        """Get detailed information about commits affecting specified paths"""
+        return list(self.iter_commit_info(repo_dir, old_commit, new_commit, paths))
 
     def get_changed_files(
         self, repo_dir: Path, old_commit: str, new_commit: str, paths: List[str]
@@ -331,10 +1285,30 @@ class GitHelper:
 class GhidraUpdater:
     """Handles updating Ghidra-related CMake files"""
 
-    def __init__(self, ci_mode: bool = False, dry_run: bool = False) -> None:
+    def __init__(
+        self,
+        ci_mode: bool = False,
+        dry_run: bool = False,
+        cache_dir: Optional[Path] = None,
+        ghidra_url: str = GHIDRA_REPO_URL,
+        perf_gate: bool = False,
+        perf_threshold: float = 0.1,
+        perf_jobs: int = 1,
+        perf_work_dir: Optional[Path] = None,
+        check_patches: bool = True,
+        spec_costs: Optional[Dict[str, float]] = None,
+    ) -> None:
         self.git = GitHelper()
         self.ci_mode = ci_mode
         self.dry_run = dry_run
+        self.cache_dir = cache_dir
+        self.ghidra_url = ghidra_url
+        self.perf_gate = perf_gate
+        self.perf_threshold = perf_threshold
+        self.perf_jobs = perf_jobs
+        self.perf_work_dir = perf_work_dir
+        self.check_patches = check_patches
+        self.spec_costs = spec_costs
 
         # Validate required paths
         if not HEAD_SPEC_FILE.exists():
@@ -346,130 +1320,309 @@ class GhidraUpdater:
         if self.ci_mode and "GITHUB_OUTPUT" not in os.environ:
             raise RuntimeError("CI mode requires GITHUB_OUTPUT environment variable")
 
-    def clone_ghidra_if_needed(
-        self, repo_dir: Optional[Path] = None
-    ) -> Tuple[Path, Optional[tempfile.TemporaryDirectory]]:
-        """Clone Ghidra repo if a directory is not provided"""
-        temp_dir = None
-
-        if repo_dir is None:
-            temp_dir = tempfile.TemporaryDirectory()
-            repo_dir = Path(temp_dir.name) / "ghidra"
-            self.git.clone("https://github.com/NationalSecurityAgency/ghidra", repo_dir)
-
-        return repo_dir, temp_dir
-
-    def log_github_output(self, key: str, value: str) -> None:
-        """Log output for GitHub Actions"""
-        if self.ci_mode:
-            with open(os.environ["GITHUB_OUTPUT"], "a") as f:
-                f.write(f"{key}={value}\n")
-
-    def log_github_multiline_output(self, key: str, value: str) -> None:
-        """Log multiline output for GitHub Actions"""
-        if self.ci_mode:
-            with open(os.environ["GITHUB_OUTPUT"], "a") as f:
-                f.write(f"{key}<<EOF\n")
-                f.write(value)
-                f.write("\nEOF\n")
-
-    def display_changes(
-        self, repo_dir: Path, start_commit: str, end_commit: str
-    ) -> Tuple[List[str], List[Dict[str, Any]], CategorizedChanges]:
-        """Display changes between two commits and return the changed files and commit info.
+    @contextlib.contextmanager
+    def ghidra_repo(self, repo_dir: Optional[Path] = None) -> Iterator[Path]:
+        """Provide a Ghidra checkout for the duration of the context.
 
-        Returns:
-            Tuple of (changed_files, commit_info, categorized_changes)
+        Uses repo_dir as-is if given. Otherwise, with a cache directory
+        configured, a persistent partial mirror is created or incrementally
+        fetched, and locked against further fetches while in use. Without one,
+        a full clone is made in a temporary directory and removed afterwards.
+        """
+        if repo_dir is not None:
+            yield repo_dir
+        elif self.cache_dir is not None:
+            with self._locked_mirror() as mirror_dir:
+                yield mirror_dir
+        else:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                repo_dir = Path(temp_dir) / "ghidra"
+                self.git.clone(self.ghidra_url, repo_dir)
+                yield repo_dir
+
+    @contextlib.contextmanager
+    def _locked_mirror(self) -> Iterator[Path]:
+        """Provide the cached mirror, fetched no earlier than this call.
+
+        The mirror is only locked exclusively to clone or fetch it, and is
+        shared with other runs while in use. A run that finds the mirror
+        already fetched since it started uses it as is, so runs started
+        together fetch once and then read the mirror at the same time.
         """
-        # Get changed files and categorized changes
+        assert self.cache_dir is not None
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        mirror_dir = self.cache_dir / "ghidra"
+        started = time.time()
+
+        with (self.cache_dir / MIRROR_LOCK_FILE).open("a+") as lock_file:
+            try:
+                waited_for_fetch = False
+                while True:
+                    _lock_file(lock_file, shared=True)
+                    if self._mirror_fetched_since(started):
+                        break
+                    _unlock_file(lock_file)
+                    # The run holding the lock may be fetching, so wait once
+                    # for its fetch before fetching after it
+                    if not _lock_file(lock_file, blocking=waited_for_fetch):
+                        waited_for_fetch = True
+                        continue
+                    if not self._mirror_fetched_since(started):
+                        self._update_mirror(mirror_dir)
+                    _share_lock(lock_file)
+                    break
+                yield mirror_dir
+            finally:
+                _unlock_file(lock_file)
+
+    def _update_mirror(self, mirror_dir: Path) -> None:
+        """Create or fetch the cached mirror, which must be locked exclusively"""
+        assert self.cache_dir is not None
+        fetch_started = time.time()
+        if (mirror_dir / ".git").is_dir():
+            self.git.fetch(mirror_dir, self.ghidra_url)
+        else:
+            # Remove leftovers of an interrupted clone before retrying
+            if mirror_dir.exists():
+                shutil.rmtree(mirror_dir)
+            self.git.clone_partial(
+                self.ghidra_url,
+                mirror_dir,
+                SLEIGH_PATHS,
+            )
+            self.git.run(
+                ["checkout", "--force", "--detach", "refs/remotes/origin/HEAD"],
+                cwd=mirror_dir,
+            )
+        (self.cache_dir / MIRROR_FETCH_FILE).write_text(f"{fetch_started}\n")
+
+    def _mirror_fetched_since(self, started: float) -> bool:
+        """Whether the cached mirror's last fetch began at or after started"""
+        assert self.cache_dir is not None
+        try:
+            fetched = float((self.cache_dir / MIRROR_FETCH_FILE).read_text())
+        except (OSError, ValueError):
+            return False
+        return fetched >= started
+
+    def write_github_outputs(self, report: UpdateReport) -> None:
+        """Write the report's outputs for GitHub Actions in one go"""
+        if not self.ci_mode:
+            return
+        with open(os.environ["GITHUB_OUTPUT"], "a") as f:
+            for key, value in report.github_outputs():
+                if "\n" not in value:
+                    f.write(f"{key}={value}\n")
+                    continue
+                delimiter = "EOF"
+                while delimiter in value.splitlines():
+                    delimiter += "_"
+                f.write(f"{key}<<{delimiter}\n{value}\n{delimiter}\n")
+
+    def collect_changes(
+        self, repo_dir: Path, start_commit: str, end_commit: str
+    ) -> UpdateReport:
+        """Collect the changes to sleigh files between two commits"""
         changed_files, categorized = self.git.get_changed_files(
             repo_dir, start_commit, end_commit, SLEIGH_PATHS
         )
-
+        report = UpdateReport(
+            old_commit=start_commit,
+            new_commit=end_commit,
+            changed_files=changed_files,
+            categorized=categorized,
+        )
         if not changed_files:
-            print("No sleigh files were modified between these commits")
-            return [], [], CategorizedChanges()
-
-        # Output changes for logging
-        num_changed = len(changed_files)
-        print(f"Found {num_changed} changed sleigh files:")
-        for file in changed_files:
-            print(f"  {file}")
-
-        # Display manual intervention warning if needed
-        if categorized.needs_manual_intervention():
-            print("\n** Manual intervention may be required **")
-            if categorized.added_cpp:
-                print(f"  New C++ files: {len(categorized.added_cpp)}")
-            if categorized.deleted_cpp:
-                print(f"  Deleted C++ files: {len(categorized.deleted_cpp)}")
-            if categorized.added_spec:
-                print(f"  New spec files: {len(categorized.added_spec)}")
-            if categorized.deleted_spec:
-                print(f"  Deleted spec files: {len(categorized.deleted_spec)}")
+            return report
 
-        # Get detailed commit info for logging
-        commit_info = self.git.get_commit_info(
+        report.commits = self.git.get_commit_info(
             repo_dir, start_commit, end_commit, SLEIGH_PATHS
         )
 
-        if commit_info:
-            print(f"\nCommits affecting sleigh files ({len(commit_info)}):\n")
-            for i, commit in enumerate(commit_info, 1):
-                print(f"[Commit {i}/{len(commit_info)}]")
-                print(f"Hash: {commit['hash']}")
-                print(f"Date: {commit['date']}")
-                print(f"Message: {commit['message']}")
-                if commit["body"]:
-                    print(f"Details:\n{commit['body']}")
-                print("\nFiles changed:")
-                for file in commit["files"]:
-                    print(f"  {file}")
-                print("")
-
-        # Log outputs for GitHub Actions
-        if self.ci_mode:
-            self.log_github_output("short_sha", end_commit[:9])
-            self.log_github_output("did_update", "true")
-
-            # Log changed files
-            changed_files_str = "```\n" + "\n".join(changed_files) + "\n```"
-            self.log_github_multiline_output("changed_files", changed_files_str)
-
-            # Log commit details
-            if commit_info:
-                details = ["```"]
-                for i, commit in enumerate(commit_info, 1):
-                    details.append(f"[Commit {i}/{len(commit_info)}]")
-                    details.append(f"Hash: {commit['hash']}")
-                    details.append(f"Date: {commit['date']}")
-                    details.append(f"Message: {commit['message']}")
-                    if commit["body"]:
-                        details.append(f"Details:\n{commit['body']}")
-                    details.append("\nFiles changed:")
-                    for file in commit["files"]:
-                        details.append(f"  {file}")
-                    details.append("")
-                # Replace trailing newline for last entry
-                details[-1] = "```"
-
-                self.log_github_multiline_output("commit_details", "\n".join(details))
-
-            # Log manual intervention outputs
-            if categorized.needs_manual_intervention():
-                self.log_github_output("needs_manual_intervention", "true")
-                self.log_github_multiline_output(
-                    "intervention_details", categorized.format_intervention_details()
+        # Include graphs are only needed to follow changed spec sources
+        graphs: Dict[str, SpecIncludeGraph] = {}
+        if changed_spec_sources(changed_files):
+            graphs["old"] = self.git.load_spec_graph(repo_dir, start_commit)
+            graphs["new"] = self.git.load_spec_graph(repo_dir, end_commit)
+        report.impact = build_impact_map(changed_files, graphs, self.spec_costs)
+
+        if self.perf_gate:
+            report.perf = self.run_perf_gate(
+                repo_dir, start_commit, end_commit, changed_files, graphs
+            )
+        if self.check_patches:
+            report.patches = self.check_head_patches(repo_dir, end_commit)
+        return report
+
+    def check_head_patches(self, repo_dir: Path, commit: str) -> PatchCheckResult:
+        """Check whether the HEAD patches still apply to a commit.
+
+        Patches that change disjoint sets of files are checked in parallel.
+        With a cache directory, results are kept per commit and patch contents
+        (including the earlier patches it builds on), so only new or changed
+        patches are checked again on later runs.
+        """
+        commit = self.git.resolve_commit(repo_dir, commit)
+        patches = read_patch_list(SETUP_GHIDRA_FILE)
+        print(f"\nChecking {len(patches)} HEAD patches against {commit}...")
+
+        # Cache key of each patch, covering the patches before it in its group
+        groups = group_patches(patches)
+        keys: Dict[Path, str] = {}
+        for group in groups:
+            key = hashlib.sha256(commit.encode())
+            for patch in group:
+                key.update(hashlib.sha256(patch.read_bytes()).digest())
+                keys[patch] = key.hexdigest()
+
+        cache: Dict[str, Dict[str, Any]] = {}
+        cache_file = None
+        if self.cache_dir is not None:
+            cache_file = self.cache_dir / PATCH_CHECK_CACHE_FILE
+            if cache_file.exists():
+                try:
+                    cache = json.loads(cache_file.read_text())
+                except ValueError:
+                    print(f"Ignoring invalid patch check cache {cache_file}")
+
+        checks: Dict[Path, PatchCheck] = {}
+        for patch in patches:
+            cached = cache.get(keys[patch])
+            if cached is not None:
+                checks[patch] = PatchCheck(
+                    patch=patch.name,
+                    applies=cached["applies"],
+                    conflicting_files=cached["conflicting_files"],
+                    cached=True,
                 )
+
+        pending = [g for g in groups if any(p not in checks for p in g)]
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                futures = {
+                    executor.submit(
+                        self.git.check_patches,
+                        repo_dir,
+                        commit,
+                        group,
+                        set().union(*(read_patch_files(p) for p in group)),
+                    ): group
+                    for group in pending
+                }
+                for future in as_completed(futures):
+                    group = futures[future]
+                    for patch, (applies, conflicting) in zip(group, future.result()):
+                        checks[patch] = PatchCheck(
+                            patch=patch.name,
+                            applies=applies,
+                            conflicting_files=conflicting,
+                        )
+                        cache[keys[patch]] = {
+                            "applies": applies,
+                            "conflicting_files": conflicting,
+                        }
+                    # Save after every group, so an interrupted run can resume
+                    if cache_file is not None:
+                        temp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+                        temp_file.write_text(json.dumps(cache, indent=2) + "\n")
+                        os.replace(temp_file, cache_file)
+
+        return PatchCheckResult(commit=commit, checks=[checks[p] for p in patches])
+
+    def _build_spec_compiler(self, source_dir: Path) -> Path:
+        """Build the spec compiler of a Ghidra checkout and return its path.
+
+        Uses Ghidra's own Makefile rather than this repo's CMake files, which
+        only list the sources of the currently pinned commit.
+        """
+        cpp_dir = source_dir / CPP_PATH
+        print(f"Building spec compiler in {cpp_dir}...")
+        subprocess.run(
+            ["make", f"-j{self.perf_jobs}", SPEC_COMPILER_TARGET],
+            cwd=cpp_dir,
+            stdout=sys.stdout,
+            stderr=sys.stderr,
+            check=True,
+        )
+        return cpp_dir / SPEC_COMPILER_TARGET
+
+    def run_perf_gate(
+        self,
+        repo_dir: Path,
+        old_commit: str,
+        new_commit: str,
+        changed_files: List[str],
+        graphs: Dict[str, SpecIncludeGraph],
+    ) -> Optional[PerfGateResult]:
+        """Compare the cost of compiling the specs affected by the changes.
+
+        Each commit is checked out in its own worktree and builds its own spec
+        compiler. Only the .slaspec files that transitively include a changed
+        spec source are compiled, for one commit after the other so that
+        their timings don't interfere.
+
+        Args:
+            graphs: Include graphs of the commits, keyed "old" and "new"
+
+        Returns:
+            The per-spec deltas, or None if no spec sources changed
+        """
+        changed_sources = changed_spec_sources(changed_files)
+        if not changed_sources:
+            print("No spec sources changed, skipping performance gate")
+            return None
+
+        specs_by_commit = {
+            "old": graphs["old"].affected_specs(changed_sources),
+            "new": graphs["new"].affected_specs(changed_sources),
+        }
+        affected = sorted(
+            set(specs_by_commit["old"]) | set(specs_by_commit["new"]),
+            key=lambda path: path.split("/"),
+        )
+        result = PerfGateResult(
+            threshold=self.perf_threshold,
+            deltas=[SpecPerfDelta(spec=spec) for spec in affected],
+        )
+        if not affected:
+            print("No compiled specs are affected, skipping performance gate")
+            return result
+
+        print(f"\nComparing compilation of {len(affected)} affected specs...")
+        deltas = {delta.spec: delta for delta in result.deltas}
+        with contextlib.ExitStack() as stack:
+            if self.perf_work_dir is not None:
+                work_dir = self.perf_work_dir
+                work_dir.mkdir(parents=True, exist_ok=True)
             else:
-                self.log_github_output("needs_manual_intervention", "false")
+                work_dir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
 
-        return changed_files, commit_info, categorized
+            for name, commit in (("old", old_commit), ("new", new_commit)):
+                specs = specs_by_commit[name]
+                if not specs:
+                    continue
+                worktree_dir = work_dir / name
+                # Left over from an earlier run in a persistent work directory
+                if worktree_dir.exists():
+                    shutil.rmtree(worktree_dir)
+                    self.git.run(["worktree", "prune"], cwd=repo_dir)
+
+                with self.git.worktree(repo_dir, commit, worktree_dir) as source_dir:
+                    compiler = self._build_spec_compiler(source_dir)
+                    spec_results = compile_specs(
+                        compiler,
+                        [source_dir / spec for spec in specs],
+                        work_dir / f"{name}_specfiles",
+                        self.perf_jobs,
+                    )
+                for spec_result in spec_results:
+                    spec = Path(spec_result.spec).relative_to(source_dir).as_posix()
+                    setattr(deltas[spec], name, spec_result)
 
-    def update_head_commit(
-        self, repo_dir: Path, setup_file: Path
-    ) -> Tuple[bool, str, str]:
-        """Update the HEAD commit in the setup file if needed"""
+        return result
+
+    def update_head_commit(self, repo_dir: Path, setup_file: Path) -> UpdateReport:
+        """Update the HEAD commit in the setup file if any sleigh files changed"""
         # Get latest commit hash
         latest_commit = self.git.get_head_commit(repo_dir)
         current_commit = None
@@ -488,17 +1641,14 @@ class GhidraUpdater:
         # Check if update is needed
         if current_commit == latest_commit:
             print(f"Already at the latest commit: {latest_commit}")
-            return False, current_commit, latest_commit
+            return UpdateReport(old_commit=current_commit, new_commit=latest_commit)
 
         print(f"Found new commit: {latest_commit}")
 
-        # Check if sleigh files were updated and display changes
-        changed_files, commit_info, _ = self.display_changes(
-            repo_dir, current_commit, latest_commit
-        )
-
-        if not changed_files:
-            return False, current_commit, latest_commit
+        # Check if sleigh files were updated
+        report = self.collect_changes(repo_dir, current_commit, latest_commit)
+        if not report.has_changes():
+            return report
 
         # Update the setup file if not in dry run mode
         if not self.dry_run:
@@ -508,9 +1658,11 @@ class GhidraUpdater:
                 f'set(ghidra_head_git_tag "{latest_commit}")',
             )
 
-        return True, current_commit, latest_commit
+        return report
 
-    def update_version(self, repo_dir: Path, setup_file: Path) -> None:
+    def update_version(
+        self, repo_dir: Path, setup_file: Path
+    ) -> Optional[VersionBump]:
         """Update the Ghidra version in the setup file if needed"""
         # Get source version from application.properties
         app_properties_file = repo_dir / "Ghidra" / "application.properties"
@@ -533,9 +1685,7 @@ class GhidraUpdater:
         # Check if update is needed
         if cmake_version == source_version:
             print("No new version bump")
-            return
-
-        print(f"Found new version: {source_version}")
+            return None
 
         # Update the setup file if not in dry run mode
         if not self.dry_run:
@@ -545,25 +1695,43 @@ class GhidraUpdater:
                 f'set(ghidra_head_version "{source_version}")',
             )
 
-    def update_spec_files(self, repo_dir: Path, spec_file: Path) -> None:
-        """Update the list of spec files in the CMake file"""
-        # Find all .slaspec files
-        spec_files = []
-        processors_dir = repo_dir / "Ghidra" / "Processors"
+        return VersionBump(old=cmake_version, new=source_version)
+
+    def update_spec_files(
+        self, repo_dir: Path, spec_file: Path, old_commit: str, new_commit: str
+    ) -> SpecListDiff:
+        """Update the list of spec files in the CMake file from the git tree.
 
-        for path in processors_dir.glob("**/*.slaspec"):
-            spec_files.append(path.relative_to(repo_dir))
+        The file is only rewritten when the generated list differs from its
+        current contents.
 
-        spec_files.sort()
+        Returns:
+            The spec files added and removed between old_commit and new_commit
+        """
+        spec_files = self.git.list_spec_files(repo_dir, new_commit)
         print(f"Found {len(spec_files)} slaspec files")
 
+        spec_diff = self.git.diff_spec_files(repo_dir, old_commit, new_commit)
+
+        if not spec_files:
+            return spec_diff
+
+        lines = ["set(spec_file_list\n"]
+        for spec in spec_files:
+            lines.append(f'  "${{ghidrasource_SOURCE_DIR}}/{spec}"\n')
+        lines.append(")\n")
+        content = "".join(lines)
+
+        if spec_file.exists() and spec_file.read_text() == content:
+            print("Spec file list is unchanged")
+            return spec_diff
+
         # Write the updated spec file list
-        if not self.dry_run and spec_files:
+        if not self.dry_run:
             with spec_file.open("w") as f:
-                f.write("set(spec_file_list\n")
-                for spec in spec_files:
-                    f.write(f'  "${{ghidrasource_SOURCE_DIR}}/{spec}"\n')
-                f.write(")\n")
+                f.write(content)
+
+        return spec_diff
 
     def _replace_in_file(self, file_path: Path, pattern: str, replacement: str) -> None:
         """Replace text in a file matching the pattern with the replacement"""
@@ -578,30 +1746,25 @@ class GhidraUpdater:
         os.remove(file_path)
         shutil.move(temp_file.name, file_path)
 
-    def update(self, repo_dir: Optional[Path] = None) -> bool:
+    def update(self, repo_dir: Optional[Path] = None) -> UpdateReport:
         """Main update method to orchestrate the update process"""
-        # Clone repo if not provided
-        repo_dir, temp_dir = self.clone_ghidra_if_needed(repo_dir)
-
-        try:
+        # Clone or fetch the repo if not provided
+        with self.ghidra_repo(repo_dir) as repo_dir:
             # Update the HEAD commit
-            did_update, _, _ = self.update_head_commit(repo_dir, SETUP_GHIDRA_FILE)
+            report = self.update_head_commit(repo_dir, SETUP_GHIDRA_FILE)
 
             # If commit was updated, also update version and spec files
-            if did_update:
-                self.update_version(repo_dir, SETUP_GHIDRA_FILE)
-                self.update_spec_files(repo_dir, HEAD_SPEC_FILE)
-
-            return did_update
+            if report.has_changes():
+                report.version = self.update_version(repo_dir, SETUP_GHIDRA_FILE)
+                report.spec_diff = self.update_spec_files(
+                    repo_dir, HEAD_SPEC_FILE, report.old_commit, report.new_commit
+                )
 
-        finally:
-            # Clean up temp directory if created
-            if temp_dir:
-                temp_dir.cleanup()
+            return report
 
     def compare_commits(
         self, repo_dir: Path, start_commit: str, end_commit: Optional[str] = None
-    ) -> None:
+    ) -> UpdateReport:
         """Compare changes between two commits without updating any files"""
         # If end_commit is not provided, use HEAD
         if end_commit is None:
@@ -615,8 +1778,16 @@ class GhidraUpdater:
             if not self.git.check_commit_exists(repo_dir, commit):
                 raise ValueError(f"Commit {commit} does not exist in the repository")
 
-        # Display changes
-        self.display_changes(repo_dir, start_commit, end_commit)
+        # Report full SHAs like update mode does, even for refs and short SHAs
+        start_commit = self.git.resolve_commit(repo_dir, start_commit)
+        end_commit = self.git.resolve_commit(repo_dir, end_commit)
+
+        report = self.collect_changes(repo_dir, start_commit, end_commit)
+        if report.has_changes():
+            report.spec_diff = self.git.diff_spec_files(
+                repo_dir, start_commit, end_commit
+            )
+        return report
 
 
 def parse_args() -> argparse.Namespace:
@@ -631,18 +1802,76 @@ def parse_args() -> argparse.Namespace:
         help="Use a specific Ghidra repo directory instead of downloading it from the internet",
     )
 
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="Keep a persistent partial Ghidra mirror in this directory and only fetch new commits on later runs. Safe to share between concurrent jobs.",
+    )
+
+    parser.add_argument(
+        "--ghidra-url",
+        type=str,
+        default=GHIDRA_REPO_URL,
+        help=f"Ghidra repository to clone or fetch from (default: {GHIDRA_REPO_URL})",
+    )
+
     parser.add_argument(
         "--ci",
         action="store_true",
         help="Output GitHub Actions commands for recording information in CI. Requires GITHUB_OUTPUT environment variable.",
     )
 
+    parser.add_argument(
+        "--json",
+        type=str,
+        metavar="FILE",
+        help="Also write the report as a JSON document to this file, or to stdout if '-', in which case all other output goes to stderr",
+    )
+
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Show what would be changed without actually modifying any files",
     )
 
+    parser.add_argument(
+        "--skip-patch-check",
+        action="store_true",
+        help="Don't check whether the patches in src/patches/HEAD apply to the new commit",
+    )
+
+    parser.add_argument(
+        "--spec-costs",
+        type=str,
+        help="JSON report of scripts/compile_specs.py used to estimate the rebuild cost of the specs affected by the changes",
+    )
+
+    parser.add_argument(
+        "--perf-gate",
+        action="store_true",
+        help="Build the spec compiler at both commits and compare the compile time and .sla size of the specs affected by the changes",
+    )
+
+    parser.add_argument(
+        "--perf-threshold",
+        type=float,
+        default=10.0,
+        help="Increase in percent of a spec's compile time or .sla size that counts as a regression (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "--perf-jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of parallel jobs for building the spec compilers and compiling specs (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "--perf-work-dir",
+        type=str,
+        help="Keep the compiled specs and build logs of the performance gate in this directory instead of a temporary one",
+    )
+
     parser.add_argument(
         "start_commit",
         nargs="?",
@@ -666,13 +1895,25 @@ def parse_args() -> argparse.Namespace:
             parser.error(f"Ghidra repo directory does not exist: {repo_path}")
         args.ghidra_repo = repo_path
 
+    if args.cache_dir:
+        args.cache_dir = Path(args.cache_dir).expanduser().resolve()
+
+    if args.perf_work_dir:
+        args.perf_work_dir = Path(args.perf_work_dir).expanduser().resolve()
+
+    if args.perf_jobs < 1:
+        parser.error("--perf-jobs must be at least 1")
+
+    if args.cache_dir and args.ghidra_repo:
+        parser.error("Cannot specify both --cache-dir and --ghidra-repo")
+
     # Validate commit arguments
     if args.end_commit and not args.start_commit:
         parser.error("Cannot specify end_commit without start_commit")
 
     # If commits are specified, a Ghidra repo is required
-    if args.start_commit and not args.ghidra_repo:
-        parser.error("--ghidra-repo is required when specifying commits")
+    if args.start_commit and not (args.ghidra_repo or args.cache_dir):
+        parser.error("--ghidra-repo or --cache-dir is required when specifying commits")
 
     return args
 
@@ -681,28 +1922,63 @@ def main() -> None:
     """Main entry point"""
     args = parse_args()
 
-    try:
-        updater = GhidraUpdater(ci_mode=args.ci, dry_run=args.dry_run)
+    # Keep stdout for the JSON report alone if it is written there
+    json_stdout = sys.stdout
+    with contextlib.ExitStack() as stack:
+        if args.json == "-":
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        try:
+            run(args, json_stdout)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+
+def run(args: argparse.Namespace, json_stdout: IO[str]) -> None:
+    """Run the comparison or update and report the results"""
+    spec_costs = None
+    if args.spec_costs:
+        spec_costs = read_previous_costs(Path(args.spec_costs))
+
+    updater = GhidraUpdater(
+        ci_mode=args.ci,
+        dry_run=args.dry_run,
+        cache_dir=args.cache_dir,
+        ghidra_url=args.ghidra_url,
+        perf_gate=args.perf_gate,
+        perf_threshold=args.perf_threshold / 100.0,
+        perf_jobs=args.perf_jobs,
+        perf_work_dir=args.perf_work_dir,
+        check_patches=not args.skip_patch_check,
+        spec_costs=spec_costs,
+    )
 
-        # If start_commit is specified, run in comparison mode
-        if args.start_commit:
-            updater.compare_commits(
-                args.ghidra_repo, args.start_commit, args.end_commit
+    # If start_commit is specified, run in comparison mode
+    if args.start_commit:
+        with updater.ghidra_repo(args.ghidra_repo) as repo_dir:
+            report = updater.compare_commits(
+                repo_dir, args.start_commit, args.end_commit
             )
+    else:
+        # Normal update mode
+        report = updater.update(args.ghidra_repo)
+
+    if report.old_commit != report.new_commit:
+        print(report.format_text())
+    updater.write_github_outputs(report)
+    if args.json == "-":
+        report.write_json(json_stdout)
+    elif args.json:
+        with open(args.json, "w") as f:
+            report.write_json(f)
+
+    if not args.start_commit:
+        if not report.has_changes():
+            print("No update required")
+        elif args.dry_run:
+            print("Update would be required!")
         else:
-            # Normal update mode
-            did_update = updater.update(args.ghidra_repo)
-
-            if not did_update:
-                print("No update required")
-            elif args.dry_run:
-                print("Update would be required!")
-            else:
-                print("Update required!")
-
-    except Exception as e:
-        print(f"Error: {e}", file=sys.stderr)
-        sys.exit(1)
+            print("Update required!")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include "sleigh/BatchLifter.h"
+
+#include <algorithm>
+#include <atomic>
+#include <exception>
+#include <mutex>
+#include <thread>
+
+#include "sleigh/LanguageCache.h"
+#include "sleigh/libsleigh.hh"
+
+namespace sleigh {
+
+namespace {
+
+void DecodeRegion(ghidra::Sleigh &engine, const BatchLiftOptions &options,
+                  RegionLiftResult &result, LiftProfile *profile) {
+  const auto &region = result.region;
+  // Regions were checked to fit in the code space, so counting the bytes
+  // decoded never wraps around, even for a region ending at the top
+  uint64_t offset = 0;
+  while (offset < region.length) {
+    const uint64_t address = region.address + offset;
+    LiftedInstruction insn;
+    try {
+      DecodeInstruction(engine, address, options.disassemble, options.pcode,
+                        insn, profile);
+    } catch (ghidra::LowlevelError &err) {
+      // Includes UnimplError and BadDataError
+      result.error = err.explain;
+      result.error_address = address;
+      return;
+    }
+    offset += insn.length;
+    result.instructions.push_back(std::move(insn));
+  }
+}
+
+// Whether the region's addresses are all in the code space, without wrapping
+// around its top
+bool FitsInSpace(const LiftRegion &region, uint64_t highest) {
+  return region.address <= highest &&
+         (region.length == 0 || region.length - 1 <= highest - region.address);
+}
+
+} // namespace
+
+BatchLiftResult LiftRegions(const Language &language, ghidra::LoadImage &image,
+                            const std::vector<LiftRegion> &regions,
+                            const BatchLiftOptions &options) {
+  BatchLiftResult result;
+  result.regions.resize(regions.size());
+  for (size_t i = 0; i < regions.size(); ++i) {
+    result.regions[i].region = regions[i];
+  }
+
+  // Space indices are the same for every engine of a language
+  const auto first_engine = language.CreateEngine(&image);
+  result.space_names = GetSpaceNames(first_engine->Engine());
+
+  // Reject regions that would run past the top of the code space up front,
+  // instead of wrapping around to address zero
+  const uint64_t highest =
+      first_engine->Engine().getDefaultCodeSpace()->getHighest();
+  std::vector<size_t> region_indices;
+  region_indices.reserve(regions.size());
+  for (size_t i = 0; i < regions.size(); ++i) {
+    if (FitsInSpace(regions[i], highest)) {
+      region_indices.push_back(i);
+    } else {
+      result.regions[i].error = "Region overflows the address space";
+      result.regions[i].error_address = regions[i].address;
+    }
+  }
+
+  size_t num_threads = options.num_threads;
+  if (num_threads == 0) {
+    num_threads = std::max(1u, std::thread::hardware_concurrency());
+  }
+  num_threads = std::min(num_threads, region_indices.size());
+
+  std::atomic<size_t> next_region{0};
+  std::exception_ptr worker_error;
+  std::atomic<bool> failed{false};
+  std::mutex profile_mutex;
+  auto worker = [&](void) {
+    try {
+      auto engine = language.CreateEngine(&image);
+      // Context changes must not carry from one region into the next, or the
+      // results would depend on which worker decoded which regions before
+      engine->Engine().allowContextSet(false);
+      LiftProfile profile;
+      for (size_t i = next_region++; i < region_indices.size() && !failed;
+           i = next_region++) {
+        DecodeRegion(engine->Engine(), options,
+                     result.regions[region_indices[i]],
+                     options.profile ? &profile : nullptr);
+      }
+      if (options.profile) {
+        std::lock_guard<std::mutex> lock(profile_mutex);
+        result.profile.Merge(profile);
+      }
+    } catch (...) {
+      // Only engine creation is expected to throw here. Keep the first error
+      // to rethrow on the calling thread
+      if (!failed.exchange(true)) {
+        worker_error = std::current_exception();
+      }
+    }
+  };
+
+  std::vector<std::thread> threads;
+  threads.reserve(num_threads > 0 ? num_threads - 1 : 0);
+  for (size_t i = 1; i < num_threads; ++i) {
+    threads.emplace_back(worker);
+  }
+  // The calling thread works too
+  if (num_threads > 0) {
+    worker();
+  }
+  for (auto &thread : threads) {
+    thread.join();
+  }
+  if (worker_error) {
+    std::rethrow_exception(worker_error);
+  }
+  return result;
+}
+
+} // namespace sleigh
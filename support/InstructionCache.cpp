@@ -0,0 +1,331 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include "sleigh/InstructionCache.h"
+
+#include <algorithm>
+#include <cstring>
+#include <string_view>
+
+#include "sleigh/LanguageCache.h"
+#include "sleigh/libsleigh.hh"
+
+namespace sleigh {
+
+namespace {
+
+// Sleigh always fetches this many bytes for an instruction it parses, and its
+// decision tree can look at bytes past the end of the instruction it
+// eventually picks, so the whole window is part of the key
+constexpr size_t kFetchWindowSize = 16;
+
+// Distance to the address of the shifted decode. It is a multiple of 16, so
+// it doesn't change the low address bits that are part of the key, and none
+// of its bytes are zero, so a relative offset is never mistaken for a fixed
+// one at any varnode size
+constexpr uint64_t kShadowDelta = 0x1234567812345670ULL;
+
+uint64_t RelocateOffset(const ghidra::AddrSpace &space, uint64_t offset,
+                        uint32_t size, uint64_t delta) {
+  const uint64_t moved = offset + delta;
+  if (space.getType() == ghidra::IPTR_CONSTANT) {
+    return moved & ghidra::calc_mask(static_cast<ghidra::int4>(size));
+  }
+  return space.wrapOffset(moved);
+}
+
+// Whether the first input of the op is a constant encoding an address space
+bool IsSpaceOperand(uint32_t opcode) {
+  return opcode == ghidra::CPUI_LOAD || opcode == ghidra::CPUI_STORE;
+}
+
+// See ghidra::VarnodeData::getSpaceFromConst
+ghidra::int4 SpaceIndex(const LiftedVarnode &vn) {
+  return reinterpret_cast<const ghidra::AddrSpace *>(
+             static_cast<uintptr_t>(vn.offset))
+      ->getIndex();
+}
+
+// The constant encoding an address space for `translator`. Cached entries
+// hold the space's index instead, since the space objects belong to the
+// engine that decoded the instruction
+uint64_t SpaceOperand(const ghidra::Translate &translator,
+                      ghidra::int4 space_index) {
+  return static_cast<uint64_t>(
+      reinterpret_cast<uintptr_t>(translator.getSpace(space_index)));
+}
+
+// Copy a cached instruction, decoded at `cached.address`, to `address`
+void CopyRelocated(const ghidra::Translate &translator,
+                   const LiftedInstruction &cached,
+                   const std::vector<bool> &relative, uint64_t address,
+                   LiftedInstruction &insn) {
+  const uint64_t delta = address - cached.address;
+  auto relocate = [&](LiftedVarnode &vn, size_t i) {
+    if (relative[i]) {
+      vn.offset =
+          RelocateOffset(*translator.getSpace(vn.space), vn.offset, vn.size,
+                         delta);
+    }
+  };
+
+  insn.address = address;
+  insn.length = cached.length;
+  insn.mnemonic = cached.mnemonic;
+  insn.body = cached.body;
+  insn.pcode.resize(cached.pcode.size());
+  size_t varnode_index = 0;
+  for (size_t i = 0; i < cached.pcode.size(); ++i) {
+    auto &op = insn.pcode[i];
+    op = cached.pcode[i];
+    if (op.output) {
+      relocate(*op.output, varnode_index++);
+    }
+    for (auto &input : op.inputs) {
+      relocate(input, varnode_index++);
+    }
+    if (IsSpaceOperand(op.opcode) && !op.inputs.empty()) {
+      op.inputs[0].offset = SpaceOperand(
+          translator, static_cast<ghidra::int4>(op.inputs[0].offset));
+    }
+  }
+}
+
+} // namespace
+
+double InstructionCacheStats::HitRate(void) const {
+  const uint64_t lookups = hits + misses;
+  return lookups ? static_cast<double>(hits) / static_cast<double>(lookups)
+                 : 0.0;
+}
+
+struct InstructionCache::Entry {
+  std::string key;
+  bool cacheable = false;
+  // As decoded at its original address, except that the address space
+  // operands of LOAD and STORE ops hold the space's index
+  LiftedInstruction insn;
+  // Whether each varnode's offset follows the instruction's address, in
+  // p-code order with each op's output before its inputs
+  std::vector<bool> relative;
+};
+
+// Serves the fetch window of one instruction, and records whether the
+// decoder read it or anything else
+class InstructionCache::ShadowImage : public ghidra::LoadImage {
+public:
+  ShadowImage(void) : LoadImage("nofile") {}
+
+  void SetWindow(uint64_t base_, std::string_view window_) {
+    base = base_;
+    window = window_;
+    loaded_window = false;
+    loaded_other = false;
+  }
+
+  bool LoadedWindow(void) const { return loaded_window; }
+  bool LoadedOther(void) const { return loaded_other; }
+
+  void loadFill(unsigned char *ptr, int size,
+                const ghidra::Address &addr) override {
+    if (addr.getOffset() == base && size >= 0 &&
+        static_cast<size_t>(size) <= window.size()) {
+      std::memcpy(ptr, window.data(), static_cast<size_t>(size));
+      loaded_window = true;
+    } else {
+      // Such as the instruction in a delay slot
+      std::memset(ptr, 0, static_cast<size_t>(std::max(size, 0)));
+      loaded_other = true;
+    }
+  }
+
+  std::string getArchType(void) const override { return "memory"; }
+  void adjustVma(long) override {}
+
+private:
+  uint64_t base = 0;
+  std::string_view window;
+  bool loaded_window = false;
+  bool loaded_other = false;
+};
+
+InstructionCache::InstructionCache(const Language &language_,
+                                   size_t max_entries_)
+    : language(language_), max_entries(max_entries_) {}
+
+InstructionCache::~InstructionCache(void) = default;
+
+void InstructionCache::Lift(LanguageEngine &engine, ghidra::LoadImage &image,
+                            uint64_t address, bool disassemble, bool pcode,
+                            LiftedInstruction &insn, LiftProfile *profile) {
+  ghidra::Sleigh &translator = engine.Engine();
+  const ghidra::Address addr(translator.getDefaultCodeSpace(), address);
+
+  key.resize(kFetchWindowSize);
+  image.loadFill(reinterpret_cast<unsigned char *>(key.data()),
+                 static_cast<int>(kFetchWindowSize), addr);
+  const ghidra::ContextDatabase &ctx = engine.Context();
+  key.append(reinterpret_cast<const char *>(ctx.getContext(addr)),
+             sizeof(ghidra::uintm) *
+                 static_cast<size_t>(ctx.getContextSize()));
+  key.push_back(static_cast<char>((address & 0xf) | (disassemble ? 0x10 : 0) |
+                                  (pcode ? 0x20 : 0)));
+
+  auto it = index.find(key);
+  if (it != index.end()) {
+    entries.splice(entries.begin(), entries, it->second);
+    const Entry &entry = entries.front();
+    if (entry.cacheable) {
+      ++stats.hits;
+      CopyRelocated(translator, entry.insn, entry.relative, address, insn);
+      return;
+    }
+    ++stats.misses;
+    ++stats.uncacheable;
+    DecodeInstruction(translator, address, disassemble, pcode, insn, profile);
+    return;
+  }
+
+  ++stats.misses;
+  DecodeInstruction(translator, address, disassemble, pcode, insn, profile);
+  if (max_entries == 0) {
+    return;
+  }
+  Entry entry;
+  entry.key = key;
+  entry.insn = insn;
+  entry.cacheable = FindRelocations(entry, disassemble, pcode);
+  if (!entry.cacheable) {
+    // Only the key is needed to skip the shifted decode next time
+    ++stats.uncacheable;
+    entry.insn = {};
+    entry.relative.clear();
+  }
+  Insert(std::move(entry));
+}
+
+bool InstructionCache::FindRelocations(Entry &entry, bool disassemble,
+                                       bool pcode) {
+  if (!shadow_engine) {
+    shadow_image = std::make_unique<ShadowImage>();
+    shadow_engine = language.CreateEngine(shadow_image.get());
+    shadow_engine->Engine().allowContextSet(false);
+  }
+  ghidra::Sleigh &translator = shadow_engine->Engine();
+  ghidra::AddrSpace *code_space = translator.getDefaultCodeSpace();
+  const uint64_t address = entry.insn.address;
+  const uint64_t shadow_address =
+      code_space->wrapOffset(address + kShadowDelta);
+  const uint64_t delta = shadow_address - address;
+  const ghidra::Address shadow_addr(code_space, shadow_address);
+
+  // The shifted decode must see the same context
+  const ghidra::ContextDatabase &ctx = shadow_engine->Context();
+  const size_t context_size =
+      sizeof(ghidra::uintm) * static_cast<size_t>(ctx.getContextSize());
+  if (entry.key.size() != kFetchWindowSize + context_size + 1 ||
+      std::memcmp(ctx.getContext(shadow_addr),
+                  entry.key.data() + kFetchWindowSize, context_size) != 0) {
+    return false;
+  }
+
+  LiftedInstruction shadow;
+  const std::string_view window(entry.key.data(), kFetchWindowSize);
+  for (int attempt = 0;; ++attempt) {
+    shadow_image->SetWindow(shadow_address, window);
+    try {
+      DecodeInstruction(translator, shadow_address, disassemble, pcode, shadow);
+    } catch (ghidra::LowlevelError &) {
+      return false;
+    }
+    if (shadow_image->LoadedWindow() || attempt > 0) {
+      break;
+    }
+    // The engine still had a parse of an earlier instruction at the shifted
+    // address, so start over with empty instruction caches
+    shadow_engine->Reset(shadow_image.get());
+    translator.allowContextSet(false);
+  }
+  if (!shadow_image->LoadedWindow() || shadow_image->LoadedOther()) {
+    return false;
+  }
+
+  const LiftedInstruction &insn = entry.insn;
+  if (shadow.length != insn.length || shadow.mnemonic != insn.mnemonic ||
+      shadow.body != insn.body || shadow.pcode.size() != insn.pcode.size()) {
+    return false;
+  }
+  auto match = [&](const LiftedVarnode &vn, const LiftedVarnode &shadow_vn) {
+    if (vn.space != shadow_vn.space || vn.size != shadow_vn.size) {
+      return false;
+    }
+    if (vn.offset == shadow_vn.offset) {
+      entry.relative.push_back(false);
+      return true;
+    }
+    const auto &space = *translator.getSpace(vn.space);
+    if (RelocateOffset(space, vn.offset, vn.size, delta) == shadow_vn.offset) {
+      entry.relative.push_back(true);
+      return true;
+    }
+    // Depends on the address in some other way, such as its page
+    return false;
+  };
+  entry.relative.clear();
+  for (size_t i = 0; i < insn.pcode.size(); ++i) {
+    auto &op = entry.insn.pcode[i];
+    const auto &shadow_op = shadow.pcode[i];
+    if (op.opcode != shadow_op.opcode ||
+        op.output.has_value() != shadow_op.output.has_value() ||
+        op.inputs.size() != shadow_op.inputs.size()) {
+      return false;
+    }
+    if (op.output && !match(*op.output, *shadow_op.output)) {
+      return false;
+    }
+    for (size_t j = 0; j < op.inputs.size(); ++j) {
+      if (j == 0 && IsSpaceOperand(op.opcode)) {
+        // Refers to an address space object, which is different for every
+        // engine, so keep its index to find the space of the engine that a
+        // hit is for
+        const ghidra::int4 space_index = SpaceIndex(op.inputs[0]);
+        if (space_index != SpaceIndex(shadow_op.inputs[0])) {
+          return false;
+        }
+        op.inputs[0].offset = static_cast<uint64_t>(space_index);
+        entry.relative.push_back(false);
+      } else if (!match(op.inputs[j], shadow_op.inputs[j])) {
+        return false;
+      }
+    }
+  }
+  return true;
+}
+
+void InstructionCache::Insert(Entry entry) {
+  entries.push_front(std::move(entry));
+  index.emplace(entries.front().key, entries.begin());
+  while (entries.size() > max_entries) {
+    index.erase(entries.back().key);
+    entries.pop_back();
+    ++stats.evictions;
+  }
+}
+
+void InstructionCache::Clear(void) {
+  index.clear();
+  entries.clear();
+}
+
+InstructionCacheStats InstructionCache::Stats(void) const {
+  auto result = stats;
+  result.entries = entries.size();
+  return result;
+}
+
+} // namespace sleigh
@@ -0,0 +1,302 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include "sleigh/LanguageCache.h"
+
+#include <fstream>
+#include <sstream>
+#include <system_error>
+
+#include "sleigh/libsleigh.hh"
+
+namespace sleigh {
+
+// Translator that can decode the .sla format from memory, so that each new
+// engine doesn't have to read and decompress the file again
+class Language::CachedSleigh : public ghidra::Sleigh {
+public:
+  CachedSleigh(ghidra::LoadImage *load_image, ghidra::ContextDatabase *ctx)
+      : ghidra::Sleigh(load_image, ctx) {}
+
+  void Decode(const std::string &sla_data) {
+    ghidra::PackedDecode decoder(this);
+    std::istringstream sla_stream(sla_data);
+    decoder.ingestStream(sla_stream);
+    decode(decoder);
+  }
+};
+
+namespace {
+
+std::once_flag gMarshalInitFlag;
+
+// The attribute and element id tables need to be set up once per process
+// before anything can be decoded
+void InitializeMarshal(void) {
+  std::call_once(gMarshalInitFlag, [] {
+    ghidra::AttributeId::initialize();
+    ghidra::ElementId::initialize();
+  });
+}
+
+std::filesystem::file_time_type
+GetModificationTime(const std::filesystem::path &file_path) {
+  std::error_code ec;
+  auto mtime = std::filesystem::last_write_time(file_path, ec);
+  if (ec) {
+    throw ghidra::LowlevelError("Could not stat file: " + file_path.string());
+  }
+  return mtime;
+}
+
+// Read the .sla file, which is a compressed form of the packed format
+std::string ReadSlaFile(const std::filesystem::path &sla_path) {
+  std::ifstream sla_file(sla_path, std::ios::binary);
+  if (!sla_file) {
+    throw ghidra::LowlevelError("Could not open .sla file: " +
+                                sla_path.string());
+  }
+  if (!ghidra::sla::isSlaFormat(sla_file)) {
+    throw ghidra::LowlevelError("Missing SLA format header: " +
+                                sla_path.string());
+  }
+  std::string sla_data;
+  ghidra::Decompress decompressor;
+  std::vector<ghidra::uint1> in_buffer(1 << 16), out_buffer(1 << 16);
+  while (!decompressor.isFinished()) {
+    sla_file.read(reinterpret_cast<char *>(in_buffer.data()),
+                  static_cast<std::streamsize>(in_buffer.size()));
+    const auto in_size = static_cast<ghidra::int4>(sla_file.gcount());
+    if (in_size == 0) {
+      break;
+    }
+    decompressor.input(in_buffer.data(), in_size);
+    ghidra::int4 out_avail;
+    do {
+      const auto out_size = static_cast<ghidra::int4>(out_buffer.size());
+      out_avail = decompressor.inflate(out_buffer.data(), out_size);
+      sla_data.append(reinterpret_cast<const char *>(out_buffer.data()),
+                      static_cast<size_t>(out_size - out_avail));
+    } while (out_avail == 0);
+  }
+  return sla_data;
+}
+
+std::string CacheKey(const std::filesystem::path &sla_path,
+                     const std::optional<std::filesystem::path> &pspec_path) {
+  std::string key = std::filesystem::absolute(sla_path).string();
+  key.push_back('\0');
+  if (pspec_path) {
+    key += std::filesystem::absolute(*pspec_path).string();
+  }
+  return key;
+}
+
+} // namespace
+
+Language::Language(void) = default;
+Language::~Language(void) = default;
+
+std::shared_ptr<const Language>
+Language::Load(const std::filesystem::path &sla_path,
+               const std::optional<std::filesystem::path> &pspec_path) {
+  InitializeMarshal();
+  std::shared_ptr<Language> language(new Language);
+  language->sla_path = sla_path;
+  language->pspec_path = pspec_path;
+  language->sla_mtime = GetModificationTime(sla_path);
+  language->sla_data = ReadSlaFile(sla_path);
+
+  if (pspec_path) {
+    language->pspec_mtime = GetModificationTime(*pspec_path);
+    language->pspec_storage = std::make_unique<ghidra::DocumentStorage>();
+    const ghidra::Element *root =
+        language->pspec_storage->openDocument(pspec_path->string())
+            ->getRoot();
+    // Same lookup as Architecture::parseProcessorConfig, by name so that the
+    // decompiler's element ids aren't needed
+    for (const ghidra::Element *child : root->getChildren()) {
+      if (child->getName() == "context_data") {
+        language->context_data = child;
+        break;
+      }
+    }
+  }
+
+  // Decode once up front so that errors in the .sla file are reported here,
+  // and keep the result for the first engine
+  auto ctx = std::make_unique<ghidra::ContextInternal>();
+  auto engine = std::make_unique<CachedSleigh>(nullptr, ctx.get());
+  language->PrepareEngine(*engine, *ctx, nullptr, /*decode=*/true);
+  language->Recycle(std::move(engine));
+  return language;
+}
+
+bool Language::IsUpToDate(void) const {
+  std::error_code ec;
+  if (std::filesystem::last_write_time(sla_path, ec) != sla_mtime || ec) {
+    return false;
+  }
+  return !pspec_path ||
+         (std::filesystem::last_write_time(*pspec_path, ec) == pspec_mtime &&
+          !ec);
+}
+
+std::unique_ptr<LanguageEngine>
+Language::CreateEngine(ghidra::LoadImage *load_image) const {
+  std::unique_ptr<CachedSleigh> engine;
+  {
+    std::lock_guard<std::mutex> lock(idle_mutex);
+    if (!idle_engines.empty()) {
+      engine = std::move(idle_engines.back());
+      idle_engines.pop_back();
+    }
+  }
+  auto ctx = std::make_unique<ghidra::ContextInternal>();
+  const bool decode = !engine;
+  if (decode) {
+    engine = std::make_unique<CachedSleigh>(load_image, ctx.get());
+  }
+  PrepareEngine(*engine, *ctx, load_image, decode);
+  return std::unique_ptr<LanguageEngine>(new LanguageEngine(
+      shared_from_this(), std::move(engine), std::move(ctx)));
+}
+
+void Language::PrepareEngine(CachedSleigh &engine, ghidra::ContextInternal &ctx,
+                             ghidra::LoadImage *load_image,
+                             bool decode) const {
+  if (decode) {
+    engine.Decode(sla_data);
+  } else {
+    engine.reset(load_image, &ctx);
+  }
+  // The translator is already decoded, so this only registers the context
+  // variables with the new database and sets up the instruction caches
+  ghidra::DocumentStorage unused_storage;
+  engine.initialize(unused_storage);
+
+  // Now that context symbol names are loaded by the translator
+  // we can set the default context
+  if (context_data) {
+    ghidra::XmlDecode decoder(&engine, context_data);
+    ctx.decodeFromSpec(decoder);
+  }
+}
+
+void Language::Recycle(std::unique_ptr<CachedSleigh> engine) const {
+  // Enough to cover the engines in use at once by a typical thread pool
+  static constexpr size_t kMaxIdleEngines = 64;
+  std::lock_guard<std::mutex> lock(idle_mutex);
+  if (idle_engines.size() < kMaxIdleEngines) {
+    idle_engines.push_back(std::move(engine));
+  }
+}
+
+LanguageEngine::LanguageEngine(std::shared_ptr<const Language> language_,
+                               std::unique_ptr<Language::CachedSleigh> engine_,
+                               std::unique_ptr<ghidra::ContextInternal> ctx_)
+    : language(std::move(language_)), engine(std::move(engine_)),
+      ctx(std::move(ctx_)) {}
+
+LanguageEngine::~LanguageEngine(void) {
+  language->Recycle(std::move(engine));
+}
+
+ghidra::Sleigh &LanguageEngine::Engine(void) { return *engine; }
+
+void LanguageEngine::Reset(ghidra::LoadImage *load_image) {
+  // Context variables can't be re-registered with a database that already
+  // holds the processor spec context, so start from a fresh one
+  auto new_ctx = std::make_unique<ghidra::ContextInternal>();
+  language->PrepareEngine(*engine, *new_ctx, load_image, /*decode=*/false);
+  ctx = std::move(new_ctx);
+}
+
+LanguageCache::LanguageCache(size_t max_languages_)
+    : max_languages(max_languages_) {}
+
+LanguageCache &LanguageCache::Global(void) {
+  static LanguageCache cache;
+  return cache;
+}
+
+std::shared_ptr<const Language>
+LanguageCache::Get(const std::filesystem::path &sla_path,
+                   const std::optional<std::filesystem::path> &pspec_path) {
+  const std::string key = CacheKey(sla_path, pspec_path);
+  const auto sla_mtime = GetModificationTime(sla_path);
+  const auto pspec_mtime =
+      pspec_path ? GetModificationTime(*pspec_path)
+                 : std::filesystem::file_time_type();
+  auto is_current = [&](const Language &language) {
+    return language.sla_mtime == sla_mtime &&
+           (!pspec_path || language.pspec_mtime == pspec_mtime);
+  };
+
+  {
+    std::lock_guard<std::mutex> lock(mutex);
+    auto it = index.find(key);
+    if (it != index.end() && is_current(*it->second->second)) {
+      entries.splice(entries.begin(), entries, it->second);
+      ++stats.hits;
+      return entries.front().second;
+    }
+    ++stats.misses;
+  }
+
+  // Load without holding the lock, so that other languages can still be used
+  auto language = Language::Load(sla_path, pspec_path);
+
+  std::lock_guard<std::mutex> lock(mutex);
+  auto it = index.find(key);
+  if (it != index.end()) {
+    if (is_current(*it->second->second)) {
+      // Another thread loaded it in the meantime
+      entries.splice(entries.begin(), entries, it->second);
+      return entries.front().second;
+    }
+    entries.erase(it->second);
+    index.erase(it);
+  }
+  entries.emplace_front(key, language);
+  index.emplace(key, entries.begin());
+  EvictExcess();
+  return language;
+}
+
+void LanguageCache::SetMaxLanguages(size_t max_languages_) {
+  std::lock_guard<std::mutex> lock(mutex);
+  max_languages = max_languages_;
+  EvictExcess();
+}
+
+void LanguageCache::Clear(void) {
+  std::lock_guard<std::mutex> lock(mutex);
+  index.clear();
+  entries.clear();
+}
+
+size_t LanguageCache::Size(void) const {
+  std::lock_guard<std::mutex> lock(mutex);
+  return entries.size();
+}
+
+LanguageCacheStats LanguageCache::Stats(void) const {
+  std::lock_guard<std::mutex> lock(mutex);
+  return stats;
+}
+
+void LanguageCache::EvictExcess(void) {
+  while (entries.size() > max_languages) {
+    index.erase(entries.back().first);
+    entries.pop_back();
+    ++stats.evictions;
+  }
+}
+
+} // namespace sleigh
@@ -0,0 +1,193 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include "sleigh/LiftProfile.h"
+
+#include <algorithm>
+#include <iomanip>
+#include <ostream>
+
+namespace sleigh {
+
+namespace {
+
+void MergeInto(MnemonicProfile &into, const MnemonicProfile &from) {
+  into.count += from.count;
+  into.disassembly_ns += from.disassembly_ns;
+  into.pcode_ns += from.pcode_ns;
+  into.pcode_ops += from.pcode_ops;
+  for (const auto &[num_ops, count] : from.pcode_op_histogram) {
+    into.pcode_op_histogram[num_ops] += count;
+  }
+}
+
+double PerInstruction(uint64_t total, uint64_t count) {
+  return count ? static_cast<double>(total) / static_cast<double>(count) : 0.0;
+}
+
+void WriteJsonString(std::ostream &os, std::string_view str) {
+  static const char kHexDigits[] = "0123456789abcdef";
+  os << '"';
+  for (const char c : str) {
+    if (c == '"' || c == '\\') {
+      os << '\\' << c;
+    } else if (static_cast<unsigned char>(c) < 0x20) {
+      os << "\\u00" << kHexDigits[(c >> 4) & 0xf] << kHexDigits[c & 0xf];
+    } else {
+      os << c;
+    }
+  }
+  os << '"';
+}
+
+void WriteJsonProfile(std::ostream &os, const MnemonicProfile &profile) {
+  os << "\"count\": " << profile.count
+     << ", \"disassembly_ns\": " << profile.disassembly_ns
+     << ", \"pcode_ns\": " << profile.pcode_ns
+     << ", \"pcode_ops\": " << profile.pcode_ops
+     << ", \"pcode_op_histogram\": {";
+  bool first = true;
+  for (const auto &[num_ops, count] : profile.pcode_op_histogram) {
+    os << (first ? "" : ", ") << '"' << num_ops << "\": " << count;
+    first = false;
+  }
+  os << '}';
+}
+
+} // namespace
+
+void LiftProfile::Record(std::string_view mnemonic, uint64_t disassembly_ns,
+                         uint64_t pcode_ns,
+                         std::optional<size_t> num_pcode_ops) {
+  auto it = mnemonics.find(mnemonic);
+  if (it == mnemonics.end()) {
+    it = mnemonics.emplace(std::string(mnemonic), MnemonicProfile{}).first;
+  }
+  auto &profile = it->second;
+  ++profile.count;
+  profile.disassembly_ns += disassembly_ns;
+  profile.pcode_ns += pcode_ns;
+  if (num_pcode_ops) {
+    profile.pcode_ops += *num_pcode_ops;
+    ++profile.pcode_op_histogram[static_cast<uint32_t>(*num_pcode_ops)];
+  }
+}
+
+void LiftProfile::Merge(const LiftProfile &other) {
+  for (const auto &[mnemonic, profile] : other.mnemonics) {
+    MergeInto(mnemonics[mnemonic], profile);
+  }
+}
+
+void LiftProfile::Clear(void) { mnemonics.clear(); }
+
+MnemonicProfile LiftProfile::Total(void) const {
+  MnemonicProfile total;
+  for (const auto &entry : mnemonics) {
+    MergeInto(total, entry.second);
+  }
+  return total;
+}
+
+std::vector<std::pair<std::string_view, const MnemonicProfile *>>
+LiftProfile::SortedByTime(void) const {
+  std::vector<std::pair<std::string_view, const MnemonicProfile *>> sorted;
+  sorted.reserve(mnemonics.size());
+  for (const auto &[mnemonic, profile] : mnemonics) {
+    sorted.emplace_back(mnemonic, &profile);
+  }
+  // Ties keep the mnemonics' alphabetical order, so reports are stable
+  std::stable_sort(sorted.begin(), sorted.end(),
+                   [](const auto &a, const auto &b) {
+                     return a.second->TotalNanoseconds() >
+                            b.second->TotalNanoseconds();
+                   });
+  return sorted;
+}
+
+void LiftProfile::WriteReport(std::ostream &os, size_t max_rows) const {
+  const auto flags = os.flags();
+  const auto precision = os.precision();
+  const auto fill = os.fill(' ');
+  const MnemonicProfile total = Total();
+  os << std::dec << "Lift profile: " << total.count << " instructions, "
+     << mnemonics.size() << " mnemonics, " << std::fixed
+     << std::setprecision(3) << static_cast<double>(total.disassembly_ns) / 1e6
+     << " ms disassembling, "
+     << static_cast<double>(total.pcode_ns) / 1e6 << " ms lifting, "
+     << total.pcode_ops << " p-code ops\n";
+
+  os << std::left << std::setw(16) << "mnemonic" << std::right
+     << std::setw(10) << "count" << std::setw(8) << "time %"
+     << std::setw(12) << "disasm ns" << std::setw(12) << "pcode ns"
+     << std::setw(10) << "ops" << std::setw(8) << "max ops" << '\n';
+  const double total_ns = static_cast<double>(total.TotalNanoseconds());
+  size_t rows = 0;
+  for (const auto &[mnemonic, profile] : SortedByTime()) {
+    if (max_rows && rows++ == max_rows) {
+      break;
+    }
+    const double share =
+        total_ns > 0
+            ? 100.0 * static_cast<double>(profile->TotalNanoseconds()) /
+                  total_ns
+            : 0.0;
+    const uint32_t max_ops = profile->pcode_op_histogram.empty()
+                                 ? 0
+                                 : profile->pcode_op_histogram.rbegin()->first;
+    // Times and op counts are per instruction
+    uint64_t num_lifted = 0;
+    for (const auto &entry : profile->pcode_op_histogram) {
+      num_lifted += entry.second;
+    }
+    os << std::left << std::setw(16) << mnemonic << std::right
+       << std::setw(10) << profile->count << std::setprecision(1)
+       << std::setw(8) << share << std::setprecision(0) << std::setw(12)
+       << PerInstruction(profile->disassembly_ns, profile->count)
+       << std::setw(12) << PerInstruction(profile->pcode_ns, profile->count)
+       << std::setprecision(1) << std::setw(10)
+       << PerInstruction(profile->pcode_ops, num_lifted) << std::setw(8)
+       << max_ops << '\n';
+  }
+
+  if (!total.pcode_op_histogram.empty()) {
+    uint64_t num_lifted = 0;
+    for (const auto &entry : total.pcode_op_histogram) {
+      num_lifted += entry.second;
+    }
+    os << "P-code ops per instruction:\n";
+    for (const auto &[num_ops, count] : total.pcode_op_histogram) {
+      os << std::setw(6) << num_ops << std::setw(12) << count << std::setw(8)
+         << std::setprecision(1) << 100.0 * PerInstruction(count, num_lifted)
+         << "%\n";
+    }
+  }
+  os.flags(flags);
+  os.precision(precision);
+  os.fill(fill);
+}
+
+void LiftProfile::WriteJson(std::ostream &os) const {
+  const auto flags = os.flags();
+  os << std::dec << "{\"total\": {";
+  WriteJsonProfile(os, Total());
+  os << "},\n \"mnemonics\": [";
+  bool first = true;
+  for (const auto &[mnemonic, profile] : SortedByTime()) {
+    os << (first ? "\n" : ",\n") << "  {\"mnemonic\": ";
+    WriteJsonString(os, mnemonic);
+    os << ", ";
+    WriteJsonProfile(os, *profile);
+    os << '}';
+    first = false;
+  }
+  os << "\n ]}\n";
+  os.flags(flags);
+}
+
+} // namespace sleigh
@@ -0,0 +1,168 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include "sleigh/LiftedInstruction.h"
+
+#include <chrono>
+
+#include "sleigh/LiftProfile.h"
+#include "sleigh/libsleigh.hh"
+
+namespace sleigh {
+
+namespace {
+
+LiftedVarnode ToLiftedVarnode(const ghidra::VarnodeData &data) {
+  return {data.space->getIndex(), data.offset, data.size};
+}
+
+// Fills in the p-code ops of an instruction, reusing the ops and input
+// vectors left over from the previous instruction
+class PcodeCollector : public ghidra::PcodeEmit {
+public:
+  explicit PcodeCollector(std::vector<LiftedPcodeOp> &ops) : ops(ops) {}
+
+  ~PcodeCollector(void) { ops.resize(num_ops); }
+
+  void dump(const ghidra::Address &, ghidra::OpCode opc,
+            ghidra::VarnodeData *outvar, ghidra::VarnodeData *vars,
+            ghidra::int4 isize) override {
+    if (num_ops == ops.size()) {
+      ops.emplace_back();
+    }
+    auto &op = ops[num_ops++];
+    op.opcode = static_cast<uint32_t>(opc);
+    if (outvar) {
+      op.output = ToLiftedVarnode(*outvar);
+    } else {
+      op.output.reset();
+    }
+    op.inputs.clear();
+    for (ghidra::int4 i = 0; i < isize; ++i) {
+      op.inputs.push_back(ToLiftedVarnode(vars[i]));
+    }
+  }
+
+private:
+  std::vector<LiftedPcodeOp> &ops;
+  size_t num_ops = 0;
+};
+
+class AssemblyCollector : public ghidra::AssemblyEmit {
+public:
+  explicit AssemblyCollector(LiftedInstruction &insn) : insn(insn) {}
+
+  void dump(const ghidra::Address &, const std::string &mnemonic,
+            const std::string &body) override {
+    insn.mnemonic = mnemonic;
+    insn.body = body;
+  }
+
+private:
+  LiftedInstruction &insn;
+};
+
+// Only keeps the mnemonic, for profiling instructions that aren't disassembled
+class MnemonicCollector : public ghidra::AssemblyEmit {
+public:
+  void dump(const ghidra::Address &, const std::string &mnemonic,
+            const std::string &) override {
+    this->mnemonic = mnemonic;
+  }
+
+  std::string mnemonic;
+};
+
+uint64_t ElapsedNanoseconds(std::chrono::steady_clock::time_point start,
+                            std::chrono::steady_clock::time_point end) {
+  return static_cast<uint64_t>(
+      std::chrono::duration_cast<std::chrono::nanoseconds>(end - start)
+          .count());
+}
+
+// Same as `DecodeInstruction`, but timing each step
+void DecodeProfiled(ghidra::Sleigh &engine, const ghidra::Address &addr,
+                    bool disassemble, bool pcode, LiftedInstruction &insn,
+                    LiftProfile &profile) {
+  using Clock = std::chrono::steady_clock;
+  ghidra::int4 length = 0;
+  uint64_t disassembly_ns = 0, pcode_ns = 0;
+  if (disassemble) {
+    AssemblyCollector asm_emit(insn);
+    const auto start = Clock::now();
+    length = engine.printAssembly(asm_emit, addr);
+    disassembly_ns = ElapsedNanoseconds(start, Clock::now());
+  }
+  {
+    PcodeCollector pcode_emit(insn.pcode);
+    if (pcode) {
+      const auto start = Clock::now();
+      length = engine.oneInstruction(pcode_emit, addr);
+      pcode_ns = ElapsedNanoseconds(start, Clock::now());
+    }
+  }
+  if (length <= 0) {
+    length = engine.instructionLength(addr);
+  }
+  insn.length = static_cast<uint32_t>(length);
+  std::optional<size_t> num_pcode_ops;
+  if (pcode) {
+    num_pcode_ops = insn.pcode.size();
+  }
+  if (disassemble) {
+    profile.Record(insn.mnemonic, disassembly_ns, pcode_ns, num_pcode_ops);
+  } else {
+    MnemonicCollector mnemonic_emit;
+    engine.printAssembly(mnemonic_emit, addr);
+    profile.Record(mnemonic_emit.mnemonic, disassembly_ns, pcode_ns,
+                   num_pcode_ops);
+  }
+}
+
+} // namespace
+
+std::vector<std::string> GetSpaceNames(const ghidra::Translate &translator) {
+  std::vector<std::string> space_names(
+      static_cast<size_t>(translator.numSpaces()));
+  for (ghidra::int4 i = 0; i < translator.numSpaces(); ++i) {
+    if (auto *space = translator.getSpace(i)) {
+      space_names[static_cast<size_t>(i)] = space->getName();
+    }
+  }
+  return space_names;
+}
+
+void DecodeInstruction(ghidra::Sleigh &engine, uint64_t address,
+                       bool disassemble, bool pcode, LiftedInstruction &insn,
+                       LiftProfile *profile) {
+  const ghidra::Address addr(engine.getDefaultCodeSpace(), address);
+  insn.address = address;
+  insn.mnemonic.clear();
+  insn.body.clear();
+  if (profile) {
+    DecodeProfiled(engine, addr, disassemble, pcode, insn, *profile);
+    return;
+  }
+  ghidra::int4 length = 0;
+  if (disassemble) {
+    AssemblyCollector asm_emit(insn);
+    length = engine.printAssembly(asm_emit, addr);
+  }
+  {
+    PcodeCollector pcode_emit(insn.pcode);
+    if (pcode) {
+      length = engine.oneInstruction(pcode_emit, addr);
+    }
+  }
+  if (length <= 0) {
+    length = engine.instructionLength(addr);
+  }
+  insn.length = static_cast<uint32_t>(length);
+}
+
+} // namespace sleigh
@@ -8,42 +8,157 @@
 
 #include "sleigh/Support.h"
 
+#include <algorithm>
+#include <fstream>
+#include <map>
+#include <mutex>
+#include <system_error>
+#include <unordered_map>
+
 #include "sleigh/SpecFilePaths.h"
 
 namespace sleigh {
 
 namespace {
 
-std::optional<std::filesystem::path>
-FindSpecFileInSearchPath(std::string_view file_name,
-                         std::filesystem::path search_path) {
-  search_path.append("Ghidra").append("Processors");
-  // Check whether a Sleigh installation exists at this path
-  if (!std::filesystem::is_directory(search_path)) {
-    return {};
+// Index of the spec files found under a single search path
+struct SpecFileIndex {
+  // Modification time of '<search_path>/Ghidra/Processors' when indexed
+  std::filesystem::file_time_type processors_mtime;
+  // Whether the index was read from a manifest instead of scanned
+  bool from_manifest = false;
+  // Each processor's languages directory and its modification time when
+  // scanned
+  std::vector<std::pair<std::filesystem::path, std::filesystem::file_time_type>>
+      lang_dirs;
+  // Spec file name to full path. Names are unique, with the first processor
+  // directory in sorted order winning
+  std::unordered_map<std::string, std::filesystem::path> files;
+};
+
+std::filesystem::path ProcessorsDir(std::filesystem::path search_path) {
+  return search_path.append("Ghidra").append("Processors");
+}
+
+// Read the index from a manifest written at install time. The manifest is
+// only trusted if it is at least as new as the processor directory.
+bool ReadSpecFileManifest(const std::filesystem::path &search_path,
+                          SpecFileIndex &index) {
+  std::error_code ec;
+  const auto manifest_path = search_path / kSpecFileManifestName;
+  const auto manifest_mtime =
+      std::filesystem::last_write_time(manifest_path, ec);
+  if (ec || manifest_mtime < index.processors_mtime) {
+    return false;
   }
+  std::ifstream manifest(manifest_path);
+  if (!manifest) {
+    return false;
+  }
+  std::string line;
+  while (std::getline(manifest, line)) {
+    if (line.empty() || line[0] == '#') {
+      continue;
+    }
+    auto file_path = search_path / std::filesystem::path(line);
+    index.files.emplace(file_path.filename().string(), std::move(file_path));
+  }
+  index.from_manifest = true;
+  return true;
+}
+
+// Modification time of a path, or the earliest time if it doesn't exist
+std::filesystem::file_time_type
+LastWriteTime(const std::filesystem::path &path) {
+  std::error_code ec;
+  const auto mtime = std::filesystem::last_write_time(path, ec);
+  return ec ? std::filesystem::file_time_type::min() : mtime;
+}
+
+// Index the spec files by scanning the processor directories
+void ScanSpecFiles(const std::filesystem::path &processors_dir,
+                   SpecFileIndex &index) {
   // Each directory under Processors/ represents a family of architectures
   //
   // Spec files should reside under:
   // <root_sla_dir>/Ghidra/Processors/<arch>/data/languages
-  std::filesystem::directory_iterator install_iter(search_path);
-  for (auto &dir_entry : install_iter) {
-    if (!dir_entry.is_directory()) {
-      continue;
+  std::error_code ec;
+  std::vector<std::filesystem::path> lang_dirs;
+  for (std::filesystem::directory_iterator it(processors_dir, ec), end;
+       !ec && it != end; it.increment(ec)) {
+    if (it->is_directory(ec)) {
+      lang_dirs.push_back(it->path() / "data" / "languages");
     }
-    // Check whether the spec file exists under data/languages/
-    auto dir_path = dir_entry.path();
-    dir_path.append("data").append("languages").append(file_name);
-    if (!std::filesystem::exists(dir_path)) {
-      continue;
+  }
+  std::sort(lang_dirs.begin(), lang_dirs.end());
+
+  for (const auto &lang_dir : lang_dirs) {
+    index.lang_dirs.emplace_back(lang_dir, LastWriteTime(lang_dir));
+    for (std::filesystem::directory_iterator it(lang_dir, ec), end;
+         !ec && it != end; it.increment(ec)) {
+      if (!it->is_directory(ec)) {
+        index.files.emplace(it->path().filename().string(), it->path());
+      }
     }
-    return dir_path;
+    // A processor without a languages directory is not an error
+    ec.clear();
   }
-  return {};
+}
+
+// Index for each search path, rebuilt when the processor directory changes
+std::mutex gSpecFileIndexMutex;
+std::map<std::filesystem::path, SpecFileIndex> gSpecFileIndexes;
+
+// Get the up-to-date index for a search path, or nullptr if it doesn't
+// contain a Sleigh installation. Caller must hold gSpecFileIndexMutex.
+const SpecFileIndex *GetSpecFileIndex(const std::filesystem::path &search_path,
+                                      bool force_scan = false) {
+  const auto processors_dir = ProcessorsDir(search_path);
+  std::error_code ec;
+  const auto processors_mtime =
+      std::filesystem::last_write_time(processors_dir, ec);
+  // Check whether a Sleigh installation exists at this path
+  if (ec || !std::filesystem::is_directory(processors_dir, ec)) {
+    gSpecFileIndexes.erase(search_path);
+    return nullptr;
+  }
+
+  auto it = gSpecFileIndexes.find(search_path);
+  if (it != gSpecFileIndexes.end() && !force_scan &&
+      it->second.processors_mtime == processors_mtime) {
+    return &it->second;
+  }
+
+  SpecFileIndex index;
+  index.processors_mtime = processors_mtime;
+  if (force_scan || !ReadSpecFileManifest(search_path, index)) {
+    ScanSpecFiles(processors_dir, index);
+  }
+  auto &entry = gSpecFileIndexes[search_path];
+  entry = std::move(index);
+  return &entry;
+}
+
+// Whether files may have been added to or removed from the processors'
+// languages directories since the index was built. That doesn't change the
+// processor directory itself, so it is only checked when needed
+bool LanguageDirsChanged(const SpecFileIndex &index) {
+  if (index.from_manifest) {
+    // The manifest may predate the files
+    return true;
+  }
+  for (const auto &[lang_dir, mtime] : index.lang_dirs) {
+    if (LastWriteTime(lang_dir) != mtime) {
+      return true;
+    }
+  }
+  return false;
 }
 
 } // namespace
 
+const char *const kSpecFileManifestName = "sleigh-spec-manifest.txt";
+
 const std::vector<std::filesystem::path> gDefaultSearchPaths = {
     // Derived from the installation
     kSleighFullSpecInstallDir,
@@ -56,15 +171,58 @@ const std::vector<std::filesystem::path> gDefaultSearchPaths = {
 std::optional<std::filesystem::path>
 FindSpecFile(std::string_view file_name,
              const std::vector<std::filesystem::path> &search_paths) {
+  const std::string name(file_name);
+  std::lock_guard<std::mutex> lock(gSpecFileIndexMutex);
   // Search each path for spec files
   for (const auto &path : search_paths) {
-    auto file_path = FindSpecFileInSearchPath(file_name, path);
-    if (file_path) {
-      return file_path;
+    const auto *index = GetSpecFileIndex(path);
+    if (!index) {
+      continue;
+    }
+    auto it = index->files.find(name);
+    if (it != index->files.end() && std::filesystem::exists(it->second)) {
+      return it->second;
+    }
+    // Either the file was added or removed without touching the processor
+    // directory, or it isn't here. Rescan if a languages directory changed
+    // before moving on to the next path, which only costs a stat of each of
+    // them when nothing did
+    if (it == index->files.end() && !LanguageDirsChanged(*index)) {
+      continue;
+    }
+    index = GetSpecFileIndex(path, /*force_scan=*/true);
+    if (!index) {
+      continue;
+    }
+    it = index->files.find(name);
+    if (it != index->files.end()) {
+      return it->second;
     }
   }
   // Cannot find the spec file
   return {};
 }
 
+std::vector<std::filesystem::path>
+ListSpecFiles(const std::vector<std::filesystem::path> &search_paths) {
+  std::map<std::string, std::filesystem::path> spec_files;
+  std::lock_guard<std::mutex> lock(gSpecFileIndexMutex);
+  for (const auto &path : search_paths) {
+    const auto *index = GetSpecFileIndex(path);
+    if (index && LanguageDirsChanged(*index)) {
+      index = GetSpecFileIndex(path, /*force_scan=*/true);
+    }
+    if (index) {
+      // Earlier search paths take precedence, like in FindSpecFile
+      spec_files.insert(index->files.begin(), index->files.end());
+    }
+  }
+  std::vector<std::filesystem::path> result;
+  result.reserve(spec_files.size());
+  for (auto &[name, file_path] : spec_files) {
+    result.push_back(std::move(file_path));
+  }
+  return result;
+}
+
 } // namespace sleigh
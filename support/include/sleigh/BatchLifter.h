@@ -0,0 +1,79 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <optional>
+#include <string>
+#include <vector>
+
+#include "sleigh/LiftProfile.h"
+#include "sleigh/LiftedInstruction.h"
+
+namespace ghidra {
+class LoadImage;
+} // namespace ghidra
+
+namespace sleigh {
+
+class Language;
+
+// A range of addresses to decode, in the default code space
+struct LiftRegion {
+  uint64_t address;
+  uint64_t length;
+};
+
+struct RegionLiftResult {
+  LiftRegion region;
+  // Instructions decoded in address order, up to the first error if any
+  std::vector<LiftedInstruction> instructions;
+  // Set if decoding stopped early, along with the address that failed
+  std::optional<std::string> error;
+  uint64_t error_address = 0;
+};
+
+struct BatchLiftResult {
+  // Names of the language's address spaces, by space index, which is what
+  // the varnodes refer to
+  std::vector<std::string> space_names;
+  // One result per requested region, in the same order
+  std::vector<RegionLiftResult> regions;
+  // Decoding costs of all regions, if profiling was requested
+  LiftProfile profile;
+};
+
+struct BatchLiftOptions {
+  // Number of worker threads. Zero uses the hardware concurrency
+  size_t num_threads = 0;
+  bool disassemble = true;
+  bool pcode = true;
+  // Record per-mnemonic decoding costs in the result's profile
+  bool profile = false;
+};
+
+// Decode every region on a pool of worker threads, each with its own engine
+// created from `language`. Regions are handed out one at a time, so uneven
+// region sizes are balanced between the workers.
+//
+// Each engine reads from `image`, so its `loadFill` must be safe to call from
+// several threads at once, which is the case for images backed by memory
+// that isn't modified during the call. Decoding errors end their region, and
+// are reported in its result without affecting other regions. Regions that
+// run past the top of the code space are not decoded and get an error.
+//
+// Like the engines used with `InstructionCache`, the workers' engines don't
+// commit context changes to following instructions, so the results don't
+// depend on the number of threads.
+BatchLiftResult LiftRegions(const Language &language, ghidra::LoadImage &image,
+                            const std::vector<LiftRegion> &regions,
+                            const BatchLiftOptions &options = {});
+
+} // namespace sleigh
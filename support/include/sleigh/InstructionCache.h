@@ -0,0 +1,111 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <list>
+#include <memory>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+#include "sleigh/LiftedInstruction.h"
+
+namespace ghidra {
+class LoadImage;
+} // namespace ghidra
+
+namespace sleigh {
+
+class Language;
+class LanguageEngine;
+
+struct InstructionCacheStats {
+  uint64_t hits = 0;
+  uint64_t misses = 0;
+  // Misses for instructions that can't be cached, because their decoding
+  // depends on their address in a way that can't be relocated or on bytes
+  // outside of the fetch window
+  uint64_t uncacheable = 0;
+  uint64_t evictions = 0;
+  size_t entries = 0;
+
+  // Fraction of lookups that were hits, or zero before the first lookup
+  double HitRate(void) const;
+};
+
+// Memoizes decoded instructions for lifting the same code repeatedly, e.g.
+// common library functions across many binaries.
+//
+// Entries are keyed by everything that can affect decoding besides the
+// address: the bytes the decoder fetches for an instruction, which is a fixed
+// window larger than the instruction itself, the context register values at
+// the address, and the low bits of the address, so that alignment-dependent
+// semantics are never relocated. On a miss, the instruction is also decoded
+// at a shifted address to find which varnode offsets follow the instruction's
+// address, and those are relocated to the requested address on a hit.
+//
+// Engines used with the cache must not commit context changes to following
+// instructions (see `ghidra::Sleigh::allowContextSet`), since a hit skips
+// decoding altogether. Entries don't refer to the engine that decoded them,
+// so one cache can serve any of the engines created from its language, but
+// it must not be used by several threads at once.
+class InstructionCache {
+public:
+  static constexpr size_t kDefaultMaxEntries = 1 << 16;
+
+  explicit InstructionCache(const Language &language,
+                            size_t max_entries = kDefaultMaxEntries);
+  ~InstructionCache(void);
+
+  InstructionCache(const InstructionCache &) = delete;
+  InstructionCache &operator=(const InstructionCache &) = delete;
+
+  // Same as `DecodeInstruction` with `engine`, which must be created from the
+  // cache's language and read from `image`, using a cached instruction if
+  // there is one. Throws ghidra::LowlevelError if the instruction can't be
+  // decoded. Only misses are recorded in `profile`, since hits don't decode
+  // anything.
+  void Lift(LanguageEngine &engine, ghidra::LoadImage &image, uint64_t address,
+            bool disassemble, bool pcode, LiftedInstruction &insn,
+            LiftProfile *profile = nullptr);
+
+  void Clear(void);
+
+  InstructionCacheStats Stats(void) const;
+
+private:
+  struct Entry;
+  class ShadowImage;
+
+  // Decode the entry's instruction again at a shifted address, and fill in
+  // which of its varnodes are relative to the address. Returns false if the
+  // instruction can't be cached.
+  bool FindRelocations(Entry &entry, bool disassemble, bool pcode);
+
+  void Insert(Entry entry);
+
+  const Language &language;
+  size_t max_entries;
+  InstructionCacheStats stats;
+
+  // Engine for the shifted decodes, created on the first miss
+  std::unique_ptr<ShadowImage> shadow_image;
+  std::unique_ptr<LanguageEngine> shadow_engine;
+
+  // Scratch space for building keys
+  std::string key;
+
+  // Most recently used first
+  std::list<Entry> entries;
+  std::unordered_map<std::string, std::list<Entry>::iterator> index;
+};
+
+} // namespace sleigh
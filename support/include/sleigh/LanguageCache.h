@@ -0,0 +1,172 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <filesystem>
+#include <list>
+#include <memory>
+#include <mutex>
+#include <optional>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+namespace ghidra {
+class ContextInternal;
+class Element;
+class DocumentStorage;
+class LoadImage;
+class Sleigh;
+} // namespace ghidra
+
+namespace sleigh {
+
+class LanguageEngine;
+
+// A compiled language, loaded from its .sla file and optional processor spec.
+//
+// Loading reads and decompresses the .sla file and parses the processor spec
+// once. Engines are then created from the loaded data without touching the
+// filesystem, and engines that are destroyed are kept to be reset and reused
+// by the next engine for the language, which skips decoding altogether.
+class Language : public std::enable_shared_from_this<Language> {
+public:
+  // Throws ghidra::LowlevelError if the files can't be read or parsed
+  static std::shared_ptr<const Language>
+  Load(const std::filesystem::path &sla_path,
+       const std::optional<std::filesystem::path> &pspec_path = {});
+
+  ~Language(void);
+
+  Language(const Language &) = delete;
+  Language &operator=(const Language &) = delete;
+
+  // Create an engine reading from `load_image` with its own context, set to
+  // the defaults from the processor spec. The load image must outlive the
+  // engine, or be replaced with `LanguageEngine::Reset` before it is
+  // destroyed. Engines may be used concurrently with each other.
+  std::unique_ptr<LanguageEngine> CreateEngine(ghidra::LoadImage *load_image) const;
+
+  // Whether the language's files still have the modification times they had
+  // when it was loaded. False if they can't be found anymore.
+  bool IsUpToDate(void) const;
+
+  const std::filesystem::path &SlaPath(void) const { return sla_path; }
+  const std::optional<std::filesystem::path> &PspecPath(void) const {
+    return pspec_path;
+  }
+
+private:
+  friend class LanguageEngine;
+  friend class LanguageCache;
+  class CachedSleigh;
+
+  Language(void);
+
+  // Reset an engine and its new context for reading from `load_image`
+  void PrepareEngine(CachedSleigh &engine, ghidra::ContextInternal &ctx,
+                     ghidra::LoadImage *load_image, bool decode) const;
+
+  // Keep a destroyed engine's translator around for reuse
+  void Recycle(std::unique_ptr<CachedSleigh> engine) const;
+
+  std::filesystem::path sla_path;
+  std::optional<std::filesystem::path> pspec_path;
+  std::filesystem::file_time_type sla_mtime, pspec_mtime;
+
+  // Decompressed contents of the .sla file
+  std::string sla_data;
+
+  // Processor spec document and its `context_data` element, if any
+  std::unique_ptr<ghidra::DocumentStorage> pspec_storage;
+  const ghidra::Element *context_data = nullptr;
+
+  // Initialized translators from destroyed engines
+  mutable std::mutex idle_mutex;
+  mutable std::vector<std::unique_ptr<CachedSleigh>> idle_engines;
+};
+
+// A Sleigh engine and context database created from a Language
+class LanguageEngine {
+public:
+  ~LanguageEngine(void);
+
+  LanguageEngine(const LanguageEngine &) = delete;
+  LanguageEngine &operator=(const LanguageEngine &) = delete;
+
+  ghidra::Sleigh &Engine(void);
+  ghidra::ContextInternal &Context(void) { return *ctx; }
+  const Language &GetLanguage(void) const { return *language; }
+
+  // Switch to a new load image. This clears all cached instructions and
+  // restores the processor spec's default context, without decoding the
+  // .sla file again.
+  void Reset(ghidra::LoadImage *load_image);
+
+private:
+  friend class Language;
+
+  LanguageEngine(std::shared_ptr<const Language> language,
+                 std::unique_ptr<Language::CachedSleigh> engine,
+                 std::unique_ptr<ghidra::ContextInternal> ctx);
+
+  std::shared_ptr<const Language> language;
+  std::unique_ptr<Language::CachedSleigh> engine;
+  std::unique_ptr<ghidra::ContextInternal> ctx;
+};
+
+struct LanguageCacheStats {
+  uint64_t hits = 0;
+  uint64_t misses = 0;
+  uint64_t evictions = 0;
+};
+
+// Bounded cache of loaded languages, keyed by the paths of their .sla and
+// processor spec files. Entries are reloaded if either file's modification
+// time changes, and the least recently used language is evicted when the
+// cache is full. Evicted languages stay alive while engines still use them.
+class LanguageCache {
+public:
+  static constexpr size_t kDefaultMaxLanguages = 16;
+
+  explicit LanguageCache(size_t max_languages = kDefaultMaxLanguages);
+
+  // The process-wide cache
+  static LanguageCache &Global(void);
+
+  // Get a loaded language, loading it if it isn't cached or is out of date.
+  // Throws ghidra::LowlevelError if the language can't be loaded.
+  std::shared_ptr<const Language>
+  Get(const std::filesystem::path &sla_path,
+      const std::optional<std::filesystem::path> &pspec_path = {});
+
+  void SetMaxLanguages(size_t max_languages);
+  void Clear(void);
+
+  size_t Size(void) const;
+  LanguageCacheStats Stats(void) const;
+
+private:
+  using Entry = std::pair<std::string, std::shared_ptr<const Language>>;
+
+  // Evict entries over the limit. Caller must hold the mutex
+  void EvictExcess(void);
+
+  mutable std::mutex mutex;
+  size_t max_languages;
+  LanguageCacheStats stats;
+
+  // Most recently used first
+  std::list<Entry> entries;
+  std::unordered_map<std::string, std::list<Entry>::iterator> index;
+};
+
+} // namespace sleigh
@@ -0,0 +1,85 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <functional>
+#include <iosfwd>
+#include <map>
+#include <optional>
+#include <string>
+#include <string_view>
+#include <utility>
+#include <vector>
+
+namespace sleigh {
+
+// Number of instructions by how many p-code ops they lifted to
+using PcodeOpHistogram = std::map<uint32_t, uint64_t>;
+
+struct MnemonicProfile {
+  uint64_t count = 0;
+  // Cumulative nanoseconds spent in `printAssembly` and `oneInstruction`
+  uint64_t disassembly_ns = 0;
+  uint64_t pcode_ns = 0;
+  uint64_t pcode_ops = 0;
+  // Only counts the instructions that were lifted to p-code
+  PcodeOpHistogram pcode_op_histogram;
+
+  uint64_t TotalNanoseconds(void) const { return disassembly_ns + pcode_ns; }
+};
+
+// Per-mnemonic decoding costs, for finding the instructions that make lifting
+// slow, e.g. after a Ghidra update.
+//
+// Profiling is enabled by passing a profile to `DecodeInstruction` or
+// `InstructionCache::Lift`, and costs nothing otherwise, so it can be turned
+// on for a sample of the work. When an instruction is both disassembled and
+// lifted, `printAssembly` runs first and parses the instruction, so
+// `oneInstruction` only pays for generating p-code. When it is only lifted,
+// it is also disassembled to find its mnemonic, which isn't counted.
+//
+// A profile must not be used by several threads at once, but profiles from
+// several threads can be merged.
+class LiftProfile {
+public:
+  // Record one decoded instruction. The p-code op count is only given if the
+  // instruction was lifted to p-code
+  void Record(std::string_view mnemonic, uint64_t disassembly_ns,
+              uint64_t pcode_ns, std::optional<size_t> num_pcode_ops);
+
+  void Merge(const LiftProfile &other);
+
+  void Clear(void);
+
+  // Totals over all mnemonics
+  MnemonicProfile Total(void) const;
+
+  const std::map<std::string, MnemonicProfile, std::less<>> &
+  Mnemonics(void) const {
+    return mnemonics;
+  }
+
+  // Mnemonics from the most to the least total time
+  std::vector<std::pair<std::string_view, const MnemonicProfile *>>
+  SortedByTime(void) const;
+
+  // A table of the `max_rows` most expensive mnemonics, or of all of them if
+  // zero, and the p-code ops per instruction histogram
+  void WriteReport(std::ostream &os, size_t max_rows = 0) const;
+
+  // The totals and every mnemonic, sorted like the report
+  void WriteJson(std::ostream &os) const;
+
+private:
+  std::map<std::string, MnemonicProfile, std::less<>> mnemonics;
+};
+
+} // namespace sleigh
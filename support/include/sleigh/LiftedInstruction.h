@@ -0,0 +1,60 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#pragma once
+
+#include <cstdint>
+#include <optional>
+#include <string>
+#include <vector>
+
+namespace ghidra {
+class Sleigh;
+class Translate;
+} // namespace ghidra
+
+namespace sleigh {
+
+class LiftProfile;
+
+struct LiftedVarnode {
+  // Index of the address space in the translator, see `GetSpaceNames`
+  int32_t space;
+  uint64_t offset;
+  uint32_t size;
+};
+
+struct LiftedPcodeOp {
+  // A ghidra::OpCode
+  uint32_t opcode;
+  std::optional<LiftedVarnode> output;
+  std::vector<LiftedVarnode> inputs;
+};
+
+struct LiftedInstruction {
+  uint64_t address;
+  uint32_t length;
+  // Only set when disassembling
+  std::string mnemonic, body;
+  // Only set when lifting p-code
+  std::vector<LiftedPcodeOp> pcode;
+};
+
+// Names of the translator's address spaces, by space index. Space indices are
+// the same for every engine of a language.
+std::vector<std::string> GetSpaceNames(const ghidra::Translate &translator);
+
+// Decode the instruction at `address` in the default code space into `insn`,
+// reusing its storage. Throws ghidra::LowlevelError (including UnimplError and
+// BadDataError) if the instruction can't be decoded. If `profile` is given,
+// the time spent decoding is recorded in it, see `LiftProfile`.
+void DecodeInstruction(ghidra::Sleigh &engine, uint64_t address,
+                       bool disassemble, bool pcode, LiftedInstruction &insn,
+                       LiftProfile *profile = nullptr);
+
+} // namespace sleigh
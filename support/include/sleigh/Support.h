@@ -17,9 +17,23 @@ namespace sleigh {
 
 extern const std::vector<std::filesystem::path> gDefaultSearchPaths;
 
+// Name of the optional manifest file at the root of a search path, listing
+// the spec files under it one per line, relative to the search path
+extern const char *const kSpecFileManifestName;
+
+// Find a spec file by name. Each search path is indexed on first use, from its
+// manifest if there is an up-to-date one, and reindexed whenever its
+// 'Ghidra/Processors' directory is modified. Files added to an existing
+// processor are found by reindexing on a miss, if any processor's languages
+// directory was modified since the last scan.
 std::optional<std::filesystem::path>
 FindSpecFile(std::string_view file_name,
              const std::vector<std::filesystem::path> &search_paths =
                  gDefaultSearchPaths);
 
+// List every spec file that FindSpecFile can find, sorted by file name
+std::vector<std::filesystem::path>
+ListSpecFiles(const std::vector<std::filesystem::path> &search_paths =
+                  gDefaultSearchPaths);
+
 } // namespace sleigh
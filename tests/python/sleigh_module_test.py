@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Tests of the `sleigh` Python module
+
+Usage: sleigh_module_test.py module_dir spec_files_root [unittest arguments]
+"""
+
+import array
+import importlib
+import struct
+import sys
+import threading
+import time
+import unittest
+from typing import Any, List, Optional
+
+# Set from the command line
+sleigh: Any = None
+SPEC_ROOT = ""
+
+SLA_FILE = "ARM8_le.sla"
+
+# `cmp r0, #0`, `beq 0x1010`, `mov r0, #1`, `bx lr`, `bl 0x101c`,
+# `b 0x1008`, an undefined word and `bx lr`, at 0x1000
+CODE_ADDRESS = 0x1000
+CODE = bytes.fromhex("000050e30100000a0100a0e31eff2fe1010000ebfbffffeaffffffff1eff2fe1")
+MNEMONICS = ["cmp", "beq", "mov", "bx", "bl", "b"]
+
+# `mov r0, #1` repeated, which takes a while to lift
+MANY_MOVS = bytes.fromhex("0100a0e3") * 100000
+
+COLUMN_FORMATS = {
+    "insn_address": "Q",
+    "insn_length": "I",
+    "insn_op_count": "I",
+    "op_address": "Q",
+    "opcode": "I",
+    "op_output": "q",
+    "op_input_start": "Q",
+    "op_input_count": "I",
+    "varnode_space": "i",
+    "varnode_offset": "Q",
+    "varnode_size": "I",
+}
+
+
+def columns(result: Any) -> dict:
+    """The result's columns as lists, by name."""
+    return {name: getattr(result, name).tolist() for name in COLUMN_FORMATS}
+
+
+class LiftTest(unittest.TestCase):
+    language: Any = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.language = sleigh.Language(SLA_FILE, search_paths=[SPEC_ROOT])
+
+    def test_columns(self) -> None:
+        result = self.language.lift(CODE[:24], CODE_ADDRESS, disassemble=True)
+        for name, fmt in COLUMN_FORMATS.items():
+            view = memoryview(getattr(result, name))
+            self.assertEqual(view.format, fmt, name)
+            self.assertEqual(view.itemsize, struct.calcsize(fmt), name)
+            self.assertEqual(len(view), len(getattr(result, name)), name)
+            self.assertTrue(view.readonly, name)
+
+        self.assertIsNone(result.error)
+        self.assertIsNone(result.error_address)
+        self.assertEqual(result.mnemonic, MNEMONICS)
+        self.assertEqual(len(result.body), len(MNEMONICS))
+        self.assertEqual(
+            result.insn_address.tolist(),
+            [CODE_ADDRESS + 4 * i for i in range(len(MNEMONICS))],
+        )
+        self.assertEqual(result.insn_length.tolist(), [4] * len(MNEMONICS))
+
+        # Ops belong to the instructions in order
+        op_counts = result.insn_op_count.tolist()
+        self.assertEqual(
+            result.op_address.tolist(),
+            [
+                address
+                for address, count in zip(result.insn_address.tolist(), op_counts)
+                for _ in range(count)
+            ],
+        )
+        # Each op's output comes right before its inputs, with no gaps
+        num_varnodes = 0
+        for output, start, count in zip(
+            result.op_output.tolist(),
+            result.op_input_start.tolist(),
+            result.op_input_count.tolist(),
+        ):
+            if output >= 0:
+                self.assertEqual(output, num_varnodes)
+                num_varnodes += 1
+            self.assertEqual(start, num_varnodes)
+            num_varnodes += count
+        for name in ["varnode_space", "varnode_offset", "varnode_size"]:
+            self.assertEqual(len(getattr(result, name)), num_varnodes)
+        self.assertLess(
+            max(result.varnode_space.tolist()), len(self.language.space_names)
+        )
+        self.assertTrue(all(sleigh.OPCODE_NAMES[op] for op in result.opcode.tolist()))
+
+        # Without disassembly or p-code
+        result = self.language.lift(CODE[:24], CODE_ADDRESS, pcode=False)
+        self.assertIsNone(result.mnemonic)
+        self.assertEqual(len(result.insn_address), len(MNEMONICS))
+        self.assertEqual(len(result.opcode), 0)
+        self.assertEqual(result.insn_op_count.tolist(), [0] * len(MNEMONICS))
+
+    def test_buffer_types(self) -> None:
+        expected = columns(self.language.lift(CODE[:24], CODE_ADDRESS))
+        padded = b"\0" * 4 + CODE[:24] + b"\0" * 4
+        for data in [
+            bytearray(CODE[:24]),
+            memoryview(CODE[:24]),
+            # Read in place from the middle of a larger buffer
+            memoryview(padded)[4:-4],
+            array.array("I", CODE[:24]),
+        ]:
+            with self.subTest(type=type(data).__name__):
+                result = self.language.lift(data, CODE_ADDRESS)
+                self.assertEqual(columns(result), expected)
+
+        # Data that would have to be copied to be contiguous isn't accepted
+        with self.assertRaises(BufferError):
+            self.language.lift(memoryview(padded)[::2], CODE_ADDRESS)
+
+    def test_decode_error(self) -> None:
+        result = self.language.lift(CODE, CODE_ADDRESS, disassemble=True)
+        self.assertEqual(result.mnemonic, MNEMONICS)
+        self.assertIsInstance(result.error, str)
+        self.assertNotEqual(result.error, "")
+        self.assertEqual(result.error_address, CODE_ADDRESS + 24)
+
+        # Stopping early isn't an error
+        result = self.language.lift(CODE, CODE_ADDRESS, max_instructions=2)
+        self.assertEqual(len(result.insn_address), 2)
+        self.assertIsNone(result.error)
+
+    def test_address_space_overflow(self) -> None:
+        # The data may end at the top of the address space, but not go past it
+        result = self.language.lift(CODE[:4], 0xFFFFFFFC)
+        self.assertEqual(result.insn_address.tolist(), [0xFFFFFFFC])
+        for address, data in [
+            (0xFFFFFFFC, CODE[:8]),
+            (0x100000000, CODE[:4]),
+            (0xFFFFFFFFFFFFFFFF, b""),
+        ]:
+            with self.subTest(address=hex(address)):
+                with self.assertRaises(ValueError):
+                    self.language.lift(data, address)
+
+    def test_concurrent_lifts(self) -> None:
+        expected = columns(self.language.lift(MANY_MOVS))
+        # When each lift started and ended, by thread
+        lift_times: List[Optional[tuple]] = [None, None]
+        results: List[Any] = [None, None]
+
+        def lift(index: int) -> None:
+            start = time.monotonic()
+            results[index] = self.language.lift(MANY_MOVS)
+            lift_times[index] = (start, time.monotonic())
+
+        threads = [threading.Thread(target=lift, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        # This thread keeps running Python code while the others lift
+        ticks = []
+        while any(thread.is_alive() for thread in threads):
+            ticks.append(time.monotonic())
+        for thread in threads:
+            thread.join()
+
+        for result in results:
+            self.assertEqual(columns(result), expected)
+        # The GIL is released while decoding, so this thread ran in the middle
+        # of both lifts and the lifts overlapped
+        starts, ends = zip(*lift_times)  # type: ignore[misc]
+        middle_start = max(starts) + (min(ends) - max(starts)) / 4
+        middle_end = min(ends) - (min(ends) - max(starts)) / 4
+        self.assertLess(middle_start, middle_end)
+        self.assertTrue(any(middle_start < tick < middle_end for tick in ticks))
+
+
+class LanguageTest(unittest.TestCase):
+    def test_missing_language(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            sleigh.Language("missing.sla", search_paths=[SPEC_ROOT])
+
+
+def main(argv: List[str]) -> int:
+    global sleigh, SPEC_ROOT
+    if len(argv) < 3:
+        print(__doc__, file=sys.stderr)
+        return 1
+    sys.path.insert(0, argv[1])
+    sleigh = importlib.import_module("sleigh")
+    SPEC_ROOT = argv[2]
+    program = unittest.main(argv=[argv[0], *argv[3:]], exit=False)
+    return 0 if program.result.wasSuccessful() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Tests of the update_ghidra_head.py script, against local repositories
+
+Usage: update_ghidra_head_test.py [unittest arguments]
+"""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+import update_ghidra_head  # noqa: E402
+
+# How long concurrent runs may take to reach each other
+CONCURRENT_RUN_TIMEOUT = 60
+
+# Commits made with a fixed identity, regardless of the user's configuration
+GIT_ENV = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "Test",
+    "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test",
+    "GIT_COMMITTER_EMAIL": "test@example.com",
+    "GIT_CONFIG_GLOBAL": os.devnull,
+    "GIT_CONFIG_NOSYSTEM": "1",
+}
+
+
+def git(repo_dir: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args],
+        cwd=repo_dir,
+        env=GIT_ENV,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.strip()
+
+
+class StandInRepo:
+    """A local repository standing in for Ghidra's, with only the files the
+    script looks at."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.mkdir()
+        git(path, "init", "--quiet", "--initial-branch=master")
+        # Needed to clone with --filter from a local repository
+        git(path, "config", "uploadpack.allowFilter", "true")
+        self.commit(
+            {
+                "Ghidra/application.properties": "application.version=12.0\n",
+                "Ghidra/Processors/Toy/data/languages/toy.slaspec": "define;\n",
+            }
+        )
+
+    @property
+    def url(self) -> str:
+        return self.path.as_uri()
+
+    def commit(self, files: Dict[str, str]) -> str:
+        """Commit the files with their contents and return the new commit"""
+        for name, contents in files.items():
+            file_path = self.path / name
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(contents)
+            git(self.path, "add", name)
+        git(self.path, "commit", "--quiet", "-m", f"Change {', '.join(files)}")
+        return git(self.path, "rev-parse", "HEAD")
+
+
+class MirrorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.upstream = StandInRepo(Path(temp_dir.name) / "upstream")
+        self.cache_dir = Path(temp_dir.name) / "cache"
+        self.fetches = 0
+
+    def updater(self) -> update_ghidra_head.GhidraUpdater:
+        """An updater using the cache directory, which counts its fetches"""
+        updater = update_ghidra_head.GhidraUpdater(
+            dry_run=True, cache_dir=self.cache_dir, ghidra_url=self.upstream.url
+        )
+        fetch = updater.git.fetch
+
+        def counted_fetch(repo_dir: Path, repo_url: str) -> None:
+            self.fetches += 1
+            fetch(repo_dir, repo_url)
+
+        updater.git.fetch = counted_fetch  # type: ignore[method-assign]
+        return updater
+
+    def mirror_head(self) -> str:
+        with self.updater().ghidra_repo() as repo_dir:
+            return git(repo_dir, "rev-parse", "HEAD")
+
+    def test_first_clone(self) -> None:
+        # Git's output goes to the same file, so it needs a file descriptor
+        with tempfile.TemporaryFile("w+") as output, contextlib.redirect_stdout(output):
+            with self.updater().ghidra_repo() as repo_dir:
+                self.assertEqual(repo_dir, self.cache_dir / "ghidra")
+                self.assertEqual(
+                    git(repo_dir, "rev-parse", "HEAD"),
+                    git(self.upstream.path, "rev-parse", "HEAD"),
+                )
+                self.assertEqual(
+                    git(repo_dir, "config", "remote.origin.partialclonefilter"),
+                    "blob:none",
+                )
+                self.assertTrue(
+                    (repo_dir / "Ghidra/Processors/Toy/data/languages").is_dir()
+                )
+            output.seek(0)
+            printed = output.read()
+        self.assertEqual(self.fetches, 0)
+        # Nobody else held the lock
+        self.assertIn("Cloning", printed)
+        self.assertNotIn("Waiting for lock", printed)
+
+    def test_incremental_fetch(self) -> None:
+        self.mirror_head()
+        marker = self.cache_dir / "ghidra" / ".git" / "kept"
+        marker.touch()
+
+        new_commit = self.upstream.commit(
+            {"Ghidra/Processors/Toy/data/languages/toy.sinc": "define;\n"}
+        )
+        self.assertEqual(self.mirror_head(), new_commit)
+        self.assertEqual(self.fetches, 1)
+        # The mirror was fetched into rather than cloned again
+        self.assertTrue(marker.exists())
+
+    @unittest.skipIf(sys.platform == "win32", "needs shared locks")
+    def test_concurrent_runs(self) -> None:
+        self.mirror_head()
+        new_commit = self.upstream.commit(
+            {"Ghidra/Processors/Toy/data/languages/toy.sinc": "define;\n"}
+        )
+
+        # Both runs start while another process holds the lock, and then have
+        # to be using the mirror at the same time to get past the barrier
+        both_reading = threading.Barrier(2, timeout=CONCURRENT_RUN_TIMEOUT)
+        heads: List[str] = []
+        errors: List[BaseException] = []
+
+        def run() -> None:
+            try:
+                with self.updater().ghidra_repo() as repo_dir:
+                    both_reading.wait()
+                    heads.append(git(repo_dir, "rev-parse", "HEAD"))
+            except BaseException as e:
+                errors.append(e)
+
+        self.cache_dir.mkdir(exist_ok=True)
+        lock_path = self.cache_dir / update_ghidra_head.MIRROR_LOCK_FILE
+        with lock_path.open("a+") as lock_file:
+            update_ghidra_head._lock_file(lock_file)
+            threads = [threading.Thread(target=run) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            # Let both runs start waiting for the lock
+            threading.Event().wait(0.5)
+            update_ghidra_head._unlock_file(lock_file)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(heads, [new_commit, new_commit])
+        # The second run used the first one's fetch
+        self.assertEqual(self.fetches, 1)
+
+
+class SpecGraphTest(unittest.TestCase):
+    def test_includes(self) -> None:
+        languages = "Ghidra/Processors/Toy/data/languages/"
+        spec, spec64 = languages + "toy.slaspec", languages + "toy64.slaspec"
+        sinc = languages + "toy.sinc"
+        base = "Ghidra/Processors/Toy/data/common/base.sinc"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            upstream = StandInRepo(Path(temp_dir) / "upstream")
+            upstream.commit(
+                {
+                    # Indented with spaces, tabs and both
+                    spec: '  @include "toy.sinc"\n',
+                    spec64: '\t@include\t"toy.sinc"\n',
+                    sinc: ' \t@include "../common/base.sinc"\n@include "$(X).sinc"\n',
+                    languages + "alone.slaspec": "define;\n",
+                    base: "define;\n",
+                }
+            )
+            graph = update_ghidra_head.GitHelper().load_spec_graph(
+                upstream.path, "HEAD"
+            )
+
+        # Includes using macros are skipped
+        self.assertEqual(graph.includes, {spec: [sinc], spec64: [sinc], sinc: [base]})
+        # What the performance gate compiles when the innermost file changes
+        self.assertEqual(graph.affected_specs({base}), [spec, spec64])
+
+
+class JsonReportTest(unittest.TestCase):
+    def test_changed_files(self) -> None:
+        sinc = "Ghidra/Processors/Toy/data/languages/toy.sinc"
+        slaspec = "Ghidra/Processors/Toy/data/languages/toy.slaspec"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            upstream = StandInRepo(Path(temp_dir) / "upstream")
+            old_commit = git(upstream.path, "rev-parse", "HEAD")
+            new_commit = upstream.commit(
+                {sinc: "define;\n", slaspec: '@include "toy.sinc"\n'}
+            )
+            updater = update_ghidra_head.GhidraUpdater(
+                dry_run=True, check_patches=False
+            )
+            report = updater.compare_commits(upstream.path, old_commit, new_commit)
+
+        out = io.StringIO()
+        report.write_json(out)
+        data = json.loads(out.getvalue())
+        self.assertEqual(data["format_version"], 2)
+        expected = [{"status": "A", "path": sinc}, {"status": "M", "path": slaspec}]
+        self.assertEqual(data["changed_files"], expected)
+        (commit,) = data["commits"]
+        self.assertEqual(commit["hash"], new_commit)
+        self.assertEqual(commit["files"], expected)
+        (processor,) = data["impact"]["processors"]
+        self.assertEqual(processor["processor"], "Toy")
+        self.assertEqual(processor["changed_files"], expected)
+        self.assertEqual(processor["affected_specs"], [slaspec])
+
+
+def main(argv: List[str]) -> int:
+    program = unittest.main(argv=argv, exit=False)
+    return 0 if program.result.wasSuccessful() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""Tests of the sleigh-lift tool
+
+Usage: sleigh_lift_test.py sleigh_lift spec_files_root [unittest arguments]
+"""
+
+import json
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(
+    0, str(Path(__file__).resolve().parents[2] / "extra-tools" / "sleigh-lift")
+)
+import lift_client  # noqa: E402
+
+# Set from the command line
+SLEIGH_LIFT = ""
+SPEC_ROOT = ""
+
+SLA_FILE = "ARM8_le.sla"
+
+# `cmp r0, #0`, `beq 0x1010`, `mov r0, #1`, `bx lr`, `bl 0x101c`,
+# `b 0x1008`, an undefined word and `bx lr`, at 0x1000
+CODE_ADDRESS = 0x1000
+CODE = bytes.fromhex("000050e30100000a0100a0e31eff2fe1010000ebfbffffeaffffffff1eff2fe1")
+
+# How long to wait for a server to load its languages and start listening
+SERVER_START_TIMEOUT = 60
+
+
+def run_lift(*args: str, check: bool = True) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [SLEIGH_LIFT, *args, "-p", SPEC_ROOT],
+        capture_output=True,
+        check=check,
+    )
+
+
+def lift_bytes(action: str, address: int, data: bytes, *args: str) -> bytes:
+    """The output of lifting `data` at `address` from the command line."""
+    return run_lift(action, SLA_FILE, data.hex(), "-a", hex(address), *args).stdout
+
+
+class LiftServer:
+    """A server running in the background, on a socket in a temporary
+    directory."""
+
+    def __init__(self, *args: str, spec_root: Optional[str] = None):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = Path(self.temp_dir.name) / "lift.sock"
+        self.process = subprocess.Popen(
+            [
+                SLEIGH_LIFT,
+                "--serve",
+                str(self.socket_path),
+                "-p",
+                spec_root or SPEC_ROOT,
+                *args,
+            ],
+            stderr=subprocess.PIPE,
+        )
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while not self._accepts_connections():
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited: {self.stop()}")
+            if time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError("Server didn't start listening in time")
+            time.sleep(0.05)
+
+    def _accepts_connections(self) -> bool:
+        if not self.socket_path.exists():
+            return False
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(str(self.socket_path))
+            except OSError:
+                return False
+        return True
+
+    def client(self) -> lift_client.LiftClient:
+        return lift_client.LiftClient(self.socket_path)
+
+    def stop(self) -> str:
+        """Interrupt the server and return what it wrote to stderr."""
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+        _, stderr = self.process.communicate(timeout=SERVER_START_TIMEOUT)
+        self.temp_dir.cleanup()
+        return stderr.decode()
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix domain sockets")
+class ServeTest(unittest.TestCase):
+    server: Optional[LiftServer] = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = LiftServer("-t", "2", "-w", SLA_FILE)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        if cls.server:
+            cls.server.stop()
+
+    def test_matches_command_line(self) -> None:
+        # Enough requests to keep both workers busy, each with its own address
+        requests = [
+            lift_client.LiftRequest(CODE_ADDRESS + i * 0x100, CODE[:24])
+            for i in range(16)
+        ]
+        with self.server.client() as client:
+            for kind, action in [
+                (lift_client.KIND_PCODE, "pcode"),
+                (lift_client.KIND_DISASSEMBLE, "disassemble"),
+            ]:
+                for output_format in ["text", "jsonl"]:
+                    responses = client.lift_many(
+                        kind, SLA_FILE, requests, output_format=output_format
+                    )
+                    for request, response in zip(requests, responses):
+                        self.assertEqual(response.status, lift_client.STATUS_OK)
+                        self.assertEqual(
+                            response.output,
+                            lift_bytes(
+                                action,
+                                request.address,
+                                request.data,
+                                "-O",
+                                output_format,
+                            ),
+                        )
+
+    def test_errors(self) -> None:
+        with self.server.client() as client:
+            responses = client.lift_many(
+                lift_client.KIND_DISASSEMBLE,
+                "missing.sla",
+                [lift_client.LiftRequest(CODE_ADDRESS, CODE[:4])],
+            )
+            self.assertEqual(responses[0].status, lift_client.STATUS_FAILED)
+            self.assertIn("missing.sla", responses[0].message)
+
+            overflow, undefined = client.lift_many(
+                lift_client.KIND_DISASSEMBLE,
+                SLA_FILE,
+                [
+                    lift_client.LiftRequest(0xFFFFFFFE, CODE[:4]),
+                    lift_client.LiftRequest(CODE_ADDRESS, CODE[:4] + CODE[24:28]),
+                ],
+            )
+            self.assertEqual(overflow.status, lift_client.STATUS_FAILED)
+            # Instructions before the one that failed are still returned
+            self.assertEqual(undefined.status, lift_client.STATUS_DECODE_ERROR)
+            self.assertIn(b"cmp", undefined.output)
+
+            # The connection is still usable after errors
+            (response,) = client.lift_many(
+                lift_client.KIND_DISASSEMBLE,
+                SLA_FILE,
+                [lift_client.LiftRequest(CODE_ADDRESS, CODE[:4])],
+            )
+            self.assertEqual(response.status, lift_client.STATUS_OK)
+
+    def test_stats(self) -> None:
+        with self.server.client() as client:
+            before = client.stats()
+            client.lift_many(
+                lift_client.KIND_PCODE,
+                SLA_FILE,
+                [lift_client.LiftRequest(CODE_ADDRESS, CODE[:8])] * 3,
+            )
+            after = client.stats()
+        self.assertEqual(after["workers"], 2)
+        # The stats request itself is counted too
+        self.assertEqual(after["requests"], before["requests"] + 4)
+        (language,) = after["languages"]
+        self.assertTrue(language["sla"].endswith(SLA_FILE))
+        self.assertEqual(language["pool_misses"], 0)
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix domain sockets")
+class ServeManyLanguagesTest(unittest.TestCase):
+    # More than the process-wide language cache holds
+    NUM_LANGUAGES = 17
+
+    def test_keeps_engines_of_evicted_languages(self) -> None:
+        # Copies of the same language under different names
+        (sla_path,) = Path(SPEC_ROOT).glob(
+            f"Ghidra/Processors/*/data/languages/{SLA_FILE}"
+        )
+        names = [f"arm{i}.sla" for i in range(self.NUM_LANGUAGES)]
+        with tempfile.TemporaryDirectory() as spec_root:
+            languages_dir = Path(spec_root) / "Ghidra/Processors/ARM/data/languages"
+            languages_dir.mkdir(parents=True)
+            for name in names:
+                shutil.copyfile(sla_path, languages_dir / name)
+
+            server = LiftServer("-t", "1", spec_root=spec_root)
+            try:
+                with server.client() as client:
+                    for _ in range(2):
+                        for name in names:
+                            (response,) = client.lift_many(
+                                lift_client.KIND_DISASSEMBLE,
+                                name,
+                                [lift_client.LiftRequest(CODE_ADDRESS, CODE[:4])],
+                            )
+                            self.assertEqual(response.status, lift_client.STATUS_OK)
+                    stats = client.stats()
+            finally:
+                server.stop()
+
+        self.assertEqual(len(stats["languages"]), self.NUM_LANGUAGES)
+        # The second round reuses the engine from the first, although each
+        # language was evicted from the cache in the meantime
+        for language in stats["languages"]:
+            self.assertEqual(language["pool_misses"], 1)
+            self.assertEqual(language["pool_hits"], 1)
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix domain sockets")
+class ServeUnreadResponsesTest(unittest.TestCase):
+    # `mov r0, #1` repeated, with a few megabytes of p-code
+    MANY_MOVS = bytes.fromhex("0100a0e3") * 4096
+
+    # Enough responses to go over the server's limit on unread ones
+    MAX_REQUESTS = 1000
+
+    def setUp(self) -> None:
+        self.server = LiftServer("-t", "2", "-w", SLA_FILE)
+        self.addCleanup(self.server.stop)
+
+    def pcode_frame(self, client: lift_client.LiftClient) -> bytes:
+        _, frame = client.encode_request(
+            lift_client.KIND_PCODE, SLA_FILE, address=0, data=self.MANY_MOVS
+        )
+        return frame
+
+    def check_served(self, client: lift_client.LiftClient) -> None:
+        (response,) = client.lift_many(
+            lift_client.KIND_DISASSEMBLE,
+            SLA_FILE,
+            [lift_client.LiftRequest(CODE_ADDRESS, CODE[:4])],
+        )
+        self.assertEqual(response.status, lift_client.STATUS_OK)
+
+    def test_disconnects_client(self) -> None:
+        with self.server.client() as stuck, self.server.client() as client:
+            frame = self.pcode_frame(stuck)
+            # Sending fails once the server gives up on the client
+            with self.assertRaises(OSError):
+                for _ in range(self.MAX_REQUESTS):
+                    stuck.send(frame)
+            # While the workers keep serving others
+            self.check_served(client)
+        stderr = self.server.stop()
+        self.assertEqual(self.server.process.returncode, 0)
+        self.assertIn("bytes of unread responses", stderr)
+
+    def test_stops_on_sigterm(self) -> None:
+        with self.server.client() as stuck, self.server.client() as client:
+            frame = self.pcode_frame(stuck)
+            for _ in range(4):
+                stuck.send(frame)
+            self.check_served(client)
+            stderr = self.server.stop()
+        self.assertEqual(self.server.process.returncode, 0)
+        self.assertIn("Closing 1 connections with unread responses", stderr)
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix domain sockets")
+class ServeShutdownTest(unittest.TestCase):
+    def test_stops_on_sigterm(self) -> None:
+        server = LiftServer("-t", "1")
+        socket_path = server.socket_path
+        stderr = server.stop()
+        self.assertEqual(server.process.returncode, 0)
+        self.assertFalse(socket_path.exists())
+        stats = json.loads(stderr.split("Final statistics: ", 1)[1])
+        self.assertEqual(stats["workers"], 1)
+
+    def test_unknown_preloaded_language(self) -> None:
+        with self.assertRaises(RuntimeError):
+            LiftServer("-t", "1", "-w", "missing.sla")
+
+
+class CommandLineTest(unittest.TestCase):
+    def test_address_formats(self) -> None:
+        output = run_lift(
+            "disassemble", SLA_FILE, CODE[:4].hex(), "-a", str(CODE_ADDRESS)
+        ).stdout
+        self.assertTrue(output.startswith(b"0x00001000: cmp "))
+        self.assertEqual(output, lift_bytes("disassemble", CODE_ADDRESS, CODE[:4]))
+
+        result = run_lift("disassemble", SLA_FILE, "00", "-a", "0x", check=False)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn(b"Invalid -a argument: 0x", result.stderr)
+
+    def test_address_overflow(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            code_path = Path(temp_dir) / "code.bin"
+            code_path.write_bytes(CODE[:8])
+            for source, args in [
+                (b"bytes arg", [CODE[:8].hex(), "-a", "0xfffffffc"]),
+                (b"binary file", ["-b", str(code_path), "-a", "0xfffffffc"]),
+                (b"segment " + bytes(code_path), ["-m", f"{code_path}@0xfffffffc"]),
+            ]:
+                result = run_lift("disassemble", SLA_FILE, *args, check=False)
+                self.assertNotEqual(result.returncode, 0)
+                self.assertIn(
+                    b"Too many bytes specified in " + source + b", would result",
+                    result.stderr,
+                )
+
+
+def read_binary_output(output: bytes) -> List[tuple]:
+    """The records of binary disassembly output, as (kind, fields...) tuples."""
+    assert output[:8] == b"SLPB" + struct.pack("<I", 2)
+    pos = 8
+
+    def read(fmt: str) -> tuple:
+        nonlocal pos
+        values = struct.unpack_from(fmt, output, pos)
+        pos += struct.calcsize(fmt)
+        return values
+
+    def read_string() -> str:
+        nonlocal pos
+        (size,) = read("<I")
+        pos += size
+        return output[pos - size : pos].decode()
+
+    (num_spaces,) = read("<I")
+    for _ in range(num_spaces):
+        read("<I")
+        read_string()
+    records = []
+    while pos < len(output):
+        (kind,) = read("<B")
+        if kind == 2:
+            address, _ = read("<QI")
+            records.append((kind, address, read_string(), read_string()))
+        elif kind == 4:
+            number, has_address, address = read("<QBQ")
+            records.append(
+                (kind, number, address if has_address else None, read_string())
+            )
+        else:
+            raise ValueError(f"Unexpected record kind {kind}")
+    return records
+
+
+class BatchTest(unittest.TestCase):
+    """Every input record gets an end marker, even if it is skipped."""
+
+    def lift_records(self, data: bytes, *args: str) -> subprocess.CompletedProcess:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = Path(temp_dir) / "records"
+            input_path.write_bytes(data)
+            return run_lift(
+                "disassemble", SLA_FILE, "-i", str(input_path), *args, check=False
+            )
+
+    def test_text_records(self) -> None:
+        result = self.lift_records(
+            b"# comment\n"
+            + f"{CODE_ADDRESS:#x} {CODE[:4].hex()}\n".encode()
+            + b"\n0x2000 zz\nbad 00\n0x3000 00 extra\n"
+            + f"0x4000 {CODE[24:28].hex()}\n".encode()
+            + b"0xfffffffc 0100a0e10100a0e1\n"
+            + b"0x5000 0100a0e1\n",
+            "-O",
+            "jsonl",
+        )
+        self.assertEqual(result.returncode, 0)
+        records = [json.loads(line) for line in result.stdout.decode().splitlines()]
+        self.assertEqual(records[0]["mnemonic"], "cmp")
+        self.assertEqual(records[-2]["addr"], 0x5000)
+        # Records are numbered by their line
+        expected = [
+            (2, CODE_ADDRESS, None),
+            (4, 0x2000, "Invalid hex byte value 'zz'"),
+            (5, None, "Invalid address: bad"),
+            (6, 0x3000, "Unexpected field: extra"),
+            (7, 0x4000, "BadDataError @ 0x00004000"),
+            (8, 0xFFFFFFFC, "Too many bytes, would result in a 32-bit overflow"),
+            (9, 0x5000, None),
+        ]
+        ends = [record for record in records if "end" in record]
+        self.assertEqual(len(ends), len(expected))
+        for end, (number, address, error) in zip(ends, expected):
+            self.assertEqual((end["record"], end["addr"]), (number, address))
+            if error is None:
+                self.assertNotIn("error", end)
+            else:
+                self.assertTrue(end["error"].startswith(error), end["error"])
+                self.assertIn(f"Line {number}: {error}".encode(), result.stderr)
+
+        # Text output has an empty line for each record
+        result = self.lift_records(b"0x1000 zz\n0x1000 0100a0e1\n")
+        self.assertEqual(result.stdout, b"\n0x00001000: cpy r0,r1\n\n")
+
+    def test_binary_records(self) -> None:
+        def record(address: int, data: bytes, length: Optional[int] = None) -> bytes:
+            if length is None:
+                length = len(data)
+            return struct.pack("<QI", address, length) + data
+
+        result = self.lift_records(
+            record(CODE_ADDRESS, CODE[:4])
+            + record(0xFFFFFFFC, CODE[:8])
+            + record(0x4000, CODE[24:28])
+            + record(0x5000, CODE[:2], length=4),
+            "-f",
+            "binary",
+            "-O",
+            "binary",
+        )
+        # The input ended in the middle of a record
+        self.assertNotEqual(result.returncode, 0)
+        records = read_binary_output(result.stdout)
+        self.assertEqual(records[0][:3], (2, CODE_ADDRESS, "cmp"))
+        self.assertEqual(
+            [record[:3] for record in records[1:]],
+            [(4, 1, CODE_ADDRESS), (4, 2, 0xFFFFFFFC), (4, 3, 0x4000), (4, 4, 0x5000)],
+        )
+        errors = [record[3] for record in records[1:]]
+        self.assertEqual(
+            errors[:2], ["", "Too many bytes, would result in a 32-bit overflow"]
+        )
+        self.assertIn("Unable to resolve constructor", errors[2])
+        self.assertEqual(errors[3], "Truncated bytes")
+
+
+class ControlFlowTest(unittest.TestCase):
+    # Blocks of CODE reachable from its start, with their successors. The
+    # call target 0x101c is a block of its own rather than a successor, and
+    # the undefined word at 0x1018 isn't reached
+    EXPECTED_BLOCKS = {
+        0x1000: [0x1008, 0x1010],
+        0x1008: [],
+        0x1010: [0x1008],
+        0x101C: [],
+    }
+
+    def lift_reachable(self, *entries: int) -> Dict[int, List[int]]:
+        """The blocks reachable from the entries, with their successors, after
+        checking that every reachable instruction is lifted once, in order."""
+        args = []
+        for entry in entries:
+            args += ["-e", hex(entry)]
+        output = lift_bytes(
+            "disassemble", CODE_ADDRESS, CODE, "-O", "jsonl", *args
+        ).decode()
+        blocks: Dict[int, List[int]] = {}
+        addresses = []
+        for line in output.splitlines():
+            record = json.loads(line)
+            if "block" in record:
+                blocks[record["block"]] = record["succs"]
+            elif "addr" in record:
+                addresses.append(record["addr"])
+        self.assertEqual(addresses, sorted(set(addresses)))
+        self.assertEqual(sorted(blocks), [a for a in addresses if a in blocks])
+        return blocks
+
+    def test_follows_branches(self) -> None:
+        self.assertEqual(self.lift_reachable(CODE_ADDRESS), self.EXPECTED_BLOCKS)
+
+    def test_multiple_entries(self) -> None:
+        # An entry inside a block splits it
+        blocks = self.lift_reachable(CODE_ADDRESS, 0x1014)
+        self.assertEqual(blocks[0x1010], [0x1014])
+        self.assertEqual(blocks[0x1014], [0x1008])
+        self.assertEqual(len(blocks), len(self.EXPECTED_BLOCKS) + 1)
+
+        self.assertEqual(self.lift_reachable(0x1008), {0x1008: []})
+        self.assertEqual(self.lift_reachable(0x101C, 0x1008), {0x1008: [], 0x101C: []})
+
+    def test_text_output(self) -> None:
+        output = lift_bytes("disassemble", CODE_ADDRESS, CODE, "-e", "0x1000")
+        self.assertIn(b"block 0x00001000 -> 0x00001008 0x00001010\n", output)
+        self.assertNotIn(b"0x00001018", output)
+
+    def test_binary_file(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            code_path = Path(temp_dir) / "code.bin"
+            code_path.write_bytes(CODE)
+            output = run_lift(
+                "pcode",
+                SLA_FILE,
+                "-b",
+                str(code_path),
+                "-a",
+                str(CODE_ADDRESS),
+                "-e",
+                hex(CODE_ADDRESS),
+            ).stdout
+        self.assertEqual(
+            output, lift_bytes("pcode", CODE_ADDRESS, CODE, "-e", hex(CODE_ADDRESS))
+        )
+
+    def test_rejects_entry_outside_image(self) -> None:
+        result = run_lift(
+            "disassemble",
+            SLA_FILE,
+            CODE.hex(),
+            "-a",
+            str(CODE_ADDRESS),
+            "-e",
+            "0x2000",
+            check=False,
+        )
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn(b"not in the image", result.stderr)
+
+
+def main(argv: List[str]) -> int:
+    global SLEIGH_LIFT, SPEC_ROOT
+    if len(argv) < 3:
+        print(__doc__, file=sys.stderr)
+        return 1
+    SLEIGH_LIFT = argv[1]
+    SPEC_ROOT = argv[2]
+    program = unittest.main(argv=[argv[0], *argv[3:]], exit=False)
+    return 0 if program.result.wasSuccessful() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
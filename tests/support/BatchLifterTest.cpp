@@ -0,0 +1,130 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include <sleigh/BatchLifter.h>
+
+#include "TestSupport.h"
+
+namespace {
+
+// Decode a region on its own, the way the workers should
+sleigh::RegionLiftResult DecodeAlone(const sleigh::Language &language,
+                                     ghidra::LoadImage &image,
+                                     const sleigh::LiftRegion &region) {
+  sleigh::RegionLiftResult result;
+  result.region = region;
+  auto engine = language.CreateEngine(&image);
+  engine->Engine().allowContextSet(false);
+  for (uint64_t offset = 0; offset < region.length;) {
+    sleigh::LiftedInstruction insn;
+    try {
+      sleigh::DecodeInstruction(engine->Engine(), region.address + offset,
+                                true, true, insn);
+    } catch (ghidra::LowlevelError &err) {
+      result.error = err.explain;
+      result.error_address = region.address + offset;
+      break;
+    }
+    offset += insn.length;
+    result.instructions.push_back(std::move(insn));
+  }
+  return result;
+}
+
+bool SameRegion(const sleigh::RegionLiftResult &a,
+                const sleigh::RegionLiftResult &b) {
+  if (a.region.address != b.region.address ||
+      a.region.length != b.region.length || a.error != b.error ||
+      a.error_address != b.error_address ||
+      a.instructions.size() != b.instructions.size()) {
+    return false;
+  }
+  for (size_t i = 0; i < a.instructions.size(); ++i) {
+    if (!sleigh_test::SameInstruction(
+            sleigh_test::WithoutSpaceOperands(a.instructions[i]),
+            sleigh_test::WithoutSpaceOperands(b.instructions[i]))) {
+      return false;
+    }
+  }
+  return true;
+}
+
+// Results don't depend on the number of threads, even when an instruction
+// sets the context of another region. Here each `blx` switches to Thumb mode
+// at the start of the next region, which would decode differently depending
+// on whether the same worker decoded the `blx` first.
+void TestThreadCounts(const sleigh::Language &language) {
+  sleigh_test::TestImage image;
+  std::vector<sleigh::LiftRegion> regions;
+  for (uint64_t base = 0x10000; base <= 0x100000; base += 0x10000) {
+    // `blx` to base + 0x1000, then `mov r0, r1` and `bx lr`
+    image.Map(base, sleigh_test::FromHex("fe0300fa0100a0e11eff2fe1"));
+    // `mov r8, r8` twice in Thumb mode, a store in ARM mode
+    image.Map(base + 0x1000, sleigh_test::FromHex("c046c0461eff2fe1"));
+    regions.push_back({base, 12});
+    regions.push_back({base + 0x1000, 8});
+  }
+
+  sleigh::BatchLiftOptions options;
+  options.num_threads = 1;
+  const auto single = sleigh::LiftRegions(language, image, regions, options);
+  options.num_threads = 4;
+  const auto multi = sleigh::LiftRegions(language, image, regions, options);
+
+  CHECK(single.space_names == multi.space_names);
+  CHECK(single.regions.size() == regions.size());
+  CHECK(multi.regions.size() == regions.size());
+  for (size_t i = 0; i < regions.size(); ++i) {
+    CHECK(!single.regions[i].error);
+    CHECK(SameRegion(single.regions[i], multi.regions[i]));
+    CHECK(SameRegion(single.regions[i],
+                     DecodeAlone(language, image, regions[i])));
+  }
+  // The second regions are decoded in ARM mode
+  CHECK(single.regions[1].instructions.size() == 2);
+  CHECK(single.regions[1].instructions[0].length == 4);
+}
+
+// Regions must fit in the code space, but may end at its top
+void TestSpaceBounds(const sleigh::Language &language) {
+  sleigh_test::TestImage image;
+  // `mov r0, r1` twice
+  image.Map(0xfffffff8, sleigh_test::FromHex("0100a0e10100a0e1"));
+  const std::vector<sleigh::LiftRegion> regions = {
+      {0xfffffff8, 8},
+      {0xfffffff8, 16},
+      {0x100000000, 4},
+      {0xfffffffc, 0},
+  };
+  sleigh::BatchLiftOptions options;
+  options.num_threads = 2;
+  const auto result = sleigh::LiftRegions(language, image, regions, options);
+  CHECK(result.regions.size() == regions.size());
+
+  CHECK(!result.regions[0].error);
+  CHECK(result.regions[0].instructions.size() == 2);
+  CHECK(result.regions[0].instructions[1].address == 0xfffffffc);
+
+  for (size_t i : {1, 2}) {
+    CHECK(result.regions[i].error);
+    CHECK(result.regions[i].error_address == regions[i].address);
+    CHECK(result.regions[i].instructions.empty());
+  }
+
+  CHECK(!result.regions[3].error);
+  CHECK(result.regions[3].instructions.empty());
+}
+
+} // namespace
+
+int main(int argc, char *argv[]) {
+  const auto language = sleigh_test::LoadArm(sleigh_test::SpecRoot(argc, argv));
+  TestThreadCounts(*language);
+  TestSpaceBounds(*language);
+  return 0;
+}
@@ -0,0 +1,121 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include <sleigh/InstructionCache.h>
+
+#include "TestSupport.h"
+
+namespace {
+
+// `ldr r0, [r1]`, `str r0, [r1]`, `add r0, r1, r2`, `bl` 0x100 bytes ahead,
+// `ldr r0, [pc, #8]` and `bx lr`, which cover loads and stores, and
+// operands relative to the instruction's address
+const std::string kCode =
+    sleigh_test::FromHex("000091e5000081e5020081e03e0000eb08009fe51eff2fe1");
+constexpr uint64_t kCodeSize = 24;
+
+// The same code at addresses with the same alignment
+constexpr uint64_t kFirstCopy = 0x1000;
+constexpr uint64_t kSecondCopy = 0x8000;
+constexpr uint64_t kThirdCopy = 0x123450;
+
+std::unique_ptr<sleigh::LanguageEngine>
+CreateEngine(const sleigh::Language &language, ghidra::LoadImage &image) {
+  auto engine = language.CreateEngine(&image);
+  engine->Engine().allowContextSet(false);
+  return engine;
+}
+
+// Lift the code at `base` through the cache and directly with the same
+// engine, and check that the results are identical
+void CheckCopy(sleigh::InstructionCache &cache, sleigh::LanguageEngine &engine,
+               ghidra::LoadImage &image, uint64_t base, bool disassemble) {
+  sleigh::LiftedInstruction cached, plain;
+  for (uint64_t address = base; address < base + kCodeSize;
+       address += plain.length) {
+    cache.Lift(engine, image, address, disassemble, true, cached);
+    sleigh::DecodeInstruction(engine.Engine(), address, disassemble, true,
+                              plain);
+    CHECK(sleigh_test::SameInstruction(cached, plain));
+  }
+}
+
+// Hits are relocated to the requested address
+void TestRelocation(const sleigh::Language &language) {
+  sleigh_test::TestImage image;
+  image.Map(kFirstCopy, kCode);
+  image.Map(kSecondCopy, kCode);
+  auto engine = CreateEngine(language, image);
+  sleigh::InstructionCache cache(language);
+
+  CheckCopy(cache, *engine, image, kFirstCopy, false);
+  auto stats = cache.Stats();
+  CHECK(stats.hits == 0);
+  CHECK(stats.misses == 6);
+  CHECK(stats.uncacheable == 0);
+  CHECK(stats.entries == 6);
+
+  CheckCopy(cache, *engine, image, kSecondCopy, false);
+  stats = cache.Stats();
+  CHECK(stats.hits == 6);
+  CHECK(stats.misses == 6);
+}
+
+// The disassembly of `bl` and of the PC-relative `ldr` shows their target
+// addresses, which can't be relocated
+void TestDisassembly(const sleigh::Language &language) {
+  sleigh_test::TestImage image;
+  image.Map(kFirstCopy, kCode);
+  image.Map(kSecondCopy, kCode);
+  auto engine = CreateEngine(language, image);
+  sleigh::InstructionCache cache(language);
+
+  CheckCopy(cache, *engine, image, kFirstCopy, true);
+  CheckCopy(cache, *engine, image, kSecondCopy, true);
+  const auto stats = cache.Stats();
+  CHECK(stats.hits == 4);
+  CHECK(stats.misses == 8);
+  CHECK(stats.uncacheable == 4);
+
+  // Whether to disassemble is part of the key
+  sleigh::LiftedInstruction insn;
+  cache.Lift(*engine, image, kFirstCopy, false, true, insn);
+  CHECK(insn.mnemonic.empty());
+  cache.Lift(*engine, image, kSecondCopy, true, true, insn);
+  CHECK(insn.mnemonic == "ldr");
+}
+
+// Instructions cached with one engine are lifted correctly for another,
+// down to the address space operands of loads and stores
+void TestSharedBetweenEngines(const sleigh::Language &language) {
+  sleigh_test::TestImage image;
+  image.Map(kFirstCopy, kCode);
+  image.Map(kThirdCopy, kCode);
+  auto first_engine = CreateEngine(language, image);
+  auto second_engine = CreateEngine(language, image);
+  sleigh::InstructionCache cache(language);
+
+  CheckCopy(cache, *first_engine, image, kFirstCopy, false);
+  CheckCopy(cache, *second_engine, image, kThirdCopy, false);
+  CHECK(cache.Stats().hits == 6);
+
+  // The entries outlive the engine that filled the cache
+  first_engine.reset();
+  CheckCopy(cache, *second_engine, image, kFirstCopy, false);
+  CHECK(cache.Stats().hits == 12);
+}
+
+} // namespace
+
+int main(int argc, char *argv[]) {
+  const auto language = sleigh_test::LoadArm(sleigh_test::SpecRoot(argc, argv));
+  TestRelocation(*language);
+  TestDisassembly(*language);
+  TestSharedBetweenEngines(*language);
+  return 0;
+}
@@ -0,0 +1,141 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include "TestSupport.h"
+
+namespace fs = std::filesystem;
+
+namespace {
+
+// `mov r8, r8` in Thumb mode, and a 4 byte instruction in ARM mode
+const std::string kThumbNops = sleigh_test::FromHex("c046c046");
+
+uint32_t DecodedLength(sleigh::LanguageEngine &engine, uint64_t address) {
+  sleigh::LiftedInstruction insn;
+  sleigh::DecodeInstruction(engine.Engine(), address, true, true, insn);
+  return insn.length;
+}
+
+// Repeated lookups share one language
+void TestHits(const fs::path &dir) {
+  sleigh::LanguageCache cache;
+  const auto first = cache.Get(dir / "ARM8_le.sla", dir / "ARMt.pspec");
+  const auto second = cache.Get(dir / "ARM8_le.sla", dir / "ARMt.pspec");
+  CHECK(first == second);
+  // The processor spec is part of the key
+  const auto thumb = cache.Get(dir / "ARM8_le.sla", dir / "ARMtTHUMB.pspec");
+  CHECK(thumb != first);
+
+  const auto stats = cache.Stats();
+  CHECK(stats.hits == 1);
+  CHECK(stats.misses == 2);
+  CHECK(stats.evictions == 0);
+  CHECK(cache.Size() == 2);
+
+  sleigh_test::TestImage image;
+  image.Map(0x1000, kThumbNops);
+  CHECK(DecodedLength(*first->CreateEngine(&image), 0x1000) == 4);
+  CHECK(DecodedLength(*thumb->CreateEngine(&image), 0x1000) == 2);
+}
+
+// The least recently used language is evicted, and stays usable by whoever
+// still holds it
+void TestEviction(const fs::path &dir) {
+  const auto sla_path = dir / "ARM8_le.sla";
+  sleigh::LanguageCache cache(2);
+  const auto arm = cache.Get(sla_path, dir / "ARMt.pspec");
+  const auto thumb = cache.Get(sla_path, dir / "ARMtTHUMB.pspec");
+  CHECK(cache.Get(sla_path, dir / "ARMt.pspec") == arm);
+  const auto no_pspec = cache.Get(sla_path);
+  CHECK(cache.Size() == 2);
+  CHECK(cache.Stats().evictions == 1);
+
+  // The Thumb language was the least recently used
+  CHECK(cache.Get(sla_path, dir / "ARMt.pspec") == arm);
+  CHECK(cache.Get(sla_path) == no_pspec);
+  const auto stats = cache.Stats();
+  CHECK(cache.Get(sla_path, dir / "ARMtTHUMB.pspec") != thumb);
+  CHECK(cache.Stats().misses == stats.misses + 1);
+
+  sleigh_test::TestImage image;
+  image.Map(0x1000, kThumbNops);
+  CHECK(DecodedLength(*thumb->CreateEngine(&image), 0x1000) == 2);
+
+  cache.SetMaxLanguages(0);
+  CHECK(cache.Size() == 0);
+}
+
+// Languages whose files were modified are loaded again
+void TestReload(const fs::path &dir) {
+  sleigh_test::TempDir temp;
+  const auto sla_path = temp.Path() / "ARM8_le.sla";
+  fs::copy_file(dir / "ARM8_le.sla", sla_path);
+
+  sleigh::LanguageCache cache;
+  const auto old_language = cache.Get(sla_path);
+  CHECK(cache.Get(sla_path) == old_language);
+  CHECK(old_language->IsUpToDate());
+
+  fs::last_write_time(sla_path,
+                      fs::last_write_time(sla_path) + std::chrono::hours(1));
+  CHECK(!old_language->IsUpToDate());
+  const auto new_language = cache.Get(sla_path);
+  CHECK(new_language != old_language);
+  CHECK(new_language->IsUpToDate());
+  CHECK(cache.Get(sla_path) == new_language);
+  CHECK(cache.Size() == 1);
+  const auto stats = cache.Stats();
+  CHECK(stats.misses == 2);
+  CHECK(stats.hits == 2);
+
+  sleigh_test::TestImage image;
+  image.Map(0x1000, kThumbNops);
+  CHECK(DecodedLength(*old_language->CreateEngine(&image), 0x1000) == 4);
+  CHECK(DecodedLength(*new_language->CreateEngine(&image), 0x1000) == 4);
+
+  fs::remove(sla_path);
+  CHECK(!new_language->IsUpToDate());
+  bool threw = false;
+  try {
+    cache.Get(sla_path);
+  } catch (ghidra::LowlevelError &) {
+    threw = true;
+  }
+  CHECK(threw);
+}
+
+// Engines reused after being destroyed start over with the new load image
+// and the default context
+void TestRecycledEngines(const fs::path &dir) {
+  const auto language =
+      sleigh::Language::Load(dir / "ARM8_le.sla", dir / "ARMt.pspec");
+  sleigh_test::TestImage first_image, second_image;
+  // `blx` switches to Thumb mode at its target
+  first_image.Map(0x1000, sleigh_test::FromHex("fe0300fa"));
+  first_image.Map(0x2000, kThumbNops);
+  second_image.Map(0x2000, kThumbNops);
+  {
+    auto engine = language->CreateEngine(&first_image);
+    CHECK(DecodedLength(*engine, 0x1000) == 4);
+    CHECK(DecodedLength(*engine, 0x2000) == 2);
+  }
+  auto engine = language->CreateEngine(&second_image);
+  CHECK(DecodedLength(*engine, 0x2000) == 4);
+}
+
+} // namespace
+
+int main(int argc, char *argv[]) {
+  const auto dir =
+      sleigh_test::LanguagesDir(sleigh_test::SpecRoot(argc, argv), "ARM");
+  TestHits(dir);
+  TestEviction(dir);
+  TestReload(dir);
+  TestRecycledEngines(dir);
+  return 0;
+}
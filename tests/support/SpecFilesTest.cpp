@@ -0,0 +1,89 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#include <sleigh/Support.h>
+
+#include <fstream>
+
+#include "TestSupport.h"
+
+namespace fs = std::filesystem;
+
+namespace {
+
+// A languages directory whose modification time is well in the past, so that
+// adding a file to it changes it even on file systems with coarse timestamps
+fs::path MakeLanguagesDir(const fs::path &root, std::string_view processor) {
+  const auto dir = sleigh_test::LanguagesDir(root, processor);
+  fs::create_directories(dir);
+  const auto past = fs::last_write_time(dir) - std::chrono::hours(1);
+  fs::last_write_time(dir, past);
+  fs::last_write_time(root / "Ghidra" / "Processors", past);
+  return dir;
+}
+
+void Touch(const fs::path &path) { std::ofstream(path.string()).put('\n'); }
+
+// Files added to a processor after the first lookup are found
+void TestAddedFile(void) {
+  sleigh_test::TempDir root;
+  const auto dir = MakeLanguagesDir(root.Path(), "Test");
+  Touch(dir / "first.sla");
+  const std::vector<fs::path> search_paths = {root.Path()};
+
+  CHECK(sleigh::FindSpecFile("first.sla", search_paths) == dir / "first.sla");
+  CHECK(!sleigh::FindSpecFile("second.sla", search_paths));
+
+  Touch(dir / "second.sla");
+  CHECK(sleigh::FindSpecFile("second.sla", search_paths) == dir / "second.sla");
+  CHECK(sleigh::ListSpecFiles(search_paths).size() == 2);
+
+  fs::remove(dir / "first.sla");
+  CHECK(!sleigh::FindSpecFile("first.sla", search_paths));
+}
+
+// A manifest written before a file was added doesn't hide it
+void TestStaleManifest(void) {
+  sleigh_test::TempDir root;
+  const auto dir = MakeLanguagesDir(root.Path(), "Test");
+  Touch(dir / "first.sla");
+  std::ofstream(root.Path() / sleigh::kSpecFileManifestName)
+      << "Ghidra/Processors/Test/data/languages/first.sla\n";
+  Touch(dir / "second.sla");
+  const std::vector<fs::path> search_paths = {root.Path()};
+
+  CHECK(sleigh::FindSpecFile("first.sla", search_paths) == dir / "first.sla");
+  CHECK(sleigh::FindSpecFile("second.sla", search_paths) == dir / "second.sla");
+  CHECK(!sleigh::FindSpecFile("third.sla", search_paths));
+}
+
+// Later search paths are used for files that earlier ones lack
+void TestSearchOrder(void) {
+  sleigh_test::TempDir first, second;
+  const auto first_dir = MakeLanguagesDir(first.Path(), "Test");
+  const auto second_dir = MakeLanguagesDir(second.Path(), "Test");
+  Touch(first_dir / "shared.sla");
+  Touch(second_dir / "shared.sla");
+  const std::vector<fs::path> search_paths = {first.Path(), second.Path()};
+
+  CHECK(!sleigh::FindSpecFile("other.sla", search_paths));
+  Touch(second_dir / "other.sla");
+  CHECK(sleigh::FindSpecFile("other.sla", search_paths) ==
+        second_dir / "other.sla");
+  CHECK(sleigh::FindSpecFile("shared.sla", search_paths) ==
+        first_dir / "shared.sla");
+}
+
+} // namespace
+
+int main(void) {
+  TestAddedFile();
+  TestStaleManifest();
+  TestSearchOrder();
+  return 0;
+}
@@ -0,0 +1,176 @@
+/*
+  Copyright (c) 2026-present, Trail of Bits, Inc.
+  All rights reserved.
+
+  This source code is licensed in accordance with the terms specified in
+  the LICENSE file found in the root directory of this source tree.
+*/
+
+#pragma once
+
+#include <sleigh/LanguageCache.h>
+#include <sleigh/LiftedInstruction.h>
+#include <sleigh/libsleigh.hh>
+
+#include <chrono>
+#include <cstdint>
+#include <cstdlib>
+#include <filesystem>
+#include <iostream>
+#include <map>
+#include <memory>
+#include <string>
+#include <string_view>
+
+// Small helpers shared by the support library tests. Each test is its own
+// executable, which exits with a failure on the first check that fails.
+
+#define CHECK(cond) \
+  do { \
+    if (!(cond)) { \
+      std::cerr << __FILE__ << ':' << __LINE__ << ": Check failed: " #cond \
+                << std::endl; \
+      std::exit(EXIT_FAILURE); \
+    } \
+  } while (0)
+
+namespace sleigh_test {
+
+// Bytes at fixed addresses, reading as zeros everywhere else. It isn't
+// modified while decoding, so engines on several threads can share it.
+class TestImage : public ghidra::LoadImage {
+public:
+  TestImage(void) : ghidra::LoadImage("test") {}
+
+  void Map(uint64_t address, std::string bytes) {
+    segments[address] = std::move(bytes);
+  }
+
+  void loadFill(unsigned char *ptr, int size,
+                const ghidra::Address &addr) override {
+    for (int i = 0; i < size; ++i) {
+      const uint64_t address = addr.getOffset() + static_cast<uint64_t>(i);
+      ptr[i] = 0;
+      auto it = segments.upper_bound(address);
+      if (it != segments.begin()) {
+        --it;
+        if (address - it->first < it->second.size()) {
+          ptr[i] = static_cast<unsigned char>(it->second[address - it->first]);
+        }
+      }
+    }
+  }
+
+  std::string getArchType(void) const override { return "test"; }
+
+  void adjustVma(long) override {}
+
+private:
+  std::map<uint64_t, std::string> segments;
+};
+
+// Bytes from a string of hex digits
+inline std::string FromHex(std::string_view hex) {
+  std::string bytes;
+  for (size_t i = 0; i + 1 < hex.size(); i += 2) {
+    bytes.push_back(
+        static_cast<char>(std::stoi(std::string(hex.substr(i, 2)), 0, 16)));
+  }
+  return bytes;
+}
+
+// The directory holding the built spec files, passed as the only argument
+inline std::filesystem::path SpecRoot(int argc, char *argv[]) {
+  if (argc != 2) {
+    std::cerr << "Usage: " << argv[0] << " <spec files root>" << std::endl;
+    std::exit(EXIT_FAILURE);
+  }
+  return argv[1];
+}
+
+inline std::filesystem::path LanguagesDir(const std::filesystem::path &root,
+                                          std::string_view processor) {
+  return root / "Ghidra" / "Processors" / processor / "data" / "languages";
+}
+
+// Little-endian ARM, starting in Thumb mode if `thumb` is set. All of the
+// tests use this language, so that they only need one spec built.
+inline std::shared_ptr<const sleigh::Language>
+LoadArm(const std::filesystem::path &root, bool thumb = false) {
+  const auto dir = LanguagesDir(root, "ARM");
+  return sleigh::Language::Load(dir / "ARM8_le.sla",
+                                dir / (thumb ? "ARMtTHUMB.pspec" : "ARMt.pspec"));
+}
+
+// A fresh directory for files created by a test, removed on destruction
+class TempDir {
+public:
+  TempDir(void) {
+    static int count = 0;
+    const auto ticks =
+        std::chrono::steady_clock::now().time_since_epoch().count();
+    path = std::filesystem::temp_directory_path() /
+           ("sleigh-test-" + std::to_string(ticks) + "-" +
+            std::to_string(count++));
+    std::filesystem::create_directories(path);
+  }
+
+  ~TempDir(void) {
+    std::error_code ec;
+    std::filesystem::remove_all(path, ec);
+  }
+
+  TempDir(const TempDir &) = delete;
+  TempDir &operator=(const TempDir &) = delete;
+
+  const std::filesystem::path &Path(void) const { return path; }
+
+private:
+  std::filesystem::path path;
+};
+
+inline bool SameVarnode(const sleigh::LiftedVarnode &a,
+                        const sleigh::LiftedVarnode &b) {
+  return a.space == b.space && a.offset == b.offset && a.size == b.size;
+}
+
+inline bool SameInstruction(const sleigh::LiftedInstruction &a,
+                            const sleigh::LiftedInstruction &b) {
+  if (a.address != b.address || a.length != b.length ||
+      a.mnemonic != b.mnemonic || a.body != b.body ||
+      a.pcode.size() != b.pcode.size()) {
+    return false;
+  }
+  for (size_t i = 0; i < a.pcode.size(); ++i) {
+    const auto &op_a = a.pcode[i];
+    const auto &op_b = b.pcode[i];
+    if (op_a.opcode != op_b.opcode ||
+        op_a.output.has_value() != op_b.output.has_value() ||
+        (op_a.output && !SameVarnode(*op_a.output, *op_b.output)) ||
+        op_a.inputs.size() != op_b.inputs.size()) {
+      return false;
+    }
+    for (size_t j = 0; j < op_a.inputs.size(); ++j) {
+      if (!SameVarnode(op_a.inputs[j], op_b.inputs[j])) {
+        return false;
+      }
+    }
+  }
+  return true;
+}
+
+// The space operand of LOAD and STORE is a pointer to the address space of
+// the engine that decoded them. Clear it to compare instructions decoded by
+// different engines.
+inline sleigh::LiftedInstruction
+WithoutSpaceOperands(sleigh::LiftedInstruction insn) {
+  for (auto &op : insn.pcode) {
+    if ((op.opcode == ghidra::CPUI_LOAD || op.opcode == ghidra::CPUI_STORE) &&
+        !op.inputs.empty()) {
+      op.inputs[0].offset = 0;
+    }
+  }
+  return insn;
+}
+
+} // namespace sleigh_test